@@ -0,0 +1,207 @@
+"""
+Отложенная запись GenerationLog и ротация старых записей.
+
+Раньше каждая пачка планировщика сама открывала сессию и делала commit логов,
+а ротации «старше 7 дней» из docstring модели не было вовсе — generation_log
+рос бесконечно. Теперь:
+  • планировщик кладёт строки лога (и отметки last_*_sent_at метрик) в буфер
+    GenerationLogWriter.add() и сразу идёт дальше;
+  • фоновая задача сбрасывает буфер одним INSERT (executemany) + одним UPDATE
+    раз в METRICS_LOG_FLUSH_MS или сразу, как набралось METRICS_LOG_FLUSH_ROWS;
+  • раз в час purge_old_logs() удаляет записи старше METRICS_LOG_RETENTION_DAYS
+    порциями по METRICS_LOG_RETENTION_CHUNK — без долгой блокировки таблицы.
+
+Без запущенного цикла (скрипты, тесты) add() пишет сразу. На остановке
+приложения stop() дописывает хвост буфера.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_FLUSH_MS = 500
+_DEFAULT_FLUSH_ROWS = 1000
+_DEFAULT_RETENTION_DAYS = 7
+_DEFAULT_RETENTION_CHUNK = 5000
+_RETENTION_INTERVAL_SEC = 3600
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def purge_old_logs(days: Optional[int] = None, chunk: Optional[int] = None) -> int:
+    """Удалить записи старше days дней порциями по chunk (commit на порцию). Вернуть число удалённых."""
+    from sqlalchemy import delete, select
+    from db.postgres import SessionLocal
+    from db.metrics_models import GenerationLog
+
+    days = days or _env_int("METRICS_LOG_RETENTION_DAYS", _DEFAULT_RETENTION_DAYS)
+    chunk = chunk or _env_int("METRICS_LOG_RETENTION_CHUNK", _DEFAULT_RETENTION_CHUNK)
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            ids = select(GenerationLog.id).where(GenerationLog.sent_at < cutoff).limit(chunk)
+            deleted = db.execute(
+                delete(GenerationLog).where(GenerationLog.id.in_(ids.scalar_subquery())),
+                execution_options={"synchronize_session": False},
+            ).rowcount
+            db.commit()
+            total += deleted
+            if deleted < chunk:
+                break
+    finally:
+        db.close()
+    if total:
+        logger.info(f"[GenerationLog] retention: deleted {total} rows older than {days} days")
+    return total
+
+
+class GenerationLogWriter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._rows: list[dict] = []
+        self._touches: dict[int, dict] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: list[asyncio.Task] = []
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    def add(self, rows: list[dict], touches: Optional[dict[int, dict]] = None) -> None:
+        """
+        Поставить строки GenerationLog (словари колонок) и обновления колонок
+        TestMetric {metric_id: {колонка: значение}} в очередь записи.
+        Потокобезопасно — вызывается из потоков отправки планировщика.
+        """
+        with self._lock:
+            self._rows.extend(rows)
+            for metric_id, fields in (touches or {}).items():
+                self._touches.setdefault(metric_id, {}).update(fields)
+            pending = len(self._rows)
+            loop, wakeup = self._loop, self._wakeup
+        if loop is None:
+            self.flush()
+        elif pending >= _env_int("METRICS_LOG_FLUSH_ROWS", _DEFAULT_FLUSH_ROWS):
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def flush(self) -> int:
+        """Записать накопленное одним INSERT + одним UPDATE. Вернуть число строк лога."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                touches, self._touches = self._touches, {}
+            if rows or touches:
+                self._write(rows, touches)
+            return len(rows)
+
+    async def start(self) -> None:
+        """Запустить фоновый сброс буфера и ротацию (в lifespan)."""
+        if self._loop is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [
+            asyncio.create_task(self._flush_loop(), name="generation_log_flush"),
+            asyncio.create_task(self._retention_loop(), name="generation_log_retention"),
+        ]
+
+    async def stop(self) -> None:
+        """Остановить фоновые задачи и дописать хвост буфера."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        with self._lock:
+            self._loop = None
+            self._wakeup = None
+        await asyncio.to_thread(self.flush)
+
+    # ── Internal ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _write(rows: list[dict], touches: dict[int, dict]) -> None:
+        from sqlalchemy import bindparam, insert, select, update
+        from sqlalchemy.exc import IntegrityError
+        from db.postgres import SessionLocal
+        from db.metrics_models import GenerationLog, TestMetric
+
+        log_table, metric_table = GenerationLog.__table__, TestMetric.__table__
+        db = SessionLocal()
+        try:
+            for attempt in range(2):
+                try:
+                    # Core, а не ORM bulk: ORM пропускает None-колонки, и строки
+                    # с разным набором None дробили бы executemany на куски
+                    if rows:
+                        db.execute(insert(log_table), rows)
+                    # UPDATE по первичному ключу — executemany на каждый набор колонок
+                    groups: dict[tuple, list[dict]] = {}
+                    for mid, fields in touches.items():
+                        groups.setdefault(tuple(sorted(fields)), []).append({"b_id": mid, **fields})
+                    for columns, params in groups.items():
+                        db.execute(
+                            update(metric_table)
+                            .where(metric_table.c.id == bindparam("b_id"))
+                            .values({c: bindparam(c) for c in columns}),
+                            params,
+                        )
+                    db.commit()
+                    return
+                except IntegrityError as e:
+                    db.rollback()
+                    if attempt:
+                        raise
+                    # Метрику удалили, пока её строки ждали в буфере — без них пишем остальное
+                    ids = {r["test_metric_id"] for r in rows} | set(touches)
+                    alive = set(db.scalars(select(TestMetric.id).where(TestMetric.id.in_(ids))))
+                    logger.warning(f"[GenerationLog] dropping rows of deleted metrics {sorted(ids - alive)}: {e}")
+                    rows = [r for r in rows if r["test_metric_id"] in alive]
+                    touches = {mid: f for mid, f in touches.items() if mid in alive}
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[GenerationLog] flush of {len(rows)} rows failed: {e}")
+        finally:
+            db.close()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=_env_int("METRICS_LOG_FLUSH_MS", _DEFAULT_FLUSH_MS) / 1000,
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    async def _retention_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(purge_old_logs)
+            except Exception as e:
+                logger.error(f"[GenerationLog] retention failed: {e}")
+            await asyncio.sleep(_RETENTION_INTERVAL_SEC)
+
+
+# ── Singleton ─────────────────────────────────────────────────────────────────
+
+generation_log_writer = GenerationLogWriter()
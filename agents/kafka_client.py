@@ -13,11 +13,56 @@
   KAFKA_SSL_PASSWORD       — пароль приватного ключа, если он зашифрован
 
 Или через явный kafka_cfg: dict (приоритет над env).
+
+Producer для send() — долгоживущий, один на набор настроек подключения (ключ —
+sha256 от kafka_cfg и KAFKA_* env). Раньше на каждое сообщение создавался свой
+KafkaProducer: TCP/SASL-handshake и загрузка metadata на каждую из трёх
+отправок метрики. Теперь сообщения копятся linger_ms (KAFKA_LINGER_MS) и
+уходят пачками; close_producers() дописывает хвост и закрывает пул — на
+остановке приложения и при смене настроек Kafka.
 """
 
+import hashlib
+import json
+import logging
 import os
+import threading
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
+_DEFAULT_LINGER_MS = 20
+
+_producers: dict[str, object] = {}
+_producers_lock = threading.Lock()
+
+
+def _producer_key(kafka_cfg: Optional[dict]) -> str:
+    """Хэш настроек подключения: топики и таймауты не влияют, секреты в ключ не попадают открыто."""
+    cfg = {
+        k: v for k, v in (kafka_cfg or {}).items()
+        if k.startswith("kafka_") and not k.startswith("kafka_topic")
+    }
+    env = {k: v for k, v in os.environ.items() if k.startswith("KAFKA_")}
+    raw = json.dumps({"cfg": cfg, "env": env}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def close_producers(timeout: float = 10) -> None:
+    """Отправить накопленное и закрыть все producer'ы пула; следующий send() соберёт новый."""
+    with _producers_lock:
+        producers = list(_producers.values())
+        _producers.clear()
+    for producer in producers:
+        try:
+            producer.flush(timeout=timeout)
+        except Exception as e:
+            logger.warning("Kafka producer: flush перед закрытием не удался: %s", e)
+        try:
+            producer.close(timeout=timeout)
+        except Exception as e:
+            logger.warning("Kafka producer: закрытие не удалось: %s", e)
+
 
 class KafkaClient:
 
@@ -84,6 +129,25 @@ class KafkaClient:
 
         return KafkaProducer(**KafkaClient._build_producer_kwargs(kafka_cfg))
 
+    @classmethod
+    def _pooled_producer(cls, kafka_cfg: Optional[dict] = None):
+        key = _producer_key(kafka_cfg)
+        producer = _producers.get(key)
+        if producer is not None:
+            return producer
+        with _producers_lock:
+            producer = _producers.get(key)
+            if producer is None:
+                from kafka import KafkaProducer  # type: ignore
+
+                kwargs = cls._build_producer_kwargs(kafka_cfg)
+                try:
+                    kwargs["linger_ms"] = int(os.getenv("KAFKA_LINGER_MS", "") or _DEFAULT_LINGER_MS)
+                except ValueError:
+                    kwargs["linger_ms"] = _DEFAULT_LINGER_MS
+                producer = _producers[key] = KafkaProducer(**kwargs)
+        return producer
+
     # ── Consumer (просмотр топиков) ───────────────────────────────────────────
 
     @staticmethod
@@ -184,6 +248,42 @@ class KafkaClient:
         messages.sort(key=lambda m: m.get("timestamp") or 0, reverse=True)
         return messages[:limit]
 
+    @classmethod
+    def send_async(
+        cls,
+        topic:     str,
+        payload:   str,
+        key:       Optional[str] = None,
+        headers:   Optional[list[tuple[str, bytes]]] = None,
+        partition: Optional[int] = None,
+        kafka_cfg: Optional[dict] = None,
+    ):
+        """
+        Поставить сообщение в очередь общего producer'а и сразу вернуть future
+        (kafka-python FutureRecordMetadata). Сообщения, отправленные подряд,
+        уходят одной пачкой; доставку подтверждает future.get(timeout).
+        """
+        key_bytes   = key.encode("utf-8") if key else None
+        value_bytes = payload.encode("utf-8")
+
+        send_kwargs: dict = {"value": value_bytes, "key": key_bytes}
+        if headers:
+            send_kwargs["headers"] = headers
+        if partition is not None:
+            send_kwargs["partition"] = partition
+
+        return cls._pooled_producer(kafka_cfg).send(topic, **send_kwargs)
+
+    @staticmethod
+    def result(future, timeout: float = 10) -> dict:
+        """Дождаться доставки из send_async(): {"offset", "partition", "timestamp"}."""
+        record_meta = future.get(timeout=timeout)
+        return {
+            "offset":    record_meta.offset,
+            "partition": record_meta.partition,
+            "timestamp": record_meta.timestamp,
+        }
+
     @classmethod
     def send(
         cls,
@@ -195,7 +295,7 @@ class KafkaClient:
         kafka_cfg: Optional[dict] = None,
     ) -> dict:
         """
-        Отправить сообщение в Kafka.
+        Отправить сообщение в Kafka и дождаться подтверждения.
 
         Args:
             headers:   Kafka headers — list of (name: str, value: bytes).
@@ -206,24 +306,6 @@ class KafkaClient:
         Returns:
             {"offset": int, "partition": int, "timestamp": int}
         """
-        producer = cls._build_producer(kafka_cfg)
-        try:
-            key_bytes   = key.encode("utf-8") if key else None
-            value_bytes = payload.encode("utf-8")
-
-            send_kwargs: dict = {"value": value_bytes, "key": key_bytes}
-            if headers:
-                send_kwargs["headers"] = headers
-            if partition is not None:
-                send_kwargs["partition"] = partition
-
-            future = producer.send(topic, **send_kwargs)
-            producer.flush(timeout=10)
-            record_meta = future.get(timeout=10)
-            return {
-                "offset":    record_meta.offset,
-                "partition": record_meta.partition,
-                "timestamp": record_meta.timestamp,
-            }
-        finally:
-            producer.close(timeout=5)
+        future = cls.send_async(topic, payload, key=key, headers=headers,
+                                partition=partition, kafka_cfg=kafka_cfg)
+        return cls.result(future)
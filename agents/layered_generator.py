@@ -50,11 +50,49 @@ class LayeredGenerator:
     # ========================================================
     # LAYER 1: QA Documentation
     # ========================================================
+    _QA_DOC_CONTINUATION = (
+        "Продолжи документ точно с того места, где текст оборвался. "
+        "НЕ повторяй уже написанное, не начинай заново — только продолжение."
+    )
+
     def generate_qa_doc(self, requirement, feature="", context_docs="") -> tuple[str, bool]:
         """Возвращает (текст, truncated). truncated=True — ответ обрезан лимитом
         модели (finish_reason == "length"), а не потому что документация закончилась
         естественно. Раньше это было неотличимо от «модель сама решила закончить»."""
         from agents.llm_client import Message
+
+        # 4000 токенов не хватало на большие документы: промпт просит таблицы модели
+        # данных, несколько диаграмм PlantUML, полное описание API/Jobs/интеграций
+        # и чек-лист до 40 пунктов — на объёмной документации ответ упирался в потолок
+        # и файл обрывался посередине. Теперь при обрыве по лимиту chat_continued сам
+        # догенерирует продолжение (до 3 раз) — пользователь видит цельный документ,
+        # а не обрыв на полуслове. truncated=True остаётся, только если обрыв не
+        # удалось закрыть даже за 3 продолжения (документ экстремального объёма).
+        response = self.llm.chat_continued(
+            [Message(role="user", content=self._qa_doc_prompt(requirement, feature, context_docs))],
+            temperature=0.7, max_tokens=8000,
+            continuation_instruction=self._QA_DOC_CONTINUATION,
+        )
+        return response.content.strip(), response.finish_reason == "length"
+
+    async def agenerate_qa_doc(self, requirement, feature="", context_docs="",
+                               on_delta=None) -> tuple[str, bool]:
+        """generate_qa_doc для AsyncLLMClient.
+
+        on_delta — async-колбэк для кусков текста по мере генерации (поток в UI);
+        без него документ приходит целиком."""
+        from agents.llm_client import Message
+
+        response = await self.llm.achat_continued(
+            [Message(role="user", content=self._qa_doc_prompt(requirement, feature, context_docs))],
+            temperature=0.7, max_tokens=8000,
+            continuation_instruction=self._QA_DOC_CONTINUATION,
+            on_delta=on_delta,
+        )
+        return response.content.strip(), response.finish_reason == "length"
+
+    @staticmethod
+    def _qa_doc_prompt(requirement, feature="", context_docs="") -> str:
         from agents.prompt_templates import PromptTemplateManager
 
         detected_types = PromptTemplateManager.detect_type(requirement)
@@ -121,33 +159,46 @@ class LayeredGenerator:
             "- Не дублируй одну и ту же информацию в разных разделах\n"
             "- Только Markdown"
         )
-
-        # 4000 токенов не хватало на большие документы: промпт просит таблицы модели
-        # данных, несколько диаграмм PlantUML, полное описание API/Jobs/интеграций
-        # и чек-лист до 40 пунктов — на объёмной документации ответ упирался в потолок
-        # и файл обрывался посередине. Теперь при обрыве по лимиту chat_continued сам
-        # догенерирует продолжение (до 3 раз) — пользователь видит цельный документ,
-        # а не обрыв на полуслове. truncated=True остаётся, только если обрыв не
-        # удалось закрыть даже за 3 продолжения (документ экстремального объёма).
-        response = self.llm.chat_continued(
-            [Message(role="user", content=prompt)],
-            temperature=0.7, max_tokens=8000,
-            continuation_instruction=(
-                "Продолжи документ точно с того места, где текст оборвался. "
-                "НЕ повторяй уже написанное, не начинай заново — только продолжение."
-            ),
-        )
-        return response.content.strip(), response.finish_reason == "length"
+        return prompt
 
     # ========================================================
     # LAYER 2: Case list (максимальное покрытие, клиентские пути)
     # ========================================================
+    _CASE_LIST_CONTINUATION = (
+        "Ты остановился посередине JSON-массива. Продолжи ТОЧНО со следующего элемента "
+        "массива — не повторяй уже перечисленные, не открывай новый '[', не закрывай ']', "
+        "просто следующие объекты через запятую в том же формате."
+    )
+
     def generate_case_list(self, qa_doc, system="", feature=""):
         from agents.llm_client import Message
-        import json
-        import re
 
-        prompt = (
+        # Токенов: ~140 на кейс, ориентир до ~40 кейсов + запас. При обрыве по лимиту
+        # (много кейсов на объёмной документации) chat_continued сам догенерирует
+        # оставшиеся элементы массива — репарный парсинг (шаг 3 в _parse_case_list)
+        # остаётся как подстраховка на случай, если продолжение всё равно не закрыло
+        # JSON целиком.
+        response = self.llm.chat_continued(
+            [Message(role="user", content=self._case_list_prompt(qa_doc, feature))],
+            temperature=0.5, max_tokens=8000,
+            continuation_instruction=self._CASE_LIST_CONTINUATION,
+        )
+        return self._parse_case_list(response.content, feature)
+
+    async def agenerate_case_list(self, qa_doc, system="", feature=""):
+        """generate_case_list для AsyncLLMClient."""
+        from agents.llm_client import Message
+
+        response = await self.llm.achat_continued(
+            [Message(role="user", content=self._case_list_prompt(qa_doc, feature))],
+            temperature=0.5, max_tokens=8000,
+            continuation_instruction=self._CASE_LIST_CONTINUATION,
+        )
+        return self._parse_case_list(response.content, feature)
+
+    @staticmethod
+    def _case_list_prompt(qa_doc, feature="") -> str:
+        return (
             "Проанализируй QA документацию и создай список тест-кейсов с МАКСИМАЛЬНЫМ покрытием.\n\n"
             "QA ДОКУМЕНТАЦИЯ:\n" + qa_doc + "\n\n"
             "ПОДХОД — ПОСЛЕДОВАТЕЛЬНЫЕ КЛИЕНТСКИЕ ПУТИ:\n"
@@ -186,21 +237,12 @@ class LayeredGenerator:
             "Верни ТОЛЬКО JSON массив. Никакого текста до или после."
         )
 
-        # Токенов: ~140 на кейс, ориентир до ~40 кейсов + запас. При обрыве по лимиту
-        # (много кейсов на объёмной документации) chat_continued сам догенерирует
-        # оставшиеся элементы массива — репарный парсинг ниже (шаг 3) остаётся как
-        # подстраховка на случай, если продолжение всё равно не закрыло JSON целиком.
-        response = self.llm.chat_continued(
-            [Message(role="user", content=prompt)],
-            temperature=0.5, max_tokens=8000,
-            continuation_instruction=(
-                "Ты остановился посередине JSON-массива. Продолжи ТОЧНО со следующего элемента "
-                "массива — не повторяй уже перечисленные, не открывай новый '[', не закрывай ']', "
-                "просто следующие объекты через запятую в том же формате."
-            ),
-        )
+    @staticmethod
+    def _parse_case_list(text, feature=""):
+        import json
+        import re
 
-        text = response.content.strip()
+        text = text.strip()
 
         def _normalize(cases):
             """Гарантия формата имён: [Фича из поля] Группа. Наименование.
@@ -265,10 +307,53 @@ class LayeredGenerator:
     # ========================================================
     # LAYER 3: Markdown cases (template-enhanced)
     # ========================================================
+    _CASE_CONTINUATION = (
+        "Продолжи написание тест-кейса точно с того места, где текст оборвался. "
+        "НЕ повторяй уже написанное — только продолжение."
+    )
+
     def generate_case_markdown(self, case_info, qa_doc):
         from agents.llm_client import Message
+
+        messages = [Message(role="user", content=self._case_markdown_prompt(case_info, qa_doc))]
+        response = self.llm.chat_continued(
+            messages, temperature=0.7, max_tokens=3000, continuation_instruction=self._CASE_CONTINUATION,
+        )
+        text = response.content
+
+        # Пустой ответ — не обрыв по лимиту (для него уже позаботился chat_continued
+        # выше), а отдельная деградация модели: она "ответила", но кейса в ответе нет.
+        # Раньше это тихо доходило до _parse_markdown и превращалось в шаг
+        # "Требует уточнения" с "Не требуется" во всех полях — неотличимо от
+        # настоящего кейса. Одна свежая попытка (не продолжение) обычно чинит это.
+        if not text.strip():
+            response = self.llm.chat_continued(
+                messages, temperature=0.7, max_tokens=3000, continuation_instruction=self._CASE_CONTINUATION,
+            )
+            text = response.content
+
+        return self._parse_markdown(text, case_info)
+
+    async def agenerate_case_markdown(self, case_info, qa_doc):
+        """generate_case_markdown для AsyncLLMClient (та же повторная попытка на пустой ответ)."""
+        from agents.llm_client import Message
+
+        messages = [Message(role="user", content=self._case_markdown_prompt(case_info, qa_doc))]
+        response = await self.llm.achat_continued(
+            messages, temperature=0.7, max_tokens=3000, continuation_instruction=self._CASE_CONTINUATION,
+        )
+        text = response.content
+        if not text.strip():
+            response = await self.llm.achat_continued(
+                messages, temperature=0.7, max_tokens=3000, continuation_instruction=self._CASE_CONTINUATION,
+            )
+            text = response.content
+
+        return self._parse_markdown(text, case_info)
+
+    @staticmethod
+    def _case_markdown_prompt(case_info, qa_doc) -> str:
         from agents.prompt_templates import PromptTemplateManager
-        import re
 
         enhanced = PromptTemplateManager.get_enhanced_prompt(qa_doc)
 
@@ -282,7 +367,7 @@ class LayeredGenerator:
         case_type = case_info.get("type", "positive")
         case_prio = case_info.get("priority", "Normal")
 
-        prompt = (
+        return (
             "Ты Senior QA-инженер. Напиши детальный тест-кейс.\n"
             "Пиши так, чтобы Junior тестировщик мог выполнить без вопросов.\n\n"
             "НАЗВАНИЕ: " + case_name + "\n"
@@ -365,30 +450,6 @@ class LayeredGenerator:
             "Только Markdown. Без вводных слов и пояснений."
         )
 
-        cont_instr = (
-            "Продолжи написание тест-кейса точно с того места, где текст оборвался. "
-            "НЕ повторяй уже написанное — только продолжение."
-        )
-        response = self.llm.chat_continued(
-            [Message(role="user", content=prompt)],
-            temperature=0.7, max_tokens=3000, continuation_instruction=cont_instr,
-        )
-        text = response.content
-
-        # Пустой ответ — не обрыв по лимиту (для него уже позаботился chat_continued
-        # выше), а отдельная деградация модели: она "ответила", но кейса в ответе нет.
-        # Раньше это тихо доходило до _parse_markdown и превращалось в шаг
-        # "Требует уточнения" с "Не требуется" во всех полях — неотличимо от
-        # настоящего кейса. Одна свежая попытка (не продолжение) обычно чинит это.
-        if not text.strip():
-            response = self.llm.chat_continued(
-                [Message(role="user", content=prompt)],
-                temperature=0.7, max_tokens=3000, continuation_instruction=cont_instr,
-            )
-            text = response.content
-
-        return self._parse_markdown(text, case_info)
-
     def _parse_markdown(self, text, case_info):
         import re
 
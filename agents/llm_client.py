@@ -12,9 +12,11 @@ import json
 import logging
 import os
 import tempfile
-from dataclasses import dataclass
+import threading
+import weakref
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, Awaitable, Callable, List
 
 
 logger = logging.getLogger(__name__)
@@ -150,6 +152,29 @@ def _env(name: str, default: str = "") -> str:
     return str(os.getenv(name, default) or "").strip()
 
 
+_DEFAULT_CONCURRENCY = 4
+_MAX_CONCURRENCY = 16
+
+
+def provider_concurrency(provider_id: str) -> int:
+    """Сколько запросов к провайдеру можно держать в полёте одновременно.
+
+    Custom-провайдер может задать своё `max_concurrency` в настройках (локальная
+    однопоточная модель — 1, облачный API — 8); иначе берётся общий
+    LLM_MAX_CONCURRENCY (по умолчанию 4). Значение ограничено 1.._MAX_CONCURRENCY,
+    чтобы опечатка в настройках не устроила провайдеру DoS."""
+    raw = ""
+    if provider_id.lower() not in LLMClient.BUILTIN_PROVIDERS:
+        cfg = _get_custom_provider(provider_id) or {}
+        raw = str(cfg.get("max_concurrency") or "").strip()
+    raw = raw or _env("LLM_MAX_CONCURRENCY")
+    try:
+        value = int(raw) if raw else _DEFAULT_CONCURRENCY
+    except ValueError:
+        value = _DEFAULT_CONCURRENCY
+    return max(1, min(value, _MAX_CONCURRENCY))
+
+
 def _auth_type(prefix: str) -> str:
     value = _env(prefix + "_AUTH_TYPE", "api_key").lower()
     if value not in ("api_key", "certificate"):
@@ -378,6 +403,143 @@ class LLMResponse:
             self.usage = {}
 
 
+@dataclass
+class StreamChunk:
+    """Кусок потокового ответа; finish_reason приходит в последнем чанке."""
+    content: str
+    finish_reason: str = ""
+
+
+# Признаки обрыва соединения, после которых запрос к GigaChat SDK имеет смысл
+# повторить: BIG IP периодически рвёт keep-alive посреди ответа.
+_GIGACHAT_TRANSIENT = ("peer closed", "incomplete chunked", "remoteprotocol",
+                       "remote protocol", "connection reset", "server disconnected",
+                       "incomplete read", "chunked encoding")
+
+
+def _chat_payload(messages, model: str, temperature, max_tokens) -> dict:
+    """Тело POST /chat/completions (OpenAI-совместимый формат, его же понимает GigaChat)."""
+    payload = {
+        "model": model,
+        "messages": [{"role": m.role, "content": m.content} for m in messages],
+    }
+    if temperature is not None:
+        payload["temperature"] = temperature
+    if max_tokens:
+        payload["max_tokens"] = max_tokens
+    return payload
+
+
+def _parse_completion(data: dict, model: str) -> "LLMResponse":
+    choice = data["choices"][0]
+    content = (choice.get("message") or {}).get("content") or choice.get("text", "")
+    return LLMResponse(
+        content=content,
+        model=data.get("model", model),
+        usage=data.get("usage", {}),
+        finish_reason=str(choice.get("finish_reason") or "stop"),
+    )
+
+
+def _parse_sse_line(line: str) -> dict | None:
+    """Строка SSE от chat/completions → JSON-чанк; None для служебных строк и [DONE]."""
+    line = line.strip()
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if not data or data == "[DONE]":
+        return None
+    try:
+        return json.loads(data)
+    except json.JSONDecodeError:
+        logger.debug("SSE: пропущена нераспознанная строка %r", data[:200])
+        return None
+
+
+def _stream_chunk(data: dict) -> StreamChunk | None:
+    choices = data.get("choices") or []
+    if not choices:
+        return None
+    choice = choices[0]
+    delta = choice.get("delta") or {}
+    return StreamChunk(content=delta.get("content") or "", finish_reason=str(choice.get("finish_reason") or ""))
+
+
+def _parse_sdk_response(response) -> "LLMResponse":
+    usage = response.usage
+    return LLMResponse(
+        content=response.choices[0].message.content,
+        model=response.model,
+        usage={
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+        } if usage else {},
+        finish_reason=str(response.choices[0].finish_reason or "stop"),
+    )
+
+
+def _continuation_history(history: list, last: "LLMResponse", instruction: str) -> list:
+    return history + [
+        Message(role="assistant", content=last.content),
+        Message(role="user", content=instruction),
+    ]
+
+
+def _http2_available() -> bool:
+    """HTTP/2 в httpx требует пакет h2; без него работаем по HTTP/1.1 keep-alive."""
+    import importlib.util
+    return importlib.util.find_spec("h2") is not None
+
+
+_CONTINUATION_INSTRUCTION = (
+    "Продолжи точно с того места, где текст оборвался. "
+    "НЕ повторяй уже написанное — только продолжение."
+)
+
+
+# ── Пул транспортов ─────────────────────────────────────────────────────────
+# Раньше каждый LLMClient(...) собирал свой httpx.Client (или GigaChat SDK) —
+# новый TLS-handshake, повторная загрузка mTLS-сертификата и OAuth-токен на
+# каждый запрос; в корпоративной сети это сотни мс сверху. Теперь транспорты
+# живут на уровне процесса, ключ — провайдер + base_url + cert + verify +
+# timeout, соединения остаются тёплыми между запросами. Асинхронные клиенты
+# привязаны к event loop, поэтому у каждого loop свой пул.
+_transport_pool: dict[tuple, object] = {}
+_async_transport_pools: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_transport_lock = threading.Lock()
+
+
+def _pooled_transport(pool: dict, key: tuple, factory):
+    with _transport_lock:
+        transport = pool.get(key)
+        if transport is None or getattr(transport, "is_closed", False):
+            transport = factory()
+            pool[key] = transport
+        return transport
+
+
+def reset_llm_transports() -> None:
+    """Забыть пул транспортов — следующий LLMClient(...) соберёт новые.
+
+    Вызывается при сохранении настроек: сертификаты, CA, base_url и флаги SSL
+    читаются из env при создании транспорта. Старые клиенты не закрываются —
+    на них могут идти запросы; соединения освободятся вместе с объектами."""
+    with _transport_lock:
+        _transport_pool.clear()
+        _async_transport_pools.clear()
+
+
+def _verify_key() -> tuple:
+    """От чего зависит _get_verify() — SSLContext каждый раз новый, в ключ идут настройки."""
+    return tuple(os.environ.get(k, "") for k in ("SSL_NO_VERIFY", "SSL_CERT_FILE", "SSL_MAX_TLS12"))
+
+
+def _secret_key(secret: str) -> str:
+    import hashlib
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()
+
+
 class LLMClient:
     # Единственный встроенный (обязательный) провайдер — GigaChat.
     # DeepSeek и прочие подключаются пользователем как custom (OpenAI-совместимый эндпоинт).
@@ -392,6 +554,7 @@ class LLMClient:
         self.provider = provider.lower()
         self.custom_config = None
         self._timeout_override = timeout
+        self._owns_transport = False
         if self.provider not in self.BUILTIN_PROVIDERS:
             self.custom_config = _get_custom_provider(self.provider)
             if not self.custom_config:
@@ -416,7 +579,6 @@ class LLMClient:
         # Certificate (mTLS): ходим НАПРЯМУЮ по httpx, как рабочий curl — без SDK и без OAuth.
         # SDK в ряде версий даже в cert-режиме пытается получить токен; прямой путь надёжнее.
         if self.auth_type == "certificate":
-            import httpx
             cert_file = _env("GIGACHAT_CLIENT_CERT_PATH")
             key_file = _env("GIGACHAT_CLIENT_KEY_PATH")
             if not cert_file:
@@ -426,15 +588,23 @@ class LLMClient:
             key_file = _resolve_pem_path(key_file)
             ca = _resolve_pem_path(_env("GIGACHAT_CA_CERT_PATH"))
             no_verify = _gigachat_no_verify()
-            # SSL_NO_VERIFY / GIGACHAT_NO_VERIFY / SSL_MAX_TLS12 / CA учитываются.
-            # Порядок как в list_gigachat_models — чат и /models ходят одинаково.
-            verify = False if no_verify else (ca if ca else _get_verify())
             cert = (cert_file, key_file) if key_file else cert_file
-            logger.info(
-                "GigaChat init (certificate): base_url=%s model=%s no_verify=%s ca=%s",
-                self.base_url, self.model, no_verify, bool(ca),
+            timeout = self._timeout_override or 120.0
+
+            def _make():
+                # SSL_NO_VERIFY / GIGACHAT_NO_VERIFY / SSL_MAX_TLS12 / CA учитываются.
+                # Порядок как в list_gigachat_models — чат и /models ходят одинаково.
+                verify = False if no_verify else (ca if ca else _get_verify())
+                logger.info(
+                    "GigaChat init (certificate): base_url=%s model=%s no_verify=%s ca=%s",
+                    self.base_url, self.model, no_verify, bool(ca),
+                )
+                return self._new_http(timeout=timeout, verify=verify, cert=cert)
+
+            verify_key = "off" if no_verify else (ca or _verify_key())
+            self._giga_http = self._shared_transport(
+                ("http", self.provider, self.base_url, cert, verify_key, timeout), _make,
             )
-            self._giga_http = httpx.Client(timeout=self._timeout_override or 120.0, verify=verify, cert=cert)
             self.client = None
             return
 
@@ -443,26 +613,53 @@ class LLMClient:
         credentials = _env("GIGACHAT_AUTH_KEY") or _env("GIGACHAT_CREDENTIALS")
         if not credentials:
             raise ValueError("GIGACHAT_AUTH_KEY not found in settings")
+        tls_kwargs = _gigachat_tls_kwargs()
         client_kwargs = {
             "scope": _env("GIGACHAT_SCOPE", "GIGACHAT_API_PERS") or "GIGACHAT_API_PERS",
             "model": self.model,
             "timeout": self._timeout_override or 120.0,
             "credentials": credentials,
-            **_gigachat_tls_kwargs(),
+            **tls_kwargs,
         }
         if self.base_url:
             client_kwargs["base_url"] = self.base_url
         auth_url = _env("GIGACHAT_AUTH_URL", "https://ngw.devices.sberbank.ru:9443/api/v2/oauth")
         if auth_url:
             client_kwargs["auth_url"] = auth_url
-        logger.info(
-            "GigaChat init (api_key): base_url=%s model=%s auth_url=%s",
-            self.base_url, self.model, auth_url,
+
+        def _make():
+            logger.info(
+                "GigaChat init (api_key): base_url=%s model=%s auth_url=%s",
+                self.base_url, self.model, auth_url,
+            )
+            return GigaChat(**client_kwargs)
+
+        # SDK держит OAuth-токен — общий экземпляр заодно избавляет от запроса
+        # токена на каждый вызов. Ключ по хэшу credentials, не по самому секрету.
+        tls_key = tuple(sorted((k, v) for k, v in tls_kwargs.items() if k != "ssl_context"))
+        self.client = self._shared_transport(
+            ("sdk", self.provider, self.base_url, auth_url, client_kwargs["scope"], self.model,
+             _secret_key(credentials), tls_key, _verify_key(), client_kwargs["timeout"]),
+            _make,
         )
-        self.client = GigaChat(**client_kwargs)
 
-    def _init_custom(self):
+    def _new_http(self, timeout: float, verify, cert):
+        """HTTP-транспорт клиента. AsyncLLMClient подменяет его на httpx.AsyncClient."""
         import httpx
+        return httpx.Client(timeout=timeout, verify=verify, cert=cert)
+
+    def _transport_pool(self) -> dict | None:
+        return _transport_pool
+
+    def _shared_transport(self, key: tuple, factory):
+        """Транспорт из пула процесса; без пула — собственный, закрывается в aclose()."""
+        pool = self._transport_pool()
+        if pool is None:
+            self._owns_transport = True
+            return factory()
+        return _pooled_transport(pool, key, factory)
+
+    def _init_custom(self):
         cfg = self.custom_config or {}
         self.base_url = str(cfg.get("base_url", "")).rstrip("/")
         self.model = str(cfg.get("model", "")).strip()
@@ -477,22 +674,50 @@ class LLMClient:
         if self.auth_type == "api_key" and not self.api_key:
             raise ValueError("Custom LLM API key is empty")
 
-        ca_path = str(cfg.get("ca_cert_path", "")).strip()
-        verify = _resolve_pem_path(ca_path) if ca_path else _get_verify()
+        ca_path = _resolve_pem_path(str(cfg.get("ca_cert_path", "")).strip())
         client_cert = _resolve_pem_path(str(cfg.get("client_cert_path", "")).strip())
         client_key = _resolve_pem_path(str(cfg.get("client_key_path", "")).strip())
         if self.auth_type == "certificate" and not client_cert:
             raise ValueError("Custom LLM client certificate path is empty")
         cert = (client_cert, client_key) if client_cert and client_key else (client_cert or None)
-        self.client = httpx.Client(timeout=self._timeout_override or 180.0, verify=verify, cert=cert)
+        timeout = self._timeout_override or 180.0
+        self.client = self._shared_transport(
+            ("http", self.provider, self.base_url, cert, ca_path or _verify_key(), timeout),
+            lambda: self._new_http(timeout=timeout, verify=ca_path or _get_verify(), cert=cert),
+        )
 
     def chat(self, messages: List[Message],
              temperature: float = 0.7,
              max_tokens: int = 4000,
-             model: str = "") -> LLMResponse:
+             model: str = "",
+             cache: bool = True) -> LLMResponse:
+        """cache=False — мимо кэша ответов (db/llm_cache.py), например для замеров."""
+        key, hit = self._cache_lookup(messages, temperature, max_tokens, model, cache)
+        if hit:
+            return hit
         if self.provider == "gigachat":
-            return self._chat_gigachat(messages, temperature, max_tokens, model)
-        return self._chat_custom(messages, temperature, max_tokens, model)
+            response = self._chat_gigachat(messages, temperature, max_tokens, model)
+        else:
+            response = self._chat_custom(messages, temperature, max_tokens, model)
+        self._cache_store(key, response)
+        return response
+
+    def _cache_lookup(self, messages, temperature, max_tokens, model, cache: bool):
+        """(ключ, ответ из кэша); ключ None — кэш выключен или вызов от него отказался."""
+        if not cache:
+            return None, None
+        from db.llm_cache import LLMResponseCache, cache_key
+        if not LLMResponseCache.enabled():
+            return None, None
+        key = cache_key(self.provider, model or self.model, messages, temperature, max_tokens)
+        hit = LLMResponseCache.get(key)
+        return key, (LLMResponse(**hit) if hit else None)
+
+    def _cache_store(self, key: str | None, response: LLMResponse) -> None:
+        # Пустой ответ — деградация модели, его повторяют заново, а не из кэша.
+        if key and response.content.strip():
+            from db.llm_cache import LLMResponseCache
+            LLMResponseCache.put(key, self.provider, response.model or self.model, asdict(response))
 
     def chat_continued(
         self,
@@ -501,11 +726,9 @@ class LLMClient:
         temperature: float = 0.7,
         max_tokens: int = 4000,
         max_continuations: int = 3,
-        continuation_instruction: str = (
-            "Продолжи точно с того места, где текст оборвался. "
-            "НЕ повторяй уже написанное — только продолжение."
-        ),
+        continuation_instruction: str = _CONTINUATION_INSTRUCTION,
         model: str = "",
+        cache: bool = True,
     ) -> LLMResponse:
         """chat() с автоматическим бесшовным продолжением при обрыве по лимиту токенов.
 
@@ -523,18 +746,15 @@ class LLMClient:
         Не годится там, где сырое поведение модели — сам измеряемый результат
         (например, тестовые прогоны в model_bench) — там обрыв должен быть виден.
         """
-        response = self.chat(messages, temperature=temperature, max_tokens=max_tokens, model=model)
+        response = self.chat(messages, temperature=temperature, max_tokens=max_tokens, model=model, cache=cache)
         text = response.content
         last = response
         history = list(messages)
         for _ in range(max_continuations):
             if last.finish_reason != "length":
                 break
-            history = history + [
-                Message(role="assistant", content=last.content),
-                Message(role="user", content=continuation_instruction),
-            ]
-            cont = self.chat(history, temperature=temperature, max_tokens=max_tokens, model=model)
+            history = _continuation_history(history, last, continuation_instruction)
+            cont = self.chat(history, temperature=temperature, max_tokens=max_tokens, model=model, cache=cache)
             if not cont.content.strip():
                 # Пустое продолжение — деградация, а не обрыв; дальше не гонимся,
                 # last остаётся прежним (ещё truncated) — это увидит вызывающий код.
@@ -547,58 +767,23 @@ class LLMClient:
         model = model_override or self.model
         # Certificate (mTLS): прямой POST /chat/completions по httpx (как curl), без SDK/OAuth.
         if self.auth_type == "certificate":
-            payload = {
-                "model": model,
-                "messages": [{"role": m.role, "content": m.content} for m in messages],
-            }
-            if temperature is not None:
-                payload["temperature"] = temperature
-            if max_tokens:
-                payload["max_tokens"] = max_tokens
             resp = self._giga_http.post(
                 self.base_url + "/chat/completions",
-                json=payload,
+                json=_chat_payload(messages, model, temperature, max_tokens),
                 headers={"Content-Type": "application/json"},
             )
             resp.raise_for_status()
-            data = resp.json()
-            choice = data["choices"][0]
-            return LLMResponse(
-                content=choice["message"]["content"],
-                model=data.get("model", model),
-                usage=data.get("usage", {}),
-                finish_reason=str(choice.get("finish_reason") or "stop"),
-            )
+            return _parse_completion(resp.json(), model)
 
         import time
-        from gigachat.models import Chat, Messages
-        chat = Chat(
-            model=model,
-            messages=[Messages(role=m.role, content=m.content) for m in messages],
-            temperature=temperature,
-            max_tokens=max_tokens
-        )
-        transient = ("peer closed", "incomplete chunked", "remoteprotocol",
-                     "remote protocol", "connection reset", "server disconnected",
-                     "incomplete read", "chunked encoding")
+        chat = self._sdk_chat(messages, model, temperature, max_tokens)
         last_err = None
         for attempt in range(3):
             try:
-                response = self.client.chat(chat)
-                usage = response.usage
-                return LLMResponse(
-                    content=response.choices[0].message.content,
-                    model=response.model,
-                    usage={
-                        "prompt_tokens": usage.prompt_tokens,
-                        "completion_tokens": usage.completion_tokens,
-                        "total_tokens": usage.total_tokens,
-                    } if usage else {},
-                    finish_reason=str(response.choices[0].finish_reason or "stop"),
-                )
+                return _parse_sdk_response(self.client.chat(chat))
             except Exception as e:
                 emsg = str(e).lower()
-                if any(x in emsg for x in transient):
+                if any(x in emsg for x in _GIGACHAT_TRANSIENT):
                     last_err = e
                     if attempt < 2:
                         time.sleep(1.5 * (attempt + 1))
@@ -606,35 +791,39 @@ class LLMClient:
                 raise
         raise last_err
 
+    @staticmethod
+    def _sdk_chat(messages, model, temperature, max_tokens):
+        from gigachat.models import Chat, Messages
+        return Chat(
+            model=model,
+            messages=[Messages(role=m.role, content=m.content) for m in messages],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+
     def _custom_headers(self) -> dict:
         headers = {"Content-Type": "application/json"}
         if self.auth_type == "api_key":
             headers["Authorization"] = "Bearer " + self.api_key
         return headers
 
-    def _chat_custom(self, messages, temperature, max_tokens, model_override: str = ""):
-        payload = {
+    def _custom_payload(self, messages, temperature, max_tokens, model_override: str = "") -> dict:
+        return {
             "model": model_override or self.model,
             "messages": [{"role": m.role, "content": m.content} for m in messages],
             "temperature": temperature,
             "max_tokens": max_tokens,
             "stream": False,
         }
+
+    def _chat_custom(self, messages, temperature, max_tokens, model_override: str = ""):
         response = self.client.post(
             self.base_url + "/chat/completions",
-            json=payload,
+            json=self._custom_payload(messages, temperature, max_tokens, model_override),
             headers=self._custom_headers(),
         )
         response.raise_for_status()
-        data = response.json()
-        choice = data["choices"][0]
-        content = choice.get("message", {}).get("content") or choice.get("text", "")
-        return LLMResponse(
-            content=content,
-            model=data.get("model", model_override or self.model),
-            usage=data.get("usage", {}),
-            finish_reason=str(choice.get("finish_reason") or "stop"),
-        )
+        return _parse_completion(response.json(), model_override or self.model)
 
     # ========================================================
     # ERROR CLASSIFIER — friendly messages for LLM errors
@@ -683,7 +872,7 @@ class LLMClient:
                 status = _builtin_status(provider_id)
                 if status["status"] != "ready":
                     return {"status": "red", "message": status["message"]}
-                response = LLMClient(provider_id).chat([Message(role="user", content="ping")], max_tokens=5)
+                response = LLMClient(provider_id).chat([Message(role="user", content="ping")], max_tokens=5, cache=False)
                 if response.content is not None:
                     return {"status": "green", "message": "OK"}
                 return {"status": "yellow", "message": "Пустой ответ"}
@@ -691,7 +880,7 @@ class LLMClient:
             cfg = _get_custom_provider(provider_id)
             if cfg:
                 client = LLMClient(provider_id)
-                response = client.chat([Message(role="user", content="ping")], max_tokens=5)
+                response = client.chat([Message(role="user", content="ping")], max_tokens=5, cache=False)
                 if response.content is not None:
                     return {"status": "green", "message": "OK"}
                 return {"status": "yellow", "message": "Пустой ответ"}
@@ -752,3 +941,207 @@ class LLMClient:
             })
 
         return providers
+
+
+class AsyncLLMClient(LLMClient):
+    """Асинхронный LLMClient: `await achat(...)` / `await achat_continued(...)`.
+
+    Конфигурация провайдера (env, custom-настройки, сертификаты) — та же, что у
+    LLMClient, отличается только транспорт: httpx.AsyncClient с keep-alive и
+    HTTP/2 (если установлен h2), а GigaChat SDK вызывается через achat. Обработчики
+    API ждут ответ в event loop, а не занимают на каждый вызов поток из пула
+    asyncio.to_thread — под нагрузкой пул (min(32, cpu+4)) кончался раньше,
+    чем лимиты провайдера.
+
+    Клиент держит соединения — закрывайте через `async with` или aclose()."""
+
+    def _new_http(self, timeout: float, verify, cert):
+        import httpx
+        return httpx.AsyncClient(
+            timeout=timeout, verify=verify, cert=cert,
+            http2=_http2_available(),
+            limits=httpx.Limits(max_keepalive_connections=_MAX_CONCURRENCY, keepalive_expiry=60.0),
+        )
+
+    def _transport_pool(self) -> dict | None:
+        import asyncio
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        with _transport_lock:
+            return _async_transport_pools.setdefault(loop, {})
+
+    def chat(self, *args, **kwargs):
+        raise TypeError("AsyncLLMClient: используйте await achat(...)")
+
+    def chat_continued(self, *args, **kwargs):
+        raise TypeError("AsyncLLMClient: используйте await achat_continued(...)")
+
+    async def achat(self, messages: List[Message],
+                    temperature: float = 0.7,
+                    max_tokens: int = 4000,
+                    model: str = "",
+                    cache: bool = True) -> LLMResponse:
+        import asyncio
+        key, hit = await asyncio.to_thread(self._cache_lookup, messages, temperature, max_tokens, model, cache)
+        if hit:
+            return hit
+        if self.provider == "gigachat":
+            response = await self._achat_gigachat(messages, temperature, max_tokens, model)
+        else:
+            response = await self._achat_custom(messages, temperature, max_tokens, model)
+        await asyncio.to_thread(self._cache_store, key, response)
+        return response
+
+    async def achat_continued(
+        self,
+        messages: List[Message],
+        *,
+        temperature: float = 0.7,
+        max_tokens: int = 4000,
+        max_continuations: int = 3,
+        continuation_instruction: str = _CONTINUATION_INSTRUCTION,
+        model: str = "",
+        on_delta: Callable[[str], Awaitable[None]] | None = None,
+        cache: bool = True,
+    ) -> LLMResponse:
+        """Асинхронный chat_continued — та же логика продолжения при обрыве по лимиту.
+
+        on_delta — если задан, ответ (и продолжения) идут потоком через astream(),
+        а каждый кусок текста передаётся в on_delta по мере прихода."""
+        ask = self.achat if on_delta is None else self._astream_collector(on_delta)
+        response = await ask(messages, temperature=temperature, max_tokens=max_tokens, model=model, cache=cache)
+        text = response.content
+        last = response
+        history = list(messages)
+        for _ in range(max_continuations):
+            if last.finish_reason != "length":
+                break
+            history = _continuation_history(history, last, continuation_instruction)
+            cont = await ask(history, temperature=temperature, max_tokens=max_tokens, model=model, cache=cache)
+            if not cont.content.strip():
+                break
+            text = text + cont.content
+            last = cont
+        return LLMResponse(content=text, model=last.model, usage=last.usage, finish_reason=last.finish_reason)
+
+    async def astream(self, messages: List[Message],
+                      temperature: float = 0.7,
+                      max_tokens: int = 4000,
+                      model: str = "") -> AsyncIterator[StreamChunk]:
+        """Ответ модели по кускам по мере генерации.
+
+        chat/completions-совместимые эндпоинты (custom и GigaChat по сертификату)
+        читаются как SSE ("stream": true), GigaChat по ключу — через astream SDK.
+        Если эндпоинт проигнорировал stream и вернул обычный JSON — отдаём его
+        одним чанком, а не падаем."""
+        model = model or self.model
+        if self.provider == "gigachat" and self.auth_type != "certificate":
+            async for chunk in self.client.astream(self._sdk_chat(messages, model, temperature, max_tokens)):
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    yield StreamChunk(
+                        content=choice.delta.content or "",
+                        finish_reason=str(choice.finish_reason or ""),
+                    )
+            return
+
+        if self.provider == "gigachat":
+            http = self._giga_http
+            payload = _chat_payload(messages, model, temperature, max_tokens)
+            headers = {"Content-Type": "application/json"}
+        else:
+            http = self.client
+            payload = self._custom_payload(messages, temperature, max_tokens, model)
+            headers = self._custom_headers()
+        payload["stream"] = True
+        headers["Accept"] = "text/event-stream"
+
+        async with http.stream("POST", self.base_url + "/chat/completions", json=payload, headers=headers) as resp:
+            if resp.is_error:
+                await resp.aread()
+                resp.raise_for_status()
+            if "text/event-stream" not in resp.headers.get("content-type", ""):
+                await resp.aread()
+                full = _parse_completion(resp.json(), model)
+                yield StreamChunk(content=full.content, finish_reason=full.finish_reason)
+                return
+            async for line in resp.aiter_lines():
+                data = _parse_sse_line(line)
+                chunk = _stream_chunk(data) if data else None
+                if chunk:
+                    yield chunk
+
+    def _astream_collector(self, on_delta: Callable[[str], Awaitable[None]]):
+        """achat-совместимая функция: собирает astream() в LLMResponse, по пути отдавая куски в on_delta.
+        Ответ из кэша уходит в on_delta одним куском."""
+        import asyncio
+
+        async def ask(messages, *, temperature, max_tokens, model, cache) -> LLMResponse:
+            key, hit = await asyncio.to_thread(self._cache_lookup, messages, temperature, max_tokens, model, cache)
+            if hit:
+                await on_delta(hit.content)
+                return hit
+            parts: list[str] = []
+            finish_reason = "stop"
+            async for chunk in self.astream(messages, temperature=temperature, max_tokens=max_tokens, model=model):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    await on_delta(chunk.content)
+                if chunk.finish_reason:
+                    finish_reason = chunk.finish_reason
+            response = LLMResponse(content="".join(parts), model=model or self.model, finish_reason=finish_reason)
+            await asyncio.to_thread(self._cache_store, key, response)
+            return response
+        return ask
+
+    async def _achat_gigachat(self, messages, temperature, max_tokens, model_override: str = ""):
+        model = model_override or self.model
+        if self.auth_type == "certificate":
+            resp = await self._giga_http.post(
+                self.base_url + "/chat/completions",
+                json=_chat_payload(messages, model, temperature, max_tokens),
+                headers={"Content-Type": "application/json"},
+            )
+            resp.raise_for_status()
+            return _parse_completion(resp.json(), model)
+
+        import asyncio
+        chat = self._sdk_chat(messages, model, temperature, max_tokens)
+        last_err = None
+        for attempt in range(3):
+            try:
+                return _parse_sdk_response(await self.client.achat(chat))
+            except Exception as e:
+                emsg = str(e).lower()
+                if any(x in emsg for x in _GIGACHAT_TRANSIENT):
+                    last_err = e
+                    if attempt < 2:
+                        await asyncio.sleep(1.5 * (attempt + 1))
+                        continue
+                raise
+        raise last_err
+
+    async def _achat_custom(self, messages, temperature, max_tokens, model_override: str = ""):
+        response = await self.client.post(
+            self.base_url + "/chat/completions",
+            json=self._custom_payload(messages, temperature, max_tokens, model_override),
+            headers=self._custom_headers(),
+        )
+        response.raise_for_status()
+        return _parse_completion(response.json(), model_override or self.model)
+
+    async def aclose(self) -> None:
+        """Закрывает только собственный транспорт — общий из пула остаётся тёплым."""
+        if not self._owns_transport:
+            return
+        transport = getattr(self, "_giga_http", None) if self.client is None else self.client
+        if transport is not None:
+            await transport.aclose()
+
+    async def __aenter__(self) -> "AsyncLLMClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
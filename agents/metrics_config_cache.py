@@ -0,0 +1,261 @@
+"""
+Кэш скомпилированных конфигов метрик для горячего пути отправки.
+
+Раньше каждая отправка открывала сессию и подгружала TestMetric, system,
+values/baseline/thresholds/health-конфиги и threshold_rows — несколько
+запросов к БД на метрику каждый период. Теперь конфиг метрики один раз
+компилируется в неизменяемый CompiledMetric: числа уже float, таблица порогов
+— кортеж неизменяемых строк, METADATA-сообщение — готовая JSON-строка,
+топики — из настроек Kafka. Снимок живёт, пока его не сбросят:
+  • PUT-ы конструктора метрики и правки метрики/услуги — invalidate(metric_id)
+    или invalidate_all();
+  • PUT настроек Kafka — invalidate_all() (топики и cfg сняты в снимке).
+
+Изменяемое между отправками состояние (когда последний раз ушли METADATA и
+THRESHOLDS) хранится рядом, а не в снимке: после отправки его обновляет
+планировщик, в БД оно пишется тем же commit, что и GenerationLog.
+
+Планировщик работает в одном процессе (--workers 1) — сброс из API того же
+процесса виден ему сразу.
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledMetric:
+    """Неизменяемый снимок всего, что нужно для отправки метрики."""
+
+    id: int
+    metric_hash: str
+    period_sec: int
+    created_at: Optional[datetime]
+
+    # values
+    pattern: str
+    value_min: float
+    value_max: float
+    sine_period_min: Optional[int]
+    spike_interval_min: Optional[int]
+
+    # baseline
+    baseline_enabled: bool
+    baseline_method: str
+    baseline_fixed: Optional[float]
+    baseline_offset: Optional[float]
+    baseline_deviation: Optional[float]
+
+    # health
+    health_enabled: bool
+    health_method: str
+    fixed_status: Optional[int]
+    health_pattern: Optional[str]
+    flap_interval_min: Optional[int]
+    degrade_hours: Optional[int]
+
+    # thresholds
+    thresholds_enabled: bool
+    combination_selector: str
+    threshold_rows: tuple[Mapping, ...]
+
+    # Kafka
+    metadata_json: str
+    topic_data: str
+    topic_metadata: str
+    topic_thresholds: str
+    kafka_cfg: Mapping[str, str]
+
+    @property
+    def sends_thresholds(self) -> bool:
+        return self.thresholds_enabled and bool(self.threshold_rows)
+
+
+def _f(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def compile_metric(m, cfg: Mapping[str, str]) -> CompiledMetric:
+    """Собрать снимок из TestMetric с подгруженными system и конфигами."""
+    from agents.metrics_message_builder import build_metadata_message
+
+    system = m.system
+    vc = m.values_config
+    bc = m.baseline_config
+    tc = m.thresholds_config
+    hc = m.health_config
+
+    rows = tuple(
+        MappingProxyType({
+            "health_type": r.health_type,
+            "min_value":   _f(r.min_value),
+            "max_value":   _f(r.max_value),
+            "is_percent":  r.is_percent,
+        })
+        for r in (tc.threshold_rows if tc else ())
+    )
+
+    deviation: Optional[float] = None
+    if bc and bc.enabled:
+        if bc.calc_method == "offset" and bc.offset_value is not None:
+            deviation = float(bc.offset_value)
+        elif bc.calc_method == "fixed" and bc.fixed_value is not None:
+            deviation = float(bc.fixed_value)
+
+    metadata = build_metadata_message(
+        metric_hash=m.metric_hash,
+        mon_system_ci=system.mon_system_ci,
+        it_service_ci=system.it_service_ci,
+        object_ci=m.object_ci,
+        object_id=m.object_id,
+        object_name=m.object_name,
+        object_type=m.object_type,
+        metric_id=m.mon_system_metric_id,
+        metric_name=m.metric_name,
+        metric_description=m.metric_description,
+        metric_type=m.metric_type,
+        metric_group=m.metric_group,
+        metric_unit=m.metric_unit,
+        metric_period_sec=m.metric_period_sec,
+    )
+
+    return CompiledMetric(
+        id=m.id,
+        metric_hash=m.metric_hash,
+        period_sec=m.metric_period_sec,
+        created_at=m.created_at,
+        pattern=vc.pattern if vc else "random",
+        value_min=float(vc.value_min) if vc else 0.0,
+        value_max=float(vc.value_max) if vc else 100.0,
+        sine_period_min=vc.sine_period_min if vc else None,
+        spike_interval_min=vc.spike_interval_min if vc else None,
+        baseline_enabled=bc.enabled if bc else False,
+        baseline_method=bc.calc_method if bc else "offset",
+        baseline_fixed=_f(bc.fixed_value) if bc else None,
+        baseline_offset=_f(bc.offset_value) if bc else None,
+        baseline_deviation=deviation,
+        health_enabled=hc.enabled if hc else False,
+        health_method=hc.calc_method if hc else "auto",
+        fixed_status=hc.fixed_status if hc else None,
+        health_pattern=hc.health_pattern if hc else None,
+        flap_interval_min=hc.flap_interval_min if hc else None,
+        degrade_hours=hc.degrade_hours if hc else None,
+        thresholds_enabled=tc.enabled if tc else False,
+        combination_selector=tc.combination_selector if tc else "worst",
+        threshold_rows=rows,
+        metadata_json=json.dumps(metadata, ensure_ascii=False),
+        topic_data=cfg.get("kafka_topic_data", "sber911.data"),
+        topic_metadata=cfg.get("kafka_topic_metadata", "sber911.metadata"),
+        topic_thresholds=cfg.get("kafka_topic_thresholds", "sber911.thresholds"),
+        kafka_cfg=cfg,
+    )
+
+
+class MetricConfigCache:
+    """Снимки CompiledMetric по id и время последних METADATA/THRESHOLDS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configs: dict[int, CompiledMetric] = {}
+        self._sent_at: dict[int, tuple[Optional[datetime], Optional[datetime]]] = {}
+        self._kafka_cfg: Optional[Mapping[str, str]] = None
+        self._cfg_lock = threading.Lock()
+        # Растёт при каждом сбросе: снимок, собранный по данным до сброса, не сохраняется
+        self._generation = 0
+
+    def get_many(self, metric_ids: list[int]) -> tuple[dict[int, CompiledMetric], list[int]]:
+        """(снимки по id, id без снимка). Отсутствующие — собрать load()."""
+        with self._lock:
+            found = {mid: self._configs[mid] for mid in metric_ids if mid in self._configs}
+        return found, [mid for mid in metric_ids if mid not in found]
+
+    def load(self, metric_ids: list[int]) -> dict[int, CompiledMetric]:
+        """Собрать снимки активных метрик одним запросом. Выключенных/удалённых нет в ответе."""
+        from sqlalchemy.orm import joinedload, selectinload
+        from db.postgres import SessionLocal
+        from db.metrics_models import TestMetric, TestMetricThresholdsConfig
+
+        with self._lock:
+            generation = self._generation
+        db = SessionLocal()
+        try:
+            # До загрузки метрик: get_kafka_config может сделать commit (досоздать
+            # настройки по умолчанию), а commit сбросил бы загруженные объекты —
+            # и каждое обращение к атрибуту стало бы отдельным SELECT.
+            cfg = self._kafka_config(db, generation)
+            metrics = (
+                db.query(TestMetric)
+                .options(
+                    joinedload(TestMetric.system),
+                    selectinload(TestMetric.values_config),
+                    selectinload(TestMetric.baseline_config),
+                    selectinload(TestMetric.thresholds_config)
+                    .selectinload(TestMetricThresholdsConfig.threshold_rows),
+                    selectinload(TestMetric.health_config),
+                )
+                .filter(TestMetric.id.in_(metric_ids))
+                .all()
+            )
+            active = [m for m in metrics if m.is_active and m.system and m.system.is_active]
+            compiled = {m.id: compile_metric(m, cfg) for m in active}
+            sent_at = {m.id: (m.last_metadata_sent_at, m.last_thresholds_sent_at) for m in active}
+        finally:
+            db.close()
+
+        with self._lock:
+            if generation == self._generation:
+                self._configs.update(compiled)
+                for mid, stamps in sent_at.items():
+                    self._sent_at.setdefault(mid, stamps)
+        return compiled
+
+    def _kafka_config(self, db, generation: int) -> Mapping[str, str]:
+        """Настройки Kafka — один раз на поколение кэша (сбрасываются invalidate_all)."""
+        from backend.api.metrics_settings import get_kafka_config
+
+        # Под блокировкой: параллельные пачки на пустой БД иначе гоняются
+        # за вставку настроек по умолчанию (UNIQUE metrics_settings.key)
+        with self._cfg_lock:
+            cfg = self._kafka_cfg
+            if cfg is None:
+                cfg = MappingProxyType(get_kafka_config(db))
+                with self._lock:
+                    if generation == self._generation:
+                        self._kafka_cfg = cfg
+            return cfg
+
+    def sent_at(self, metric_id: int) -> tuple[Optional[datetime], Optional[datetime]]:
+        """(последняя METADATA, последние THRESHOLDS) — None, если ещё не отправлялись."""
+        with self._lock:
+            return self._sent_at.get(metric_id, (None, None))
+
+    def mark_sent(self, metric_id: int, metadata_at: Optional[datetime], thresholds_at: Optional[datetime]) -> None:
+        """Запомнить отправку METADATA/THRESHOLDS (None — эта часть не отправлялась)."""
+        with self._lock:
+            prev_meta, prev_thr = self._sent_at.get(metric_id, (None, None))
+            self._sent_at[metric_id] = (metadata_at or prev_meta, thresholds_at or prev_thr)
+
+    def invalidate(self, metric_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._configs.pop(metric_id, None)
+            self._sent_at.pop(metric_id, None)
+
+    def invalidate_all(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._configs.clear()
+            self._sent_at.clear()
+            self._kafka_cfg = None
+
+
+# ── Singleton ─────────────────────────────────────────────────────────────────
+
+metric_configs = MetricConfigCache()
@@ -6,14 +6,21 @@ Sber911 — 3 раздельных потока:
   DATA       — значения метрик (каждый period_sec)
   METADATA   — описание метрики (при старте + каждые 24 ч)
   THRESHOLDS — пороги/базалайн (при старте + каждые 24 ч, если включены)
+
+generate_value / calculate_baseline / calculate_health считают одну метрику.
+Для тика планировщика на тысячи метрик есть пакетные *_batch — те же правила
+на массивах NumPy; для детерминированных паттернов результат совпадает со
+скалярным до бита.
 """
 
 import json
 import math
 import random
 import time
-from datetime import datetime, timezone
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+import numpy as np
 
 
 # ── Health int → Sber911 status string ───────────────────────────────────────
@@ -35,9 +42,11 @@ def generate_value(
     value_max: float,
     sine_period_min: Optional[int] = None,
     spike_interval_min: Optional[int] = None,
+    now: Optional[float] = None,
 ) -> float:
     """
     Генерирует числовое значение метрики по паттерну.
+    now — unix-время для sine/spike (по умолчанию текущее).
 
     Patterns:
         constant — всегда value_min
@@ -56,7 +65,7 @@ def generate_value(
 
     if pattern == "sine":
         period_sec = (sine_period_min or 60) * 60
-        t = time.time()
+        t = time.time() if now is None else now
         phase = (t % period_sec) / period_sec           # 0..1
         sine_val = math.sin(2 * math.pi * phase)        # -1..1
         amplitude = (vmax - vmin) / 2
@@ -65,7 +74,7 @@ def generate_value(
 
     if pattern == "spike":
         interval_sec = (spike_interval_min or 15) * 60
-        t = time.time()
+        t = time.time() if now is None else now
         pos = t % interval_sec
         if pos >= interval_sec * 0.95:
             return vmax
@@ -136,6 +145,7 @@ def calculate_health(
     thresholds_enabled: bool = False,
     combination_selector: str = "worst",
     threshold_rows: Optional[list[dict]] = None,
+    now: Optional[datetime] = None,
 ) -> Optional[int]:
     """Рассчитывает статус здоровья (1=OK .. 5=Critical) или None если отключён."""
     if not enabled:
@@ -151,7 +161,7 @@ def calculate_health(
         if pat == "degrading":
             hours = float(degrade_hours or 4)
             if metric_created_at:
-                now = datetime.now(timezone.utc)
+                now = now or datetime.now(timezone.utc)
                 created = metric_created_at
                 if created.tzinfo is None:
                     created = created.replace(tzinfo=timezone.utc)
@@ -175,6 +185,221 @@ def calculate_health(
     return 1
 
 
+# ── Пакетный расчёт (NumPy) ───────────────────────────────────────────────────
+#
+# Те же правила, что у generate_value / calculate_baseline / calculate_health,
+# но на массивах параметров всех метрик тика. Строковые параметры передаются
+# кодами (encode(names, PATTERN_CODES) и т.п.), None в числовых — как NaN.
+
+PATTERN_CODES: dict[str, int] = {"constant": 0, "random": 1, "sine": 2, "spike": 3}
+BASELINE_METHOD_CODES: dict[str, int] = {"fixed": 0, "offset": 1}
+HEALTH_METHOD_CODES: dict[str, int] = {"auto": 0, "fixed": 1, "pattern": 2}
+HEALTH_PATTERN_CODES: dict[str, int] = {"stable_ok": 0, "degrading": 1, "flapping": 2}
+UNKNOWN_CODE = -1
+
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def encode(names: Sequence[Optional[str]], codes: dict[str, int]) -> np.ndarray:
+    """Строковые параметры → массив кодов; неизвестные и None → UNKNOWN_CODE."""
+    return np.fromiter((codes.get(n, UNKNOWN_CODE) for n in names), dtype=np.int8, count=len(names))
+
+
+def _floats(values, n: int, default: Optional[float] = None) -> np.ndarray:
+    """Числовой параметр → float64 (None → NaN). default заменяет None и 0 — как `x or default`."""
+    arr = np.full(n, np.nan) if values is None else np.asarray(values, dtype=np.float64).reshape(n)
+    if default is not None:
+        arr = np.where(np.isnan(arr) | (arr == 0), default, arr)
+    return arr
+
+
+def _round4(x: np.ndarray) -> np.ndarray:
+    """
+    round(x, 4) как у Python. rint(x·10⁴)/10⁴ даёт тот же float везде, кроме
+    значений у самой половинки (там погрешность x·10⁴ решает, куда округлять)
+    и огромных |x| — их досчитывает встроенный round().
+    """
+    scaled = x * 1e4
+    out = np.rint(scaled) / 1e4
+    dist = np.abs(scaled - np.floor(scaled) - 0.5)
+    doubtful = np.isfinite(x) & ((dist <= np.abs(scaled) * 2.0 ** -52 + 1e-9) | (np.abs(x) >= 1e11))
+    for i in np.flatnonzero(doubtful):
+        out[i] = round(float(x[i]), 4)
+    return out
+
+
+def generate_values_batch(
+    patterns: np.ndarray,
+    value_min,
+    value_max,
+    sine_period_min=None,
+    spike_interval_min=None,
+    now: Optional[float] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    generate_value для массива метрик. patterns — коды PATTERN_CODES.
+    constant/sine/spike совпадают со скалярным путём при том же now;
+    random (и неизвестный паттерн) — из rng, по тем же правилам.
+    """
+    codes = np.asarray(patterns, dtype=np.int8)
+    n = len(codes)
+    vmin = _floats(value_min, n)
+    vmax = _floats(value_max, n)
+    t = time.time() if now is None else now
+    out = vmin.copy()                                   # constant
+
+    rnd = ~np.isin(codes, (PATTERN_CODES["constant"], PATTERN_CODES["sine"], PATTERN_CODES["spike"]))
+    if rnd.any():
+        rng = rng or np.random.default_rng()
+        # как random.uniform: a + (b - a) * U[0, 1)
+        out[rnd] = _round4(vmin[rnd] + (vmax[rnd] - vmin[rnd]) * rng.random(int(rnd.sum())))
+
+    sine = codes == PATTERN_CODES["sine"]
+    if sine.any():
+        period = _floats(sine_period_min, n, 60)[sine] * 60
+        phase = np.fmod(t, period) / period
+        # Синус — из math на уникальных фазах: у тика одно t и мало разных
+        # периодов, а синус libm побитно совпадает со скалярным путём.
+        uniq, inverse = np.unique(phase, return_inverse=True)
+        sine_val = np.array([math.sin(2 * math.pi * p) for p in uniq.tolist()])[inverse]
+        amplitude = (vmax[sine] - vmin[sine]) / 2
+        midpoint = (vmax[sine] + vmin[sine]) / 2
+        out[sine] = _round4(midpoint + amplitude * sine_val)
+
+    spike = codes == PATTERN_CODES["spike"]
+    if spike.any():
+        interval = _floats(spike_interval_min, n, 15)[spike] * 60
+        pos = np.fmod(t, interval)
+        out[spike] = np.where(pos >= interval * 0.95, vmax[spike], vmin[spike])
+
+    return out
+
+
+def calculate_baselines_batch(
+    enabled,
+    methods: np.ndarray,
+    values: np.ndarray,
+    fixed_value=None,
+    offset_value=None,
+) -> np.ndarray:
+    """calculate_baseline для массива метрик. methods — коды BASELINE_METHOD_CODES; NaN — baseline нет."""
+    codes = np.asarray(methods, dtype=np.int8)
+    n = len(codes)
+    on = np.asarray(enabled, dtype=bool).reshape(n)
+    values = np.asarray(values, dtype=np.float64)
+    fixed = _floats(fixed_value, n)
+    offset = _floats(offset_value, n)
+    out = np.full(n, np.nan)
+
+    f = on & (codes == BASELINE_METHOD_CODES["fixed"])
+    out[f] = np.where(np.isnan(fixed[f]), 0.0, fixed[f])
+    o = on & (codes == BASELINE_METHOD_CODES["offset"])
+    out[o] = _round4(values[o] + np.nan_to_num(offset[o]))
+    return out
+
+
+def threshold_table(rows_per_metric: Sequence[Sequence[dict]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Строки порогов метрик → (min, max, health_type) формы (n, k), k — максимум
+    строк у метрики. Нет границы — NaN, пустая ячейка — health_type 0.
+    """
+    n = len(rows_per_metric)
+    k = max((len(rows) for rows in rows_per_metric), default=0)
+    lo = np.full((n, k), np.nan)
+    hi = np.full((n, k), np.nan)
+    ht = np.zeros((n, k), dtype=np.int8)
+    for i, rows in enumerate(rows_per_metric):
+        for j, row in enumerate(rows):
+            if row.get("min_value") is not None:
+                lo[i, j] = float(row["min_value"])
+            if row.get("max_value") is not None:
+                hi[i, j] = float(row["max_value"])
+            ht[i, j] = int(row["health_type"])
+    return lo, hi, ht
+
+
+def _evaluate_thresholds_batch(values: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                               ht: np.ndarray, best: np.ndarray) -> np.ndarray:
+    v = values[:, None]
+    match = (ht > 0) & (np.where(np.isnan(lo), -np.inf, lo) <= v) & (v <= np.where(np.isnan(hi), np.inf, hi))
+    best_val = np.where(match, ht, np.iinfo(np.int8).max).min(axis=1, initial=np.iinfo(np.int8).max)
+    worst_val = np.where(match, ht, 0).max(axis=1, initial=0)
+    return np.where(match.any(axis=1), np.where(best, best_val, worst_val), 1)
+
+
+def calculate_health_batch(
+    metric_ids: Sequence[int],
+    enabled,
+    methods: np.ndarray,
+    values: np.ndarray,
+    fixed_status=None,
+    health_patterns: Optional[np.ndarray] = None,
+    flap_interval_min=None,
+    degrade_hours=None,
+    metric_created_at: Optional[Sequence[Optional[datetime]]] = None,
+    thresholds_enabled=None,
+    best=None,
+    thresholds: Optional[tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+    now: Optional[datetime] = None,
+) -> np.ndarray:
+    """
+    calculate_health для массива метрик. methods — коды HEALTH_METHOD_CODES,
+    health_patterns — HEALTH_PATTERN_CODES, best — combination_selector == "best",
+    thresholds — threshold_table(). Возвращает int8: 1..5, 0 — health отключён.
+    flapping ведёт тот же счётчик _flap_counter, что и скалярный путь.
+    """
+    codes = np.asarray(methods, dtype=np.int8)
+    n = len(codes)
+    on = np.asarray(enabled, dtype=bool).reshape(n)
+    values = np.asarray(values, dtype=np.float64)
+    out = np.where(on, 1, 0).astype(np.int8)           # по умолчанию OK
+
+    fixed = on & (codes == HEALTH_METHOD_CODES["fixed"])
+    out[fixed] = _floats(fixed_status, n, 1)[fixed].astype(np.int8)
+
+    pattern = on & (codes == HEALTH_METHOD_CODES["pattern"])
+    pats = (np.full(n, HEALTH_PATTERN_CODES["stable_ok"], dtype=np.int8) if health_patterns is None
+            else np.asarray(health_patterns, dtype=np.int8))
+    pats = np.where(pats == UNKNOWN_CODE, HEALTH_PATTERN_CODES["stable_ok"], pats)
+
+    degrading = np.flatnonzero(pattern & (pats == HEALTH_PATTERN_CODES["degrading"]))
+    if degrading.size:
+        hours = _floats(degrade_hours, n, 4)[degrading]
+        now = now or datetime.now(timezone.utc)
+        created = [metric_created_at[i] if metric_created_at is not None else None for i in degrading]
+        # Возраст — в целых микросекундах, как timedelta в скалярном пути
+        elapsed_us = np.array([
+            (now - (c if c.tzinfo is not None else c.replace(tzinfo=timezone.utc))) // _MICROSECOND
+            if c else 0
+            for c in created
+        ], dtype=np.int64)
+        elapsed_h = elapsed_us / 1e6 / 3600
+        progress = np.where([c is not None for c in created], np.minimum(elapsed_h / hours, 1.0), 0.5)
+        out[degrading] = np.clip(np.trunc(1 + progress * 4), 1, 5).astype(np.int8)
+
+    flapping = np.flatnonzero(pattern & (pats == HEALTH_PATTERN_CODES["flapping"]))
+    if flapping.size:
+        flap = _floats(flap_interval_min, n, 5)
+        for i in flapping.tolist():
+            interval_calls = max(1, int(flap[i] * 60 / 10))
+            mid = int(metric_ids[i])
+            count = _flap_counter.get(mid, 0)
+            _flap_counter[mid] = count + 1
+            out[i] = 1 if (count // interval_calls) % 2 == 0 else 3
+
+    auto = on & (codes == HEALTH_METHOD_CODES["auto"])
+    if thresholds is not None and thresholds_enabled is not None and auto.any():
+        lo, hi, ht = thresholds
+        evaluate = auto & np.asarray(thresholds_enabled, dtype=bool).reshape(n) & (ht > 0).any(axis=1)
+        if evaluate.any():
+            sel = np.zeros(n, dtype=bool) if best is None else np.asarray(best, dtype=bool).reshape(n)
+            out[evaluate] = _evaluate_thresholds_batch(
+                values[evaluate], lo[evaluate], hi[evaluate], ht[evaluate], sel[evaluate],
+            )
+    return out
+
+
 # ── DATA message ──────────────────────────────────────────────────────────────
 
 def build_data_message(
@@ -3,15 +3,30 @@
 Синглтон — создаётся один раз при старте FastAPI через lifespan.
 
 Требует --workers 1 (один asyncio event loop = один планировщик без дублей).
+
+Один цикл на все метрики: куча (heapq) ближайших сроков отправки. Раньше на
+каждую метрику была своя asyncio-задача, которая каждый период заново читала
+metric_period_sec из БД и отправляла через свой to_thread — на тысячах метрик
+это тысячи задач, запросов и потоков. Теперь метрики, срок которых наступил в
+одном тике (окно _BATCH_WINDOW_SEC), уходят пачкой: конфиги грузятся одним
+запросом, сообщения — одной пачкой producer'а, логи — в буфер отложенной
+записи (agents/generation_log_writer.py).
+Конфиги метрик берутся из кэша скомпилированных снимков
+(agents/metrics_config_cache.py): в горячем цикле БД только пишется.
+Период меняется событием update_period(), а не опросом БД. Следующий срок
+считается от планового, а не от фактического — без накопления дрейфа.
 """
 
 import asyncio
+import heapq
 import json
 import logging
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 _RESEND_INTERVAL = timedelta(hours=24)
+_BATCH_WINDOW_SEC = 0.05   # сроки в пределах окна — одна пачка
+_MAX_BATCH = 500           # метрик в одном запросе к БД / одном потоке
 
 logger = logging.getLogger(__name__)
 
@@ -19,91 +34,177 @@ logger = logging.getLogger(__name__)
 class MetricsScheduler:
 
     def __init__(self):
-        self._tasks: dict[int, asyncio.Task] = {}
+        self._heap: list[tuple[float, int, int]] = []   # (срок по loop.time(), версия, metric_id)
+        self._periods: dict[int, int] = {}
+        self._versions: dict[int, int] = {}
+        self._version = 0
+        self._in_flight: set[int] = set()
+        self._batches: set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
 
     # ── Public API ────────────────────────────────────────────────────────────
 
-    async def start_metric(self, metric_id: int) -> None:
-        """Запустить задачу отправки для метрики (идемпотентно)."""
-        existing = self._tasks.get(metric_id)
-        if existing and not existing.done():
+    async def start_metric(self, metric_id: int, period_sec: Optional[int] = None) -> None:
+        """Запланировать отправку метрики (идемпотентно)."""
+        if metric_id in self._periods:
             return
-        task = asyncio.create_task(
-            self._run_metric(metric_id),
-            name=f"metric_{metric_id}",
-        )
-        self._tasks[metric_id] = task
+        if period_sec is None:
+            period_sec = await asyncio.to_thread(self._get_period, metric_id)
+            if period_sec is None:
+                logger.warning(f"[Scheduler] metric_id={metric_id} not found, not started")
+                return
+        self._schedule(metric_id, period_sec)
         logger.info(f"[Scheduler] started metric_id={metric_id}")
 
     async def stop_metric(self, metric_id: int) -> None:
-        """Остановить задачу для метрики."""
-        task = self._tasks.pop(metric_id, None)
-        if task and not task.done():
-            task.cancel()
-            try:
-                await asyncio.wait_for(asyncio.shield(task), timeout=5.0)
-            except (asyncio.CancelledError, asyncio.TimeoutError):
-                pass
+        """Снять метрику с расписания (запись в куче станет устаревшей)."""
+        from agents.metrics_config_cache import metric_configs
+        self._forget(metric_id)
+        metric_configs.invalidate(metric_id)
         logger.info(f"[Scheduler] stopped metric_id={metric_id}")
 
+    async def update_period(self, metric_id: int, period_sec: int) -> None:
+        """Новый период метрики: следующий срок — через period_sec от текущего момента."""
+        if metric_id not in self._periods:
+            return
+        self._schedule(metric_id, period_sec)
+        logger.info(f"[Scheduler] metric_id={metric_id} period={period_sec}s")
+
     async def start_all(self) -> None:
-        """Загрузить все активные метрики из БД и запустить задачи."""
-        metric_ids = await asyncio.to_thread(self._load_active_metric_ids)
-        for mid in metric_ids:
-            await self.start_metric(mid)
-        logger.info(f"[Scheduler] start_all: {len(metric_ids)} metrics")
+        """Загрузить все активные метрики из БД (одним запросом) и запланировать."""
+        metrics = await asyncio.to_thread(self._load_active_metrics)
+        for mid, period_sec in metrics:
+            if mid not in self._periods:
+                self._schedule(mid, period_sec)
+        logger.info(f"[Scheduler] start_all: {len(metrics)} metrics")
 
     async def stop_all(self) -> None:
-        """Остановить все задачи."""
-        ids = list(self._tasks.keys())
-        for mid in ids:
-            await self.stop_metric(mid)
-        logger.info(f"[Scheduler] stop_all: {len(ids)} metrics")
+        """Снять все метрики и остановить цикл; отправки в полёте дожидаются до 5 с."""
+        from agents.metrics_config_cache import metric_configs
+        count = len(self._periods)
+        metric_configs.invalidate_all()
+        self._heap.clear()
+        self._periods.clear()
+        self._versions.clear()
+        if self._loop_task and not self._loop_task.done():
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+        self._loop_task = None
+        if self._batches:
+            await asyncio.wait(list(self._batches), timeout=5.0)
+        logger.info(f"[Scheduler] stop_all: {count} metrics")
 
     def running_ids(self) -> list[int]:
-        """ID метрик с живыми задачами."""
-        return [mid for mid, t in self._tasks.items() if not t.done()]
+        """ID метрик на расписании."""
+        return list(self._periods)
+
+    # ── Расписание ────────────────────────────────────────────────────────────
+
+    def _schedule(self, metric_id: int, period_sec: int, due: Optional[float] = None) -> None:
+        self._ensure_loop()
+        loop = asyncio.get_running_loop()
+        self._version += 1
+        self._versions[metric_id] = self._version
+        self._periods[metric_id] = period_sec
+        heapq.heappush(self._heap, (due if due is not None else loop.time() + period_sec,
+                                    self._version, metric_id))
+        self._wakeup.set()
+
+    def _forget(self, metric_id: int) -> None:
+        self._periods.pop(metric_id, None)
+        self._versions.pop(metric_id, None)
+
+    def _is_current(self, version: int, metric_id: int) -> bool:
+        return self._versions.get(metric_id) == version
+
+    def _ensure_loop(self) -> None:
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.create_task(self._run(), name="metrics_scheduler")
+
+    def _next_delay(self, now: float) -> Optional[float]:
+        """Секунд до ближайшего актуального срока; None — расписание пусто."""
+        while self._heap and not self._is_current(self._heap[0][1], self._heap[0][2]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] - now if self._heap else None
+
+    def _pop_due(self, now: float) -> list[int]:
+        """Снять с кучи наступившие сроки, поставить следующие. Вернуть id к отправке."""
+        due_ids: list[int] = []
+        while self._heap and self._heap[0][0] <= now + _BATCH_WINDOW_SEC:
+            due, version, mid = heapq.heappop(self._heap)
+            if not self._is_current(version, mid):
+                continue
+            period = self._periods[mid]
+            next_due = due + period
+            if next_due <= now:
+                # Отстали больше чем на период (долгая пауза цикла) — не догоняем залпом
+                next_due = now + period
+            heapq.heappush(self._heap, (next_due, version, mid))
+            if mid in self._in_flight:
+                logger.warning(f"[Scheduler] metric_id={mid} previous send still running, tick skipped")
+                continue
+            due_ids.append(mid)
+        return due_ids
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            delay = self._next_delay(loop.time())
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            due_ids = self._pop_due(loop.time())
+            for i in range(0, len(due_ids), _MAX_BATCH):
+                self._dispatch(due_ids[i:i + _MAX_BATCH])
+
+    def _dispatch(self, metric_ids: list[int]) -> None:
+        self._in_flight.update(metric_ids)
+        versions = {mid: self._versions.get(mid) for mid in metric_ids}
+        task = asyncio.create_task(self._send_batch(metric_ids, versions))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _send_batch(self, metric_ids: list[int], versions: dict[int, Optional[int]]) -> None:
+        try:
+            gone = await asyncio.to_thread(self._do_send_batch, metric_ids)
+        except Exception as e:
+            logger.error(f"[Scheduler] batch of {len(metric_ids)} metrics outer error: {e}")
+            gone = []
+        finally:
+            self._in_flight.difference_update(metric_ids)
+        for mid in gone:
+            # Перезапущенную за время отправки метрику (новая версия) не трогаем
+            if mid in self._periods and self._versions.get(mid) == versions.get(mid):
+                logger.info(f"[Scheduler] metric_id={mid} inactive or deleted, unscheduled")
+                self._forget(mid)
 
     # ── Internal ──────────────────────────────────────────────────────────────
 
     @staticmethod
-    def _load_active_metric_ids() -> list[int]:
+    def _load_active_metrics() -> list[tuple[int, int]]:
         from db.postgres import SessionLocal
         from db.metrics_models import TestMetric, TestSystem
         db = SessionLocal()
         try:
             rows = (
-                db.query(TestMetric.id)
+                db.query(TestMetric.id, TestMetric.metric_period_sec)
                 .join(TestSystem, TestMetric.test_system_id == TestSystem.id)
                 .filter(TestMetric.is_active == True, TestSystem.is_active == True)
                 .all()
             )
-            return [r[0] for r in rows]
+            return [(r[0], r[1]) for r in rows]
         finally:
             db.close()
 
-    async def _run_metric(self, metric_id: int) -> None:
-        """
-        Основной цикл метрики:
-          1. Получить период из БД
-          2. Спать period_sec секунд
-          3. Отправить сообщение в Kafka
-          4. Повторить
-        """
-        while True:
-            period_sec = await asyncio.to_thread(self._get_period, metric_id)
-            if period_sec is None:
-                logger.warning(f"[Scheduler] metric_id={metric_id} not found, stopping")
-                self._tasks.pop(metric_id, None)
-                return
-
-            try:
-                await asyncio.sleep(period_sec)
-            except asyncio.CancelledError:
-                return
-
-            await self._send_once(metric_id)
-
     @staticmethod
     def _get_period(metric_id: int) -> Optional[int]:
         from db.postgres import SessionLocal
@@ -115,194 +216,243 @@ class MetricsScheduler:
         finally:
             db.close()
 
-    async def _send_once(self, metric_id: int) -> None:
-        """Один цикл: сгенерировать значение → отправить в Kafka → записать лог."""
-        try:
-            await asyncio.to_thread(self._do_send, metric_id)
-        except asyncio.CancelledError:
-            raise
-        except Exception as e:
-            logger.error(f"[Scheduler] metric_id={metric_id} outer error: {e}")
+    @staticmethod
+    def _evaluate(configs: list, now: datetime) -> list[tuple[float, Optional[float], Optional[int]]]:
+        """
+        Значение, базалайн и здоровье всех метрик пачки — одним пакетным
+        расчётом NumPy (те же правила, что у скалярных generate_value и т.д.).
+        """
+        import numpy as np
+        from agents.metrics_message_builder import (
+            PATTERN_CODES, BASELINE_METHOD_CODES, HEALTH_METHOD_CODES, HEALTH_PATTERN_CODES,
+            encode, threshold_table,
+            generate_values_batch, calculate_baselines_batch, calculate_health_batch,
+        )
+
+        values = generate_values_batch(
+            encode([c.pattern for c in configs], PATTERN_CODES),
+            [c.value_min for c in configs],
+            [c.value_max for c in configs],
+            [c.sine_period_min for c in configs],
+            [c.spike_interval_min for c in configs],
+            now=now.timestamp(),
+        )
+        baselines = calculate_baselines_batch(
+            [c.baseline_enabled for c in configs],
+            encode([c.baseline_method for c in configs], BASELINE_METHOD_CODES),
+            values,
+            [c.baseline_fixed for c in configs],
+            [c.baseline_offset for c in configs],
+        )
+        healths = calculate_health_batch(
+            [c.id for c in configs],
+            [c.health_enabled for c in configs],
+            encode([c.health_method for c in configs], HEALTH_METHOD_CODES),
+            values,
+            fixed_status=[c.fixed_status for c in configs],
+            health_patterns=encode([c.health_pattern for c in configs], HEALTH_PATTERN_CODES),
+            flap_interval_min=[c.flap_interval_min for c in configs],
+            degrade_hours=[c.degrade_hours for c in configs],
+            metric_created_at=[c.created_at for c in configs],
+            thresholds_enabled=[c.thresholds_enabled for c in configs],
+            best=[c.combination_selector == "best" for c in configs],
+            thresholds=threshold_table([c.threshold_rows for c in configs]),
+            now=now,
+        )
+        return [
+            (v, None if np.isnan(b) else b, h or None)
+            for v, b, h in zip(values.tolist(), baselines.tolist(), healths.tolist())
+        ]
+
+    @staticmethod
+    def _evaluate_one(c, now: datetime) -> tuple[float, Optional[float], Optional[int]]:
+        """Скалярный расчёт одной метрики — запасной путь, если пачка не посчиталась."""
+        from agents.metrics_message_builder import generate_value, calculate_baseline, calculate_health
+
+        value = generate_value(
+            pattern=c.pattern,
+            value_min=c.value_min,
+            value_max=c.value_max,
+            sine_period_min=c.sine_period_min,
+            spike_interval_min=c.spike_interval_min,
+            now=now.timestamp(),
+        )
+        baseline = calculate_baseline(
+            enabled=c.baseline_enabled,
+            calc_method=c.baseline_method,
+            current_value=value,
+            fixed_value=c.baseline_fixed,
+            offset_value=c.baseline_offset,
+        )
+        health = calculate_health(
+            metric_id=c.id,
+            enabled=c.health_enabled,
+            calc_method=c.health_method,
+            value=value,
+            fixed_status=c.fixed_status,
+            health_pattern=c.health_pattern,
+            flap_interval_min=c.flap_interval_min,
+            degrade_hours=c.degrade_hours,
+            metric_created_at=c.created_at,
+            thresholds_enabled=c.thresholds_enabled,
+            combination_selector=c.combination_selector,
+            threshold_rows=c.threshold_rows,
+            now=now,
+        )
+        return value, baseline, health
 
     @staticmethod
-    def _do_send(metric_id: int) -> None:
-        """Синхронная отправка — выполняется в отдельном потоке.
+    def _queue_metric(c, now: datetime, value: float, baseline: Optional[float], health: Optional[int]) -> dict:
+        """
+        Поставить сообщения метрики (по снимку CompiledMetric и посчитанным
+        _evaluate значениям) в очередь producer'а. Подтверждения доставки
+        ждёт _do_send_batch.
 
         Sber911: 3 топика:
           DATA       — отправляется всегда (каждый period_sec)
           METADATA   — при первом запуске + каждые 24 ч
           THRESHOLDS — при первом запуске + каждые 24 ч (если включены)
         """
-        from db.postgres import SessionLocal
-        from db.metrics_models import (
-            TestMetric, GenerationLog,
-        )
-        from backend.api.metrics_settings import get_kafka_config
-        from agents.metrics_message_builder import (
-            generate_value, calculate_baseline, calculate_health,
-            build_data_message, build_metadata_message, build_thresholds_message,
-        )
+        from agents.metrics_message_builder import build_data_message, build_thresholds_message
+        from agents.metrics_config_cache import metric_configs
         from agents.kafka_client import KafkaClient
 
-        db = SessionLocal()
-        value: Optional[float]    = None
-        baseline: Optional[float] = None
-        health: Optional[int]     = None
-        try:
-            m = db.query(TestMetric).filter(TestMetric.id == metric_id).first()
-            if not m or not m.is_active:
-                return
+        item: dict = {"metric_id": c.id, "value": value, "baseline": baseline, "health": health}
+        cfg = c.kafka_cfg
 
-            system = m.system
-            if not system or not system.is_active:
-                return
+        # ── DATA (всегда) ─────────────────────────────────────────────────────
+        data_str = item["data_str"] = json.dumps(
+            build_data_message(c.metric_hash, value, baseline, health), ensure_ascii=False,
+        )
+        item["data_future"] = KafkaClient.send_async(c.topic_data, data_str, key=c.metric_hash, kafka_cfg=cfg)
+        item["futures"] = []
 
-            vc = m.values_config
-            bc = m.baseline_config
-            tc = m.thresholds_config
-            hc = m.health_config
-
-            rows: list[dict] = []
-            if tc and tc.threshold_rows:
-                rows = [
-                    {
-                        "health_type": r.health_type,
-                        "min_value":   float(r.min_value) if r.min_value is not None else None,
-                        "max_value":   float(r.max_value) if r.max_value is not None else None,
-                        "is_percent":  r.is_percent,
-                    }
-                    for r in tc.threshold_rows
-                ]
-
-            value = generate_value(
-                pattern=vc.pattern if vc else "random",
-                value_min=float(vc.value_min) if vc else 0.0,
-                value_max=float(vc.value_max) if vc else 100.0,
-                sine_period_min=vc.sine_period_min if vc else None,
-                spike_interval_min=vc.spike_interval_min if vc else None,
-            )
-            baseline = calculate_baseline(
-                enabled=bc.enabled if bc else False,
-                calc_method=bc.calc_method if bc else "offset",
-                current_value=value,
-                fixed_value=float(bc.fixed_value) if bc and bc.fixed_value is not None else None,
-                offset_value=float(bc.offset_value) if bc and bc.offset_value is not None else None,
-            )
-            health = calculate_health(
-                metric_id=metric_id,
-                enabled=hc.enabled if hc else False,
-                calc_method=hc.calc_method if hc else "auto",
-                value=value,
-                fixed_status=hc.fixed_status if hc else None,
-                health_pattern=hc.health_pattern if hc else None,
-                flap_interval_min=hc.flap_interval_min if hc else None,
-                degrade_hours=hc.degrade_hours if hc else None,
-                metric_created_at=m.created_at,
-                thresholds_enabled=tc.enabled if tc else False,
-                combination_selector=tc.combination_selector if tc else "worst",
-                threshold_rows=rows,
-            )
+        last_metadata, last_thresholds = metric_configs.sent_at(c.id)
 
-            cfg = get_kafka_config(db)
-            topic_data       = cfg.get("kafka_topic_data",       "sber911.data")
-            topic_metadata   = cfg.get("kafka_topic_metadata",   "sber911.metadata")
-            topic_thresholds = cfg.get("kafka_topic_thresholds", "sber911.thresholds")
-
-            now = datetime.now(timezone.utc)
-
-            # ── DATA (всегда) ─────────────────────────────────────────────────
-            data_msg = build_data_message(m.metric_hash, value, baseline, health)
-            data_str = json.dumps(data_msg, ensure_ascii=False)
-            data_result = KafkaClient.send(topic_data, data_str, key=m.metric_hash, kafka_cfg=cfg)
-
-            # ── METADATA (при первом запуске или раз в 24 ч) ──────────────────
-            sent_metadata = False
-            if (m.last_metadata_sent_at is None
-                    or now - m.last_metadata_sent_at >= _RESEND_INTERVAL):
-                meta_msg = build_metadata_message(
-                    metric_hash=m.metric_hash,
-                    mon_system_ci=system.mon_system_ci,
-                    it_service_ci=system.it_service_ci,
-                    object_ci=m.object_ci,
-                    object_id=m.object_id,
-                    object_name=m.object_name,
-                    object_type=m.object_type,
-                    metric_id=m.mon_system_metric_id,
-                    metric_name=m.metric_name,
-                    metric_description=m.metric_description,
-                    metric_type=m.metric_type,
-                    metric_group=m.metric_group,
-                    metric_unit=m.metric_unit,
-                    metric_period_sec=m.metric_period_sec,
+        # ── METADATA (при первом запуске или раз в 24 ч) ──────────────────────
+        item["sent_metadata"] = False
+        if last_metadata is None or now - _aware(last_metadata) >= _RESEND_INTERVAL:
+            item["futures"].append(KafkaClient.send_async(
+                c.topic_metadata, c.metadata_json, key=c.metric_hash, kafka_cfg=cfg,
+            ))
+            item["sent_metadata"] = True
+
+        # ── THRESHOLDS (если включены, при первом запуске или раз в 24 ч) ─────
+        item["sent_thresholds"] = False
+        if c.sends_thresholds:
+            if last_thresholds is None or now - _aware(last_thresholds) >= _RESEND_INTERVAL:
+                thr_msg = build_thresholds_message(
+                    metric_hash=c.metric_hash,
+                    threshold_rows=c.threshold_rows,
+                    combination_selector=c.combination_selector,
+                    baseline_deviation=c.baseline_deviation,
                 )
-                KafkaClient.send(
-                    topic_metadata,
-                    json.dumps(meta_msg, ensure_ascii=False),
-                    key=m.metric_hash,
+                item["futures"].append(KafkaClient.send_async(
+                    c.topic_thresholds,
+                    json.dumps(thr_msg, ensure_ascii=False),
+                    key=c.metric_hash,
                     kafka_cfg=cfg,
-                )
-                m.last_metadata_sent_at = now
-                sent_metadata = True
-
-            # ── THRESHOLDS (если включены, при первом запуске или раз в 24 ч) ─
-            sent_thresholds = False
-            if tc and tc.enabled and rows:
-                if (m.last_thresholds_sent_at is None
-                        or now - m.last_thresholds_sent_at >= _RESEND_INTERVAL):
-                    baseline_deviation: Optional[float] = None
-                    if bc and bc.enabled:
-                        if bc.calc_method == "offset" and bc.offset_value is not None:
-                            baseline_deviation = float(bc.offset_value)
-                        elif bc.calc_method == "fixed" and bc.fixed_value is not None:
-                            baseline_deviation = float(bc.fixed_value)
-                    thr_msg = build_thresholds_message(
-                        metric_hash=m.metric_hash,
-                        threshold_rows=rows,
-                        combination_selector=tc.combination_selector,
-                        baseline_deviation=baseline_deviation,
-                    )
-                    KafkaClient.send(
-                        topic_thresholds,
-                        json.dumps(thr_msg, ensure_ascii=False),
-                        key=m.metric_hash,
-                        kafka_cfg=cfg,
-                    )
-                    m.last_thresholds_sent_at = now
-                    sent_thresholds = True
-
-            m.last_sent_at = now
-            db.add(GenerationLog(
-                test_metric_id=metric_id,
-                value_sent=value,
-                baseline_sent=baseline,
-                health_sent=health,
-                thresholds_sent=sent_thresholds,
-                kafka_offset=data_result.get("offset"),
-                status="success",
-                message_json=data_str,
-            ))
-            db.commit()
-            logger.debug(
-                f"[Scheduler] metric_id={metric_id} sent ok"
-                f" value={value} metadata={sent_metadata} thresholds={sent_thresholds}"
-            )
+                ))
+                item["sent_thresholds"] = True
+        return item
+
+    @classmethod
+    def _do_send_batch(cls, metric_ids: list[int]) -> list[int]:
+        """
+        Синхронная отправка пачки метрик — выполняется в отдельном потоке.
+        Возвращает id метрик, которых больше нет или которые выключены.
+
+        Конфиги берутся из кэша снимков (metrics_config_cache); БД читается
+        только для метрик без снимка. Логи и отметки времени отправки уходят
+        в буфер generation_log_writer — пишутся в фоне общим INSERT.
+        """
+        from agents.metrics_config_cache import metric_configs
+        from agents.generation_log_writer import generation_log_writer
+        from agents.kafka_client import KafkaClient
+
+        configs, missing = metric_configs.get_many(metric_ids)
+        if missing:
+            configs.update(metric_configs.load(missing))
+        gone = [mid for mid in missing if mid not in configs]
+        if not configs:
+            return gone
 
+        now = datetime.now(timezone.utc)
+
+        # Сначала все метрики пачки ставятся в очередь producer'а (одна
+        # пачка в Kafka), потом ждём подтверждения.
+        queued: list[tuple[dict, float]] = []
+        logs: list[dict] = []
+        batch = list(configs.values())
+        try:
+            computed = cls._evaluate(batch, now)
         except Exception as e:
-            logger.error(f"[Scheduler] metric_id={metric_id} send error: {e}")
+            # Одна битая метрика не должна валить всю пачку: считаем поштучно,
+            # ошибкой уходит только та, что не считается и скалярно
+            logger.warning(f"[Scheduler] batch of {len(batch)} metrics: batch calculation failed, "
+                           f"falling back to per-metric: {e}")
+            computed = None
+        for i, c in enumerate(batch):
             try:
-                db.add(GenerationLog(
-                    test_metric_id=metric_id,
-                    value_sent=value,
-                    baseline_sent=baseline,
-                    health_sent=health,
-                    status="error",
-                    error_message=str(e)[:2000],
-                ))
-                db.commit()
-            except Exception:
-                db.rollback()
-        finally:
-            db.close()
+                value, baseline, health = computed[i] if computed is not None else cls._evaluate_one(c, now)
+                timeout = float(c.kafka_cfg.get("metric_send_timeout_sec") or 10)
+                queued.append((cls._queue_metric(c, now, value, baseline, health), timeout))
+            except Exception as e:
+                logger.error(f"[Scheduler] metric_id={c.id} send error: {e}")
+                logs.append(_log_row(c.id, error=e))
+
+        touches: dict[int, dict] = {}
+        for item, timeout in queued:
+            mid = item["metric_id"]
+            try:
+                data_result = KafkaClient.result(item["data_future"], timeout)
+                for future in item["futures"]:
+                    KafkaClient.result(future, timeout)
+            except Exception as e:
+                logger.error(f"[Scheduler] metric_id={mid} send error: {e}")
+                logs.append(_log_row(mid, item, error=e))
+                continue
+            touch = touches[mid] = {"last_sent_at": now}
+            if item["sent_metadata"]:
+                touch["last_metadata_sent_at"] = now
+            if item["sent_thresholds"]:
+                touch["last_thresholds_sent_at"] = now
+            metric_configs.mark_sent(
+                mid,
+                now if item["sent_metadata"] else None,
+                now if item["sent_thresholds"] else None,
+            )
+            logs.append(_log_row(mid, item, offset=data_result.get("offset")))
+            logger.debug(
+                f"[Scheduler] metric_id={mid} sent ok"
+                f" value={item['value']} metadata={item['sent_metadata']}"
+                f" thresholds={item['sent_thresholds']}"
+            )
+
+        generation_log_writer.add(logs, touches)
+        return gone
+
+
+def _log_row(metric_id: int, item: Optional[dict] = None, offset: Optional[int] = None,
+             error: Optional[Exception] = None) -> dict:
+    """Строка GenerationLog для буфера — все колонки, чтобы пачка ушла одним executemany."""
+    item = item or {}
+    return {
+        "test_metric_id":  metric_id,
+        "value_sent":      item.get("value"),
+        "baseline_sent":   item.get("baseline"),
+        "health_sent":     item.get("health"),
+        "thresholds_sent": bool(item.get("sent_thresholds")) and error is None,
+        "kafka_offset":    offset,
+        "status":          "error" if error is not None else "success",
+        "error_message":   str(error)[:2000] if error is not None else None,
+        "message_json":    item.get("data_str") if error is None else None,
+    }
+
+
+def _aware(dt: datetime) -> datetime:
+    """DateTime-колонки без tz (SQLite/Postgres timestamp) — считаем их UTC."""
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=timezone.utc)
 
 
 # ── Singleton ─────────────────────────────────────────────────────────────────
@@ -10,7 +10,7 @@
 import re
 import time
 
-from agents.llm_client import LLMClient, Message
+from agents.llm_client import AsyncLLMClient, LLMClient, Message
 
 _BEST_MARKER_RE = re.compile(r"^ЛУЧШАЯ_МОДЕЛЬ:\s*(\S+)::(.*)$", re.MULTILINE)
 
@@ -22,65 +22,70 @@ _BEST_MARKER_RE = re.compile(r"^ЛУЧШАЯ_МОДЕЛЬ:\s*(\S+)::(.*)$", re.M
 _BENCH_TIMEOUT_SEC = 180.0
 
 
-def run_model_batch(provider: str, model: str, prompt: str, transcript: str, runs: int) -> list[dict]:
+async def run_model_batch(provider: str, model: str, prompt: str, transcript: str, runs: int) -> list[dict]:
     """N независимых вызовов одной модели с одним и тем же промптом+транскрибацией.
 
     Ошибка в одном прогоне не должна убивать остальные — фиксируем её в самом
     прогоне (`error`), а не бросаем исключение наружу."""
-    client = LLMClient(provider=provider, timeout=_BENCH_TIMEOUT_SEC)
     messages = [
         Message(role="system", content=prompt),
         Message(role="user", content=transcript),
     ]
     results = []
-    for i in range(runs):
-        started = time.time()
-        try:
-            resp = client.chat(messages, temperature=0.3, max_tokens=2000, model=model)
-            # Пустой ответ при finish_reason="stop" — не ошибка API (исключения не было),
-            # а деградация модели: она "ответила", но саммари в этом ответе нет. Раньше это
-            # тихо сохранялось как успешный прогон с пустым output_text — неотличимо от
-            # настоящего пустого саммари. Одна свежая попытка (не продолжение) обычно чинит это.
-            if not resp.content.strip():
-                resp = client.chat(messages, temperature=0.3, max_tokens=2000, model=model)
-            elapsed = time.time() - started
-            usage = resp.usage or {}
-            tokens_out = usage.get("completion_tokens", 0)
-            if not resp.content.strip():
-                results.append({
-                    "run": i + 1,
-                    "output_text": "",
-                    "latency_sec": round(elapsed, 2),
-                    "tokens_in": usage.get("prompt_tokens", 0),
-                    "tokens_out": tokens_out,
-                    "tokens_per_sec": 0,
-                    "finish_reason": resp.finish_reason,
-                    "error": "Модель вернула пустой ответ (после повторной попытки)",
-                })
-                continue
-            results.append({
-                "run": i + 1,
-                "output_text": resp.content,
+    async with AsyncLLMClient(provider=provider, timeout=_BENCH_TIMEOUT_SEC) as client:
+        for i in range(runs):
+            results.append(await _run_once(client, i + 1, messages, model))
+    return results
+
+
+async def _run_once(client: AsyncLLMClient, run: int, messages: list[Message], model: str) -> dict:
+    """Один прогон из run_model_batch; ошибка возвращается в самом прогоне.
+    Мимо кэша ответов: замеряется сама модель, а не диск."""
+    started = time.time()
+    try:
+        resp = await client.achat(messages, temperature=0.3, max_tokens=2000, model=model, cache=False)
+        # Пустой ответ при finish_reason="stop" — не ошибка API (исключения не было),
+        # а деградация модели: она "ответила", но саммари в этом ответе нет. Раньше это
+        # тихо сохранялось как успешный прогон с пустым output_text — неотличимо от
+        # настоящего пустого саммари. Одна свежая попытка (не продолжение) обычно чинит это.
+        if not resp.content.strip():
+            resp = await client.achat(messages, temperature=0.3, max_tokens=2000, model=model, cache=False)
+        elapsed = time.time() - started
+        usage = resp.usage or {}
+        tokens_out = usage.get("completion_tokens", 0)
+        if not resp.content.strip():
+            return {
+                "run": run,
+                "output_text": "",
                 "latency_sec": round(elapsed, 2),
                 "tokens_in": usage.get("prompt_tokens", 0),
                 "tokens_out": tokens_out,
-                "tokens_per_sec": round(tokens_out / elapsed, 1) if elapsed > 0 and tokens_out else 0,
-                "finish_reason": resp.finish_reason,
-                "error": None,
-            })
-        except Exception as e:
-            _, friendly = LLMClient.classify_error(e)
-            results.append({
-                "run": i + 1,
-                "output_text": "",
-                "latency_sec": round(time.time() - started, 2),
-                "tokens_in": 0,
-                "tokens_out": 0,
                 "tokens_per_sec": 0,
-                "finish_reason": "",
-                "error": friendly[:300],
-            })
-    return results
+                "finish_reason": resp.finish_reason,
+                "error": "Модель вернула пустой ответ (после повторной попытки)",
+            }
+        return {
+            "run": run,
+            "output_text": resp.content,
+            "latency_sec": round(elapsed, 2),
+            "tokens_in": usage.get("prompt_tokens", 0),
+            "tokens_out": tokens_out,
+            "tokens_per_sec": round(tokens_out / elapsed, 1) if elapsed > 0 and tokens_out else 0,
+            "finish_reason": resp.finish_reason,
+            "error": None,
+        }
+    except Exception as e:
+        _, friendly = LLMClient.classify_error(e)
+        return {
+            "run": run,
+            "output_text": "",
+            "latency_sec": round(time.time() - started, 2),
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "tokens_per_sec": 0,
+            "finish_reason": "",
+            "error": friendly[:300],
+        }
 
 
 def target_stats(target: dict) -> dict:
@@ -135,8 +140,8 @@ def _target_outputs_text(target: dict) -> str:
     return "\n\n".join(lines)
 
 
-def _judge_single_target(judge_provider: str, prompt: str, transcript: str, target: dict, stats: dict,
-                          judge_instructions: str = "") -> str:
+async def _judge_single_target(judge_provider: str, prompt: str, transcript: str, target: dict, stats: dict,
+                                judge_instructions: str = "") -> str:
     """Оценка качества ОДНОЙ модели — отдельным независимым запросом.
 
     Раньше все модели и все прогоны склеивались в один гигантский промпт
@@ -163,19 +168,19 @@ def _judge_single_target(judge_provider: str, prompt: str, transcript: str, targ
         "в транскрибации), стабильность формата/длины между прогонами. Без вводных фраз, сразу к делу."
         + extra_block
     )
-    client = LLMClient(provider=judge_provider, timeout=_BENCH_TIMEOUT_SEC)
-    resp = client.chat_continued(
-        [Message(role="user", content=judge_prompt)], temperature=0.3, max_tokens=1200,
-        continuation_instruction=(
-            "Продолжи оценку точно с того места, где текст оборвался. "
-            "НЕ повторяй уже написанное — только продолжение."
-        ),
-    )
+    async with AsyncLLMClient(provider=judge_provider, timeout=_BENCH_TIMEOUT_SEC) as client:
+        resp = await client.achat_continued(
+            [Message(role="user", content=judge_prompt)], temperature=0.3, max_tokens=1200,
+            continuation_instruction=(
+                "Продолжи оценку точно с того места, где текст оборвался. "
+                "НЕ повторяй уже написанное — только продолжение."
+            ),
+        )
     return resp.content.strip()
 
 
-def analyze_report(judge_provider: str, prompt: str, transcript: str, targets: list[dict],
-                    judge_instructions: str = "") -> tuple[str, dict | None]:
+async def analyze_report(judge_provider: str, prompt: str, transcript: str, targets: list[dict],
+                          judge_instructions: str = "") -> tuple[str, dict | None]:
     """Сравнительный отчёт по всем накопленным моделям/прогонам.
 
     Двухфазная схема специально ради лимита токенов:
@@ -199,7 +204,7 @@ def analyze_report(judge_provider: str, prompt: str, transcript: str, targets: l
     stats = compute_stats(targets)
 
     assessments = [
-        _judge_single_target(judge_provider, prompt, transcript, t, s, judge_instructions)
+        await _judge_single_target(judge_provider, prompt, transcript, t, s, judge_instructions)
         for t, s in zip(targets, stats)
     ]
 
@@ -236,16 +241,16 @@ def analyze_report(judge_provider: str, prompt: str, transcript: str, targets: l
         "(например: custom_groq::llama-3.3-70b-versatile)."
     )
 
-    client = LLMClient(provider=judge_provider, timeout=_BENCH_TIMEOUT_SEC)
     # Обрыв перед строкой ЛУЧШАЯ_МОДЕЛЬ означал бы, что подсветка победителя тихо
-    # пропадает — chat_continued гарантирует, что судья дойдёт до конца отчёта.
-    resp = client.chat_continued(
-        [Message(role="user", content=final_prompt)], temperature=0.3, max_tokens=3000,
-        continuation_instruction=(
-            "Продолжи отчёт точно с того места, где текст оборвался. НЕ повторяй уже "
-            "написанное. Не забудь завершить строкой «ЛУЧШАЯ_МОДЕЛЬ: provider::model»."
-        ),
-    )
+    # пропадает — achat_continued гарантирует, что судья дойдёт до конца отчёта.
+    async with AsyncLLMClient(provider=judge_provider, timeout=_BENCH_TIMEOUT_SEC) as client:
+        resp = await client.achat_continued(
+            [Message(role="user", content=final_prompt)], temperature=0.3, max_tokens=3000,
+            continuation_instruction=(
+                "Продолжи отчёт точно с того места, где текст оборвался. НЕ повторяй уже "
+                "написанное. Не забудь завершить строкой «ЛУЧШАЯ_МОДЕЛЬ: provider::model»."
+            ),
+        )
     report = resp.content.strip()
 
     best = None
@@ -24,7 +24,7 @@ from sqlalchemy.orm import Session
 
 from db.postgres import get_db
 from db.metrics_models import MetricsSettings
-from agents.llm_client import gigachat_only
+from agents.llm_client import gigachat_only, reset_llm_transports
 
 router = APIRouter()
 
@@ -170,6 +170,7 @@ def _save_custom_llm_providers(db: Session, providers: list[dict]) -> None:
         ))
     db.commit()
     os.environ["CUSTOM_LLM_PROVIDERS"] = raw
+    reset_llm_transports()
 
 
 def _load_revisor_stands(db: Session) -> list[dict]:
@@ -248,6 +249,9 @@ def _save_logs_vps(db: Session, connections: list[dict]) -> None:
         ))
     db.commit()
     os.environ["LOGS_VPS_CONNECTIONS"] = raw
+    # Клиенты логов собраны по старым подключениям — пересоздаются при следующем запросе
+    from backend.api.log_clients import invalidate_clients
+    invalidate_clients()
 
 
 def _slugify_logs_vps_id(name: str) -> str:
@@ -378,6 +382,14 @@ def save_settings(body: SettingsUpdate, db: Session = Depends(get_db)) -> dict:
             os.environ[ev] = val
         elif sk in body.settings:
             os.environ.pop(ev, None)
+    # HTTP-клиенты LLM собраны по старым env (сертификаты, CA, base_url).
+    reset_llm_transports()
+    # Kafka-producer'ы Метрик — тоже (эта форма правит и kafka_*-ключи)
+    from agents.kafka_client import close_producers
+    from agents.metrics_config_cache import metric_configs
+    close_producers()
+    # Топики и cfg зашиты в скомпилированные снимки метрик
+    metric_configs.invalidate_all()
 
     return {"ok": True}
 
@@ -579,6 +591,9 @@ class LogsVpsConfig(BaseModel):
     ca_cert_path: str = ""
     default_index: str = ""
     enabled: bool = True
+    # Маски fingerprint (None — все встроенные) и свои regex изменчивых токенов
+    fingerprint_masks: Optional[list[str]] = None
+    fingerprint_patterns: list[str] = Field(default_factory=list)
 
 
 @router.get("/api/settings/logs-vps")
@@ -605,6 +620,13 @@ def upsert_logs_vps(body: LogsVpsConfig, db: Session = Depends(get_db)) -> dict:
     if auth_type not in ("none", "bearer", "basic", "api_key"):
         raise HTTPException(422, "auth_type должен быть none, bearer, basic или api_key")
 
+    fingerprint_patterns = [p for p in (x.strip() for x in body.fingerprint_patterns) if p]
+    try:
+        from backend.api.log_clients.fingerprint import get_normalizer
+        get_normalizer(body.fingerprint_masks, fingerprint_patterns)
+    except ValueError as e:
+        raise HTTPException(422, str(e))
+
     existing = next(
         (c for c in connections if str(c.get("id", "")).lower() == conn_id), None
     )
@@ -635,6 +657,8 @@ def upsert_logs_vps(body: LogsVpsConfig, db: Session = Depends(get_db)) -> dict:
         "ca_cert_path": body.ca_cert_path.strip(),
         "default_index": body.default_index.strip(),
         "enabled": bool(body.enabled),
+        "fingerprint_masks": body.fingerprint_masks,
+        "fingerprint_patterns": fingerprint_patterns,
     }
 
     if existing:
@@ -770,6 +794,8 @@ async def gigachat_cert_upload(kind: str, file: UploadFile = File(...)) -> dict:
     with os.fdopen(fd, "wb") as f:
         f.write(content)
     os.chmod(dest, 0o600)
+    # Путь тот же, а содержимое новое — клиент из пула держит старый сертификат.
+    reset_llm_transports()
 
     return {"path": str(dest)}
 
@@ -850,8 +876,8 @@ def test_kafka_metrics(db: Session = Depends(get_db)) -> dict:
 def test_chromadb() -> dict:
     """Тест подключения к ChromaDB."""
     try:
-        from db.vector_store import VectorStore
-        store = VectorStore()
+        from db.vector_store import get_vector_store
+        store = get_vector_store()
         stats = store.get_stats()
         total = sum(stats.values())
         return {"status": "green", "message": f"OK — {total} записей в {len(stats)} коллекциях"}
@@ -912,19 +938,8 @@ def test_logs_vps(conn_id: str, db: Session = Depends(get_db)) -> dict:
         )
         if not conn:
             return {"status": "red", "message": "Подключение не найдено"}
-        from backend.api.log_clients import get_client
-        client = get_client(
-            vps_type=conn.get("vps_type", "generic"),
-            base_url=conn.get("base_url", ""),
-            auth_type=conn.get("auth_type", "none"),
-            token=conn.get("token", ""),
-            username=conn.get("username", ""),
-            password=conn.get("password", ""),
-            api_key_header=conn.get("api_key_header", "Authorization"),
-            ssl_verify=conn.get("ssl_verify", True),
-            ca_cert_path=conn.get("ca_cert_path", ""),
-            default_index=conn.get("default_index", ""),
-        )
+        from backend.api.log_clients import client_for_connection
+        client = client_for_connection(conn)
         return client.test_connection()
     except Exception as e:
         return {"status": "red", "message": str(e)[:200]}
@@ -122,9 +122,9 @@ _PROMPTS: dict[str, str] = {
 _DEFAULT_TYPE = "e2e"
 
 
-def _generate_sync(cases: str, provider: str, test_type: str,
-                   project_context: str = "") -> str:
-    from agents.llm_client import LLMClient, Message
+async def _generate(cases: str, provider: str, test_type: str,
+                    project_context: str = "") -> str:
+    from agents.llm_client import AsyncLLMClient, Message
 
     prompt_tpl = _PROMPTS.get(test_type, _PROMPTS[_DEFAULT_TYPE])
     # Use replace instead of .format() to avoid KeyError on curly braces in input
@@ -138,18 +138,18 @@ def _generate_sync(cases: str, provider: str, test_type: str,
         # Insert project context before the cases block
         prompt = prompt.replace("\nВХОДНЫЕ ТЕСТ-КЕЙСЫ:", project_block + "\n\nВХОДНЫЕ ТЕСТ-КЕЙСЫ:")
 
-    llm = LLMClient(provider=provider)
     # Обрыв по лимиту токенов особенно вреден для кода — незакрытые скобки/методы
-    # не скомпилируются. chat_continued сам догенерирует хвост файла.
-    resp = llm.chat_continued(
-        [Message(role="user", content=prompt)],
-        temperature=0.2,
-        max_tokens=4000,
-        continuation_instruction=(
-            "Продолжи Java-код точно с того места, где он оборвался. "
-            "НЕ повторяй уже написанное, не начинай класс заново — только продолжение кода."
-        ),
-    )
+    # не скомпилируются. achat_continued сам догенерирует хвост файла.
+    async with AsyncLLMClient(provider=provider) as llm:
+        resp = await llm.achat_continued(
+            [Message(role="user", content=prompt)],
+            temperature=0.2,
+            max_tokens=4000,
+            continuation_instruction=(
+                "Продолжи Java-код точно с того места, где он оборвался. "
+                "НЕ повторяй уже написанное, не начинай класс заново — только продолжение кода."
+            ),
+        )
     return resp.content.strip()
 
 
@@ -173,9 +173,7 @@ async def generate_autotest(
         )
 
     try:
-        code = await asyncio.to_thread(
-            _generate_sync, cases, provider, test_type, project_context
-        )
+        code = await _generate(cases, provider, test_type, project_context)
         return {"code": code}
     except Exception as e:
         from agents.llm_client import LLMClient
@@ -7,7 +7,6 @@
   description → Описание (целиком, со всеми подразделами)
   priority    → Приоритет
 """
-import asyncio
 import re
 from typing import List
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
@@ -64,10 +63,8 @@ def with_screenshots(report: str, names: list[str]) -> str:
     return report[:last.start()].rstrip() + "\n" + block + "\n\n" + report[last.start():]
 
 
-def _format_bug_sync(platform: str, feature: str, description: str, provider: str, requirements_context: str = "") -> str:
-    from agents.llm_client import LLMClient, Message
-
-    llm = LLMClient(provider=provider)
+async def _format_bug(platform: str, feature: str, description: str, provider: str, requirements_context: str = "") -> str:
+    from agents.llm_client import AsyncLLMClient, Message
 
     feature_hint = f"\nФИЧА / МОДУЛЬ (подсказка): {feature.strip()}" if feature.strip() else ""
     requirements_block = f"\n\n═══════════════════════════════════════════════════\nКОНТЕКСТ ИЗ ТРЕБОВАНИЙ (для справки — реальные поля БД, методы API, бизнес-правила; используй, чтобы точнее и конкретнее описать дефект, но не выдумывай то, чего нет во входных данных)\n═══════════════════════════════════════════════════\n{requirements_context}" if requirements_context.strip() else ""
@@ -128,15 +125,16 @@ def _format_bug_sync(platform: str, feature: str, description: str, provider: st
     # Обрыв по лимиту токенов до строки "Приоритет: X" (последней в шаблоне) означал
     # бы, что _parse_report() не находит приоритет — chat_continued сам догенерирует
     # хвост отчёта, не показывая пользователю обрыв на полуслове.
-    response = llm.chat_continued(
-        [Message(role="user", content=prompt)],
-        temperature=0.2,
-        max_tokens=4000,
-        continuation_instruction=(
-            "Продолжи отчёт о дефекте точно с того места, где текст оборвался. "
-            "НЕ повторяй уже написанное. Не забудь завершить строкой «Приоритет: X»."
-        ),
-    )
+    async with AsyncLLMClient(provider=provider) as llm:
+        response = await llm.achat_continued(
+            [Message(role="user", content=prompt)],
+            temperature=0.2,
+            max_tokens=4000,
+            continuation_instruction=(
+                "Продолжи отчёт о дефекте точно с того места, где текст оборвался. "
+                "НЕ повторяй уже написанное. Не забудь завершить строкой «Приоритет: X»."
+            ),
+        )
     return response.content.strip()
 
 
@@ -218,10 +216,7 @@ async def format_bug(
         )
 
     try:
-        report = await asyncio.to_thread(
-            _format_bug_sync,
-            platform, feature, full_description, provider, requirements_context,
-        )
+        report = await _format_bug(platform, feature, full_description, provider, requirements_context)
         report = with_screenshots(report, screenshot_names)
         return {"report": report, "screenshots": screenshot_names, **_parse_report(report)}
     except Exception as e:
@@ -16,7 +16,7 @@ from pydantic import BaseModel, Field
 
 from agents.datagen_presets import tcsmember_rules
 from agents.datagen_sync import list_parents, plan_sync, sync_members
-from backend.api.db_connector import get_db_connection, introspect_schema
+from backend.api.db_connector import introspect_schema, pooled_connection
 from db.datagen_config_store import DatagenConfigStore
 from db.testdata_connections import TestDataConnectionsStore
 
@@ -56,15 +56,9 @@ def _sync_config() -> dict:
 
 
 def _with_connection(conn_cfg: dict, fn):
-    """Открывает соединение, выполняет и обязательно закрывает."""
-    conn, _driver = get_db_connection(conn_cfg)
-    try:
+    """Берёт соединение из пула подключения, выполняет и возвращает его в пул."""
+    with pooled_connection(conn_cfg) as (conn, _driver):
         return fn(conn)
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
 
 @router.get("/api/datagen/tcs/parents")
@@ -14,20 +14,36 @@ Python-драйверы: единообразие с DBeaver и с реестр
 JVM запускается один раз за процесс, и её системный classpath после старта
 изменить нельзя. Раньше это означало: добавил/заменил .jar — перезапусти сервер.
 
-Теперь classpath при старте НЕ фиксируется. На каждое подключение .jar
-загружается динамически через java.net.URLClassLoader, из него берётся класс
-драйвера, создаётся экземпляр java.sql.Driver и вызывается его .connect(url,
-props) напрямую (минуя DriverManager, который не видит классы из внешнего
-загрузчика). Благодаря этому:
+Теперь classpath при старте НЕ фиксируется. .jar загружается динамически
+через java.net.URLClassLoader, из него берётся класс драйвера, создаётся
+экземпляр java.sql.Driver и вызывается его .connect(url, props) напрямую
+(минуя DriverManager, который не видит классы из внешнего загрузчика).
+Благодаря этому:
   • новую или заменённую библиотеку можно подключить без перезапуска;
   • .jar может лежать по любому пути на машине (его не обязательно копировать).
+
+Загруженный драйвер кэшируется по (путь к .jar, класс) вместе с mtime и
+размером файла: раньше свежий загрузчик создавался на каждое подключение —
+загрузка классов на каждый запрос и утечка загрузчиков в metaspace. Файл
+заменили — следующее подключение грузит новую версию, а старый загрузчик
+закрывается, когда закроются все его соединения.
 """
 
+import asyncio
+import hashlib
+import json
+import logging
+import os
 import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Optional
 
 from db.jdbc_drivers_store import JdbcDriversStore
 
+logger = logging.getLogger(__name__)
+
 _jvm_lock = threading.Lock()
 
 
@@ -82,23 +98,11 @@ def _ensure_jaydebeapi_ready() -> None:
         jaydebeapi._java_array_byte = lambda data: jpype.JArray(jpype.JByte, 1)(data)
 
 
-def load_jdbc_driver(driver_class: str, jar_path: str):
-    """Загружает класс JDBC-драйвера из указанного .jar через свежий
-    URLClassLoader и возвращает экземпляр java.sql.Driver.
-
-    Свежий загрузчик на каждый вызов = горячая замена: заменили файл по пути —
-    следующее подключение подхватит новую версию без перезапуска."""
+def _new_driver(driver_class: str, jar: Path):
+    """Свежий URLClassLoader над .jar и экземпляр java.sql.Driver из него: (loader, driver)."""
     ensure_jvm()
     from jpype import JArray, JClass
 
-    jar = Path(jar_path)
-    if not jar.is_file():
-        raise FileNotFoundError(
-            f"Файл драйвера не найден: {jar_path}. "
-            "Проверьте путь (он проверяется на машине, где запущен бэкенд) "
-            "или укажите библиотеку заново во вкладке «Библиотека»."
-        )
-
     File = JClass("java.io.File")
     URL = JClass("java.net.URL")
     URLClassLoader = JClass("java.net.URLClassLoader")
@@ -108,7 +112,84 @@ def load_jdbc_driver(driver_class: str, jar_path: str):
     url = File(str(jar)).toURI().toURL()
     loader = URLClassLoader(JArray(URL)([url]), ClassLoader.getSystemClassLoader())
     klass = Class.forName(driver_class, True, loader)
-    return klass.getDeclaredConstructor().newInstance()
+    return loader, klass.getDeclaredConstructor().newInstance()
+
+
+class _LoadedDriver:
+    """Драйвер из одной версии .jar и число открытых через него соединений."""
+
+    __slots__ = ("stat", "loader", "driver", "connections", "retired")
+
+    def __init__(self, stat: tuple, loader, driver):
+        self.stat = stat
+        self.loader = loader
+        self.driver = driver
+        self.connections = 0
+        self.retired = False
+
+
+_drivers: dict[tuple[str, str], _LoadedDriver] = {}
+_drivers_lock = threading.Lock()
+
+
+def _close_loader(loaded: _LoadedDriver) -> None:
+    try:
+        loaded.loader.close()
+    except Exception as e:
+        logger.debug(f"[JDBC] closing class loader failed: {e}")
+
+
+def _checkout_driver(driver_class: str, jar_path: str, lease: bool) -> _LoadedDriver:
+    """Драйвер из кэша; при изменённом .jar — загрузить заново, старый вывести из оборота.
+    lease=True — под новое соединение (вернуть через _release_driver)."""
+    jar = Path(jar_path)
+    try:
+        st = jar.stat()
+    except OSError:
+        st = None
+    if st is None or not jar.is_file():
+        raise FileNotFoundError(
+            f"Файл драйвера не найден: {jar_path}. "
+            "Проверьте путь (он проверяется на машине, где запущен бэкенд) "
+            "или укажите библиотеку заново во вкладке «Библиотека»."
+        )
+    key, stat = (str(jar), driver_class), (st.st_mtime_ns, st.st_size)
+
+    with _drivers_lock:
+        loaded = _drivers.get(key)
+        if loaded is None or loaded.stat != stat:
+            # Загрузка под блокировкой: параллельные подключения не плодят загрузчики
+            fresh = _LoadedDriver(stat, *_new_driver(driver_class, jar))
+            if loaded is not None:
+                loaded.retired = True
+                if loaded.connections == 0:
+                    _close_loader(loaded)
+            _drivers[key] = loaded = fresh
+        if lease:
+            loaded.connections += 1
+        return loaded
+
+
+def _release_driver(loaded: _LoadedDriver) -> None:
+    """Соединение через драйвер закрыто; выведенный из оборота загрузчик закрыть с последним."""
+    with _drivers_lock:
+        loaded.connections -= 1
+        if loaded.retired and loaded.connections == 0:
+            _close_loader(loaded)
+
+
+def attach_jvm_thread() -> None:
+    """Подключить текущий поток к JVM перед работой с уже открытым соединением
+    (например, при чтении потока результата из разных потоков пула)."""
+    _ensure_jaydebeapi_ready()
+
+
+def load_jdbc_driver(driver_class: str, jar_path: str):
+    """Возвращает экземпляр java.sql.Driver из указанного .jar.
+
+    Драйвер кэшируется по (путь, класс, mtime/размер файла): заменили файл по
+    пути — следующее подключение подхватит новую версию без перезапуска."""
+    return _checkout_driver(driver_class, jar_path, lease=False).driver
 
 
 def get_driver_for_connection(conn_config: dict) -> dict:
@@ -148,27 +229,56 @@ def get_db_connection(conn_config: dict):
 
     from jpype import JClass
 
-    driver_obj = load_jdbc_driver(driver["driver_class"], jar_path)
-    _ensure_jaydebeapi_ready()   # attach thread + инициализация _converters (иначе fetchone падает)
-    Properties = JClass("java.util.Properties")
-    props = Properties()
-    if login:
-        props.setProperty("user", login)
-    if password:
-        props.setProperty("password", password)
-
-    jconn = driver_obj.connect(url, props)
-    if jconn is None:
-        # Контракт JDBC: Driver.connect() возвращает null, если URL не для этого драйвера.
-        raise RuntimeError(
-            f"Драйвер «{driver['name']}» не принял URL. Проверьте шаблон URL и класс драйвера "
-            "(возможно, они не соответствуют выбранной библиотеке)."
-        )
-
-    conn = jaydebeapi.Connection(jconn, jaydebeapi._converters)
+    loaded = _checkout_driver(driver["driver_class"], jar_path, lease=True)
+    try:
+        _ensure_jaydebeapi_ready()   # attach thread + инициализация _converters (иначе fetchone падает)
+        Properties = JClass("java.util.Properties")
+        props = Properties()
+        if login:
+            props.setProperty("user", login)
+        if password:
+            props.setProperty("password", password)
+
+        jconn = loaded.driver.connect(url, props)
+        if jconn is None:
+            # Контракт JDBC: Driver.connect() возвращает null, если URL не для этого драйвера.
+            raise RuntimeError(
+                f"Драйвер «{driver['name']}» не принял URL. Проверьте шаблон URL и класс драйвера "
+                "(возможно, они не соответствуют выбранной библиотеке)."
+            )
+    except BaseException:
+        _release_driver(loaded)
+        raise
+
+    conn = _leased_connection_class()(jconn, jaydebeapi._converters)
+    conn._driver_lease = loaded
     return conn, driver
 
 
+_LeasedConnection = None
+
+
+def _leased_connection_class():
+    """jaydebeapi.Connection, который на close() отпускает свой драйвер из кэша."""
+    global _LeasedConnection
+    if _LeasedConnection is None:
+        import jaydebeapi
+
+        class LeasedConnection(jaydebeapi.Connection):
+            _driver_lease = None
+
+            def close(self):
+                try:
+                    super().close()
+                finally:
+                    lease, self._driver_lease = self._driver_lease, None
+                    if lease is not None:
+                        _release_driver(lease)
+
+        _LeasedConnection = LeasedConnection
+    return _LeasedConnection
+
+
 def _safe_meta(fn, default):
     """Необязательные метаданные: экзотический драйвер не должен ронять интроспекцию.
 
@@ -287,3 +397,327 @@ def introspect_schema(conn, max_tables: int = 200) -> dict:
         schema[full_name] = columns
 
     return schema
+
+
+# ── Пул соединений ────────────────────────────────────────────────────────────
+# Раньше каждый запрос «Тестовых данных», джоба и генератора данных открывал
+# своё JDBC-соединение и закрывал его — логин в Oracle/PostgreSQL через VPN
+# стоит 0.5–2 с. Теперь соединения берутся из пула своего подключения
+# (connection_id):
+#   • не больше TESTDATA_POOL_SIZE соединений, сверх — ожидание до
+#     TESTDATA_POOL_WAIT_SEC;
+#   • перед выдачей соединение проверяется (Connection.isValid);
+#   • простаивающее дольше TESTDATA_POOL_IDLE_SEC и живущее дольше
+#     TESTDATA_POOL_MAX_LIFETIME_SEC закрывается;
+#   • пул привязан к сигнатуре конфига подключения и драйвера (включая
+#     mtime/размер .jar) — правка подключения, драйвера или замена
+#     библиотеки дают новый пул, старый закрывается. API правок вдобавок
+#     сбрасывает пулы явно (invalidate_connection / invalidate_driver).
+
+_DEFAULT_POOL_SIZE = 4
+_DEFAULT_POOL_WAIT_SEC = 30
+_DEFAULT_POOL_IDLE_SEC = 300
+_DEFAULT_POOL_MAX_LIFETIME_SEC = 1800
+_VALIDATE_TIMEOUT_SEC = 5
+
+_CONNECTION_FIELDS = ("driver_id", "host", "port", "db_name", "login", "password", "schema_name")
+_DRIVER_FIELDS = ("id", "driver_class", "url_template", "default_port", "jar_path", "jar_filename")
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+def _config_signature(conn_config: dict, driver: dict) -> str:
+    """Хэш всего, от чего зависит физическое соединение. Пароль в открытом виде не хранится."""
+    jar_stat = None
+    jar = JdbcDriversStore.jar_path(driver)
+    if jar is not None:
+        try:
+            st = jar.stat()
+            jar_stat = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+    raw = json.dumps({
+        "conn": {k: conn_config.get(k) for k in _CONNECTION_FIELDS},
+        "driver": {k: driver.get(k) for k in _DRIVER_FIELDS},
+        "jar": jar_stat,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception as e:
+        logger.debug(f"[JDBC pool] close failed: {e}")
+
+
+def _is_valid(conn) -> bool:
+    """Connection.isValid (JDBC 4); у старых драйверов — хотя бы не закрыто."""
+    jconn = conn.jconn
+    try:
+        return bool(jconn.isValid(_VALIDATE_TIMEOUT_SEC))
+    except Exception:
+        try:
+            return not jconn.isClosed()
+        except Exception:
+            return False
+
+
+def _reset(conn) -> bool:
+    """Вернуть соединение в исходное состояние перед возвратом в пул. False — выбросить."""
+    try:
+        jconn = conn.jconn
+        if not jconn.getAutoCommit():
+            conn.rollback()
+            jconn.setAutoCommit(True)
+        return not jconn.isClosed()
+    except Exception:
+        return False
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = time.monotonic()
+
+
+class JdbcConnectionPool:
+    """Соединения одного подключения с одной сигнатурой конфига."""
+
+    def __init__(self, signature: str, driver: dict):
+        self.signature = signature
+        self.driver = driver
+        self.max_size = max(1, int(_env_float("TESTDATA_POOL_SIZE", _DEFAULT_POOL_SIZE)))
+        self.wait_sec = _env_float("TESTDATA_POOL_WAIT_SEC", _DEFAULT_POOL_WAIT_SEC)
+        self.idle_sec = _env_float("TESTDATA_POOL_IDLE_SEC", _DEFAULT_POOL_IDLE_SEC)
+        self.lifetime_sec = _env_float("TESTDATA_POOL_MAX_LIFETIME_SEC", _DEFAULT_POOL_MAX_LIFETIME_SEC)
+        self._cond = threading.Condition()
+        self._idle: list[_PooledConnection] = []   # LIFO: свежие соединения сверху
+        self._in_use = 0
+        self._closed = False
+
+    def _expired(self, entry: _PooledConnection, now: float) -> bool:
+        return now - entry.created_at >= self.lifetime_sec or now - entry.last_used >= self.idle_sec
+
+    def _take_expired(self) -> list[_PooledConnection]:
+        """Вынуть из простаивающих просроченные (под self._cond)."""
+        now = time.monotonic()
+        expired = [e for e in self._idle if self._expired(e, now)]
+        if expired:
+            self._idle = [e for e in self._idle if not self._expired(e, now)]
+        return expired
+
+    def acquire(self, conn_config: dict) -> _PooledConnection:
+        deadline = time.monotonic() + self.wait_sec
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Пул соединений закрыт: настройки подключения изменились")
+                    expired = self._take_expired()
+                    if self._idle:
+                        entry = self._idle.pop()
+                        self._in_use += 1
+                        break
+                    if self._in_use < self.max_size:
+                        self._in_use += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"Все {self.max_size} соединений с базой заняты дольше {self.wait_sec:g} с. "
+                            "Повторите позже или увеличьте TESTDATA_POOL_SIZE."
+                        )
+                    self._cond.wait(remaining)
+            for stale in expired:
+                _close_quietly(stale.conn)
+
+            if entry is None:
+                try:
+                    conn, _driver = get_db_connection(conn_config)
+                except BaseException:
+                    self._give_back_slot()
+                    raise
+                return _PooledConnection(conn)
+
+            _ensure_jaydebeapi_ready()   # поток пула мог ещё не быть подключён к JVM
+            if _is_valid(entry.conn):
+                return entry
+            # Сервер разорвал соединение (таймаут, рестарт БД) — выбросить и взять следующее
+            logger.info("[JDBC pool] dropping invalid connection")
+            _close_quietly(entry.conn)
+            self._give_back_slot()
+
+    def release(self, entry: _PooledConnection) -> None:
+        keep = _reset(entry.conn)
+        with self._cond:
+            self._in_use -= 1
+            now = time.monotonic()
+            if keep and not self._closed and now - entry.created_at < self.lifetime_sec:
+                entry.last_used = now
+                self._idle.append(entry)
+                entry = None
+            self._cond.notify()
+        if entry is not None:
+            _close_quietly(entry.conn)
+
+    def evict_idle(self) -> int:
+        with self._cond:
+            expired = self._take_expired()
+        for entry in expired:
+            _close_quietly(entry.conn)
+        return len(expired)
+
+    def close(self) -> None:
+        """Закрыть простаивающие; выданные закроются при возврате."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"idle": len(self._idle), "in_use": self._in_use, "max_size": self.max_size}
+
+    def _give_back_slot(self) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+
+_pools: dict[str, JdbcConnectionPool] = {}
+_pools_lock = threading.Lock()
+_sweeper: Optional[threading.Thread] = None
+
+
+def _pool_for(conn_config: dict, driver: dict) -> JdbcConnectionPool:
+    signature = _config_signature(conn_config, driver)
+    key = conn_config.get("id") or signature
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and pool.signature == signature:
+            return pool
+        stale, pool = pool, JdbcConnectionPool(signature, driver)
+        _pools[key] = pool
+        _start_sweeper()
+    if stale is not None:
+        stale.close()
+    return pool
+
+
+@contextmanager
+def pooled_connection(conn_config: dict):
+    """
+    (connection, driver) из пула подключения — вместо get_db_connection + close().
+    На выходе соединение откатывается (если autocommit выключали) и возвращается в пул.
+    """
+    driver = get_driver_for_connection(conn_config)
+    pool = _pool_for(conn_config, driver)
+    entry = pool.acquire(conn_config)
+    try:
+        yield entry.conn, pool.driver
+    finally:
+        pool.release(entry)
+
+
+def _drop_pools(match) -> int:
+    with _pools_lock:
+        keys = [k for k, pool in _pools.items() if match(k, pool)]
+        dropped = [_pools.pop(k) for k in keys]
+    for pool in dropped:
+        pool.close()
+    return len(dropped)
+
+
+def invalidate_connection(conn_id: str) -> None:
+    """Закрыть пул подключения — после правки или удаления подключения."""
+    _drop_pools(lambda key, _pool: key == conn_id)
+
+
+def invalidate_driver(driver_id: str) -> None:
+    """Закрыть пулы всех подключений через драйвер — после правки драйвера или его библиотеки."""
+    _drop_pools(lambda _key, pool: pool.driver.get("id") == driver_id)
+
+
+def close_pools() -> None:
+    """Закрыть все пулы (остановка приложения)."""
+    _drop_pools(lambda _key, _pool: True)
+
+
+def pool_stats() -> dict:
+    with _pools_lock:
+        pools = dict(_pools)
+    return {key: pool.stats() for key, pool in pools.items()}
+
+
+def _start_sweeper() -> None:
+    """Фоновый поток, закрывающий простаивающие соединения (под _pools_lock)."""
+    global _sweeper
+    if _sweeper is not None and _sweeper.is_alive():
+        return
+
+    def _run():
+        while True:
+            time.sleep(max(1.0, _env_float("TESTDATA_POOL_IDLE_SEC", _DEFAULT_POOL_IDLE_SEC) / 2))
+            with _pools_lock:
+                pools = list(_pools.values())
+            for pool in pools:
+                try:
+                    if pool.stats()["idle"]:
+                        _ensure_jaydebeapi_ready()
+                        pool.evict_idle()
+                except Exception as e:
+                    logger.warning(f"[JDBC pool] idle eviction failed: {e}")
+
+    _sweeper = threading.Thread(target=_run, name="jdbc-pool-sweeper", daemon=True)
+    _sweeper.start()
+
+
+# ── Параллельный опрос нескольких БД ──────────────────────────────────────────
+
+class DeadlineExceeded(TimeoutError):
+    """Метка gather_with_deadline для не успевших к сроку. Отдельный тип:
+    TimeoutError поднимает и сам пул (все соединения заняты) — это не
+    «база не ответила»."""
+
+
+async def gather_with_deadline(aws: dict, timeout: float, cancel_pending: bool = True) -> dict:
+    """
+    Дождаться awaitable-ов {ключ: aw} параллельно, но не дольше timeout секунд.
+    Возвращает {ключ: результат | исключение}; не успевшие — DeadlineExceeded.
+
+    Поток JDBC-запроса прервать нельзя: cancel_pending=True лишь перестаёт его
+    ждать (поток доработает в фоне и вернёт соединение в пул), False — оставляет
+    задачу выполняться до конца (например, чтобы джоб дописал свою историю).
+    """
+    tasks = {key: asyncio.ensure_future(aw) for key, aw in aws.items()}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=timeout)
+    results = {}
+    for key, task in tasks.items():
+        if not task.done():
+            if cancel_pending:
+                task.cancel()
+            else:
+                _background.add(task)
+                task.add_done_callback(_background.discard)
+            results[key] = DeadlineExceeded(f"нет ответа за {timeout:g} с")
+        elif task.cancelled():
+            results[key] = asyncio.CancelledError()
+        else:
+            results[key] = task.exception() or task.result()
+    return results
+
+
+# Недождавшиеся задачи (cancel_pending=False) — держим ссылки, пока не завершатся
+_background: set = set()
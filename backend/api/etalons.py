@@ -3,7 +3,11 @@ CRUD эндпоинты для эталонных пар:
   - Тест-кейсы:  /api/etalons    (требование → XML)
   - Автотесты:   /api/autotests  (XML мануальный кейс → Java)
   - Дефекты:     /api/defects    (описание → тело дефекта)
+
+Массовая загрузка тест-кейсов — POST /api/etalons/bulk (JSONL, по паре на строку).
 """
+import asyncio
+import json
 import logging
 import uuid
 from typing import Optional
@@ -16,8 +20,8 @@ router = APIRouter()
 
 
 def _get_store():
-    from db.vector_store import VectorStore
-    return VectorStore()
+    from db.vector_store import get_vector_store
+    return get_vector_store()
 
 
 def _err_detail(e: Exception) -> str:
@@ -133,6 +137,57 @@ async def add_etalon(
         raise HTTPException(status_code=500, detail=_err_detail(e))
 
 
+def _parse_etalons_jsonl(text: str) -> tuple[list[dict], list[dict]]:
+    """Строки JSONL → kwargs для add_pairs_bulk и ошибки по номерам строк.
+
+    Строка: {"req_text", "tc_text", "qa_doc"?, "platform"?, "feature"?, "name"?, "id"?}.
+    """
+    items, errors = [], []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors.append({"line": line_no, "error": f"невалидный JSON: {e.msg}"})
+            continue
+        if not isinstance(row, dict) or not row.get("req_text") or not row.get("tc_text"):
+            errors.append({"line": line_no, "error": "req_text и tc_text обязательны"})
+            continue
+        items.append({
+            "pair_id": str(row.get("id") or uuid.uuid4()),
+            "requirement_text": row["req_text"],
+            "test_case_xml": row["tc_text"],
+            "qa_doc": row.get("qa_doc", ""),
+            "platform": row.get("platform", ""),
+            "feature": row.get("feature", ""),
+            "name": row.get("name", ""),
+        })
+    return items, errors
+
+
+@router.post("/api/etalons/bulk")
+async def add_etalons_bulk(file: UploadFile = File(...)):
+    """Массово добавить эталонные пары из JSONL-файла — эмбеддинг и запись пачками.
+    Битые строки пропускаются и возвращаются в errors, остальные загружаются."""
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Файл должен быть в UTF-8")
+
+    items, errors = _parse_etalons_jsonl(text)
+    if not items:
+        raise HTTPException(status_code=400, detail={"message": "Нет валидных строк", "errors": errors[:50]})
+
+    store = _get_store()
+    try:
+        added = await asyncio.to_thread(store.add_pairs_bulk, items)
+    except Exception as e:
+        logger.exception("Ошибка в эндпоинте эталонов")
+        raise HTTPException(status_code=500, detail=_err_detail(e))
+    return {"status": "added", "added": added, "skipped": len(errors), "errors": errors[:50]}
+
+
 @router.delete("/api/etalons/{pair_id}")
 def delete_etalon(pair_id: str):
     store = _get_store()
@@ -392,7 +447,7 @@ async def add_context_doc(
 def delete_context_doc(doc_id: str):
     store = _get_store()
     try:
-        store.context_docs.delete(ids=[doc_id])
+        store.delete_context_doc(doc_id)
         return {"status": "deleted", "id": doc_id}
     except Exception as e:
         logger.exception("Ошибка в эндпоинте контекстных документов")
@@ -2,7 +2,7 @@
 WebSocket стриминг генерации + REST API сессий.
 
 Генерация запускается как asyncio.Task и продолжает работу даже при
-отключении WebSocket. Результаты сохраняются в data/gen_sessions.json.
+отключении WebSocket. Результаты сохраняются в data/gen_sessions.sqlite3.
 
 WebSocket протокол:
   Client → Server:
@@ -15,6 +15,7 @@ WebSocket протокол:
     {"type": "session_created",   "session_id": "..."}
     {"type": "session_state",     "session_id": "...", ...}
     {"type": "layer_start",       "layer": 1, "name": "QA документация"}
+    {"type": "layer_delta",       "layer": 1, "text": "..."}   — кусок QA-документа по мере генерации
     {"type": "layer_done",        "layer": 1, "elapsed": 42, "data": {...}}
     {"type": "case_start",        "i": 1, "total": 8, "name": "..."}
     {"type": "case_done",         "i": 1, "case": {...}}
@@ -141,6 +142,33 @@ async def _notify(session_id: str, msg: dict):
         _active_ws.pop(session_id, None)
 
 
+# ── Layer 3 concurrency ─────────────────────────────────────────────────────
+
+# Семафор на провайдера, общий для всех сессий процесса: две параллельные
+# генерации на одном GigaChat не должны удваивать нагрузку на него.
+_provider_semaphores: dict[tuple[str, int], asyncio.Semaphore] = {}
+
+
+def _provider_slots(provider: str) -> asyncio.Semaphore:
+    from agents.llm_client import provider_concurrency
+    limit = provider_concurrency(provider)
+    key = (provider.lower(), limit)
+    sem = _provider_semaphores.get(key)
+    if sem is None:
+        sem = _provider_semaphores[key] = asyncio.Semaphore(limit)
+    return sem
+
+
+async def _flush_ordered(session_id: str, all_cases: list, pending: dict[int, dict]) -> None:
+    """Переносит из pending в all_cases непрерывный по индексам хвост и шлёт
+    case_done в порядке case_list (фронт добавляет кейсы по мере прихода)."""
+    while len(all_cases) in pending:
+        i = len(all_cases)
+        case_dict = pending.pop(i)
+        all_cases.append(case_dict)
+        await _notify(session_id, {"type": "case_done", "i": i + 1, "case": case_dict})
+
+
 # ── Core generation task ────────────────────────────────────────────────────
 
 async def _run_generation(session_id: str):
@@ -159,29 +187,28 @@ async def _run_generation(session_id: str):
     provider = session["provider"]
 
     t_start = time.time()
+    llm = None
 
     try:
-        from agents.prompt_guard import sanitize_input
-        from agents.llm_client import LLMClient
+        from agents.llm_client import AsyncLLMClient
         from agents.layered_generator import LayeredGenerator
 
-        llm = LLMClient(provider=provider)
+        llm = AsyncLLMClient(provider=provider)
         gen = LayeredGenerator(llm)
 
         # Context docs from vector store
         context_docs_text = ""
         try:
-            from db.vector_store import VectorStore
-            vs = VectorStore()
-            similar = vs.find_similar_context_docs(requirement, n_results=5)
+            from db.vector_store import get_vector_store
+            vs = get_vector_store()
+            # Лучшие фрагменты документов, склеенные по документу в пределах
+            # CONTEXT_DOCS_TOKEN_BUDGET — вместо первых 3000 символов каждого
+            similar = await asyncio.to_thread(vs.find_context_passages, requirement)
             if similar:
                 parts = []
                 for doc in similar:
-                    name = doc.get("metadata", {}).get("name", "")
-                    text = doc.get("document", "")
-                    if text:
-                        header = f"[{name}]" if name else "[Документ]"
-                        parts.append(f"{header}\n{text[:3000]}")
+                    header = f"[{doc['name']}]" if doc.get("name") else "[Документ]"
+                    parts.append(f"{header}\n{doc['text']}")
                 context_docs_text = "\n\n---\n\n".join(parts)
         except Exception:
             pass
@@ -196,8 +223,13 @@ async def _run_generation(session_id: str):
             await _notify(session_id, {"type": "layer_start", "layer": 1, "name": "QA документация"})
             store.update_session(session_id, current_layer=1, status="generating")
 
-            qa_doc, qa_doc_truncated = await asyncio.to_thread(
-                gen.generate_qa_doc, requirement, feature, context_docs_text
+            # Документ идёт потоком: layer_delta с кусками текста, layer_done —
+            # итоговый текст целиком (он и сохраняется в сессию).
+            async def _qa_doc_delta(text: str) -> None:
+                await _notify(session_id, {"type": "layer_delta", "layer": 1, "text": text})
+
+            qa_doc, qa_doc_truncated = await gen.agenerate_qa_doc(
+                requirement, feature, context_docs_text, on_delta=_qa_doc_delta,
             )
             t1 = round(time.time() - t_start)
 
@@ -212,9 +244,7 @@ async def _run_generation(session_id: str):
             await _notify(session_id, {"type": "layer_start", "layer": 2, "name": "Список кейсов"})
             store.update_session(session_id, current_layer=2)
 
-            case_list = await asyncio.to_thread(
-                gen.generate_case_list, qa_doc, "", feature
-            )
+            case_list = await gen.agenerate_case_list(qa_doc, "", feature)
             t2 = round(time.time() - t_start)
 
             store.update_session(session_id, case_list=case_list)
@@ -224,27 +254,45 @@ async def _run_generation(session_id: str):
             })
 
         # ── Layer 3: Detailed cases ─────────────────────────────────
+        # Кейсы детализируются параллельно (не больше provider_concurrency запросов
+        # к провайдеру в полёте), но в сессию и в WS уходят строго в порядке
+        # case_list: кейс, готовый раньше соседей, ждёт своей очереди в
+        # cases_pending. Падение посередине теряет только кейсы «в полёте» —
+        # resume доберёт остальные с того же места.
         store.update_session(session_id, current_layer=3)
         total = len(case_list)
         all_cases = list(existing_cases)
-        start_from = len(all_cases)
+        pending = {int(k): v for k, v in (session.get("cases_pending") or {}).items()}
+        await _flush_ordered(session_id, all_cases, pending)
+        todo = [i for i in range(len(all_cases), total) if i not in pending]
+        slots = _provider_slots(provider)
 
-        for i in range(start_from, total):
+        async def _detail_case(i: int) -> tuple[int, dict]:
             case_info = case_list[i]
             case_name = case_info.get("name", "")[:60]
-
-            progress = {"current": i + 1, "total": total, "name": case_name}
-            store.update_session(session_id, layer3_progress=progress)
-            await _notify(session_id, {
-                "type": "case_start", "i": i + 1, "total": total, "name": case_name,
-            })
-
-            tc = await asyncio.to_thread(gen.generate_case_markdown, case_info, qa_doc)
-            case_dict = _tc_to_dict(tc)
-            all_cases.append(case_dict)
-
-            store.update_session(session_id, cases=all_cases)
-            await _notify(session_id, {"type": "case_done", "i": i + 1, "case": case_dict})
+            async with slots:
+                progress = {"current": i + 1, "total": total, "name": case_name}
+                store.update_session(session_id, layer3_progress=progress)
+                await _notify(session_id, {
+                    "type": "case_start", "i": i + 1, "total": total, "name": case_name,
+                })
+                tc = await gen.agenerate_case_markdown(case_info, qa_doc)
+            return i, _tc_to_dict(tc)
+
+        tasks = [asyncio.create_task(_detail_case(i)) for i in todo]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                i, case_dict = await fut
+                store.save_case(session_id, i, case_dict)
+                pending[i] = case_dict
+                await _flush_ordered(session_id, all_cases, pending)
+        finally:
+            # Ошибка одного кейса (или отмена сессии) снимает остальные — иначе
+            # они продолжат жечь квоту провайдера для уже упавшей генерации.
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
         # ── Done ────────────────────────────────────────────────────
         elapsed = round(time.time() - t_start + session.get("elapsed", 0))
@@ -252,7 +300,6 @@ async def _run_generation(session_id: str):
             session_id,
             status="done",
             elapsed=elapsed,
-            cases=all_cases,
             qa_doc=qa_doc,
             qa_doc_truncated=qa_doc_truncated,
             current_layer=3,
@@ -285,6 +332,11 @@ async def _run_generation(session_id: str):
         await _notify(session_id, {"type": "error", "message": msg, "llm_error": is_llm})
     finally:
         _active_tasks.pop(session_id, None)
+        if llm is not None:
+            try:
+                await llm.aclose()
+            except Exception:
+                pass
 
 
 def _start_generation_task(session_id: str) -> asyncio.Task:
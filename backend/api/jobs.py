@@ -25,7 +25,7 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 
-from backend.api.db_connector import get_db_connection
+from backend.api.db_connector import DeadlineExceeded, gather_with_deadline, pooled_connection
 from db.jobs_store import JobsStore
 from db.testdata_connections import TestDataConnectionsStore
 
@@ -57,6 +57,8 @@ class ExecuteRequest(BaseModel):
 class BatchExecuteRequest(BaseModel):
     job_ids:   list[str]
     offset_ms: int = 30000
+    # Срок ожидания всей пачки; не успевшие джобы доработают в фоне и запишут историю
+    timeout_sec: float = Field(default=60, gt=0, le=600)
 
 
 # ── DB executor ──────────────────────────────────────────────────────────────
@@ -66,15 +68,15 @@ def _execute_update_sync(conn_config: dict, sql: str) -> dict:
     Подключается к внешней БД (через тот же реестр драйверов, что и «Тестовые
     данные») и выполняет UPDATE-запрос. Возвращает {"rows_affected": N}.
     """
-    conn, _driver = get_db_connection(conn_config)
-    try:
+    with pooled_connection(conn_config) as (conn, _driver):
         cur = conn.cursor()
-        cur.execute(sql)
-        rows = cur.rowcount
+        try:
+            cur.execute(sql)
+            rows = cur.rowcount
+        finally:
+            cur.close()
         conn.commit()
         return {"rows_affected": rows}
-    finally:
-        conn.close()
 
 
 def _build_sql(template: str, nextfiretime: int) -> str:
@@ -177,21 +179,30 @@ async def execute_job(job_id: str, req: ExecuteRequest = ExecuteRequest()) -> di
 
 @router.post("/api/jobs/execute-batch")
 async def execute_batch(req: BatchExecuteRequest) -> dict:
-    """Запустить несколько джобов (для запуска папки)."""
+    """Запустить несколько джобов (для запуска папки) — параллельно, с общим сроком ожидания."""
+    job_ids = list(dict.fromkeys(req.job_ids))
+    outcomes = await gather_with_deadline(
+        {jid: execute_job(jid, ExecuteRequest(offset_ms=req.offset_ms)) for jid in job_ids},
+        req.timeout_sec,
+        cancel_pending=False,
+    )
     results = []
-    for jid in req.job_ids:
-        try:
-            r = await execute_job(jid, ExecuteRequest(offset_ms=req.offset_ms))
+    for jid in job_ids:
+        r = outcomes[jid]
+        if isinstance(r, DeadlineExceeded):
+            results.append({"ok": False, "job_id": jid, "timed_out": True,
+                            "error": f"Нет ответа за {req.timeout_sec:g} с — джоб продолжает выполняться"})
+        elif isinstance(r, HTTPException):
+            results.append({"ok": False, "job_id": jid, "error": r.detail})
+        elif isinstance(r, BaseException):
+            results.append({"ok": False, "job_id": jid, "error": str(r)})
+        else:
             results.append(r)
-        except HTTPException as e:
-            results.append({"ok": False, "job_id": jid, "error": e.detail})
-        except Exception as e:
-            results.append({"ok": False, "job_id": jid, "error": str(e)})
     ok_count = sum(1 for r in results if r.get("ok"))
     return {
-        "total":   len(req.job_ids),
+        "total":   len(job_ids),
         "ok":      ok_count,
-        "failed":  len(req.job_ids) - ok_count,
+        "failed":  len(job_ids) - ok_count,
         "results": results,
     }
 
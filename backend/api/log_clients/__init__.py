@@ -6,8 +6,18 @@
   - Elasticsearch / OpenSearch
   - Grafana Loki
   - Generic REST (произвольный endpoint)
+
+Клиенты кэшируются на подключение VPS (client_for_connection): у каждого
+своя Session с keep-alive пулом, поэтому повторные поиски не открывают
+TCP+TLS заново. Правка подключения меняет подпись конфига — клиент
+пересоздаётся; сохранение LOGS_VPS_CONNECTIONS сбрасывает кэш целиком
+(invalidate_clients).
 """
 
+import hashlib
+import json
+import threading
+
 from backend.api.log_clients.base import LogSourceClient, LogEntry
 from backend.api.log_clients.graylog import GraylogClient
 from backend.api.log_clients.elastic import ElasticClient
@@ -30,8 +40,69 @@ def get_client(vps_type: str, **kwargs) -> LogSourceClient:
     return cls(**kwargs)
 
 
+_clients: dict[str, tuple[str, LogSourceClient]] = {}
+_clients_lock = threading.Lock()
+
+
+def _client_kwargs(conn: dict) -> dict:
+    """kwargs get_client из подключения VPS (LOGS_VPS_CONNECTIONS)."""
+    return {
+        "vps_type": conn.get("vps_type", "generic"),
+        "base_url": conn.get("base_url", ""),
+        "auth_type": conn.get("auth_type", "none"),
+        "token": conn.get("token", ""),
+        "username": conn.get("username", ""),
+        "password": conn.get("password", ""),
+        "api_key_header": conn.get("api_key_header", "Authorization"),
+        "ssl_verify": conn.get("ssl_verify", True),
+        "ca_cert_path": conn.get("ca_cert_path", ""),
+        "default_index": conn.get("default_index", ""),
+        "fingerprint_masks": conn.get("fingerprint_masks"),
+        "fingerprint_patterns": conn.get("fingerprint_patterns") or [],
+    }
+
+
+def _signature(kwargs: dict) -> str:
+    """Хэш конфига клиента. Секреты в открытом виде не хранятся."""
+    raw = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def client_for_connection(conn: dict) -> LogSourceClient:
+    """Клиент подключения VPS из кэша (по id); при изменении конфига — новый."""
+    kwargs = _client_kwargs(conn)
+    signature = _signature(kwargs)
+    key = str(conn.get("id", "")).lower() or signature
+    with _clients_lock:
+        cached = _clients.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        client = get_client(**kwargs)
+        _clients[key] = (signature, client)
+    if cached is not None:
+        cached[1].close()
+    return client
+
+
+def invalidate_clients(conn_id: str = "") -> None:
+    """Сбросить кэш клиентов (одного подключения или всех) и закрыть их соединения."""
+    with _clients_lock:
+        if conn_id:
+            stale = [_clients.pop(conn_id.lower())] if conn_id.lower() in _clients else []
+        else:
+            stale = list(_clients.values())
+            _clients.clear()
+    for _, client in stale:
+        client.close()
+
+
+def close_clients() -> None:
+    """Закрыть все HTTP-сессии клиентов — на shutdown приложения."""
+    invalidate_clients()
+
+
 __all__ = [
     "LogSourceClient", "LogEntry",
     "GraylogClient", "ElasticClient", "LokiClient", "GenericRestClient",
-    "get_client",
+    "get_client", "client_for_connection", "invalidate_clients", "close_clients",
 ]
@@ -1,14 +1,31 @@
 """
 Абстрактный клиент для платформ агрегации логов.
+
+Поиск постраничный: реализации отдают страницы через _pages (курсор
+search_after у Elastic, сдвиг окна времени у Loki, offset у Graylog и
+Generic), а iter_search/search режут их общим бюджетом строк. Раньше
+каждый клиент делал один запрос с min(limit, 500) — ночь ошибок молча
+обрезалась до первых 500 записей.
+
+HTTP идёт через собственную requests.Session клиента: keep-alive пул
+соединений и повторы с backoff на обрывы и 429/502/503/504. Раньше каждый
+вызов открывал новое TCP+TLS-соединение через голый requests.get/post.
+Клиенты кэшируются на подключение VPS (client_for_connection в __init__).
 """
 
 from __future__ import annotations
 
-import hashlib
+import os
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from backend.api.log_clients.fingerprint import DEFAULT_NORMALIZER, FingerprintNormalizer, get_normalizer
 
 
 @dataclass
@@ -21,16 +38,19 @@ class LogEntry:
     message: str                        # первая строка / summary
     stacktrace: str = ""                # полный стектрейс (если есть)
     metadata: dict[str, Any] = field(default_factory=dict)  # pod, node, trace_id и пр.
+    # Нормализатор источника (маски подключения VPS); None — встроенные маски
+    normalizer: Optional[FingerprintNormalizer] = field(default=None, repr=False, compare=False)
 
     @property
     def fingerprint(self) -> str:
         """
         Fingerprint для группировки одинаковых ошибок.
-        Берём первые 3 строки стектрейса + service + level.
+        Первые 3 строки стектрейса + service + level; UUID, числа, адреса и
+        прочие изменчивые токены перед хэшированием маскируются.
         """
-        st_lines = self.stacktrace.strip().splitlines()[:3] if self.stacktrace else []
-        raw = f"{self.service}|{self.level}|{'|'.join(st_lines)}"
-        return hashlib.md5(raw.encode()).hexdigest()[:12]
+        return (self.normalizer or DEFAULT_NORMALIZER).fingerprint(
+            self.service, self.level, self.stacktrace, self.message,
+        )
 
     def to_dict(self) -> dict:
         return {
@@ -47,17 +67,39 @@ class LogEntry:
 
 @dataclass
 class LogSearchResult:
-    """Результат поиска логов."""
+    """Результат поиска логов (или одна страница iter_search)."""
     entries: list[LogEntry]
     total: int = 0
+    truncated: bool = False             # упёрлись в лимит/бюджет строк — дальше есть ещё
 
     def to_dict(self) -> dict:
         return {
             "entries": [e.to_dict() for e in self.entries],
             "total": self.total,
+            "truncated": self.truncated,
         }
 
 
+# Сколько записей запрашивать у платформы за раз
+PAGE_SIZE = 500
+_DEFAULT_MAX_ROWS = 20_000
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return max(0, cast(os.getenv(name, "") or default))
+    except ValueError:
+        return default
+
+
+def max_rows_budget() -> int:
+    """Общий потолок строк на один поиск (LOGS_MAX_ROWS) — память и время VPS."""
+    try:
+        return max(1, int(os.getenv("LOGS_MAX_ROWS", "") or _DEFAULT_MAX_ROWS))
+    except ValueError:
+        return _DEFAULT_MAX_ROWS
+
+
 class LogSourceClient(ABC):
     """
     Абстрактный клиент для работы с платформой агрегации логов.
@@ -75,6 +117,8 @@ class LogSourceClient(ABC):
         ssl_verify: bool = True,
         ca_cert_path: str = "",
         default_index: str = "",
+        fingerprint_masks: Optional[list[str]] = None,
+        fingerprint_patterns: Optional[list[str]] = None,
         **kwargs,
     ):
         self.base_url = base_url.rstrip("/")
@@ -86,6 +130,40 @@ class LogSourceClient(ABC):
         self.ssl_verify = ssl_verify
         self.ca_cert_path = ca_cert_path or None
         self.default_index = default_index
+        self.normalizer = get_normalizer(fingerprint_masks, fingerprint_patterns)
+        self.session = self._make_session()
+
+    @staticmethod
+    def _make_session() -> requests.Session:
+        """
+        Session с keep-alive пулом и повторами: обрывы соединения и
+        429/502/503/504 повторяются LOGS_HTTP_RETRIES раз с экспоненциальной
+        паузой от LOGS_HTTP_BACKOFF_SEC (Retry-After учитывается).
+        """
+        retry = Retry(
+            total=_env_number("LOGS_HTTP_RETRIES", 2),
+            backoff_factor=_env_number("LOGS_HTTP_BACKOFF_SEC", 0.5, float),
+            status_forcelist=(429, 502, 503, 504),
+            # POST у Elastic — это _search, повторять безопасно
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+        )
+        pool_size = max(1, _env_number("LOGS_HTTP_POOL_SIZE", 4))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Закрыть соединения пула (клиент заменён или приложение останавливается)."""
+        self.session.close()
+
+    def _attach(self, entries: list[LogEntry]) -> list[LogEntry]:
+        """Привязать к записям нормализатор fingerprint этого источника."""
+        for entry in entries:
+            entry.normalizer = self.normalizer
+        return entries
 
     def _build_headers(self) -> dict[str, str]:
         """Собрать заголовки авторизации."""
@@ -108,7 +186,6 @@ class LogSourceClient(ABC):
             return self.ca_cert_path
         return self.ssl_verify
 
-    @abstractmethod
     def search(
         self,
         services: list[str],
@@ -118,7 +195,73 @@ class LogSourceClient(ABC):
         query: str = "",
         limit: int = 100,
     ) -> LogSearchResult:
-        """Поиск логов по фильтрам."""
+        """Поиск логов по фильтрам: первые limit записей (не больше LOGS_MAX_ROWS), новые сверху."""
+        entries: list[LogEntry] = []
+        total, truncated = 0, False
+        for page in self.iter_search(services, level, time_from, time_to, query, max_rows=limit):
+            entries.extend(page.entries)
+            total, truncated = page.total, page.truncated
+        return LogSearchResult(entries=entries, total=max(total, len(entries)), truncated=truncated)
+
+    def iter_search(
+        self,
+        services: list[str],
+        level: str,
+        time_from: datetime,
+        time_to: datetime,
+        query: str = "",
+        max_rows: Optional[int] = None,
+        page_size: int = PAGE_SIZE,
+    ) -> Iterator[LogSearchResult]:
+        """
+        Страницы результата поиска, новые записи сверху.
+
+        Останавливается на max_rows (не больше общего бюджета LOGS_MAX_ROWS);
+        у последней страницы truncated=True, если платформа отдала бы ещё.
+        total страницы — сколько всего нашла платформа (если она это
+        сообщает), иначе сколько отдано на текущий момент.
+        """
+        budget = min(max_rows or max_rows_budget(), max_rows_budget())
+        # На одну запись больше бюджета — чтобы отличить «ровно столько» от «есть ещё»
+        size = max(1, min(page_size, budget + 1))
+        left, seen = budget, 0
+        pages = self._pages(services, level, time_from, time_to, query, size)
+        try:
+            for page in pages:
+                entries = page.entries[:left]
+                left -= len(entries)
+                seen += len(entries)
+                truncated = False
+                if left <= 0:
+                    if len(page.entries) > len(entries) or page.total > seen:
+                        truncated = True
+                    elif len(page.entries) >= size:
+                        # Полная страница кончилась ровно на бюджете — есть ли ещё,
+                        # знает только следующая страница
+                        following = next(pages, None)
+                        truncated = following is not None and bool(following.entries)
+                yield LogSearchResult(entries=self._attach(entries), total=max(page.total, seen), truncated=truncated)
+                if left <= 0:
+                    return
+        finally:
+            # Бюджет кончился раньше выборки — закрыть генератор сразу (Elastic закроет PIT)
+            pages.close()
+
+    @abstractmethod
+    def _pages(
+        self,
+        services: list[str],
+        level: str,
+        time_from: datetime,
+        time_to: datetime,
+        query: str,
+        page_size: int,
+    ) -> Iterator[LogSearchResult]:
+        """
+        Страницы платформы по page_size записей, новые сверху, до конца
+        выборки. total — сколько всего нашла платформа (0 — не сообщает).
+        Обрезку бюджетом и привязку нормализатора делает iter_search.
+        """
         ...
 
     @abstractmethod
@@ -1,36 +1,42 @@
 """
 Клиент для Elasticsearch / OpenSearch REST API.
 
-Поиск через /_search endpoint с query DSL.
+Поиск через /_search endpoint с query DSL. Глубокий поиск — курсором
+search_after внутри point-in-time (PIT): снимок индекса не меняется между
+страницами, а _shard_doc — уникальный тай-брейк для записей с одинаковым
+@timestamp. Где PIT нет (OpenSearch, Elasticsearch < 7.10), тай-брейк — _id.
 """
 
 from __future__ import annotations
 
 import uuid
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
 from backend.api.log_clients.base import LogSourceClient, LogEntry, LogSearchResult
 
+# Сколько PIT живёт между страницами (продлевается каждым запросом)
+_PIT_KEEP_ALIVE = "1m"
+
 
 class ElasticClient(LogSourceClient):
     """
     Работает с Elasticsearch / OpenSearch REST API.
     """
 
-    def search(
+    def _pages(
         self,
         services: list[str],
         level: str,
         time_from: datetime,
         time_to: datetime,
-        query: str = "",
-        limit: int = 100,
-    ) -> LogSearchResult:
+        query: str,
+        page_size: int,
+    ) -> Iterator[LogSearchResult]:
+        """Страницы по курсору search_after (без глубокого from/size и его окна в 10 000)."""
         index = self.default_index or "*"
-        url = f"{self.base_url}/{index}/_search"
 
         must: list[dict] = []
 
@@ -82,32 +88,84 @@ class ElasticClient(LogSourceClient):
                 }
             })
 
-        body = {
-            "size": min(limit, 500),
-            "sort": [{"@timestamp": {"order": "desc"}}],
+        body: dict[str, Any] = {
+            "size": page_size,
             "query": {"bool": {"must": must}},
+            "track_total_hits": True,
         }
 
-        resp = requests.post(
-            url,
-            json=body,
-            headers={**self._build_headers(), "Content-Type": "application/json"},
+        # _doc без PIT не уникален между шардами и не стабилен между запросами —
+        # записи с одинаковым @timestamp терялись бы или повторялись на границе страниц
+        pit_id = self._open_pit(index)
+        if pit_id:
+            url = f"{self.base_url}/_search"
+            tiebreaker = {"_shard_doc": {"order": "asc"}}
+        else:
+            url = f"{self.base_url}/{index}/_search"
+            tiebreaker = {"_id": {"order": "asc"}}
+        body["sort"] = [{"@timestamp": {"order": "desc"}}, tiebreaker]
+
+        total = 0
+        try:
+            while True:
+                if pit_id:
+                    body["pit"] = {"id": pit_id, "keep_alive": _PIT_KEEP_ALIVE}
+                resp = self.session.post(
+                    url,
+                    json=body,
+                    headers={**self._build_headers(), "Content-Type": "application/json"},
+                    auth=self._build_auth(),
+                    verify=self._verify_arg(),
+                    timeout=30,
+                )
+                resp.raise_for_status()
+                data = resp.json()
+                # Elasticsearch может вернуть новый id PIT — дальше идём по нему
+                pit_id = data.get("pit_id") or pit_id
+
+                hits = data.get("hits", {})
+                total_raw = hits.get("total", total)
+                total = total_raw.get("value", 0) if isinstance(total_raw, dict) else total_raw
+                page = hits.get("hits", [])
+
+                yield LogSearchResult(entries=[self._parse_hit(hit) for hit in page], total=total)
+
+                if len(page) < page_size or not page[-1].get("sort"):
+                    return
+                body["search_after"] = page[-1]["sort"]
+                # Считать total заново на каждой странице незачем
+                body["track_total_hits"] = False
+        finally:
+            if pit_id:
+                self._close_pit(pit_id)
+
+    def _open_pit(self, index: str) -> str:
+        """Открыть point-in-time; пустая строка — PIT не поддерживается."""
+        resp = self.session.post(
+            f"{self.base_url}/{index}/_pit",
+            params={"keep_alive": _PIT_KEEP_ALIVE},
+            headers=self._build_headers(),
             auth=self._build_auth(),
             verify=self._verify_arg(),
-            timeout=30,
+            timeout=15,
         )
-        resp.raise_for_status()
-        data = resp.json()
-
-        hits = data.get("hits", {})
-        total_raw = hits.get("total", 0)
-        total = total_raw.get("value", 0) if isinstance(total_raw, dict) else total_raw
-
-        entries = []
-        for hit in hits.get("hits", []):
-            entries.append(self._parse_hit(hit))
+        if resp.status_code != 200:
+            return ""
+        return resp.json().get("id") or ""
 
-        return LogSearchResult(entries=entries, total=total)
+    def _close_pit(self, pit_id: str) -> None:
+        """Закрыть PIT сразу, не дожидаясь keep_alive. Ошибка не важна — истечёт сам."""
+        try:
+            self.session.delete(
+                f"{self.base_url}/_pit",
+                json={"id": pit_id},
+                headers={**self._build_headers(), "Content-Type": "application/json"},
+                auth=self._build_auth(),
+                verify=self._verify_arg(),
+                timeout=10,
+            )
+        except Exception:
+            pass
 
     def get_services(self) -> list[str]:
         """Агрегация по полям service / application."""
@@ -139,7 +197,7 @@ class ElasticClient(LogSourceClient):
         }
 
         try:
-            resp = requests.post(
+            resp = self.session.post(
                 url,
                 json=body,
                 headers={**self._build_headers(), "Content-Type": "application/json"},
@@ -164,7 +222,7 @@ class ElasticClient(LogSourceClient):
 
     def test_connection(self) -> dict:
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 self.base_url,
                 headers=self._build_headers(),
                 auth=self._build_auth(),
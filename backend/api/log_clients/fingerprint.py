@@ -0,0 +1,115 @@
+"""
+Нормализация текста ошибок перед расчётом fingerprint.
+
+Раньше fingerprint хэшировал сырые первые строки стектрейса: UUID, id
+запросов, таймстемпы, сдвиг номеров строк и адреса объектов
+(`Foo@1b6d3586`) разбивали одну логическую ошибку на десятки групп — и
+каждая уходила в LLM отдельно. Теперь изменчивые токены заменяются
+метками (`<UUID>`, `<NUM>`, …) одним заранее скомпилированным regex,
+а нормализованные строки кэшируются (кадры стектрейса повторяются).
+
+Набор масок настраивается на источник логов (поля подключения VPS
+`fingerprint_masks` / `fingerprint_patterns`); нормализатор на каждый
+набор компилируется один раз (get_normalizer).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Iterable, Optional
+
+# Имя маски → (regex, метка). Порядок важен: при совпадении в одной позиции
+# выигрывает более ранняя маска (UUID раньше hex, таймстемп раньше чисел).
+_MASKS: dict[str, tuple[str, str]] = {
+    "quoted": (r""""(?:[^"\\\n]|\\.)*"|(?<!\w)'(?:[^'\\\n]|\\.)*'(?!\w)""", "<STR>"),
+    "uuid": (r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b", "<UUID>"),
+    "timestamp": (
+        r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+        r"|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b",
+        "<TS>",
+    ),
+    "ip": (r"\b(?:\d{1,3}\.){3}\d{1,3}(?::\d{1,5})?\b", "<IP>"),
+    "hex": (
+        r"\b0[xX][0-9a-fA-F]+\b|(?<=@)[0-9a-fA-F]{4,}\b"
+        r"|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b",
+        "<HEX>",
+    ),
+    "number": (r"(?<![A-Za-z_\d])\d+(?:\.\d+)*", "<NUM>"),
+}
+
+DEFAULT_MASKS: tuple[str, ...] = tuple(_MASKS)
+
+# Сколько первых строк стектрейса определяют группу
+_FINGERPRINT_LINES = 3
+
+
+class FingerprintNormalizer:
+    """Маскирует изменчивые токены и считает fingerprint записи лога."""
+
+    def __init__(self, masks: Iterable[str] = DEFAULT_MASKS, patterns: Iterable[str] = ()):
+        self.masks = tuple(masks)
+        self.patterns = tuple(p for p in patterns if p)
+        unknown = [m for m in self.masks if m not in _MASKS]
+        if unknown:
+            raise ValueError(f"Неизвестные маски fingerprint: {unknown}. Доступные: {list(_MASKS)}")
+
+        # Свои шаблоны источника применяются первым проходом: они точнее знают свой лог
+        for pattern in self.patterns:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Некорректный шаблон fingerprint {pattern!r}: {e}") from e
+        self._custom = re.compile("|".join(f"(?:{p})" for p in self.patterns)) if self.patterns else None
+
+        # Любая встроенная маска начинается с цифры, hex-буквы или кавычки —
+        # опережающая проверка отсекает остальные позиции до перебора альтернатив
+        self._labels = {name: _MASKS[name][1] for name in self.masks}
+        groups = "|".join(f"(?P<{name}>{_MASKS[name][0]})" for name in self.masks)
+        self._regex = re.compile(f"(?=[0-9a-fA-F\"'])(?:{groups})") if groups else None
+        # Строки фреймов («at com.x.Foo.bar(Foo.java:42)») повторяются постоянно
+        self._normalize_line = lru_cache(maxsize=8192)(self._substitute)
+
+    def _substitute(self, line: str) -> str:
+        line = line.strip()
+        if self._custom is not None:
+            line = self._custom.sub("<*>", line)
+        if self._regex is not None:
+            labels = self._labels
+            line = self._regex.sub(lambda m: labels[m.lastgroup], line)
+        return line
+
+    def normalize(self, text: str) -> str:
+        return "\n".join(self._normalize_line(line) for line in text.splitlines())
+
+    def fingerprint(self, service: str, level: str, stacktrace: str, message: str = "") -> str:
+        """
+        Fingerprint группы: service + level + первые строки стектрейса после
+        нормализации. Без стектрейса берётся первая строка сообщения —
+        иначе все ошибки сервиса без стектрейса слились бы в одну группу.
+        """
+        lines = stacktrace.strip().splitlines()[:_FINGERPRINT_LINES] if stacktrace else []
+        if not lines and message:
+            lines = message.strip().splitlines()[:1]
+        raw = f"{service}|{level}|{'|'.join(self._normalize_line(line) for line in lines)}"
+        return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=64)
+def _cached_normalizer(masks: tuple[str, ...], patterns: tuple[str, ...]) -> FingerprintNormalizer:
+    return FingerprintNormalizer(masks, patterns)
+
+
+def get_normalizer(
+    masks: Optional[Iterable[str]] = None,
+    patterns: Optional[Iterable[str]] = None,
+) -> FingerprintNormalizer:
+    """Нормализатор на набор масок (None — все встроенные); компилируется один раз."""
+    return _cached_normalizer(
+        DEFAULT_MASKS if masks is None else tuple(masks),
+        tuple(patterns or ()),
+    )
+
+
+DEFAULT_NORMALIZER = get_normalizer()
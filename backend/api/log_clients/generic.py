@@ -1,7 +1,7 @@
 """
 Generic REST клиент для произвольных API логов.
 
-Отправляет GET-запрос на base_url с query-параметрами,
+Отправляет GET-запросы на base_url с query-параметрами (постранично, limit/offset),
 парсит JSON-ответ по настраиваемым полям.
 """
 
@@ -9,7 +9,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
@@ -22,20 +22,25 @@ class GenericRestClient(LogSourceClient):
     Ожидает JSON-массив объектов с полями, указанными в параметрах.
     """
 
-    def search(
+    def _pages(
         self,
         services: list[str],
         level: str,
         time_from: datetime,
         time_to: datetime,
-        query: str = "",
-        limit: int = 100,
-    ) -> LogSearchResult:
+        query: str,
+        page_size: int,
+    ) -> Iterator[LogSearchResult]:
+        """
+        Страницы по параметрам limit/offset. Если API offset не понимает
+        (вернул ту же страницу) или отдал неполную страницу — выборка кончилась.
+        """
         params: dict[str, str] = {
             "from": time_from.isoformat(),
             "to": time_to.isoformat(),
             "level": level.upper(),
-            "limit": str(min(limit, 500)),
+            "limit": str(page_size),
+            "offset": "0",
         }
 
         if services:
@@ -45,35 +50,47 @@ class GenericRestClient(LogSourceClient):
 
         endpoint = self.default_index.strip("/") if self.default_index else "logs"
 
-        resp = requests.get(
-            f"{self.base_url}/{endpoint}",
-            params=params,
-            headers=self._build_headers(),
-            auth=self._build_auth(),
-            verify=self._verify_arg(),
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        # Поддерживаем разные форматы ответа
-        if isinstance(data, list):
-            items = data
-            total = len(data)
-        elif isinstance(data, dict):
-            items = data.get("items", data.get("logs", data.get("entries", data.get("results", []))))
-            total = data.get("total", data.get("count", len(items)))
-        else:
-            items = []
-            total = 0
-
-        entries = [self._parse_item(item) for item in items[:limit]]
-        return LogSearchResult(entries=entries, total=total)
+        offset, first_items = 0, None
+        while True:
+            params["offset"] = str(offset)
+            resp = self.session.get(
+                f"{self.base_url}/{endpoint}",
+                params=params,
+                headers=self._build_headers(),
+                auth=self._build_auth(),
+                verify=self._verify_arg(),
+                timeout=30,
+            )
+            resp.raise_for_status()
+            data = resp.json()
+
+            # Поддерживаем разные форматы ответа
+            if isinstance(data, list):
+                items = data
+                total = 0
+            elif isinstance(data, dict):
+                items = data.get("items", data.get("logs", data.get("entries", data.get("results", []))))
+                total = data.get("total", data.get("count", 0))
+            else:
+                items = []
+                total = 0
+
+            if offset and items[:3] == first_items:
+                return                       # offset проигнорирован — дальше та же страница
+            first_items = items[:3]
+
+            entries = [self._parse_item(item) for item in items]
+            if entries:
+                yield LogSearchResult(entries=entries, total=total if isinstance(total, int) else 0)
+            # Неполная страница — конец; больше limit — API не пагинирует и отдал всё сразу
+            if len(items) != page_size:
+                return
+            offset += page_size
 
     def get_services(self) -> list[str]:
         """Попробовать получить список сервисов через endpoint /services."""
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/services",
                 headers=self._build_headers(),
                 auth=self._build_auth(),
@@ -93,7 +110,7 @@ class GenericRestClient(LogSourceClient):
 
     def test_connection(self) -> dict:
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 self.base_url,
                 headers=self._build_headers(),
                 auth=self._build_auth(),
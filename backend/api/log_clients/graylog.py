@@ -8,12 +8,15 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
 from backend.api.log_clients.base import LogSourceClient, LogEntry, LogSearchResult
 
+# index.max_result_window Elasticsearch под Graylog: offset + limit дальше не отдаются
+_MAX_RESULT_WINDOW = 10_000
+
 
 class GraylogClient(LogSourceClient):
     """
@@ -21,15 +24,21 @@ class GraylogClient(LogSourceClient):
     Поиск через /api/search/universal/absolute.
     """
 
-    def search(
+    def _pages(
         self,
         services: list[str],
         level: str,
         time_from: datetime,
         time_to: datetime,
-        query: str = "",
-        limit: int = 100,
-    ) -> LogSearchResult:
+        query: str,
+        page_size: int,
+    ) -> Iterator[LogSearchResult]:
+        """
+        Страницы по offset. Graylog не отдаёт дальше окна Elasticsearch
+        (offset + limit ≤ 10 000), поэтому у края окна верхняя граница
+        времени сдвигается к самой старой полученной записи, offset
+        сбрасывается, а уже отданные записи на этой границе пропускаются.
+        """
         # Формируем Graylog query
         parts: list[str] = []
 
@@ -56,9 +65,10 @@ class GraylogClient(LogSourceClient):
 
         params = {
             "query": q,
-            "from": time_from.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-            "to": time_to.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-            "limit": min(limit, 500),
+            "from": self._format_ts(time_from),
+            "to": self._format_ts(time_to),
+            "limit": page_size,
+            "offset": 0,
             "sort": "timestamp:desc",
             "fields": "timestamp,source,level,message,full_message",
         }
@@ -66,26 +76,40 @@ class GraylogClient(LogSourceClient):
         if self.default_index:
             params["filter"] = f"streams:{self.default_index}"
 
-        resp = requests.get(
-            f"{self.base_url}/api/search/universal/absolute",
-            params=params,
-            headers=self._build_headers(),
-            auth=self._build_auth(),
-            verify=self._verify_arg(),
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        entries = []
-        for msg in data.get("messages", []):
-            m = msg.get("message", {})
-            entries.append(self._parse_message(m))
+        total = 0
+        boundary_ids: set[str] = set()       # отданные записи с меткой времени = params["to"]
+        while True:
+            resp = self.session.get(
+                f"{self.base_url}/api/search/universal/absolute",
+                params=params,
+                headers=self._build_headers(),
+                auth=self._build_auth(),
+                verify=self._verify_arg(),
+                timeout=30,
+            )
+            resp.raise_for_status()
+            data = resp.json()
+
+            messages = data.get("messages", [])
+            total = max(total, data.get("total_results", 0))
+            entries = [self._parse_message(msg.get("message", {})) for msg in messages]
+            fresh = [e for e in entries if e.id not in boundary_ids]
+            if fresh:
+                yield LogSearchResult(entries=fresh, total=total)
+
+            if len(messages) < page_size or not entries:
+                return
+            params["offset"] += page_size
+            if params["offset"] + page_size > _MAX_RESULT_WINDOW:
+                oldest = self._format_ts(entries[-1].timestamp)
+                if oldest == params["to"]:
+                    return                   # всё окно — одна миллисекунда; дальше не сдвинуться
+                boundary_ids = {e.id for e in entries if self._format_ts(e.timestamp) == oldest}
+                params["to"], params["offset"] = oldest, 0
 
-        return LogSearchResult(
-            entries=entries,
-            total=data.get("total_results", len(entries)),
-        )
+    @staticmethod
+    def _format_ts(ts: datetime) -> str:
+        return ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z"
 
     def get_services(self) -> list[str]:
         """
@@ -102,7 +126,7 @@ class GraylogClient(LogSourceClient):
                 "to": now.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
                 "field": "source",
             }
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/api/search/universal/absolute/terms",
                 params=params,
                 headers=self._build_headers(),
@@ -135,7 +159,7 @@ class GraylogClient(LogSourceClient):
 
     def test_connection(self) -> dict:
         try:
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/api/system",
                 headers=self._build_headers(),
                 auth=self._build_auth(),
@@ -8,7 +8,7 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
@@ -21,15 +21,21 @@ class LokiClient(LogSourceClient):
     Поиск через /loki/api/v1/query_range.
     """
 
-    def search(
+    def _pages(
         self,
         services: list[str],
         level: str,
         time_from: datetime,
         time_to: datetime,
-        query: str = "",
-        limit: int = 100,
-    ) -> LogSearchResult:
+        query: str,
+        page_size: int,
+    ) -> Iterator[LogSearchResult]:
+        """
+        Страницы сдвигом окна времени: Loki отдаёт последние limit строк
+        окна (direction=backward), следующий запрос — с end на самой старой
+        из них. Граница включается (+1 нс), а уже отданные на ней строки
+        пропускаются — записи с одинаковой меткой времени не теряются.
+        """
         # Формируем LogQL
         label_parts: list[str] = []
 
@@ -54,46 +60,61 @@ class LokiClient(LogSourceClient):
 
         logql = f'{{{label_selector}}}{level_filter}{text_filter}'
 
-        params = {
-            "query": logql,
-            "start": str(int(time_from.timestamp() * 1e9)),
-            "end": str(int(time_to.timestamp() * 1e9)),
-            "limit": min(limit, 500),
-            "direction": "backward",
-        }
-
-        resp = requests.get(
-            f"{self.base_url}/loki/api/v1/query_range",
-            params=params,
-            headers=self._build_headers(),
-            auth=self._build_auth(),
-            verify=self._verify_arg(),
-            timeout=30,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        entries: list[LogEntry] = []
-        results = data.get("data", {}).get("result", [])
-
-        for stream in results:
-            labels = stream.get("stream", {})
-            service = (
-                labels.get("job")
-                or labels.get("app")
-                or labels.get("container")
-                or labels.get("service_name")
-                or "unknown"
+        start_ns = int(time_from.timestamp() * 1e9)
+        end_ns = int(time_to.timestamp() * 1e9)
+        sent = 0
+        boundary: set[tuple] = set()         # (ts_ns, labels, line), уже отданные у границы end_ns
+        while end_ns > start_ns:
+            params = {
+                "query": logql,
+                "start": str(start_ns),
+                "end": str(end_ns),
+                "limit": page_size,
+                "direction": "backward",
+            }
+            resp = self.session.get(
+                f"{self.base_url}/loki/api/v1/query_range",
+                params=params,
+                headers=self._build_headers(),
+                auth=self._build_auth(),
+                verify=self._verify_arg(),
+                timeout=30,
             )
-            for val in stream.get("values", []):
-                ts_ns, line = val[0], val[1]
-                entries.append(self._parse_line(ts_ns, line, service, labels))
-
-        # Сортировка по времени (desc)
-        entries.sort(key=lambda e: e.timestamp, reverse=True)
-        entries = entries[:limit]
+            resp.raise_for_status()
+            data = resp.json()
+
+            rows: list[tuple[int, tuple, str, str, dict]] = []
+            for stream in data.get("data", {}).get("result", []):
+                labels = stream.get("stream", {})
+                service = (
+                    labels.get("job")
+                    or labels.get("app")
+                    or labels.get("container")
+                    or labels.get("service_name")
+                    or "unknown"
+                )
+                label_key = tuple(sorted(labels.items()))
+                for val in stream.get("values", []):
+                    rows.append((int(val[0]), label_key, val[1], service, labels))
+
+            # Сортировка по времени (desc) — Loki группирует строки по потокам
+            rows.sort(key=lambda r: r[0], reverse=True)
+            fresh = [r for r in rows if r[:3] not in boundary]
+            if fresh:
+                sent += len(fresh)
+                yield LogSearchResult(
+                    entries=[self._parse_line(str(ts), line, service, labels)
+                             for ts, _, line, service, labels in fresh],
+                    total=sent,
+                )
 
-        return LogSearchResult(entries=entries, total=len(entries))
+            if len(rows) < page_size or not fresh:
+                return
+            oldest = rows[-1][0]
+            # end исключается, поэтому +1 нс; строки на oldest+1 тоже помним —
+            # на случай Loki, у которого end включён
+            boundary = {r[:3] for r in rows if r[0] <= oldest + 1}
+            end_ns = oldest + 1
 
     def get_services(self) -> list[str]:
         """Получить список значений label 'job' за последние 24 часа."""
@@ -101,7 +122,7 @@ class LokiClient(LogSourceClient):
 
         for label_name in ("job", "app", "container", "service_name"):
             try:
-                resp = requests.get(
+                resp = self.session.get(
                     f"{self.base_url}/loki/api/v1/label/{label_name}/values",
                     headers=self._build_headers(),
                     auth=self._build_auth(),
@@ -120,7 +141,7 @@ class LokiClient(LogSourceClient):
     def test_connection(self) -> dict:
         try:
             # Проверяем доступность через /ready или /loki/api/v1/labels
-            resp = requests.get(
+            resp = self.session.get(
                 f"{self.base_url}/ready",
                 headers=self._build_headers(),
                 auth=self._build_auth(),
@@ -131,7 +152,7 @@ class LokiClient(LogSourceClient):
                 return {"status": "green", "message": "Loki — подключено (ready)"}
 
             # Fallback
-            resp2 = requests.get(
+            resp2 = self.session.get(
                 f"{self.base_url}/loki/api/v1/labels",
                 headers=self._build_headers(),
                 auth=self._build_auth(),
@@ -89,20 +89,9 @@ def _get_vps_connection(db: Session, vps_id: str) -> dict:
 
 
 def _build_client(conn: dict):
-    """Создать клиент для VPS по конфигу."""
-    from backend.api.log_clients import get_client
-    return get_client(
-        vps_type=conn.get("vps_type", "generic"),
-        base_url=conn.get("base_url", ""),
-        auth_type=conn.get("auth_type", "none"),
-        token=conn.get("token", ""),
-        username=conn.get("username", ""),
-        password=conn.get("password", ""),
-        api_key_header=conn.get("api_key_header", "Authorization"),
-        ssl_verify=conn.get("ssl_verify", True),
-        ca_cert_path=conn.get("ca_cert_path", ""),
-        default_index=conn.get("default_index", ""),
-    )
+    """Клиент для VPS по конфигу — общий на подключение (keep-alive сессия)."""
+    from backend.api.log_clients import client_for_connection
+    return client_for_connection(conn)
 
 
 def _group_entries(entries: list[dict]) -> list[dict]:
@@ -134,26 +123,122 @@ def _group_entries(entries: list[dict]) -> list[dict]:
     return result
 
 
-def _analyze_with_llm(entries: list[dict], provider: str) -> list[dict]:
+_ANALYZE_BATCH_SIZE = 5
+
+# Поля, которые относятся к записи, а не к анализу fingerprint — в кэш не идут
+_PER_ENTRY_FIELDS = frozenset({"error_index", "log_id", "service", "fingerprint", "group_size", "cached"})
+
+
+def _entry_fingerprint(entry: dict) -> str:
+    """Ключ группы записи — как в _group_entries: fingerprint, иначе id."""
+    return entry.get("fingerprint", entry.get("id", ""))
+
+
+async def _analyze_with_llm(entries: list[dict], provider: str) -> list[dict]:
     """
     Анализ ошибок через LLM.
-    Обрабатывает пакетами по 5 ошибок.
-    """
-    from agents.llm_client import LLMClient, Message
 
-    llm = LLMClient(provider=provider)
-    results: list[dict] = []
+    Раньше пакеты по 5 ошибок шли строго по очереди, а записи с одинаковым
+    fingerprint анализировались заново — всплеск из сотни одинаковых 500-х
+    одного сервиса стоил двадцати вызовов LLM. Теперь записи сворачиваются
+    по fingerprint, в LLM уходит по одному представителю группы (с общим
+    числом повторов), пакеты идут параллельно — не больше
+    provider_concurrency(provider) одновременно, — а анализ копируется на
+    каждую запись группы.
 
-    # Разбиваем на пакеты по 5
-    batch_size = 5
-    for i in range(0, len(entries), batch_size):
-        batch = entries[i:i + batch_size]
-        results.extend(_analyze_batch(llm, batch))
+    Готовые анализы fingerprint берутся из LogAnalysisCache (ключ —
+    fingerprint, провайдер и модель) — в LLM идут только промахи; удачные
+    ответы LLM сохраняются в кэш, заглушки (fallback) — нет.
 
+    Возвращает по анализу на запись в порядке entries; error_index — номер
+    записи в entries (с 1), cached — анализ взят из кэша.
+    """
+    from agents.llm_client import AsyncLLMClient, provider_concurrency
+    from db.log_analysis_cache import LogAnalysisCache
+
+    groups: dict[str, list[int]] = {}
+    for i, entry in enumerate(entries):
+        groups.setdefault(_entry_fingerprint(entry), []).append(i)
+
+    async with AsyncLLMClient(provider=provider) as llm:
+        # Кэшируются только настоящие fingerprint — id записи не повторяется
+        cacheable = {fp for fp, idxs in groups.items() if entries[idxs[0]].get("fingerprint")}
+        cached = await asyncio.to_thread(LogAnalysisCache.get_many, list(cacheable), provider, llm.model)
+
+        misses = [(fp, idxs) for fp, idxs in groups.items() if fp not in cached]
+        representatives = [
+            {**entries[idxs[0]], "count": sum(entries[i].get("count", 1) or 1 for i in idxs)}
+            for _, idxs in misses
+        ]
+        batches = [
+            representatives[i:i + _ANALYZE_BATCH_SIZE]
+            for i in range(0, len(representatives), _ANALYZE_BATCH_SIZE)
+        ]
+
+        slots = asyncio.Semaphore(provider_concurrency(provider))
+
+        async def _run(batch: list[dict]) -> list[dict]:
+            async with slots:
+                return await _analyze_batch(llm, batch)
+
+        batch_results = await asyncio.gather(*(_run(batch) for batch in batches))
+        model = llm.model
+
+    # Анализ представителя по порядку групп-промахов
+    group_analyses: dict[str, dict] = {}
+    pending = iter(misses)
+    for batch, analyses in zip(batches, batch_results):
+        by_index = {}
+        for a in analyses:
+            idx = a.get("error_index")
+            if isinstance(idx, int) and 1 <= idx <= len(batch):
+                by_index.setdefault(idx - 1, a)
+        for idx, entry in enumerate(batch):
+            fp, _ = next(pending)
+            group_analyses[fp] = by_index.get(idx) or _fallback_analysis(
+                entry, "LLM не вернул анализ этой ошибки", "Требует ручного анализа",
+            )
+
+    fresh = {
+        fp: {k: v for k, v in a.items() if k not in _PER_ENTRY_FIELDS}
+        for fp, a in group_analyses.items()
+        if fp in cacheable and not a.get("fallback")
+    }
+    if fresh:
+        await asyncio.to_thread(LogAnalysisCache.put_many, fresh, provider, model)
+
+    results: list[Optional[dict]] = [None] * len(entries)
+    for fp, idxs in groups.items():
+        analysis = cached.get(fp) or group_analyses[fp]
+        for i in idxs:
+            results[i] = {
+                **analysis,
+                "error_index": i + 1,
+                "log_id": entries[i].get("id", ""),
+                "service": entries[i].get("service", ""),
+                "fingerprint": fp,
+                "group_size": len(idxs),
+                "cached": fp in cached,
+            }
     return results
 
 
-def _analyze_batch(llm, batch: list[dict]) -> list[dict]:
+def _fallback_analysis(entry: dict, root_cause: str, impact: str) -> dict:
+    return {
+        "log_id": entry.get("id", ""),
+        "service": entry.get("service", ""),
+        "summary": entry.get("message", "")[:200],
+        "root_cause": root_cause,
+        "impact": impact,
+        "category": "other",
+        "severity": "major",
+        "suggestion": "Проверьте стектрейс вручную",
+        "defect_draft": "",
+        "fallback": True,
+    }
+
+
+async def _analyze_batch(llm, batch: list[dict]) -> list[dict]:
     """Анализ одного пакета ошибок."""
     from agents.llm_client import Message
 
@@ -199,7 +284,7 @@ def _analyze_batch(llm, batch: list[dict]) -> list[dict]:
 
     try:
         from agents.llm_client import Message
-        response = llm.chat_continued(
+        response = await llm.achat_continued(
             [Message(role="user", content=prompt)],
             temperature=0.15,
             max_tokens=4000,
@@ -237,15 +322,8 @@ def _analyze_batch(llm, batch: list[dict]) -> list[dict]:
         # Если LLM не вернул валидный JSON, возвращаем fallback
         return [{
             "error_index": i + 1,
-            "log_id": entry.get("id", ""),
-            "service": entry.get("service", ""),
-            "summary": entry.get("message", "")[:200],
-            "root_cause": "Не удалось проанализировать (ошибка парсинга ответа LLM)",
-            "impact": "Требует ручного анализа",
-            "category": "other",
-            "severity": "major",
-            "suggestion": "Проверьте стектрейс вручную",
-            "defect_draft": "",
+            **_fallback_analysis(entry, "Не удалось проанализировать (ошибка парсинга ответа LLM)",
+                                 "Требует ручного анализа"),
         } for i, entry in enumerate(batch)]
 
     except Exception as e:
@@ -260,6 +338,7 @@ def _analyze_batch(llm, batch: list[dict]) -> list[dict]:
             "severity": "major",
             "suggestion": "",
             "defect_draft": "",
+            "fallback": True,
         } for i, entry in enumerate(batch)]
 
 
@@ -303,6 +382,7 @@ async def search_logs(body: LogSearchRequest, db: Session = Depends(get_db)) ->
         "total": result.total,
         "unique_count": len(grouped),
         "services_found": services_found,
+        "truncated": result.truncated,
     }
 
 
@@ -315,8 +395,7 @@ async def analyze_logs(body: LogAnalyzeRequest, db: Session = Depends(get_db)) -
         raise HTTPException(400, "Максимум 50 ошибок за один запрос")
 
     try:
-        analyses = await asyncio.to_thread(
-            _analyze_with_llm,
+        analyses = await _analyze_with_llm(
             entries=body.entries,
             provider=body.provider,
         )
@@ -457,20 +536,20 @@ async def upload_analyze(
     excerpt, meta = _make_log_excerpt(text)
     prompt = _uploaded_analysis_prompt(file.filename or "logs", excerpt, meta)
 
-    def _run() -> str:
-        from agents.llm_client import LLMClient, Message
-        llm = LLMClient(provider=provider)
-        resp = llm.chat_continued(
-            [Message(role="user", content=prompt)], temperature=0.2, max_tokens=4000,
-            continuation_instruction=(
-                "Продолжи анализ точно с того места, где текст оборвался. "
-                "НЕ повторяй уже написанное — только продолжение."
-            ),
-        )
+    async def _run() -> str:
+        from agents.llm_client import AsyncLLMClient, Message
+        async with AsyncLLMClient(provider=provider) as llm:
+            resp = await llm.achat_continued(
+                [Message(role="user", content=prompt)], temperature=0.2, max_tokens=4000,
+                continuation_instruction=(
+                    "Продолжи анализ точно с того места, где текст оборвался. "
+                    "НЕ повторяй уже написанное — только продолжение."
+                ),
+            )
         return resp.content.strip()
 
     try:
-        analysis = await asyncio.to_thread(_run)
+        analysis = await _run()
     except Exception as e:
         raise HTTPException(502, f"Ошибка LLM анализа: {str(e)[:300]}")
 
@@ -500,25 +579,25 @@ async def chat_about_logs(body: LogChatRequest) -> dict:
 {body.analysis[:6000]}
 ═══════════════════════════════════════"""
 
-    def _run() -> str:
-        from agents.llm_client import LLMClient, Message
-        llm = LLMClient(provider=body.provider)
+    async def _run() -> str:
+        from agents.llm_client import AsyncLLMClient, Message
         msgs = [Message(role="system", content=system)]
         # последние 12 сообщений диалога — достаточно для уточнений
         for m in body.messages[-12:]:
             role = m.role if m.role in ("user", "assistant") else "user"
             msgs.append(Message(role=role, content=m.content[:8000]))
-        resp = llm.chat_continued(
-            msgs, temperature=0.2, max_tokens=2500,
-            continuation_instruction=(
-                "Продолжи ответ точно с того места, где текст оборвался. "
-                "НЕ повторяй уже написанное — только продолжение."
-            ),
-        )
+        async with AsyncLLMClient(provider=body.provider) as llm:
+            resp = await llm.achat_continued(
+                msgs, temperature=0.2, max_tokens=2500,
+                continuation_instruction=(
+                    "Продолжи ответ точно с того места, где текст оборвался. "
+                    "НЕ повторяй уже написанное — только продолжение."
+                ),
+            )
         return resp.content.strip()
 
     try:
-        reply = await asyncio.to_thread(_run)
+        reply = await _run()
     except Exception as e:
         raise HTTPException(502, f"Ошибка LLM: {str(e)[:300]}")
 
@@ -67,6 +67,12 @@ class HealthConfigUpdate(BaseModel):
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
+def _invalidate_compiled(metric_id: int) -> None:
+    """Сбросить скомпилированный снимок метрики у планировщика — следующая отправка соберёт новый."""
+    from agents.metrics_config_cache import metric_configs
+    metric_configs.invalidate(metric_id)
+
+
 def _get_metric_or_404(metric_id: int, db: Session) -> TestMetric:
     m = db.query(TestMetric).filter(TestMetric.id == metric_id).first()
     if not m:
@@ -231,6 +237,7 @@ def update_values(metric_id: int, body: ValuesConfigUpdate, db: Session = Depend
     vc.sine_period_min    = body.sine_period_min
     vc.spike_interval_min = body.spike_interval_min
     db.commit()
+    _invalidate_compiled(metric_id)
     db.refresh(vc)
     return _ser_values(vc)
 
@@ -251,6 +258,7 @@ def update_baseline(metric_id: int, body: BaselineConfigUpdate, db: Session = De
     bc.fixed_value  = body.fixed_value
     bc.offset_value = body.offset_value
     db.commit()
+    _invalidate_compiled(metric_id)
     db.refresh(bc)
     return _ser_baseline(bc)
 
@@ -291,6 +299,7 @@ def update_thresholds(metric_id: int, body: ThresholdsConfigUpdate, db: Session
         ))
 
     db.commit()
+    _invalidate_compiled(metric_id)
     db.refresh(tc)
     return _ser_thresholds(tc)
 
@@ -319,6 +328,7 @@ def update_health(metric_id: int, body: HealthConfigUpdate, db: Session = Depend
     hc.flap_interval_min = body.flap_interval_min
     hc.degrade_hours     = body.degrade_hours
     db.commit()
+    _invalidate_compiled(metric_id)
     db.refresh(hc)
     return _ser_health(hc)
 
@@ -421,11 +431,14 @@ async def send_now(metric_id: int, db: Session = Depends(get_db)):
 
     def _send_all():
         now = datetime.now(timezone.utc)
-        data_r = KafkaClient.send(topic_data, data_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
-        meta_r = KafkaClient.send(topic_metadata, meta_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
-        thr_r: Optional[dict] = None
+        data_f = KafkaClient.send_async(topic_data, data_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
+        meta_f = KafkaClient.send_async(topic_metadata, meta_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
+        thr_f = None
         if thr_str:
-            thr_r = KafkaClient.send(topic_thresholds, thr_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
+            thr_f = KafkaClient.send_async(topic_thresholds, thr_str, key=m.metric_hash, kafka_cfg=kafka_cfg)
+        data_r = KafkaClient.result(data_f)
+        meta_r = KafkaClient.result(meta_f)
+        thr_r: Optional[dict] = KafkaClient.result(thr_f) if thr_f else None
         return data_r, meta_r, thr_r, now
 
     try:
@@ -445,6 +458,8 @@ async def send_now(metric_id: int, db: Session = Depends(get_db)):
             message_json=data_str,
         ))
         db.commit()
+        from agents.metrics_config_cache import metric_configs
+        metric_configs.mark_sent(metric_id, sent_at, sent_at if thr_r else None)
         accumulated = len(data_msg.get("metrics", {}).get("data", []))
         return {
             "ok":              True,
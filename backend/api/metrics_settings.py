@@ -116,4 +116,10 @@ def update_settings(body: SettingsUpdate, db: Session = Depends(get_db)):
             row.value = value
             row.updated_at = datetime.utcnow()
     db.commit()
+    # Producer'ы пула собраны по старым настройкам — закрыть, следующая отправка соберёт новые
+    from agents.kafka_client import close_producers
+    from agents.metrics_config_cache import metric_configs
+    close_producers()
+    # Топики и cfg зашиты в скомпилированные снимки метрик
+    metric_configs.invalidate_all()
     return {"ok": True}
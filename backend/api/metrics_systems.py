@@ -211,6 +211,9 @@ def update_system(system_id: int, body: SystemUpdate, db: Session = Depends(get_
         _check_ci(body.monSystemCi, "monSystemCi")
         s.mon_system_ci = body.monSystemCi
     db.commit()
+    # CI услуги входят в METADATA метрик — снимки планировщика пересобрать
+    from agents.metrics_config_cache import metric_configs
+    metric_configs.invalidate_all()
     db.refresh(s)
     return _system_row(s, db)
 
@@ -222,6 +225,8 @@ def delete_system(system_id: int, db: Session = Depends(get_db)):
         raise HTTPException(404, "Услуга не найдена")
     db.delete(s)
     db.commit()
+    from agents.metrics_config_cache import metric_configs
+    metric_configs.invalidate_all()
     return {"status": "deleted", "id": system_id}
 
 
@@ -448,12 +453,13 @@ async def update_metric(metric_id: int, body: MetricUpdate, db: Session = Depend
 
     db.commit()
     db.refresh(m)
+    from agents.metrics_config_cache import metric_configs
+    metric_configs.invalidate(metric_id)
 
-    # Перезапускаем планировщик если изменился период и метрика активна
+    # Новый период — сразу в расписание планировщика (он не опрашивает БД)
     if period_changed and m.is_active:
         from agents.metrics_scheduler import scheduler
-        await scheduler.stop_metric(metric_id)
-        await scheduler.start_metric(metric_id)
+        await scheduler.update_period(metric_id, m.metric_period_sec)
 
     return _metric_row(m, *_last_value(m.id, db))
 
@@ -465,6 +471,9 @@ def delete_metric(metric_id: int, db: Session = Depends(get_db)):
         raise HTTPException(404, "Метрика не найдена")
     db.delete(m)
     db.commit()
+    # Без снимка планировщик перечитает метрику, не найдёт её и снимет с расписания
+    from agents.metrics_config_cache import metric_configs
+    metric_configs.invalidate(metric_id)
     return {"status": "deleted", "id": metric_id}
 
 
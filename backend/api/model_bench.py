@@ -5,8 +5,6 @@
 -> прогнать N раз другую модель (повторить сколько нужно) -> запросить
 сравнительный отчёт по накопленным прогонам.
 """
-import asyncio
-
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import Response
 from pydantic import BaseModel, Field
@@ -65,8 +63,8 @@ async def run_target(session_id: str, req: RunRequest) -> dict:
     from agents.llm_client import LLMClient
     from agents.model_bench import run_model_batch
     try:
-        results = await asyncio.to_thread(
-            run_model_batch, req.provider, req.model, session["prompt"], session["transcript"], req.runs,
+        results = await run_model_batch(
+            req.provider, req.model, session["prompt"], session["transcript"], req.runs,
         )
     except Exception as e:
         _, friendly = LLMClient.classify_error(e)
@@ -96,8 +94,8 @@ async def analyze_session(session_id: str, req: AnalyzeRequest) -> dict:
     from agents.llm_client import LLMClient
     from agents.model_bench import analyze_report
     try:
-        report, best = await asyncio.to_thread(
-            analyze_report, req.provider, session["prompt"], session["transcript"], session["targets"],
+        report, best = await analyze_report(
+            req.provider, session["prompt"], session["transcript"], session["targets"],
             session.get("judge_instructions", ""),
         )
     except Exception as e:
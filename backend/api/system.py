@@ -43,3 +43,27 @@ def get_stats():
         return store.get_stats()
     except Exception:
         return {"total": 0, "positive": 0, "negative": 0}
+
+
+@router.get("/api/system/llm-cache")
+def get_llm_cache_stats():
+    from db.llm_cache import LLMResponseCache
+    return LLMResponseCache.stats()
+
+
+@router.delete("/api/system/llm-cache")
+def clear_llm_cache():
+    from db.llm_cache import LLMResponseCache
+    return {"deleted": LLMResponseCache.clear()}
+
+
+@router.get("/api/system/log-analysis-cache")
+def get_log_analysis_cache_stats():
+    from db.log_analysis_cache import LogAnalysisCache
+    return LogAnalysisCache.stats()
+
+
+@router.delete("/api/system/log-analysis-cache")
+def clear_log_analysis_cache():
+    from db.log_analysis_cache import LogAnalysisCache
+    return {"deleted": LogAnalysisCache.clear()}
@@ -17,20 +17,27 @@ LLM-генерация SQL, предложение скриптов создан
 
   Запросы:
     POST   /api/testdata/query                      — выполнить SELECT
+    POST   /api/testdata/query/stream               — SELECT на одной БД потоком NDJSON
     POST   /api/testdata/generate-query              — LLM генерирует SQL
     POST   /api/testdata/suggest-script              — LLM предлагает скрипт создания данных
 """
 
 import asyncio
+import json
 import logging
+import os
 import re
 from pathlib import Path
 from typing import Optional
 
 from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from backend.api.db_connector import get_db_connection, introspect_schema, load_jdbc_driver
+from backend.api.db_connector import (
+    DeadlineExceeded, attach_jvm_thread, gather_with_deadline, introspect_schema, invalidate_connection, invalidate_driver, load_jdbc_driver,
+    pooled_connection,
+)
 from db.jdbc_drivers_store import JdbcDriversStore
 from db.testdata_connections import TestDataConnectionsStore
 
@@ -53,15 +60,26 @@ _ALLOWED_START = re.compile(
     re.IGNORECASE
 )
 
-_MAX_ROWS = 500
+_MAX_ROWS = 500              # по умолчанию: LIMIT, дописываемый к запросу, и потолок ответа /query
 _QUERY_TIMEOUT_SEC = 30
+_FETCH_SIZE = 500            # строк за порцию: JDBC fetchSize и fetchmany
+_DEFAULT_ROW_CAP = 100_000   # TESTDATA_MAX_ROWS — больше не отдаём ни в /query, ни в потоке
+
+
+def _row_cap() -> int:
+    try:
+        return max(1, int(os.getenv("TESTDATA_MAX_ROWS", "") or _DEFAULT_ROW_CAP))
+    except ValueError:
+        return _DEFAULT_ROW_CAP
 
 
-def _validate_sql(sql: str, dialect: str = "generic") -> str:
+def _validate_sql(sql: str, dialect: str = "generic", limit: int = _MAX_ROWS) -> str:
     """
     Валидирует SQL-запрос. Разрешены ТОЛЬКО SELECT / WITH / EXPLAIN / SHOW / DESCRIBE.
     Возвращает очищенный SQL или поднимает ValueError.
     Для Oracle ограничение строк — через FETCH FIRST, для остальных — LIMIT.
+    Приписывается limit + 1 (как setMaxRows): лишняя строка — признак того,
+    что результат обрезан; читается всё равно не больше limit строк.
     """
     cleaned = sql.strip().rstrip(";")
     if not cleaned:
@@ -79,9 +97,9 @@ def _validate_sql(sql: str, dialect: str = "generic") -> str:
 
     if dialect == "oracle":
         if not re.search(r'\b(ROWNUM|FETCH\s+FIRST)\b', cleaned, re.IGNORECASE):
-            cleaned += f" FETCH FIRST {_MAX_ROWS} ROWS ONLY"
+            cleaned += f" FETCH FIRST {limit + 1} ROWS ONLY"
     elif not re.search(r'\bLIMIT\b', cleaned, re.IGNORECASE):
-        cleaned += f" LIMIT {_MAX_ROWS}"
+        cleaned += f" LIMIT {limit + 1}"
 
     return cleaned
 
@@ -104,39 +122,165 @@ def _schema_to_text(schema: dict, db_name: str = "") -> str:
 
 # ── Execute query ─────────────────────────────────────────────────────────────
 
-def _execute_query(conn, sql: str) -> dict:
+# Раньше результат читался fetchall() целиком, а каждая ячейка проходила
+# цепочку isinstance — «SELECT *» с собственным LIMIT по большой таблице
+# поднимал всё в память. Теперь:
+#   • Statement выполняется с fetchSize и maxRows (потолок на стороне БД), а
+#     для PostgreSQL — внутри транзакции, иначе драйвер всё равно вычитывает
+#     результат целиком; пул на возврате откатывает и включает autocommit;
+#   • строки читаются порциями fetchmany, не больше max_rows;
+#   • JSON-конвертер выбирается на колонку один раз — по первому значению.
+
+def _to_json_value(val):
+    if val is None or isinstance(val, (int, float, bool)):
+        return val
+    if isinstance(val, bytes):
+        return val.hex()[:100]
+    return str(val)
+
+
+def _hex(val):
+    return val.hex()[:100] if type(val) is bytes else _to_json_value(val)
+
+
+def _same_type(t: type):
+    """Значения ожидаемого типа — как есть; иное (редкий разнотип в колонке) — общим путём."""
+    return lambda val: val if type(val) is t else _to_json_value(val)
+
+
+def _column_converters(rows: list, width: int) -> list:
+    """По конвертеру на колонку — по первому не-None значению порции."""
+    converters = []
+    for i in range(width):
+        sample = next((row[i] for row in rows if row[i] is not None), None)
+        t = type(sample)
+        if sample is None:
+            converters.append(_to_json_value)
+        elif t in (int, float, bool, str):
+            converters.append(_same_type(t))
+        elif t is bytes:
+            converters.append(_hex)
+        else:
+            converters.append(_to_json_value)
+    return converters
+
+
+def _open_cursor(conn, sql: str, max_rows: int):
     """
-    Выполняет SELECT-запрос и возвращает результат.
-    Returns: {"columns": [...], "rows": [...], "row_count": int}
+    Выполняет SELECT и возвращает курсор. У JDBC-соединения Statement готовится
+    сам: fetchSize/maxRows нужно задать ДО выполнения, а cursor.execute()
+    jaydebeapi делает prepare+execute разом.
     """
+    jconn = getattr(conn, "jconn", None)
     cur = conn.cursor()
-    cur.execute(sql)
-    columns = [desc[0] for desc in cur.description] if cur.description else []
-    rows = cur.fetchall()
-    cur.close()
-
-    # Конвертируем значения в JSON-совместимые типы
-    json_rows = []
-    for row in rows:
-        json_row = []
-        for val in row:
-            if val is None:
-                json_row.append(None)
-            elif isinstance(val, (int, float, bool)):
-                json_row.append(val)
-            elif isinstance(val, bytes):
-                json_row.append(val.hex()[:100])
-            else:
-                json_row.append(str(val))
-        json_rows.append(json_row)
+    if jconn is None:
+        cur.execute(sql)
+        return cur
+
+    import jaydebeapi
+
+    try:
+        cur._close_last()
+        try:
+            jconn.setAutoCommit(False)   # PostgreSQL отдаёт порциями только внутри транзакции
+        except Exception:
+            pass
+        stmt = jconn.prepareStatement(sql)
+        cur._prep = stmt
+        stmt.setFetchSize(_FETCH_SIZE)
+        stmt.setMaxRows(max_rows + 1)    # +1 — чтобы понять, что результат обрезан
+        try:
+            has_rs = stmt.execute()
+        except Exception:
+            jaydebeapi._handle_sql_exception()
+        if has_rs:
+            cur._rs = stmt.getResultSet()
+            cur._meta = cur._rs.getMetaData()
+            cur.rowcount = -1
+        else:
+            cur.rowcount = stmt.getUpdateCount()
+    except BaseException:
+        cur.close()
+        raise
+    return cur
+
+
+def _iter_json_pages(cur, max_rows: int, attach=None):
+    """Порции строк (уже JSON-совместимых), всего не больше max_rows."""
+    converters = None
+    left = max_rows
+    while left > 0:
+        if attach is not None:
+            attach()
+        rows = cur.fetchmany(min(_FETCH_SIZE, left))
+        if not rows:
+            return
+        if converters is None:
+            converters = _column_converters(rows, len(rows[0]))
+        left -= len(rows)
+        yield [[None if v is None else conv(v) for conv, v in zip(converters, row)] for row in rows]
+
+
+def _has_more(cur) -> bool:
+    try:
+        return bool(cur.fetchmany(1))
+    except Exception:
+        return False
+
+
+def _columns(cur) -> list:
+    return [desc[0] for desc in cur.description] if cur.description else []
+
+
+def _execute_query(conn, sql: str, max_rows: int = _MAX_ROWS) -> dict:
+    """
+    Выполняет SELECT-запрос и возвращает результат (не больше max_rows строк).
+    Returns: {"columns": [...], "rows": [...], "row_count": int, "truncated": bool}
+    """
+    cur = _open_cursor(conn, sql, max_rows)
+    try:
+        columns = _columns(cur)
+        json_rows = [row for page in _iter_json_pages(cur, max_rows) for row in page]
+        truncated = len(json_rows) >= max_rows and _has_more(cur)
+    finally:
+        cur.close()
 
     return {
         "columns": columns,
         "rows": json_rows,
         "row_count": len(json_rows),
+        "truncated": truncated,
     }
 
 
+def _stream_query_ndjson(conn_cfg: dict, sql: str, max_rows: int):
+    """
+    NDJSON-поток результата: {"type": "columns"}, затем {"type": "rows"} на
+    каждую порцию и {"type": "end", "row_count", "truncated"}; ошибка —
+    {"type": "error"}. Соединение держится, пока клиент читает поток.
+    """
+    def line(obj) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+    count = 0
+    try:
+        with pooled_connection(conn_cfg) as (conn, _driver):
+            # Starlette вызывает next() из разных потоков пула — каждый подключаем к JVM
+            attach = attach_jvm_thread if getattr(conn, "jconn", None) is not None else None
+            cur = _open_cursor(conn, sql, max_rows)
+            try:
+                yield line({"type": "columns", "columns": _columns(cur)})
+                for page in _iter_json_pages(cur, max_rows, attach):
+                    count += len(page)
+                    yield line({"type": "rows", "rows": page})
+                truncated = count >= max_rows and _has_more(cur)
+            finally:
+                cur.close()
+        yield line({"type": "end", "row_count": count, "truncated": truncated})
+    except Exception as e:
+        yield line({"type": "error", "error": str(e)[:300], "row_count": count})
+
+
 # ── LLM helpers ──────────────────────────────────────────────────────────────
 
 def _generate_sql_via_llm(
@@ -280,6 +424,7 @@ def update_connection(conn_id: str, req: ConnectionCreateRequest) -> dict:
     updated = TestDataConnectionsStore.update_connection(conn_id, req.model_dump())
     if not updated:
         raise HTTPException(status_code=404, detail="Подключение не найдено")
+    invalidate_connection(conn_id)
     safe = _enrich_with_driver({**updated})
     if safe.get("password"):
         safe["password"] = "••••••••"
@@ -291,6 +436,7 @@ def delete_connection(conn_id: str) -> dict:
     ok = TestDataConnectionsStore.delete_connection(conn_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Подключение не найдено")
+    invalidate_connection(conn_id)
     return {"status": "deleted"}
 
 
@@ -304,15 +450,14 @@ async def test_connection(conn_id: str) -> dict:
 
     def _test():
         try:
-            conn, driver = get_db_connection(conn_cfg)
-            cur = conn.cursor()
-            if driver.get("sql_dialect") == "oracle":
-                cur.execute("SELECT 1 FROM DUAL")
-            else:
-                cur.execute("SELECT 1")
-            cur.fetchone()
-            cur.close()
-            conn.close()
+            with pooled_connection(conn_cfg) as (conn, driver):
+                cur = conn.cursor()
+                if driver.get("sql_dialect") == "oracle":
+                    cur.execute("SELECT 1 FROM DUAL")
+                else:
+                    cur.execute("SELECT 1")
+                cur.fetchone()
+                cur.close()
             return {"status": "green", "message": "Соединение установлено"}
         except Exception as e:
             return {"status": "red", "message": f"Ошибка подключения: {str(e)[:300]}"}
@@ -329,14 +474,11 @@ async def introspect_connection(conn_id: str) -> dict:
         raise HTTPException(status_code=404, detail="Подключение не найдено")
 
     def _do():
-        conn, _driver = get_db_connection(conn_cfg)
-        try:
+        with pooled_connection(conn_cfg) as (conn, _driver):
             schema = introspect_schema(conn)
-            # Сохраняем в кэш
-            TestDataConnectionsStore.update_cached_schema(conn_id, schema)
-            return schema
-        finally:
-            conn.close()
+        # Сохраняем в кэш
+        TestDataConnectionsStore.update_cached_schema(conn_id, schema)
+        return schema
 
     try:
         schema = await asyncio.to_thread(_do)
@@ -354,15 +496,22 @@ async def introspect_connection(conn_id: str) -> dict:
 class QueryRequest(BaseModel):
     connection_ids: list[str] = Field(..., min_length=1)
     sql: str = Field(..., min_length=1)
+    # Общий срок на весь запрос: не ответившие БД вернутся с timed_out, остальные — с данными
+    timeout_sec: float = Field(default=_QUERY_TIMEOUT_SEC, gt=0, le=300)
+    # Сколько строк вернуть с каждой БД (по умолчанию _MAX_ROWS, не больше TESTDATA_MAX_ROWS)
+    max_rows: Optional[int] = Field(default=None, gt=0)
 
 
 @router.post("/api/testdata/query")
 async def execute_query(req: QueryRequest) -> dict:
     """
-    Выполняет SELECT-запрос на выбранных БД.
-    Возвращает результаты для каждого подключения.
+    Выполняет SELECT-запрос на выбранных БД — на всех параллельно.
+    Возвращает результаты для каждого подключения; медленные и недоступные БД
+    не задерживают остальные и отдаются ошибкой по истечении timeout_sec.
     """
     results = {}
+    pending = {}
+    max_rows = min(req.max_rows or _MAX_ROWS, _row_cap())
 
     for conn_id in req.connection_ids:
         conn_cfg = TestDataConnectionsStore.get_connection(conn_id)
@@ -374,31 +523,65 @@ async def execute_query(req: QueryRequest) -> dict:
         dialect = driver.get("sql_dialect", "generic") if driver else "generic"
 
         try:
-            validated_sql = _validate_sql(req.sql, dialect)
+            validated_sql = _validate_sql(req.sql, dialect, max_rows)
         except ValueError as e:
             results[conn_id] = {"error": str(e), "rows": [], "columns": []}
             continue
 
         def _run(cfg=conn_cfg, sql=validated_sql):
-            conn, _ = get_db_connection(cfg)
-            try:
-                return _execute_query(conn, sql)
-            finally:
-                conn.close()
+            with pooled_connection(cfg) as (conn, _driver):
+                return _execute_query(conn, sql, max_rows)
 
-        try:
-            result = await asyncio.to_thread(_run)
-            result["db_name"] = conn_cfg.get("display_name", conn_id)
-            results[conn_id] = result
-        except Exception as e:
+        pending[conn_id] = (conn_cfg, asyncio.to_thread(_run))
+
+    outcomes = await gather_with_deadline({cid: aw for cid, (_, aw) in pending.items()}, req.timeout_sec)
+    for conn_id, (conn_cfg, _) in pending.items():
+        outcome = outcomes[conn_id]
+        db_name = conn_cfg.get("display_name", conn_id)
+        # TimeoutError самого пула (все соединения заняты) — обычная ошибка ниже
+        if isinstance(outcome, DeadlineExceeded):
             results[conn_id] = {
-                "error": str(e)[:300],
+                "error": f"База не ответила за {req.timeout_sec:g} с",
+                "timed_out": True,
                 "rows": [],
                 "columns": [],
-                "db_name": conn_cfg.get("display_name", conn_id),
+                "db_name": db_name,
             }
+        elif isinstance(outcome, BaseException):
+            results[conn_id] = {"error": str(outcome)[:300], "rows": [], "columns": [], "db_name": db_name}
+        else:
+            results[conn_id] = {**outcome, "db_name": db_name}
+
+    # Порядок ответа — как в запросе
+    return {"results": {cid: results[cid] for cid in req.connection_ids if cid in results}}
 
-    return {"results": results}
+
+class StreamQueryRequest(BaseModel):
+    connection_id: str = Field(..., min_length=1)
+    sql: str = Field(..., min_length=1)
+    # По умолчанию и не больше — TESTDATA_MAX_ROWS
+    max_rows: Optional[int] = Field(default=None, gt=0)
+
+
+@router.post("/api/testdata/query/stream")
+def stream_query(req: StreamQueryRequest) -> StreamingResponse:
+    """
+    Выполняет SELECT на одной БД и отдаёт результат потоком NDJSON порциями
+    по _FETCH_SIZE строк — для больших выборок, которые не нужно держать
+    в памяти целиком ни на бэкенде, ни в браузере.
+    """
+    conn_cfg = TestDataConnectionsStore.get_connection(req.connection_id)
+    if not conn_cfg:
+        raise HTTPException(status_code=404, detail="Подключение не найдено")
+    driver = JdbcDriversStore.get_driver(conn_cfg.get("driver_id", ""))
+    dialect = driver.get("sql_dialect", "generic") if driver else "generic"
+
+    max_rows = min(req.max_rows or _row_cap(), _row_cap())
+    try:
+        sql = _validate_sql(req.sql, dialect, max_rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(_stream_query_ndjson(conn_cfg, sql, max_rows), media_type="application/x-ndjson")
 
 
 # ── LLM: Generate SQL ────────────────────────────────────────────────────────
@@ -557,6 +740,7 @@ def update_driver(driver_id: str, req: DriverCreateRequest) -> dict:
     updated = JdbcDriversStore.update_driver(driver_id, req.model_dump())
     if not updated:
         raise HTTPException(status_code=404, detail="Драйвер не найден")
+    invalidate_driver(driver_id)
     return {"driver": updated}
 
 
@@ -565,6 +749,7 @@ def delete_driver(driver_id: str) -> dict:
     ok = JdbcDriversStore.delete_driver(driver_id)
     if not ok:
         raise HTTPException(status_code=400, detail="Встроенный драйвер нельзя удалить, либо драйвер не найден")
+    invalidate_driver(driver_id)
     return {"status": "deleted"}
 
 
@@ -581,6 +766,7 @@ async def upload_driver_library(driver_id: str, file: UploadFile = File(...)) ->
         raise HTTPException(status_code=400, detail="Файл слишком большой (макс. 100 МБ)")
 
     updated = JdbcDriversStore.set_library(driver_id, content, file.filename)
+    await asyncio.to_thread(invalidate_driver, driver_id)
     return {"driver": updated}
 
 
@@ -600,6 +786,7 @@ def set_driver_library_path(driver_id: str, req: DriverLibraryPathRequest) -> di
     if not Path(path).is_file():
         raise HTTPException(status_code=400, detail="Файл не найден по указанному пути (проверяется на машине бэкенда)")
     updated = JdbcDriversStore.set_library_path(driver_id, path)
+    invalidate_driver(driver_id)
     return {"driver": updated}
 
 
@@ -608,6 +795,7 @@ def remove_driver_library(driver_id: str) -> dict:
     updated = JdbcDriversStore.remove_library(driver_id)
     if not updated:
         raise HTTPException(status_code=404, detail="Драйвер не найден")
+    invalidate_driver(driver_id)
     return {"driver": updated}
 
 
@@ -8,6 +8,7 @@ FastAPI точка входа.
     uvicorn backend.main:app --host 127.0.0.1 --port 8000 --workers 1
 """
 
+import asyncio
 import logging
 import sys
 import warnings
@@ -63,6 +64,16 @@ except Exception as _e:
     warnings.warn(f"PostgreSQL недоступен, Генератор метрик не будет работать: {_e}")
 
 
+def _init_vector_store() -> None:
+    try:
+        from db.vector_store import init_vector_store
+        prewarm = _os.getenv("VECTOR_STORE_PREWARM", "1").lower() not in ("0", "false", "no")
+        init_vector_store(prewarm=prewarm)
+    except Exception as _e:
+        # Без эмбеддингов (нет модели в закрытой сети) работает всё, кроме RAG
+        warnings.warn(f"VectorStore init failed: {_e}")
+
+
 @asynccontextmanager
 async def lifespan(app_: FastAPI):
     # Startup: применить настройки из БД к os.environ
@@ -73,12 +84,21 @@ async def lifespan(app_: FastAPI):
         _db.close()
     except Exception as _e:
         warnings.warn(f"Settings load failed: {_e}")
+    # Startup: фоновая запись логов генерации метрик + ротация старых
+    try:
+        from agents.generation_log_writer import generation_log_writer
+        await generation_log_writer.start()
+    except Exception as _e:
+        warnings.warn(f"Generation log writer failed to start: {_e}")
     # Startup: запустить планировщик метрик
     try:
         from agents.metrics_scheduler import scheduler
         await scheduler.start_all()
     except Exception as _e:
         warnings.warn(f"Scheduler failed to start: {_e}")
+    # Startup: общий VectorStore + прогрев модели эмбеддингов — в фоне, чтобы
+    # старт не ждал загрузку ONNX; первые запросы дождутся её на блокировке.
+    vector_store_task = asyncio.create_task(asyncio.to_thread(_init_vector_store))
     # Startup: запустить монитор автозапуска автотестов
     try:
         await autotest_runs.start_autorun_monitor()
@@ -86,6 +106,8 @@ async def lifespan(app_: FastAPI):
         warnings.warn(f"Autotest autorun monitor failed to start: {_e}")
     yield
     # Shutdown: остановить все задачи
+    if not vector_store_task.done():
+        vector_store_task.cancel()
     try:
         from agents.metrics_scheduler import scheduler
         await scheduler.stop_all()
@@ -95,6 +117,30 @@ async def lifespan(app_: FastAPI):
         await autotest_runs.stop_autorun_monitor()
     except Exception:
         pass
+    # Дописать логи генерации, ещё лежащие в буфере
+    try:
+        from agents.generation_log_writer import generation_log_writer
+        await generation_log_writer.stop()
+    except Exception:
+        pass
+    # Закрыть пулы JDBC-соединений к внешним БД
+    try:
+        from backend.api.db_connector import close_pools
+        await asyncio.to_thread(close_pools)
+    except Exception:
+        pass
+    # Закрыть keep-alive сессии клиентов логов VPS
+    try:
+        from backend.api.log_clients import close_clients
+        await asyncio.to_thread(close_clients)
+    except Exception:
+        pass
+    # Дописать в Kafka сообщения, накопленные producer'ами (linger_ms)
+    try:
+        from agents.kafka_client import close_producers
+        await asyncio.to_thread(close_producers)
+    except Exception:
+        pass
 
 
 app = FastAPI(
@@ -1 +1 @@
-from .vector_store import VectorStore
+from .vector_store import VectorStore, get_vector_store
@@ -6,12 +6,13 @@
   data/autotest_run_history.json  — последние 50 ручных и автоматических запусков
 """
 
-import json
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from db.json_store import json_document
+
 _ROOT = Path(__file__).resolve().parent.parent
 _CONFIG_FILE = _ROOT / "data" / "autotest_run_config.json"
 _HISTORY_FILE = _ROOT / "data" / "autotest_run_history.json"
@@ -90,10 +91,10 @@ def _merge_defaults(config: dict) -> dict:
 class AutotestRunsStore:
     @staticmethod
     def get_config() -> dict:
-        if not _CONFIG_FILE.exists():
+        doc = json_document(_CONFIG_FILE, default=dict)
+        if not doc.exists():
             return _default_config()
-        with open(_CONFIG_FILE, encoding="utf-8") as f:
-            return _merge_defaults(json.load(f))
+        return _merge_defaults(doc.read())
 
     @staticmethod
     def save_config(config: dict) -> dict:
@@ -110,9 +111,7 @@ class AutotestRunsStore:
             rule.setdefault("ui_order", 0)
             rule.setdefault("use_microservice_as_tag", True)
         data["updated_at"] = _now_iso()
-        _CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_document(_CONFIG_FILE, default=dict).write(data)
         return data
 
     @classmethod
@@ -127,16 +126,9 @@ class AutotestRunsStore:
     def add_history(entry: dict) -> None:
         if not entry.get("ts"):
             entry["ts"] = _now_iso()
-        history = AutotestRunsStore.get_history(limit=_HISTORY_MAX)
-        history.insert(0, entry)
-        history = history[:_HISTORY_MAX]
-        _HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        with json_document(_HISTORY_FILE).transaction() as tx:
+            tx.data = ([entry] + tx.data)[:_HISTORY_MAX]
 
     @staticmethod
     def get_history(limit: int = 20) -> list[dict]:
-        if not _HISTORY_FILE.exists():
-            return []
-        with open(_HISTORY_FILE, encoding="utf-8") as f:
-            return json.load(f)[:limit]
+        return json_document(_HISTORY_FILE).read()[:limit]
@@ -2,11 +2,12 @@
 Хранилище фидбека по генерациям.
 """
 
-import json
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from db.json_store import json_document
+
 DB_DIR = Path(__file__).resolve().parent / "chroma_db"
 
 
@@ -17,16 +18,15 @@ class FeedbackStore:
         self.feedback_file.parent.mkdir(parents=True, exist_ok=True)
         self._load()
 
-    def _load(self):
-        if self.feedback_file.exists():
-            with open(self.feedback_file, "r", encoding="utf-8") as f:
-                self.data = json.load(f)
-        else:
-            self.data = {"feedback": [], "stats": {"total": 0, "positive": 0, "negative": 0}}
+    @staticmethod
+    def _empty() -> Dict:
+        return {"feedback": [], "stats": {"total": 0, "positive": 0, "negative": 0}}
 
-    def _save(self):
-        with open(self.feedback_file, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
+    def _document(self):
+        return json_document(self.feedback_file, default=self._empty)
+
+    def _load(self):
+        self.data = self._document().read()
 
     def add_feedback(
         self,
@@ -57,17 +57,18 @@ class FeedbackStore:
             "result_preview": result_preview[:500],
         }
 
-        self.data["feedback"].append(entry)
-        self.data["stats"]["total"] += 1
-        if rating == "positive":
-            self.data["stats"]["positive"] += 1
-        else:
-            self.data["stats"]["negative"] += 1
-
-        self._save()
+        with self._document().transaction() as tx:
+            tx.data["feedback"].append(entry)
+            tx.data["stats"]["total"] += 1
+            if rating == "positive":
+                tx.data["stats"]["positive"] += 1
+            else:
+                tx.data["stats"]["negative"] += 1
+            self.data = tx.data
         return entry
 
     def get_stats(self) -> Dict:
+        self._load()
         s = self.data["stats"]
         total = s["total"]
         if total == 0:
@@ -82,15 +83,18 @@ class FeedbackStore:
         }
 
     def get_recent(self, n: int = 10) -> List[Dict]:
+        self._load()
         return list(reversed(self.data["feedback"]))[:n]
 
     def get_negative_feedback(self) -> List[Dict]:
+        self._load()
         return [
             fb for fb in self.data["feedback"]
             if fb["rating"] == "negative"
         ]
 
     def get_feedback_by_type(self, gen_type: str) -> Dict:
+        self._load()
         items = [
             fb for fb in self.data["feedback"]
             if fb["generation_type"] == gen_type
@@ -1,63 +1,206 @@
 """
 Хранилище сессий генерации тест-кейсов.
 
-Файл: data/gen_sessions.json
+Файл: data/gen_sessions.sqlite3 (WAL)
+
+Раньше всё лежало в data/gen_sessions.json, и каждый update_session
+перечитывал и переписывал с indent=2 все 50 сессий — на сессии в 100 кейсов
+это сотни перезаписей мегабайт JSON, а параллельные сессии гонялись за файл.
+Теперь сессия — строка в sessions, каждый готовый кейс слоя 3 — строка в
+session_cases: обновление поля или добавление кейса трогает одну строку, а
+список сессий не читает qa_doc и кейсы. Старый JSON переносится при первом
+обращении и откладывается как gen_sessions.json.migrated.
+
+Готовые кейсы хранятся по индексу в case_list. cases в сессии — непрерывный
+с нуля префикс, cases_pending — готовые раньше предыдущих {индекс: кейс}.
 """
 
 import json
+import logging
+import sqlite3
+import threading
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 _ROOT = Path(__file__).resolve().parent.parent
-_SESSIONS_FILE = _ROOT / "data" / "gen_sessions.json"
+_DB_FILE = _ROOT / "data" / "gen_sessions.sqlite3"
+_LEGACY_FILE = _ROOT / "data" / "gen_sessions.json"
 _MAX_SESSIONS = 50
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id            TEXT PRIMARY KEY,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    requirement   TEXT NOT NULL DEFAULT '',
+    qa_doc        TEXT NOT NULL DEFAULT '',
+    case_list     TEXT NOT NULL DEFAULT '[]',
+    export_result TEXT,
+    meta          TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS ix_sessions_created ON sessions (created_at);
+CREATE TABLE IF NOT EXISTS session_cases (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    idx        INTEGER NOT NULL,
+    data       TEXT NOT NULL,
+    PRIMARY KEY (session_id, idx)
+);
+"""
+
+# Поля со своей колонкой; остальные (мелкие) — в JSON meta.
+_TEXT_COLUMNS = ("status", "requirement", "qa_doc", "created_at", "updated_at")
+_JSON_COLUMNS = ("case_list", "export_result")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
 
 class GenSessionsStore:
 
+    _init_lock = threading.Lock()
+    _ready_for: Optional[Path] = None
+
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(_DB_FILE), timeout=30)
+        conn.execute("PRAGMA foreign_keys=ON")
+        if cls._ready_for != _DB_FILE:
+            with cls._init_lock:
+                if cls._ready_for != _DB_FILE:
+                    _DB_FILE.parent.mkdir(parents=True, exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    cls._migrate_legacy(conn)
+                    cls._ready_for = _DB_FILE
+        return conn
+
+    @classmethod
+    def _migrate_legacy(cls, conn: sqlite3.Connection) -> None:
+        legacy = _LEGACY_FILE
+        if not legacy.exists() or conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone():
+            return
+        try:
+            with open(legacy, encoding="utf-8") as f:
+                sessions = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("gen_sessions.json не перенесён: %s", e)
+            return
+        with conn:
+            # В JSON сессии шли от новых к старым
+            for s in reversed(sessions):
+                s = dict(s)
+                cases = s.pop("cases", []) or []
+                pending = s.pop("cases_pending", {}) or {}
+                cls._insert(conn, s)
+                rows = [(s["id"], i, json.dumps(c, ensure_ascii=False)) for i, c in enumerate(cases)]
+                rows += [(s["id"], int(k), json.dumps(c, ensure_ascii=False)) for k, c in pending.items()]
+                conn.executemany("INSERT OR REPLACE INTO session_cases VALUES (?, ?, ?)", rows)
+        legacy.rename(legacy.with_suffix(".json.migrated"))
+        logger.info("gen_sessions.json перенесён в %s (%d сессий)", _DB_FILE.name, len(sessions))
+
     @staticmethod
-    def _load() -> list[dict]:
-        if not _SESSIONS_FILE.exists():
-            return []
-        with open(_SESSIONS_FILE, encoding="utf-8") as f:
-            return json.load(f)
+    def _insert(conn: sqlite3.Connection, session: dict) -> None:
+        meta = {k: v for k, v in session.items()
+                if k not in _TEXT_COLUMNS and k not in _JSON_COLUMNS and k != "id"}
+        conn.execute(
+            "INSERT INTO sessions (id, created_at, updated_at, status, requirement, qa_doc, "
+            "case_list, export_result, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session["id"], session["created_at"], session.get("updated_at", session["created_at"]),
+                session.get("status", ""), session.get("requirement", ""), session.get("qa_doc", ""),
+                json.dumps(session.get("case_list") or [], ensure_ascii=False),
+                json.dumps(session["export_result"], ensure_ascii=False)
+                if session.get("export_result") is not None else None,
+                json.dumps(meta, ensure_ascii=False),
+            ),
+        )
 
     @staticmethod
-    def _save(sessions: list[dict]) -> None:
-        _SESSIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_SESSIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(sessions, f, ensure_ascii=False, indent=2)
+    def _split_cases(rows) -> tuple[list[dict], dict[str, dict]]:
+        done = {idx: json.loads(data) for idx, data in rows}
+        cases = []
+        while len(cases) in done:
+            cases.append(done.pop(len(cases)))
+        return cases, {str(k): v for k, v in sorted(done.items())}
 
     @classmethod
     def list_sessions(cls, limit: int = 50, status: Optional[str] = None) -> list[dict]:
-        sessions = cls._load()
+        query = (
+            "SELECT id, created_at, updated_at, status, substr(requirement, 1, 200), "
+            "length(qa_doc) > 0, export_result IS NOT NULL, meta, "
+            "(SELECT COUNT(*) FROM session_cases c WHERE c.session_id = s.id) "
+            "FROM sessions s"
+        )
+        params: list = []
         if status:
-            sessions = [s for s in sessions if s.get("status") == status]
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC, rowid DESC LIMIT ?"
+        params.append(limit)
+        conn = cls._connect()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
         result = []
-        for s in sessions[:limit]:
-            summary = {k: v for k, v in s.items()
-                       if k not in ("cases", "qa_doc", "case_list", "events", "export_result")}
-            summary["case_count"] = len(s.get("cases", []))
-            summary["has_qa_doc"] = bool(s.get("qa_doc"))
-            summary["has_export"] = bool(s.get("export_result"))
-            # requirement в summary — первые 200 символов для отображения
-            req = s.get("requirement", "")
-            summary["requirement"] = req[:200] if req else ""
+        for sid, created, updated, st, req, has_qa, has_export, meta, case_count in rows:
+            summary = json.loads(meta)
+            summary.update({
+                "id": sid,
+                "created_at": created,
+                "updated_at": updated,
+                "status": st,
+                # requirement в summary — первые 200 символов для отображения
+                "requirement": req or "",
+                "case_count": case_count,
+                "has_qa_doc": bool(has_qa),
+                "has_export": bool(has_export),
+            })
             result.append(summary)
         return result
 
     @classmethod
     def get_session(cls, session_id: str) -> Optional[dict]:
-        for s in cls._load():
-            if s.get("id") == session_id:
-                return s
-        return None
+        conn = cls._connect()
+        try:
+            row = conn.execute(
+                "SELECT id, created_at, updated_at, status, requirement, qa_doc, case_list, "
+                "export_result, meta FROM sessions WHERE id = ?",
+                (session_id,),
+            ).fetchone()
+            if not row:
+                return None
+            case_rows = conn.execute(
+                "SELECT idx, data FROM session_cases WHERE session_id = ?", (session_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        sid, created, updated, status, requirement, qa_doc, case_list, export_result, meta = row
+        session = json.loads(meta)
+        cases, pending = cls._split_cases(case_rows)
+        session.update({
+            "id": sid,
+            "created_at": created,
+            "updated_at": updated,
+            "status": status,
+            "requirement": requirement,
+            "qa_doc": qa_doc,
+            "case_list": json.loads(case_list),
+            "cases": cases,
+            "cases_pending": pending,
+            "export_result": json.loads(export_result) if export_result else None,
+        })
+        return session
 
     @classmethod
     def create_session(cls, params: dict) -> dict:
-        now = datetime.now(timezone.utc).isoformat()
+        now = _now()
         session = {
             "id": uuid.uuid4().hex[:12],
             "status": "generating",
@@ -71,7 +214,6 @@ class GenSessionsStore:
             "qa_doc": "",
             "qa_doc_truncated": False,
             "case_list": [],
-            "cases": [],
             "elapsed": 0,
             "current_layer": 0,
             "layer3_progress": None,
@@ -79,29 +221,93 @@ class GenSessionsStore:
             "error_is_llm": False,
             "export_result": None,
         }
-        sessions = cls._load()
-        sessions.insert(0, session)
-        sessions = sessions[:_MAX_SESSIONS]
-        cls._save(sessions)
-        return session
+        conn = cls._connect()
+        try:
+            with conn:
+                cls._insert(conn, session)
+                conn.execute(
+                    "DELETE FROM sessions WHERE id NOT IN ("
+                    " SELECT id FROM sessions ORDER BY created_at DESC, rowid DESC LIMIT ?)",
+                    (_MAX_SESSIONS,),
+                )
+        finally:
+            conn.close()
+        # Кейсы слоя 3, готовые раньше предыдущих по порядку: {индекс: кейс}
+        return {**session, "cases": [], "cases_pending": {}}
+
+    @classmethod
+    def update_session(cls, session_id: str, **fields) -> bool:
+        """Обновить поля сессии. cases / cases_pending переписывают кейсы целиком —
+        для кейсов по одному есть save_case()."""
+        cases = fields.pop("cases", None)
+        pending = fields.pop("cases_pending", None)
+        fields["updated_at"] = _now()
+        assignments, params = [], []
+        meta_fields = {}
+        for key, value in fields.items():
+            if key in _TEXT_COLUMNS:
+                assignments.append(f"{key} = ?")
+                params.append(value if value is not None else "")
+            elif key in _JSON_COLUMNS:
+                assignments.append(f"{key} = ?")
+                params.append(json.dumps(value, ensure_ascii=False) if value is not None else None)
+            elif key != "id":
+                meta_fields[key] = value
+
+        conn = cls._connect()
+        try:
+            with conn:
+                # IMMEDIATE — meta читается и пишется под одной блокировкой записи,
+                # параллельные сессии не затирают поля друг друга.
+                conn.execute("BEGIN IMMEDIATE")
+                if meta_fields:
+                    row = conn.execute("SELECT meta FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                    if row:
+                        assignments.append("meta = ?")
+                        params.append(json.dumps({**json.loads(row[0]), **meta_fields}, ensure_ascii=False))
+                found = conn.execute(
+                    f"UPDATE sessions SET {', '.join(assignments)} WHERE id = ?", (*params, session_id),
+                ).rowcount
+                if found and (cases is not None or pending is not None):
+                    cls._replace_cases(conn, session_id, cases, pending)
+        finally:
+            conn.close()
+        return bool(found)
+
+    @classmethod
+    def _replace_cases(cls, conn, session_id: str, cases, pending) -> None:
+        rows = conn.execute("SELECT idx, data FROM session_cases WHERE session_id = ?", (session_id,)).fetchall()
+        cur_cases, cur_pending = cls._split_cases(rows)
+        cases = cur_cases if cases is None else cases
+        pending = cur_pending if pending is None else pending
+        conn.execute("DELETE FROM session_cases WHERE session_id = ?", (session_id,))
+        new_rows = [(session_id, i, json.dumps(c, ensure_ascii=False)) for i, c in enumerate(cases)]
+        new_rows += [(session_id, int(k), json.dumps(c, ensure_ascii=False)) for k, c in pending.items()]
+        conn.executemany("INSERT OR REPLACE INTO session_cases VALUES (?, ?, ?)", new_rows)
 
     @classmethod
-    def update_session(cls, session_id: str, **fields) -> Optional[dict]:
-        sessions = cls._load()
-        for i, s in enumerate(sessions):
-            if s.get("id") == session_id:
-                s.update(fields)
-                s["updated_at"] = datetime.now(timezone.utc).isoformat()
-                cls._save(sessions)
-                return s
-        return None
+    def save_case(cls, session_id: str, index: int, case: dict) -> bool:
+        """Сохранить готовый кейс слоя 3 под его индексом в case_list — одна строка."""
+        conn = cls._connect()
+        try:
+            with conn:
+                found = conn.execute(
+                    "UPDATE sessions SET updated_at = ? WHERE id = ?", (_now(), session_id),
+                ).rowcount
+                if found:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO session_cases VALUES (?, ?, ?)",
+                        (session_id, index, json.dumps(case, ensure_ascii=False)),
+                    )
+        finally:
+            conn.close()
+        return bool(found)
 
     @classmethod
     def delete_session(cls, session_id: str) -> bool:
-        sessions = cls._load()
-        before = len(sessions)
-        sessions = [s for s in sessions if s.get("id") != session_id]
-        if len(sessions) == before:
-            return False
-        cls._save(sessions)
-        return True
+        conn = cls._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+        finally:
+            conn.close()
@@ -19,13 +19,14 @@ jar_path имеет приоритет над jar_filename.
 Файлы: data/jdbc_drivers.json (метаданные), data/jdbc_drivers/ (загруженные .jar).
 """
 
-import json
 import re
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from db.json_store import json_document
+
 _ROOT = Path(__file__).resolve().parent.parent
 _DRIVERS_FILE = _ROOT / "data" / "jdbc_drivers.json"
 _JARS_DIR = _ROOT / "data" / "jdbc_drivers"
@@ -73,44 +74,36 @@ def _sanitize_filename(name: str) -> str:
 class JdbcDriversStore:
 
     @staticmethod
-    def _load_raw() -> list[dict]:
-        if not _DRIVERS_FILE.exists():
-            return []
-        with open(_DRIVERS_FILE, encoding="utf-8") as f:
-            return json.load(f)
-
-    @staticmethod
-    def _save(drivers: list[dict]) -> None:
-        _DRIVERS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_DRIVERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(drivers, f, ensure_ascii=False, indent=2)
+    def _missing_builtins(drivers: list[dict]) -> list[dict]:
+        existing_ids = {d.get("id") for d in drivers}
+        return [b for b in BUILTIN_DRIVERS if b["id"] not in existing_ids]
 
     @classmethod
-    def _load(cls) -> list[dict]:
-        """Читает драйверы с диска, досеивая встроенные (PostgreSQL/MySQL/Oracle), если их ещё нет."""
-        drivers = cls._load_raw()
-        existing_ids = {d.get("id") for d in drivers}
-        missing = [b for b in BUILTIN_DRIVERS if b["id"] not in existing_ids]
-        if missing:
-            now = datetime.now(timezone.utc).isoformat()
-            seeded = [
-                {**b, "jar_filename": None, "jar_path": None, "original_filename": None, "built_in": True, "created_at": now}
-                for b in missing
-            ]
-            drivers = seeded + drivers
-            cls._save(drivers)
-        return drivers
+    def _document(cls):
+        """Документ с драйверами, досеивая встроенные (PostgreSQL/MySQL/Oracle), если их ещё нет."""
+        doc = json_document(_DRIVERS_FILE)
+        if any(doc.get(b["id"]) is None for b in BUILTIN_DRIVERS):
+            with doc.transaction() as tx:
+                missing = cls._missing_builtins(tx.data)
+                if not missing:
+                    tx.save = False
+                else:
+                    now = datetime.now(timezone.utc).isoformat()
+                    seeded = [
+                        {**b, "jar_filename": None, "jar_path": None, "original_filename": None,
+                         "built_in": True, "created_at": now}
+                        for b in missing
+                    ]
+                    tx.data = seeded + tx.data
+        return doc
 
     @classmethod
     def list_drivers(cls) -> list[dict]:
-        return cls._load()
+        return cls._document().read()
 
     @classmethod
     def get_driver(cls, driver_id: str) -> Optional[dict]:
-        for d in cls._load():
-            if d.get("id") == driver_id:
-                return d
-        return None
+        return cls._document().get(driver_id)
 
     @classmethod
     def jar_path(cls, driver: dict) -> Optional[Path]:
@@ -153,24 +146,23 @@ class JdbcDriversStore:
             "built_in": False,
             "created_at": now,
         }
-        drivers = cls._load()
-        drivers.insert(0, driver)
-        cls._save(drivers)
+        with cls._document().transaction() as tx:
+            tx.data.insert(0, driver)
         return driver
 
     @classmethod
     def update_driver(cls, driver_id: str, data: dict) -> Optional[dict]:
         """Обновить настройки драйвера (вкладка «Настройки») — доступно и для встроенных."""
-        drivers = cls._load()
-        for d in drivers:
-            if d.get("id") == driver_id:
-                for field in ("name", "driver_class", "url_template", "default_db_name", "default_login"):
-                    if field in data:
-                        d[field] = data[field].strip() if isinstance(data[field], str) else data[field]
-                if "default_port" in data:
-                    d["default_port"] = int(data["default_port"]) if data["default_port"] else None
-                cls._save(drivers)
-                return d
+        with cls._document().transaction() as tx:
+            for d in tx.data:
+                if d.get("id") == driver_id:
+                    for field in ("name", "driver_class", "url_template", "default_db_name", "default_login"):
+                        if field in data:
+                            d[field] = data[field].strip() if isinstance(data[field], str) else data[field]
+                    if "default_port" in data:
+                        d["default_port"] = int(data["default_port"]) if data["default_port"] else None
+                    return d
+            tx.save = False
         return None
 
     @classmethod
@@ -184,58 +176,58 @@ class JdbcDriversStore:
     @classmethod
     def set_library(cls, driver_id: str, jar_bytes: bytes, original_filename: str) -> Optional[dict]:
         """Загрузить/заменить .jar драйвера через UI (файл копируется в data/jdbc_drivers/)."""
-        drivers = cls._load()
-        for d in drivers:
-            if d.get("id") == driver_id:
-                cls._unlink_uploaded(d)
-                jar_filename = f"{driver_id}_{_sanitize_filename(original_filename)}"
-                _JARS_DIR.mkdir(parents=True, exist_ok=True)
-                with open(_JARS_DIR / jar_filename, "wb") as f:
-                    f.write(jar_bytes)
-                d["jar_filename"] = jar_filename
-                d["jar_path"] = None           # загруженный файл вытесняет внешний путь
-                d["original_filename"] = original_filename
-                cls._save(drivers)
-                return d
+        with cls._document().transaction() as tx:
+            for d in tx.data:
+                if d.get("id") == driver_id:
+                    cls._unlink_uploaded(d)
+                    jar_filename = f"{driver_id}_{_sanitize_filename(original_filename)}"
+                    _JARS_DIR.mkdir(parents=True, exist_ok=True)
+                    with open(_JARS_DIR / jar_filename, "wb") as f:
+                        f.write(jar_bytes)
+                    d["jar_filename"] = jar_filename
+                    d["jar_path"] = None           # загруженный файл вытесняет внешний путь
+                    d["original_filename"] = original_filename
+                    return d
+            tx.save = False
         return None
 
     @classmethod
     def set_library_path(cls, driver_id: str, path: str) -> Optional[dict]:
         """Указать .jar по пути на машине (без копирования — рекомендуемый способ)."""
         path = path.strip()
-        drivers = cls._load()
-        for d in drivers:
-            if d.get("id") == driver_id:
-                cls._unlink_uploaded(d)         # если раньше был загруженный файл — уберём копию
-                d["jar_filename"] = None
-                d["jar_path"] = path
-                d["original_filename"] = Path(path).name
-                cls._save(drivers)
-                return d
+        with cls._document().transaction() as tx:
+            for d in tx.data:
+                if d.get("id") == driver_id:
+                    cls._unlink_uploaded(d)         # если раньше был загруженный файл — уберём копию
+                    d["jar_filename"] = None
+                    d["jar_path"] = path
+                    d["original_filename"] = Path(path).name
+                    return d
+            tx.save = False
         return None
 
     @classmethod
     def remove_library(cls, driver_id: str) -> Optional[dict]:
-        drivers = cls._load()
-        for d in drivers:
-            if d.get("id") == driver_id:
-                cls._unlink_uploaded(d)
-                d["jar_filename"] = None
-                d["jar_path"] = None            # внешний файл по пути НЕ удаляем — он не наш
-                d["original_filename"] = None
-                cls._save(drivers)
-                return d
+        with cls._document().transaction() as tx:
+            for d in tx.data:
+                if d.get("id") == driver_id:
+                    cls._unlink_uploaded(d)
+                    d["jar_filename"] = None
+                    d["jar_path"] = None            # внешний файл по пути НЕ удаляем — он не наш
+                    d["original_filename"] = None
+                    return d
+            tx.save = False
         return None
 
     @classmethod
     def delete_driver(cls, driver_id: str) -> bool:
         """Удалить пользовательский драйвер целиком. Встроенные драйверы удалить нельзя —
         для них можно только очистить библиотеку (remove_library)."""
-        drivers = cls._load()
-        target = next((d for d in drivers if d.get("id") == driver_id), None)
-        if not target or target.get("built_in"):
-            return False
-        drivers = [d for d in drivers if d.get("id") != driver_id]
-        cls._save(drivers)
+        with cls._document().transaction() as tx:
+            target = next((d for d in tx.data if d.get("id") == driver_id), None)
+            if not target or target.get("built_in"):
+                tx.save = False
+                return False
+            tx.data = [d for d in tx.data if d.get("id") != driver_id]
         cls._unlink_uploaded(target)   # чистим только нашу копию; внешний .jar по пути не трогаем
         return True
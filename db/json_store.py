@@ -0,0 +1,192 @@
+"""
+Общий слой для JSON-хранилищ под data/.
+
+Раньше каждое хранилище (AlertsStore, JobsStore, KafkaExplorerStore, ...)
+само читало файл целиком на каждый запрос, меняло и переписывало его без
+блокировок; атомарно писал только DatagenConfigStore. Два воркера uvicorn или
+два параллельных запроса могли затереть изменения друг друга, а обрыв записи
+оставлял обрезанный JSON.
+
+Здесь один механизм для всех:
+  • чтение — из кэша в памяти, пока у файла не сменились mtime/размер;
+    для коллекций (список записей с "id") — индекс по id;
+  • запись — только внутри transaction(): межпроцессная блокировка файла
+    (<имя>.lock), свежее чтение под ней, атомарная замена через tempfile;
+  • битый файл откладывается как .corrupted-<ts>, хранилище работает дальше.
+
+Наружу отдаются копии: вызывающий код может менять результат, не портя кэш.
+
+    doc = json_document(_FILE)
+    doc.get("abc")                      # запись по id
+    with doc.transaction() as tx:       # tx.data — свежая копия, можно менять/заменять
+        tx.data.append(item)            # tx.save = False — ничего не писать
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _clone(value: Any) -> Any:
+    """Копия JSON-совместимого значения — заметно быстрее copy.deepcopy."""
+    if isinstance(value, dict):
+        return {k: _clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_clone(v) for v in value]
+    return value
+
+
+@contextmanager
+def _file_lock(lock_path: Path) -> Iterator[None]:
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class Transaction:
+    def __init__(self, data: Any):
+        self.data = data
+        self.save = True
+
+
+class JsonDocument:
+    """Один JSON-файл: кэш по mtime, индекс по id, транзакции с блокировкой."""
+
+    def __init__(self, path: Path, default: Callable[[], Any] = list):
+        self.path = path
+        self._default = default
+        self._lock = threading.RLock()
+        self._stamp: Optional[tuple[int, int, int]] = None
+        self._data: Any = None
+        self._index: dict[str, dict] = {}
+
+    # ── Чтение ──────────────────────────────────────────────────────────────
+
+    def _stat(self) -> Optional[tuple[int, int, int]]:
+        # inode меняется при каждой атомарной замене — ловит и запись в тот же тик mtime
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _parse(self) -> Any:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._default()
+        except json.JSONDecodeError:
+            backup = self.path.with_name(f"{self.path.name}.corrupted-{int(datetime.now().timestamp())}")
+            try:
+                shutil.move(str(self.path), str(backup))
+                logger.warning("%s битый, перемещён в %s", self.path.name, backup)
+            except OSError:
+                logger.warning("%s битый и не удалось сохранить копию", self.path.name)
+            return self._default()
+
+    def _remember(self, data: Any, stamp: Optional[tuple[int, int, int]]) -> None:
+        self._data = data
+        self._stamp = stamp
+        self._index = (
+            {str(item["id"]): item for item in data if isinstance(item, dict) and item.get("id")}
+            if isinstance(data, list) else {}
+        )
+
+    def _current(self, fresh: bool = False) -> Any:
+        """Кэшированные данные (без копии) — перечитываются, если файл изменился."""
+        with self._lock:
+            stamp = self._stat()
+            if fresh and stamp is not None:
+                self._remember(self._parse(), stamp)
+            elif stamp is None:
+                self._remember(self._default(), None)
+            elif stamp != self._stamp:
+                self._remember(self._parse(), stamp)
+            return self._data
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def read(self) -> Any:
+        return _clone(self._current())
+
+    def get(self, item_id: str) -> Optional[dict]:
+        """Запись коллекции по id — без прохода по списку."""
+        with self._lock:
+            self._current()
+            item = self._index.get(str(item_id))
+            return _clone(item) if item is not None else None
+
+    # ── Запись ──────────────────────────────────────────────────────────────
+
+    def _write(self, data: Any) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=str(self.path.parent), prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def transaction(self) -> Iterator[Transaction]:
+        """Чтение-изменение-запись под блокировкой файла (и между процессами)."""
+        with self._lock, _file_lock(self.path.with_name(self.path.name + ".lock")):
+            # Под блокировкой файл читается заново: кэш по mtime — для чтений,
+            # а потерянное обновление из-за грубого mtime здесь недопустимо.
+            tx = Transaction(_clone(self._current(fresh=True)))
+            yield tx
+            if tx.save:
+                self._write(tx.data)
+                self._remember(_clone(tx.data), self._stat())
+
+    def write(self, data: Any) -> None:
+        with self.transaction() as tx:
+            tx.data = data
+
+
+_documents: dict[Path, JsonDocument] = {}
+_documents_lock = threading.Lock()
+
+
+def json_document(path: Path, default: Callable[[], Any] = list) -> JsonDocument:
+    """Общий на процесс JsonDocument для файла — кэш живёт между запросами."""
+    key = Path(path).resolve()
+    with _documents_lock:
+        doc = _documents.get(key)
+        if doc is None:
+            doc = _documents[key] = JsonDocument(key, default)
+        return doc
@@ -6,12 +6,13 @@ SASL/SSL) и выбирает его из дропдауна — отсюда «
 Файл: data/kafka_explorer_connections.json. Пароль маскируется при чтении.
 """
 
-import json
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from db.json_store import json_document
+
 _ROOT = Path(__file__).resolve().parent.parent
 _FILE = _ROOT / "data" / "kafka_explorer_connections.json"
 
@@ -48,22 +49,15 @@ _SEED_CONNECTIONS = [
 class KafkaExplorerStore:
 
     @staticmethod
-    def _load() -> list[dict]:
-        if not _FILE.exists():
-            seeded = [dict(c) for c in _SEED_CONNECTIONS]
-            KafkaExplorerStore._save(seeded)
-            return seeded
-        try:
-            with open(_FILE, encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return []
-
-    @staticmethod
-    def _save(items: list[dict]) -> None:
-        _FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_FILE, "w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False, indent=2)
+    def _document():
+        doc = json_document(_FILE)
+        if not doc.exists():
+            with doc.transaction() as tx:
+                if tx.data or doc.exists():
+                    tx.save = False
+                else:
+                    tx.data = [dict(c) for c in _SEED_CONNECTIONS]
+        return doc
 
     @staticmethod
     def _mask(conn: dict) -> dict:
@@ -74,15 +68,12 @@ class KafkaExplorerStore:
 
     @classmethod
     def list_connections(cls) -> list[dict]:
-        return [cls._mask(c) for c in cls._load()]
+        return [cls._mask(c) for c in cls._document().read()]
 
     @classmethod
     def get_connection(cls, conn_id: str) -> Optional[dict]:
         """Полное подключение (с паролем) — для подключения к брокеру."""
-        for c in cls._load():
-            if c.get("id") == conn_id:
-                return c
-        return None
+        return cls._document().get(conn_id)
 
     @classmethod
     def create_connection(cls, data: dict) -> dict:
@@ -103,40 +94,39 @@ class KafkaExplorerStore:
             "created_at": now,
             "updated_at": now,
         }
-        items = cls._load()
-        items.insert(0, conn)
-        cls._save(items)
+        with cls._document().transaction() as tx:
+            tx.data.insert(0, conn)
         return cls._mask(conn)
 
     @classmethod
     def update_connection(cls, conn_id: str, data: dict) -> Optional[dict]:
-        items = cls._load()
-        for c in items:
-            if c.get("id") == conn_id:
-                for field in _FIELDS:
-                    if field in data and data[field] is not None:
-                        val = data[field]
-                        c[field] = str(val).strip().upper() if field == "security_protocol" else str(val).strip()
-                if "ssl_verify" in data and data["ssl_verify"] is not None:
-                    c["ssl_verify"] = bool(data["ssl_verify"])
-                if "default_limit" in data and data["default_limit"]:
-                    c["default_limit"] = int(data["default_limit"])
-                # Пароль обновляем только если он НЕ маскированный
-                if "sasl_password" in data and data["sasl_password"] != _MASK:
-                    c["sasl_password"] = data["sasl_password"] or ""
-                c["updated_at"] = datetime.now(timezone.utc).isoformat()
-                cls._save(items)
-                return cls._mask(c)
+        with cls._document().transaction() as tx:
+            for c in tx.data:
+                if c.get("id") == conn_id:
+                    for field in _FIELDS:
+                        if field in data and data[field] is not None:
+                            val = data[field]
+                            c[field] = str(val).strip().upper() if field == "security_protocol" else str(val).strip()
+                    if "ssl_verify" in data and data["ssl_verify"] is not None:
+                        c["ssl_verify"] = bool(data["ssl_verify"])
+                    if "default_limit" in data and data["default_limit"]:
+                        c["default_limit"] = int(data["default_limit"])
+                    # Пароль обновляем только если он НЕ маскированный
+                    if "sasl_password" in data and data["sasl_password"] != _MASK:
+                        c["sasl_password"] = data["sasl_password"] or ""
+                    c["updated_at"] = datetime.now(timezone.utc).isoformat()
+                    return cls._mask(c)
+            tx.save = False
         return None
 
     @classmethod
     def delete_connection(cls, conn_id: str) -> bool:
-        items = cls._load()
-        before = len(items)
-        items = [c for c in items if c.get("id") != conn_id]
-        if len(items) == before:
-            return False
-        cls._save(items)
+        with cls._document().transaction() as tx:
+            before = len(tx.data)
+            tx.data = [c for c in tx.data if c.get("id") != conn_id]
+            if len(tx.data) == before:
+                tx.save = False
+                return False
         return True
 
     @staticmethod
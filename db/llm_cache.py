@@ -0,0 +1,184 @@
+"""
+Кэш ответов LLM по содержимому запроса.
+
+Файл: data/llm_cache.sqlite3
+
+Ключ — sha256 от (провайдер, модель, сообщения, temperature, max_tokens):
+одинаковый запрос (повторный прогон сессии с тем же требованием, resume,
+повторный анализ тех же ошибок из логов) отдаётся с диска, а не генерируется
+заново. Записи старше LLM_CACHE_TTL_SEC не отдаются; сверх
+LLM_CACHE_MAX_ENTRIES вытесняются давно не читанные (LRU).
+
+Кэш выключен по умолчанию (LLM_CACHE_ENABLED=1 включает): при temperature > 0
+пользователь, перезапуская генерацию, иногда как раз хочет другой ответ.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_ROOT = Path(__file__).resolve().parent.parent
+_CACHE_FILE = _ROOT / "data" / "llm_cache.sqlite3"
+
+_DEFAULT_TTL_SEC = 7 * 24 * 3600
+_DEFAULT_MAX_ENTRIES = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    provider    TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed ON responses (accessed_at);
+"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "") or default))
+    except ValueError:
+        return default
+
+
+def cache_key(provider: str, model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "messages": [[m.role, m.content] for m in messages],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        },
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """SQLite-хранилище ответов; счётчики hit/miss — на процесс."""
+
+    _lock = threading.Lock()
+    _ready_for: Optional[Path] = None
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("LLM_CACHE_ENABLED", "").lower() in ("1", "true", "yes")
+
+    @staticmethod
+    def _ttl() -> int:
+        return _env_int("LLM_CACHE_TTL_SEC", _DEFAULT_TTL_SEC)
+
+    @staticmethod
+    def _max_entries() -> int:
+        return _env_int("LLM_CACHE_MAX_ENTRIES", _DEFAULT_MAX_ENTRIES)
+
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(_CACHE_FILE), timeout=10)
+        if cls._ready_for != _CACHE_FILE:
+            with cls._lock:
+                _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                cls._ready_for = _CACHE_FILE
+        return conn
+
+    @classmethod
+    def get(cls, key: str) -> Optional[dict]:
+        """Ответ из кэша или None. Свежесть проверяется здесь же, попадание обновляет accessed_at."""
+        now = time.time()
+        try:
+            conn = cls._connect()
+            try:
+                with conn:
+                    row = conn.execute(
+                        "SELECT response, created_at FROM responses WHERE key = ?", (key,),
+                    ).fetchone()
+                    if row and now - row[1] <= cls._ttl():
+                        conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                    else:
+                        row = None
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Кэш — оптимизация: битый/занятый файл не должен ронять генерацию.
+            logger.warning("llm_cache: чтение не удалось: %s", e)
+            row = None
+        with cls._lock:
+            if row:
+                cls._hits += 1
+            else:
+                cls._misses += 1
+        return json.loads(row[0]) if row else None
+
+    @classmethod
+    def put(cls, key: str, provider: str, model: str, response: dict) -> None:
+        now = time.time()
+        try:
+            conn = cls._connect()
+            try:
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, provider, model, response, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, provider, model, json.dumps(response, ensure_ascii=False), now, now),
+                    )
+                    conn.execute("DELETE FROM responses WHERE created_at < ?", (now - cls._ttl(),))
+                    conn.execute(
+                        "DELETE FROM responses WHERE key IN ("
+                        " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (cls._max_entries(),),
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("llm_cache: запись не удалась: %s", e)
+
+    @classmethod
+    def stats(cls) -> dict:
+        entries = 0
+        if _CACHE_FILE.exists():
+            try:
+                conn = cls._connect()
+                try:
+                    entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning("llm_cache: статистика недоступна: %s", e)
+        with cls._lock:
+            hits, misses = cls._hits, cls._misses
+        total = hits + misses
+        return {
+            "enabled": cls.enabled(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "entries": entries,
+            "max_entries": cls._max_entries(),
+            "ttl_sec": cls._ttl(),
+        }
+
+    @classmethod
+    def clear(cls) -> int:
+        if not _CACHE_FILE.exists():
+            return 0
+        conn = cls._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM responses").rowcount
+        finally:
+            conn.close()
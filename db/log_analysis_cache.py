@@ -0,0 +1,192 @@
+"""
+Кэш LLM-анализа ошибок логов по fingerprint.
+
+Файл: data/log_analysis_cache.sqlite3
+
+Ключ — sha256 от (fingerprint, провайдер, модель). Раньше повторяющийся
+стектрейс заново уходил в LLM при каждом открытии /api/logs/analyze —
+во время инцидента одни и те же ошибки анализировались десятки раз. Теперь
+готовый анализ отдаётся отсюда, а в LLM идут только новые fingerprint.
+
+В отличие от db/llm_cache.py ключ не зависит от текста промпта: у записей
+одной группы разные время и счётчик повторов, а анализ у них один.
+Записи старше LOG_ANALYSIS_CACHE_TTL_SEC не отдаются; сверх
+LOG_ANALYSIS_CACHE_MAX_ENTRIES вытесняются давно не читанные (LRU).
+Включён по умолчанию (LOG_ANALYSIS_CACHE_ENABLED=0 выключает).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_ROOT = Path(__file__).resolve().parent.parent
+_CACHE_FILE = _ROOT / "data" / "log_analysis_cache.sqlite3"
+
+_DEFAULT_TTL_SEC = 7 * 24 * 3600
+_DEFAULT_MAX_ENTRIES = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    key         TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    provider    TEXT NOT NULL,
+    model       TEXT NOT NULL,
+    analysis    TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_analyses_accessed ON analyses (accessed_at);
+"""
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, "") or default))
+    except ValueError:
+        return default
+
+
+def analysis_key(fingerprint: str, provider: str, model: str) -> str:
+    payload = json.dumps([fingerprint, provider.lower(), model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LogAnalysisCache:
+    """SQLite-хранилище анализов; счётчики hit/miss — на процесс."""
+
+    _lock = threading.Lock()
+    _ready_for: Optional[Path] = None
+    _hits = 0
+    _misses = 0
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv("LOG_ANALYSIS_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+    @staticmethod
+    def _ttl() -> int:
+        return _env_int("LOG_ANALYSIS_CACHE_TTL_SEC", _DEFAULT_TTL_SEC)
+
+    @staticmethod
+    def _max_entries() -> int:
+        return _env_int("LOG_ANALYSIS_CACHE_MAX_ENTRIES", _DEFAULT_MAX_ENTRIES)
+
+    @classmethod
+    def _connect(cls) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(_CACHE_FILE), timeout=10)
+        if cls._ready_for != _CACHE_FILE:
+            with cls._lock:
+                _CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                cls._ready_for = _CACHE_FILE
+        return conn
+
+    @classmethod
+    def get_many(cls, fingerprints: list[str], provider: str, model: str) -> dict[str, dict]:
+        """{fingerprint: анализ} для свежих записей; попадания обновляют accessed_at."""
+        if not cls.enabled() or not fingerprints:
+            return {}
+        keys = {analysis_key(fp, provider, model): fp for fp in fingerprints}
+        now = time.time()
+        found: dict[str, dict] = {}
+        try:
+            conn = cls._connect()
+            try:
+                with conn:
+                    placeholders = ",".join("?" * len(keys))
+                    rows = conn.execute(
+                        f"SELECT key, analysis FROM analyses WHERE key IN ({placeholders}) AND created_at >= ?",
+                        (*keys, now - cls._ttl()),
+                    ).fetchall()
+                    if rows:
+                        conn.executemany(
+                            "UPDATE analyses SET accessed_at = ? WHERE key = ?",
+                            [(now, key) for key, _ in rows],
+                        )
+            finally:
+                conn.close()
+            found = {keys[key]: json.loads(analysis) for key, analysis in rows}
+        except sqlite3.Error as e:
+            # Кэш — оптимизация: битый/занятый файл не должен ронять анализ
+            logger.warning("log_analysis_cache: чтение не удалось: %s", e)
+        with cls._lock:
+            cls._hits += len(found)
+            cls._misses += len(keys) - len(found)
+        return found
+
+    @classmethod
+    def put_many(cls, analyses: dict[str, dict], provider: str, model: str) -> None:
+        """Сохранить {fingerprint: анализ}, вытеснить просроченные и лишние."""
+        if not cls.enabled() or not analyses:
+            return
+        now = time.time()
+        rows = [
+            (analysis_key(fp, provider, model), fp, provider.lower(), model,
+             json.dumps(analysis, ensure_ascii=False), now, now)
+            for fp, analysis in analyses.items()
+        ]
+        try:
+            conn = cls._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO analyses "
+                        "(key, fingerprint, provider, model, analysis, created_at, accessed_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - cls._ttl(),))
+                    conn.execute(
+                        "DELETE FROM analyses WHERE key IN ("
+                        " SELECT key FROM analyses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (cls._max_entries(),),
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("log_analysis_cache: запись не удалась: %s", e)
+
+    @classmethod
+    def stats(cls) -> dict:
+        entries = 0
+        if _CACHE_FILE.exists():
+            try:
+                conn = cls._connect()
+                try:
+                    entries = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+                finally:
+                    conn.close()
+            except sqlite3.Error as e:
+                logger.warning("log_analysis_cache: статистика недоступна: %s", e)
+        with cls._lock:
+            hits, misses = cls._hits, cls._misses
+        total = hits + misses
+        return {
+            "enabled": cls.enabled(),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "entries": entries,
+            "max_entries": cls._max_entries(),
+            "ttl_sec": cls._ttl(),
+        }
+
+    @classmethod
+    def clear(cls) -> int:
+        if not _CACHE_FILE.exists():
+            return 0
+        conn = cls._connect()
+        try:
+            with conn:
+                return conn.execute("DELETE FROM analyses").rowcount
+        finally:
+            conn.close()
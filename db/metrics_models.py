@@ -5,7 +5,7 @@ SQLAlchemy-модели для Генератора метрик.
 
 from sqlalchemy import (
     Column, Integer, String, Boolean, Numeric,
-    BigInteger, Text, DateTime, ForeignKey, func,
+    BigInteger, Text, DateTime, ForeignKey, Index, func,
 )
 from sqlalchemy.orm import relationship
 from db.postgres import Base
@@ -140,10 +140,18 @@ class TestMetricHealthConfig(Base):
 
 
 class GenerationLog(Base):
-    """Лог отправок (ротация: записи старше 7 дней удаляются)."""
+    """Лог отправок (ротация: записи старше METRICS_LOG_RETENTION_DAYS, по умолчанию 7 дней,
+    удаляет agents/generation_log_writer.purge_old_logs)."""
     __tablename__ = "generation_log"
-
-    id              = Column(BigInteger, primary_key=True, autoincrement=True)
+    __table_args__ = (
+        # История точек метрики, последние значения, логи в UI — всё по метрике и времени
+        Index("ix_generation_log_metric_sent", "test_metric_id", "sent_at"),
+        # Ротация удаляет по времени
+        Index("ix_generation_log_sent_at", "sent_at"),
+    )
+
+    # В SQLite автоинкремент есть только у INTEGER PRIMARY KEY — там BIGINT не подходит
+    id              = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     test_metric_id  = Column(Integer, ForeignKey("test_metrics.id"), nullable=False)
     sent_at         = Column(DateTime, server_default=func.now(), nullable=False)
     value_sent      = Column(Numeric, nullable=True)
@@ -61,6 +61,18 @@ def _apply_column_migrations():
             conn.execute(text(stmt))
 
 
+def _apply_index_migrations():
+    """Индексы, добавленные после создания таблиц (create_all их не создаёт
+    для уже существующих таблиц). CREATE INDEX IF NOT EXISTS есть и в SQLite."""
+    stmts = [
+        "CREATE INDEX IF NOT EXISTS ix_generation_log_metric_sent ON generation_log (test_metric_id, sent_at)",
+        "CREATE INDEX IF NOT EXISTS ix_generation_log_sent_at ON generation_log (sent_at)",
+    ]
+    with engine.begin() as conn:
+        for stmt in stmts:
+            conn.execute(text(stmt))
+
+
 def init_db():
     """Создать все таблицы если не существуют (идемпотентно).
 
@@ -68,7 +80,8 @@ def init_db():
     create_all. Первый успевает создать таблицы, второй получает IntegrityError
     на pg_catalog — это нормально, таблицы уже есть.
 
-    Для SQLite миграции пропускаются: create_all создаёт схему сразу актуальной.
+    Для SQLite миграции колонок пропускаются: create_all создаёт схему сразу
+    актуальной. Индексы догоняются в обеих БД (старые SQLite-файлы тоже).
     """
     from db.metrics_models import Base as MetricsBase  # noqa: F401
     from sqlalchemy.exc import IntegrityError
@@ -76,6 +89,7 @@ def init_db():
         MetricsBase.metadata.create_all(bind=engine)
         if not _is_sqlite:
             _apply_column_migrations()
+        _apply_index_migrations()
     except IntegrityError:
         # Race condition: другой воркер уже создал таблицы — всё OK
         pass
@@ -13,16 +13,12 @@
 бэкенд (не в облаке, без внешних зависимостей вроде huggingface.co).
 """
 
-import json
-import logging
-import os
-import shutil
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
-logger = logging.getLogger(__name__)
+from db.json_store import json_document
 
 _ROOT = Path(__file__).resolve().parent.parent
 _FILE = _ROOT / "data" / "requirements.json"
@@ -31,33 +27,9 @@ _MAX_ITEMS = 500
 
 class RequirementsStore:
 
-    @staticmethod
-    def _load() -> list[dict]:
-        if not _FILE.exists():
-            return []
-        try:
-            with open(_FILE, encoding="utf-8") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            backup = _FILE.with_suffix(f".json.corrupted-{int(datetime.now().timestamp())}")
-            try:
-                shutil.move(str(_FILE), str(backup))
-                logger.warning("requirements.json битый, перемещён в %s", backup)
-            except OSError:
-                logger.warning("requirements.json битый и не удалось сохранить копию")
-            return []
-
-    @staticmethod
-    def _save(items: list[dict]) -> None:
-        _FILE.parent.mkdir(parents=True, exist_ok=True)
-        tmp_path = _FILE.with_suffix(".json.tmp")
-        with open(tmp_path, "w", encoding="utf-8") as f:
-            json.dump(items, f, ensure_ascii=False, indent=2)
-        os.replace(tmp_path, _FILE)
-
     @classmethod
     def list_requirements(cls, feature: str = "") -> list[dict]:
-        items = cls._load()
+        items = json_document(_FILE).read()
         if feature:
             f = feature.strip().lower()
             items = [i for i in items if f in str(i.get("feature", "")).lower()]
@@ -65,10 +37,7 @@ class RequirementsStore:
 
     @classmethod
     def get_requirement(cls, req_id: str) -> Optional[dict]:
-        for i in cls._load():
-            if i.get("id") == req_id:
-                return i
-        return None
+        return json_document(_FILE).get(req_id)
 
     @classmethod
     def add_requirement(cls, name: str, feature: str, text: str,
@@ -89,29 +58,27 @@ class RequirementsStore:
             "created_at": now,
             "updated_at": now,
         }
-        items = cls._load()
-        items.insert(0, item)
-        items = items[:_MAX_ITEMS]
-        cls._save(items)
+        with json_document(_FILE).transaction() as tx:
+            tx.data = [item] + tx.data[:_MAX_ITEMS - 1]
         return item
 
     @classmethod
     def update_requirement(cls, req_id: str, **fields) -> Optional[dict]:
-        items = cls._load()
-        for i in items:
-            if i.get("id") == req_id:
-                i.update(fields)
-                i["updated_at"] = datetime.now(timezone.utc).isoformat()
-                cls._save(items)
-                return i
+        with json_document(_FILE).transaction() as tx:
+            for i in tx.data:
+                if i.get("id") == req_id:
+                    i.update(fields)
+                    i["updated_at"] = datetime.now(timezone.utc).isoformat()
+                    return i
+            tx.save = False
         return None
 
     @classmethod
     def delete_requirement(cls, req_id: str) -> bool:
-        items = cls._load()
-        before = len(items)
-        items = [i for i in items if i.get("id") != req_id]
-        if len(items) == before:
-            return False
-        cls._save(items)
+        with json_document(_FILE).transaction() as tx:
+            before = len(tx.data)
+            tx.data = [i for i in tx.data if i.get("id") != req_id]
+            if len(tx.data) == before:
+                tx.save = False
+                return False
         return True
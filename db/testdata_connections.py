@@ -4,35 +4,23 @@
 Файл: data/testdata_connections.json
 """
 
-import json
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
+from db.json_store import json_document
+
 _ROOT = Path(__file__).resolve().parent.parent
 _CONNECTIONS_FILE = _ROOT / "data" / "testdata_connections.json"
 
 
 class TestDataConnectionsStore:
 
-    @staticmethod
-    def _load() -> list[dict]:
-        if not _CONNECTIONS_FILE.exists():
-            return []
-        with open(_CONNECTIONS_FILE, encoding="utf-8") as f:
-            return json.load(f)
-
-    @staticmethod
-    def _save(connections: list[dict]) -> None:
-        _CONNECTIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(_CONNECTIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(connections, f, ensure_ascii=False, indent=2)
-
     @classmethod
     def list_connections(cls) -> list[dict]:
         """Список подключений (пароль маскируется)."""
-        conns = cls._load()
+        conns = json_document(_CONNECTIONS_FILE).read()
         result = []
         for c in conns:
             safe = {**c}
@@ -44,10 +32,7 @@ class TestDataConnectionsStore:
     @classmethod
     def get_connection(cls, conn_id: str) -> Optional[dict]:
         """Получить подключение по ID (полное, с паролем)."""
-        for c in cls._load():
-            if c.get("id") == conn_id:
-                return c
-        return None
+        return json_document(_CONNECTIONS_FILE).get(conn_id)
 
     @classmethod
     def get_connection_safe(cls, conn_id: str) -> Optional[dict]:
@@ -76,49 +61,48 @@ class TestDataConnectionsStore:
             "cached_schema": None,
             "schema_updated_at": None,
         }
-        connections = cls._load()
-        connections.insert(0, conn)
-        cls._save(connections)
+        with json_document(_CONNECTIONS_FILE).transaction() as tx:
+            tx.data.insert(0, conn)
         return conn
 
     @classmethod
     def update_connection(cls, conn_id: str, data: dict) -> Optional[dict]:
-        connections = cls._load()
-        for c in connections:
-            if c.get("id") == conn_id:
-                # Обновляем только переданные поля
-                for field in ("display_name", "driver_id", "host", "port",
-                              "db_name", "login", "schema_name"):
-                    if field in data:
-                        c[field] = data[field]
-                # Пароль обновляем только если он не маскированный
-                if "password" in data and data["password"] != "••••••••":
-                    c["password"] = data["password"]
-                if "port" in data:
-                    c["port"] = int(data["port"])
-                c["updated_at"] = datetime.now(timezone.utc).isoformat()
-                cls._save(connections)
-                return c
+        with json_document(_CONNECTIONS_FILE).transaction() as tx:
+            for c in tx.data:
+                if c.get("id") == conn_id:
+                    # Обновляем только переданные поля
+                    for field in ("display_name", "driver_id", "host", "port",
+                                  "db_name", "login", "schema_name"):
+                        if field in data:
+                            c[field] = data[field]
+                    # Пароль обновляем только если он не маскированный
+                    if "password" in data and data["password"] != "••••••••":
+                        c["password"] = data["password"]
+                    if "port" in data:
+                        c["port"] = int(data["port"])
+                    c["updated_at"] = datetime.now(timezone.utc).isoformat()
+                    return c
+            tx.save = False
         return None
 
     @classmethod
     def delete_connection(cls, conn_id: str) -> bool:
-        connections = cls._load()
-        before = len(connections)
-        connections = [c for c in connections if c.get("id") != conn_id]
-        if len(connections) == before:
-            return False
-        cls._save(connections)
+        with json_document(_CONNECTIONS_FILE).transaction() as tx:
+            before = len(tx.data)
+            tx.data = [c for c in tx.data if c.get("id") != conn_id]
+            if len(tx.data) == before:
+                tx.save = False
+                return False
         return True
 
     @classmethod
     def update_cached_schema(cls, conn_id: str, schema: dict) -> Optional[dict]:
         """Обновить кэш схемы после introspect."""
-        connections = cls._load()
-        for c in connections:
-            if c.get("id") == conn_id:
-                c["cached_schema"] = schema
-                c["schema_updated_at"] = datetime.now(timezone.utc).isoformat()
-                cls._save(connections)
-                return c
+        with json_document(_CONNECTIONS_FILE).transaction() as tx:
+            for c in tx.data:
+                if c.get("id") == conn_id:
+                    c["cached_schema"] = schema
+                    c["schema_updated_at"] = datetime.now(timezone.utc).isoformat()
+                    return c
+            tx.save = False
         return None
@@ -1,10 +1,29 @@
 """
 Векторная БД для хранения эталонов.
+
+VectorStore один на процесс — get_vector_store(). Раньше каждый запрос
+эталонов и генерации создавал свой: заново открывал PersistentClient и
+DefaultEmbeddingFunction, а первый эмбеддинг грузил ONNX-модель — это и было
+основное время первого запроса. Теперь хранилище создаётся в lifespan
+backend/main.py и прогревается пустым эмбеддингом (VECTOR_STORE_PREWARM=0
+отключает прогрев).
+
+Массовая загрузка — add_*_bulk(): эмбеддинги считаются пачками по
+VECTOR_STORE_BATCH_SIZE документов, upsert в Chroma — теми же пачками, а не
+по одному документу на вызов.
+
+Контекстные документы режутся на перекрывающиеся фрагменты (context_passages,
+doc_id/offset в metadata). Поиск идёт по фрагментам, find_context_passages()
+склеивает лучшие из них по документам в пределах бюджета токенов — в промпт
+попадает нужный кусок длинной спецификации, а не её первые 3000 символов.
 """
 
 from __future__ import annotations
 
 import json
+import logging
+import os
+import threading
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
@@ -12,9 +31,44 @@ import chromadb
 from chromadb.utils import embedding_functions
 
 
+logger = logging.getLogger(__name__)
+
 DB_DIR = Path(__file__).resolve().parent
 CHROMA_DIR = DB_DIR / "chroma_data"
 
+_DEFAULT_BATCH_SIZE = 64
+
+_PASSAGE_CHARS = 1200
+_PASSAGE_OVERLAP = 200
+_CHARS_PER_TOKEN = 3          # грубо для русского текста
+_DEFAULT_CONTEXT_TOKENS = 3000
+
+_store: Optional["VectorStore"] = None
+_store_lock = threading.Lock()
+
+
+def _split_passages(text: str, size: int = _PASSAGE_CHARS,
+                    overlap: int = _PASSAGE_OVERLAP) -> List[tuple[int, str]]:
+    """Текст → [(offset, фрагмент)] с перекрытием. Граница фрагмента по
+    возможности сдвигается к концу абзаца/строки/предложения."""
+    if len(text) <= size:
+        return [(0, text)]
+    passages = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            for sep in ("\n\n", "\n", ". "):
+                cut = text.rfind(sep, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(sep)
+                    break
+        passages.append((start, text[start:end]))
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return passages
+
 
 def _build_where(platform: str = "", feature: str = "") -> Optional[Dict]:
     conditions = []
@@ -39,8 +93,22 @@ class VectorStore:
         self.persist_dir = str(persist_dir or CHROMA_DIR)
         self.client = chromadb.PersistentClient(path=self.persist_dir)
         self.ef = embedding_functions.DefaultEmbeddingFunction()
+        self._warm_lock = threading.Lock()
+        self._warm = False
         self._init_collections()
 
+    def warm_up(self) -> None:
+        """Загрузить модель эмбеддингов заранее — одним пробным эмбеддингом.
+        Под блокировкой: параллельные первые запросы не грузят модель дважды
+        (поиск и загрузка вызывают warm_up первым делом; после прогрева это
+        одна проверка флага)."""
+        if self._warm:
+            return
+        with self._warm_lock:
+            if not self._warm:
+                self.ef(["прогрев"])
+                self._warm = True
+
     def _init_collections(self):
         self.requirements = self.client.get_or_create_collection(
             name="requirements",
@@ -72,12 +140,17 @@ class VectorStore:
             metadata={"description": "Контекстные документы и требования для RAG"},
             embedding_function=self.ef
         )
+        self.context_passages = self.client.get_or_create_collection(
+            name="context_passages",
+            metadata={"description": "Фрагменты контекстных документов для поиска"},
+            embedding_function=self.ef
+        )
 
     # ── Тест-кейсы (существующие) ─────────────────────────────────────────────
 
-    def add_requirement(self, req_id: str, content: str, platform: str = "",
-                        feature: str = "", content_type: str = "text",
-                        tags: List[str] = None, extra_metadata: Dict[str, Any] = None):
+    @staticmethod
+    def _requirement_metadata(platform: str = "", feature: str = "", content_type: str = "text",
+                              tags: List[str] = None, extra_metadata: Dict[str, Any] = None) -> Dict:
         metadata = {
             "platform": platform,
             "feature": feature,
@@ -86,20 +159,38 @@ class VectorStore:
         }
         if extra_metadata:
             metadata.update(extra_metadata)
+        return metadata
+
+    def add_requirement(self, req_id: str, content: str, platform: str = "",
+                        feature: str = "", content_type: str = "text",
+                        tags: List[str] = None, extra_metadata: Dict[str, Any] = None):
+        metadata = self._requirement_metadata(platform, feature, content_type, tags, extra_metadata)
         self.requirements.upsert(ids=[req_id], documents=[content], metadatas=[metadata])
 
+    def add_requirements_bulk(self, items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """Пачкой: items — kwargs add_requirement (req_id, content, ...)."""
+        return len(self._upsert_bulk(
+            self.requirements,
+            [(i["req_id"], i["content"], self._requirement_metadata(
+                i.get("platform", ""), i.get("feature", ""), i.get("content_type", "text"),
+                i.get("tags"), i.get("extra_metadata"),
+            )) for i in items],
+            batch_size,
+        ))
+
     def find_similar_requirements(self, query: str, n_results: int = 5,
                                    platform: str = "", feature: str = "") -> List[Dict]:
+        self.warm_up()
         results = self.requirements.query(
             query_texts=[query], n_results=n_results,
             where=_build_where(platform, feature)
         )
         return self._format_results(results)
 
-    def add_test_case(self, tc_id: str, content: str, name: str = "",
-                      platform: str = "", feature: str = "", priority: str = "medium",
-                      element_type: str = "test_case", tags: List[str] = None,
-                      extra_metadata: Dict[str, Any] = None):
+    @staticmethod
+    def _test_case_metadata(name: str = "", platform: str = "", feature: str = "",
+                            priority: str = "medium", element_type: str = "test_case",
+                            tags: List[str] = None, extra_metadata: Dict[str, Any] = None) -> Dict:
         metadata = {
             "name": name, "platform": platform, "feature": feature,
             "priority": priority, "element_type": element_type,
@@ -107,20 +198,40 @@ class VectorStore:
         }
         if extra_metadata:
             metadata.update(extra_metadata)
+        return metadata
+
+    def add_test_case(self, tc_id: str, content: str, name: str = "",
+                      platform: str = "", feature: str = "", priority: str = "medium",
+                      element_type: str = "test_case", tags: List[str] = None,
+                      extra_metadata: Dict[str, Any] = None):
+        metadata = self._test_case_metadata(name, platform, feature, priority, element_type, tags, extra_metadata)
         self.test_cases.upsert(ids=[tc_id], documents=[content], metadatas=[metadata])
 
+    def add_test_cases_bulk(self, items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """Пачкой: items — kwargs add_test_case (tc_id, content, ...)."""
+        return len(self._upsert_bulk(
+            self.test_cases,
+            [(i["tc_id"], i["content"], self._test_case_metadata(
+                i.get("name", ""), i.get("platform", ""), i.get("feature", ""),
+                i.get("priority", "medium"), i.get("element_type", "test_case"),
+                i.get("tags"), i.get("extra_metadata"),
+            )) for i in items],
+            batch_size,
+        ))
+
     def find_similar_test_cases(self, query: str, n_results: int = 5,
                                  platform: str = "", feature: str = "") -> List[Dict]:
+        self.warm_up()
         results = self.test_cases.query(
             query_texts=[query], n_results=n_results,
             where=_build_where(platform, feature)
         )
         return self._format_results(results)
 
-    def add_pair(self, pair_id: str, requirement_text: str, test_case_xml: str,
-                 platform: str = "", feature: str = "", name: str = "",
-                 tags: List[str] = None, qa_doc: str = ""):
-        metadata = {
+    @staticmethod
+    def _pair_metadata(test_case_xml: str, platform: str = "", feature: str = "", name: str = "",
+                       tags: List[str] = None, qa_doc: str = "") -> Dict:
+        return {
             "test_case_xml": test_case_xml,
             "platform": platform,
             "feature": feature,
@@ -128,10 +239,27 @@ class VectorStore:
             "tags": json.dumps(tags or [], ensure_ascii=False),
             "qa_doc": qa_doc or "",
         }
+
+    def add_pair(self, pair_id: str, requirement_text: str, test_case_xml: str,
+                 platform: str = "", feature: str = "", name: str = "",
+                 tags: List[str] = None, qa_doc: str = ""):
+        metadata = self._pair_metadata(test_case_xml, platform, feature, name, tags, qa_doc)
         self.pairs.upsert(ids=[pair_id], documents=[requirement_text], metadatas=[metadata])
 
+    def add_pairs_bulk(self, items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """Пачкой: items — kwargs add_pair (pair_id, requirement_text, test_case_xml, ...)."""
+        return len(self._upsert_bulk(
+            self.pairs,
+            [(i["pair_id"], i["requirement_text"], self._pair_metadata(
+                i["test_case_xml"], i.get("platform", ""), i.get("feature", ""), i.get("name", ""),
+                i.get("tags"), i.get("qa_doc", ""),
+            )) for i in items],
+            batch_size,
+        ))
+
     def find_similar_pairs(self, query: str, n_results: int = 3,
                             platform: str = "", feature: str = "") -> List[Dict]:
+        self.warm_up()
         results = self.pairs.query(
             query_texts=[query], n_results=n_results,
             where=_build_where(platform, feature)
@@ -143,6 +271,7 @@ class VectorStore:
     def add_autotest_pair(self, pair_id: str, xml_text: str, java_text: str,
                           feature: str = "", name: str = ""):
         """Пара: XML мануальный кейс (документ) → Java автотест (metadata)."""
+        self.warm_up()
         metadata = {
             "java_text": java_text,
             "feature": feature,
@@ -152,6 +281,7 @@ class VectorStore:
 
     def find_similar_autotests(self, query: str, n_results: int = 3,
                                 feature: str = "") -> List[Dict]:
+        self.warm_up()
         where = {"feature": feature} if feature else None
         results = self.autotest_pairs.query(
             query_texts=[query], n_results=n_results, where=where
@@ -163,6 +293,7 @@ class VectorStore:
     def add_defect_pair(self, pair_id: str, description: str, defect_body: str,
                         feature: str = "", name: str = ""):
         """Пара: описание дефекта (документ) → тело дефекта (metadata)."""
+        self.warm_up()
         metadata = {
             "defect_body": defect_body,
             "feature": feature,
@@ -172,6 +303,7 @@ class VectorStore:
 
     def find_similar_defects(self, query: str, n_results: int = 3,
                               feature: str = "") -> List[Dict]:
+        self.warm_up()
         where = {"feature": feature} if feature else None
         results = self.defect_pairs.query(
             query_texts=[query], n_results=n_results, where=where
@@ -183,24 +315,163 @@ class VectorStore:
     def add_context_doc(self, doc_id: str, content: str, name: str = "",
                         doc_type: str = "document", feature: str = "",
                         filename: str = ""):
-        metadata = {
-            "name": name,
-            "doc_type": doc_type,
-            "feature": feature,
-            "filename": filename,
+        self.add_context_docs_bulk([{
+            "doc_id": doc_id, "content": content, "name": name,
+            "doc_type": doc_type, "feature": feature, "filename": filename,
+        }])
+
+    @staticmethod
+    def _context_metadata(item: Dict[str, Any]) -> Dict:
+        return {
+            "name": item.get("name", ""),
+            "doc_type": item.get("doc_type", "document"),
+            "feature": item.get("feature", ""),
+            "filename": item.get("filename", ""),
         }
-        self.context_docs.upsert(ids=[doc_id], documents=[content], metadatas=[metadata])
+
+    def _index_passages(self, docs: List[tuple], batch_size: Optional[int]) -> Dict[str, Any]:
+        """docs — (doc_id, текст, metadata). Перезаписывает фрагменты документов,
+        возвращает эмбеддинги фрагментов по id."""
+        doc_ids = [d[0] for d in docs]
+        if doc_ids:
+            self.context_passages.delete(where={"doc_id": {"$in": doc_ids}})
+        rows = [
+            (f"{doc_id}#{offset}", text, {**meta, "doc_id": doc_id, "offset": offset})
+            for doc_id, content, meta in docs
+            for offset, text in _split_passages(content)
+        ]
+        return self._upsert_bulk(self.context_passages, rows, batch_size)
+
+    def add_context_docs_bulk(self, items: List[Dict[str, Any]], batch_size: Optional[int] = None) -> int:
+        """Пачкой: items — kwargs add_context_doc (doc_id, content, name, ...).
+
+        Документ целиком остаётся в context_docs (список/удаление в UI), его
+        вектор — среднее векторов фрагментов: модель не гоняется второй раз."""
+        import numpy as np
+
+        docs = list({i["doc_id"]: (i["doc_id"], i["content"], self._context_metadata(i)) for i in items}.values())
+        by_doc: Dict[str, list] = {}
+        for passage_id, vector in self._index_passages(docs, batch_size).items():
+            by_doc.setdefault(passage_id.rsplit("#", 1)[0], []).append(vector)
+        size = self._batch_size(batch_size)
+        for start in range(0, len(docs), size):
+            chunk = docs[start:start + size]
+            self.context_docs.upsert(
+                ids=[d[0] for d in chunk],
+                documents=[d[1] for d in chunk],
+                embeddings=[
+                    np.mean(np.asarray(by_doc[d[0]], dtype=np.float32), axis=0).tolist() for d in chunk
+                ],
+                metadatas=[d[2] for d in chunk],
+            )
+        return len(docs)
+
+    def delete_context_doc(self, doc_id: str) -> None:
+        self.context_docs.delete(ids=[doc_id])
+        self.context_passages.delete(where={"doc_id": doc_id})
+
+    def reindex_context_docs(self, batch_size: Optional[int] = None) -> int:
+        """Нарезать на фрагменты документы, загруженные до появления фрагментов."""
+        indexed = {m.get("doc_id") for m in self.context_passages.get(include=["metadatas"])["metadatas"] or []}
+        existing = self.context_docs.get(include=["documents", "metadatas"])
+        docs = [
+            (doc_id, existing["documents"][i] or "", existing["metadatas"][i] or {})
+            for i, doc_id in enumerate(existing["ids"]) if doc_id not in indexed
+        ]
+        if docs:
+            self._index_passages(docs, batch_size)
+            logger.info("context_docs: нарезано на фрагменты %d документов", len(docs))
+        return len(docs)
 
     def find_similar_context_docs(self, query: str, n_results: int = 5,
                                    feature: str = "") -> List[Dict]:
+        self.warm_up()
         where = {"feature": feature} if feature else None
         results = self.context_docs.query(
             query_texts=[query], n_results=n_results, where=where
         )
         return self._format_results(results)
 
+    def find_context_passages(self, query: str, n_results: int = 12, feature: str = "",
+                              token_budget: Optional[int] = None) -> List[Dict]:
+        """Лучшие фрагменты, склеенные по документам в пределах бюджета токенов.
+
+        Возвращает [{"doc_id", "name", "text", "distance"}] — документы по
+        лучшему фрагменту; внутри документа фрагменты идут по offset, перекрытия
+        схлопываются, разрывы помечаются «…».
+        """
+        self.warm_up()
+        if token_budget is None:
+            try:
+                token_budget = int(os.getenv("CONTEXT_DOCS_TOKEN_BUDGET", "") or _DEFAULT_CONTEXT_TOKENS)
+            except ValueError:
+                token_budget = _DEFAULT_CONTEXT_TOKENS
+        where = {"feature": feature} if feature else None
+        hits = self._format_results(self.context_passages.query(
+            query_embeddings=self.ef([query]), n_results=n_results, where=where,
+        ))
+
+        budget = token_budget * _CHARS_PER_TOKEN
+        by_doc: Dict[str, Dict] = {}
+        for hit in hits:           # уже по возрастанию distance
+            text = hit["document"] or ""
+            if not text or len(text) > budget:
+                continue
+            budget -= len(text)
+            meta = hit["metadata"] or {}
+            doc = by_doc.setdefault(meta.get("doc_id", hit["id"]), {
+                "doc_id": meta.get("doc_id", hit["id"]),
+                "name": meta.get("name", ""),
+                "distance": hit["distance"],
+                "passages": [],
+            })
+            doc["passages"].append((int(meta.get("offset", 0)), text))
+
+        merged = []
+        for doc in by_doc.values():
+            parts, end = [], -1
+            for offset, text in sorted(doc.pop("passages")):
+                if parts and offset < end:
+                    if offset + len(text) > end:
+                        parts[-1] += text[end - offset:]
+                        end = offset + len(text)
+                    continue
+                parts.append(text)
+                end = offset + len(text)
+            merged.append({**doc, "text": "\n…\n".join(parts)})
+        return merged
+
     # ── Общие ─────────────────────────────────────────────────────────────────
 
+    def _batch_size(self, batch_size: Optional[int]) -> int:
+        if not batch_size:
+            try:
+                batch_size = int(os.getenv("VECTOR_STORE_BATCH_SIZE", "") or _DEFAULT_BATCH_SIZE)
+            except ValueError:
+                batch_size = _DEFAULT_BATCH_SIZE
+        # Больше max_batch_size Chroma не примет одним upsert
+        return max(1, min(batch_size, self.client.get_max_batch_size()))
+
+    def _upsert_bulk(self, collection, rows: List[tuple], batch_size: Optional[int]) -> Dict[str, Any]:
+        """rows — (id, документ, metadata). Эмбеддинг и upsert пачками; повтор id —
+        последний побеждает. Возвращает посчитанные эмбеддинги по id."""
+        self.warm_up()
+        unique = list({row[0]: row for row in rows}.values())
+        size = self._batch_size(batch_size)
+        vectors: Dict[str, Any] = {}
+        for start in range(0, len(unique), size):
+            chunk = unique[start:start + size]
+            documents = [row[1] for row in chunk]
+            embeddings = self.ef(documents)
+            collection.upsert(
+                ids=[row[0] for row in chunk],
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=[row[2] for row in chunk],
+            )
+            vectors.update(zip((row[0] for row in chunk), embeddings))
+        return vectors
+
     def _format_results(self, results) -> List[Dict]:
         formatted = []
         if not results or not results["ids"] or not results["ids"][0]:
@@ -232,4 +503,28 @@ class VectorStore:
         self.client.delete_collection("autotest_pairs")
         self.client.delete_collection("defect_pairs")
         self.client.delete_collection("context_docs")
+        self.client.delete_collection("context_passages")
         self._init_collections()
+
+
+def get_vector_store() -> VectorStore:
+    """Общий на процесс VectorStore (PersistentClient и модель эмбеддингов одни на всех)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+    return _store
+
+
+def init_vector_store(prewarm: bool = True) -> VectorStore:
+    """Создать общий VectorStore на старте, если нужно — прогреть модель.
+
+    Контекстные документы без фрагментов нарезаются всегда, независимо от
+    prewarm: find_context_passages ищет только по context_passages, и без
+    нарезки старые документы перестали бы попадать в контекст генерации."""
+    store = get_vector_store()
+    if prewarm:
+        store.warm_up()
+    store.reindex_context_docs()
+    return store
@@ -1023,6 +1023,11 @@ export default function LogsSection() {
                       → {result.unique_count} уникальных
                     </span>
                   )}
+                  {result.truncated && (
+                    <span className="text-xs text-amber-700">
+                      загружены первые {result.entries.length} — сузьте период или фильтры
+                    </span>
+                  )}
                   {result.services_found.length > 0 && (
                     <span className="text-xs text-text-muted">
                       в {result.services_found.length} сервис{
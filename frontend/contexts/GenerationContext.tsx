@@ -273,6 +273,12 @@ export function GenerationProvider({ children }: { children: ReactNode }) {
         setEvents(prev => [...prev, {
           type: "layer_start", layer: msg.layer as number, name: msg.name as string,
         }]);
+        if (msg.layer === 1) setQaDoc("");
+        break;
+
+      case "layer_delta":
+        // QA-документ приходит потоком; layer_done затем присылает итоговый текст целиком
+        if (msg.layer === 1) setQaDoc(prev => prev + (msg.text as string));
         break;
 
       case "layer_done":
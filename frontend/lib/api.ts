@@ -662,6 +662,8 @@ export interface TestDataQueryResult {
   row_count: number;
   db_name?:  string;
   error?:    string;
+  timed_out?: boolean;
+  truncated?: boolean;
 }
 
 export async function listTestDataConnections(): Promise<TestDataConnection[]> {
@@ -706,6 +708,8 @@ export async function introspectTestDataConnection(
 export async function executeTestDataQuery(params: {
   connection_ids: string[];
   sql:            string;
+  timeout_sec?:   number;
+  max_rows?:      number;
 }, signal?: AbortSignal): Promise<{ results: Record<string, TestDataQueryResult> }> {
   return fetchJson("/api/testdata/query", {
     method:  "POST",
@@ -887,6 +891,10 @@ export interface LogAnalysis {
   severity:     string;
   suggestion:   string;
   defect_draft: string;
+  fingerprint?: string;
+  group_size?:  number;
+  cached?:      boolean;
+  fallback?:    boolean;
 }
 
 export interface LogSearchResult {
@@ -895,6 +903,7 @@ export interface LogSearchResult {
   total:          number;
   unique_count:   number;
   services_found: string[];
+  truncated?:     boolean;
 }
 
 export interface LogAnalyzeResult {
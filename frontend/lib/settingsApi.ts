@@ -180,6 +180,8 @@ export interface LogsVpsConnection {
   ca_cert_path:    string;
   default_index:   string;
   enabled:         boolean;
+  fingerprint_masks?:    string[] | null;   // null — все встроенные маски
+  fingerprint_patterns?: string[];
 }
 
 export async function getLogsVpsConnections(): Promise<{ connections: LogsVpsConnection[] }> {
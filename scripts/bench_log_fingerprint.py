@@ -0,0 +1,151 @@
+"""
+Бенчмарк группировки ошибок логов по fingerprint.
+
+Генерирует синтетический корпус: --templates логических ошибок (сервис,
+исключение, кадры стектрейса), в каждую запись подставляются изменчивые
+токены — UUID запроса, id заказа, IP, таймстемп, адрес объекта, дрейф
+номеров строк между версиями сборки. Затем считает fingerprint двумя
+способами — как раньше (сырые первые строки стектрейса) и с нормализацией
+(backend/api/log_clients/fingerprint.py) — и сравнивает.
+Отчёт:
+  • groups_raw / groups_normalized — сколько групп получилось;
+  • grouping_ratio                 — во сколько раз нормализация сократила группы;
+  • llm_calls_*                    — пакетов /api/logs/analyze (по 5 групп);
+  • entries_per_sec_*              — пропускная способность расчёта fingerprint.
+
+    python scripts/bench_log_fingerprint.py --entries 200000 --templates 40
+    python scripts/bench_log_fingerprint.py --json --min-ratio 20   # для CI: код 1 при регрессии
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+_SERVICES = ("billing", "orders", "gateway", "auth", "catalog", "notifier")
+_EXCEPTIONS = (
+    "java.lang.IllegalStateException: Order {order} not found for request {uuid}",
+    "java.net.ConnectException: Connection to {ip}:5432 refused",
+    "org.springframework.dao.DataIntegrityViolationException: duplicate key value \"{order}\"",
+    "java.util.concurrent.TimeoutException: call to {ip} timed out after {ms}ms at {ts}",
+    "java.lang.NullPointerException: Cannot invoke \"{obj}.getId()\" because value is null",
+    "feign.RetryableException: Read timed out executing POST http://{ip}:8080/api/v1/orders/{order}",
+)
+_ANALYZE_BATCH_SIZE = 5
+
+
+def _legacy_fingerprint(service: str, level: str, stacktrace: str) -> str:
+    """Fingerprint до нормализации — сырые первые 3 строки стектрейса."""
+    st_lines = stacktrace.strip().splitlines()[:3] if stacktrace else []
+    raw = f"{service}|{level}|{'|'.join(st_lines)}"
+    return hashlib.md5(raw.encode()).hexdigest()[:12]
+
+
+def _template(rng: random.Random, k: int) -> dict:
+    cls = f"com.acme.{rng.choice(_SERVICES)}.Service{k}"
+    return {
+        "service": _SERVICES[k % len(_SERVICES)],
+        "exception": _EXCEPTIONS[k % len(_EXCEPTIONS)],
+        "frames": [(cls, f"method{k}_{i}", rng.randint(40, 900)) for i in range(3)],
+    }
+
+
+def make_corpus(entries: int, templates: int, seed_value: int = 1) -> list[dict]:
+    """Синтетические записи: templates логических ошибок с изменчивыми токенами."""
+    rng = random.Random(seed_value)
+    tpls = [_template(rng, k) for k in range(templates)]
+    corpus = []
+    for _ in range(entries):
+        tpl = tpls[rng.randrange(templates)]
+        tokens = {
+            "order": rng.randint(1, 10_000_000),
+            "uuid": uuid.UUID(int=rng.getrandbits(128)),
+            "ip": f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}",
+            "ms": rng.randint(1000, 30000),
+            "ts": f"2024-05-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00.{rng.randint(0, 999):03d}Z",
+            "obj": f"com.acme.Order@{rng.getrandbits(32):08x}",
+        }
+        drift = rng.choice((0, 0, 0, 2, 7))          # разные версии сборки на подах
+        frames = [f"\tat {cls}.{meth}({cls.rsplit('.', 1)[1]}.java:{line + drift})"
+                  for cls, meth, line in tpl["frames"]]
+        corpus.append({
+            "service": tpl["service"],
+            "level": "ERROR",
+            "message": tpl["exception"].format(**tokens),
+            "stacktrace": "\n".join([tpl["exception"].format(**tokens), *frames]),
+        })
+    return corpus
+
+
+def run_benchmark(entries: int = 200_000, templates: int = 40, seed_value: int = 1) -> dict:
+    """Сгруппировать корпус сырым и нормализованным fingerprint, вернуть метрики."""
+    from backend.api.log_clients.fingerprint import FingerprintNormalizer
+
+    corpus = make_corpus(entries, templates, seed_value)
+
+    started = time.perf_counter()
+    raw_groups = {_legacy_fingerprint(e["service"], e["level"], e["stacktrace"]) for e in corpus}
+    raw_sec = time.perf_counter() - started
+
+    normalizer = FingerprintNormalizer()               # холодный кэш строк
+    started = time.perf_counter()
+    norm_groups = {normalizer.fingerprint(e["service"], e["level"], e["stacktrace"], e["message"])
+                   for e in corpus}
+    norm_sec = time.perf_counter() - started
+
+    return {
+        "entries":                 entries,
+        "templates":               templates,
+        "groups_raw":              len(raw_groups),
+        "groups_normalized":       len(norm_groups),
+        "grouping_ratio":          round(len(raw_groups) / max(1, len(norm_groups)), 1),
+        "llm_calls_raw":           math.ceil(len(raw_groups) / _ANALYZE_BATCH_SIZE),
+        "llm_calls_normalized":    math.ceil(len(norm_groups) / _ANALYZE_BATCH_SIZE),
+        "entries_per_sec_raw":     round(entries / max(raw_sec, 1e-9)),
+        "entries_per_sec_normalized": round(entries / max(norm_sec, 1e-9)),
+        "us_per_entry_normalized": round(norm_sec * 1e6 / max(1, entries), 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк группировки ошибок логов по fingerprint")
+    parser.add_argument("--entries", type=int, default=200_000, help="сколько записей в корпусе")
+    parser.add_argument("--templates", type=int, default=40, help="сколько логических ошибок")
+    parser.add_argument("--seed", type=int, default=1, help="seed генератора корпуса")
+    parser.add_argument("--json", action="store_true", help="вывести результат одной строкой JSON")
+    parser.add_argument("--min-ratio", type=float, default=0.0,
+                        help="код выхода 1, если grouping_ratio ниже порога")
+    parser.add_argument("--min-entries-per-sec", type=float, default=0.0,
+                        help="код выхода 1, если entries_per_sec_normalized ниже порога")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args.entries, args.templates, args.seed)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        width = max(len(k) for k in result)
+        for key, value in result.items():
+            print(f"{key:<{width}}  {value}")
+
+    failed = False
+    if args.min_ratio and result["grouping_ratio"] < args.min_ratio:
+        print(f"РЕГРЕССИЯ: grouping_ratio {result['grouping_ratio']} < {args.min_ratio}", file=sys.stderr)
+        failed = True
+    if args.min_entries_per_sec and result["entries_per_sec_normalized"] < args.min_entries_per_sec:
+        print(f"РЕГРЕССИЯ: {result['entries_per_sec_normalized']} entries/sec < {args.min_entries_per_sec}",
+              file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""
+Нагрузочный бенчмарк пути отправки метрик: MetricsScheduler + KafkaClient.
+
+Засевает N TestSystem/TestMetric в отдельную БД (по умолчанию временный
+SQLite-файл, --database-url — любая другая), подменяет kafka-python
+внутрипроцессным фейковым producer'ом и гоняет планировщик заданное время.
+Отчёт:
+  • sends/sec          — DATA-сообщений в секунду после прогрева (--warmup,
+                         по умолчанию один период: первая загрузка конфигов);
+  • jitter p50/p95/p99 — отклонение интервала между отправками метрики от её периода;
+  • DB time            — суммарное время SQL-запросов (и на отправку);
+  • CPU per send       — процессорное время процесса на одну отправку.
+
+    python scripts/bench_metrics.py --metrics 5000 --period 1 --duration 30
+    python scripts/bench_metrics.py --json --min-sends-per-sec 4000   # для CI: код 1 при регрессии
+
+--ack-ms имитирует задержку подтверждения брокера.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+from pathlib import Path
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+
+# ── Фейковый Kafka ────────────────────────────────────────────────────────────
+
+class _RecordMetadata:
+    __slots__ = ("offset", "partition", "timestamp")
+
+    def __init__(self, offset: int):
+        self.offset, self.partition, self.timestamp = offset, 0, int(time.time() * 1000)
+
+
+class _FakeFuture:
+    __slots__ = ("_meta", "_ready_at")
+
+    def __init__(self, offset: int, ready_at: float):
+        self._meta = _RecordMetadata(offset)
+        self._ready_at = ready_at
+
+    def get(self, timeout=None):
+        delay = self._ready_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return self._meta
+
+
+class FakeKafkaSink:
+    """Заменяет kafka.KafkaProducer: сообщения остаются в памяти, DATA — с временем отправки по ключу."""
+
+    def __init__(self, data_topic: str, ack_ms: float = 0.0):
+        self.data_topic = data_topic
+        self.ack_sec = ack_ms / 1000
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.data_sends: dict[bytes, list[float]] = {}
+        sink = self
+
+        class FakeProducer:
+            def __init__(self, **kwargs):
+                pass
+
+            def send(self, topic, value=None, key=None, **kwargs):
+                now = time.perf_counter()
+                with sink.lock:
+                    sink.messages += 1
+                    offset = sink.messages
+                    if topic == sink.data_topic:
+                        sink.data_sends.setdefault(key, []).append(now)
+                return _FakeFuture(offset, now + sink.ack_sec)
+
+            def flush(self, timeout=None):
+                pass
+
+            def close(self, timeout=None):
+                pass
+
+        self.producer_class = FakeProducer
+
+    def install(self) -> None:
+        import agents.kafka_client as KC
+        sys.modules["kafka"] = types.SimpleNamespace(KafkaProducer=self.producer_class)
+        KC._producers.clear()
+
+
+# ── БД ────────────────────────────────────────────────────────────────────────
+
+class _SqlTimer:
+    """Суммарное время SQL-запросов по событиям engine (из всех потоков)."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.lock = threading.Lock()
+        self.total = 0.0
+        self.statements = 0
+        self._local = threading.local()
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.started = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - self._local.started
+        with self.lock:
+            self.total += elapsed
+            self.statements += 1
+
+    def reset(self) -> None:
+        with self.lock:
+            self.total = 0.0
+            self.statements = 0
+
+
+def _make_engine(database_url: str):
+    from sqlalchemy import create_engine, event
+    if database_url.startswith("sqlite"):
+        engine = create_engine(database_url, connect_args={"check_same_thread": False, "timeout": 30})
+
+        @event.listens_for(engine, "connect")
+        def _wal(conn, _):
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return engine
+    return create_engine(database_url, pool_pre_ping=True, pool_size=10, max_overflow=10)
+
+
+def seed(Session, metrics: int, period: int, per_system: int = 50, seed_value: int = 1) -> None:
+    """N активных метрик (по per_system на услугу) со смесью паттернов, базалайна, здоровья и порогов."""
+    from db.metrics_models import (
+        TestSystem, TestMetric, TestMetricValuesConfig, TestMetricBaselineConfig,
+        TestMetricThresholdsConfig, TestMetricThresholdRow, TestMetricHealthConfig,
+    )
+
+    rnd = random.Random(seed_value)
+    db = Session()
+    try:
+        systems = []
+        for s in range((metrics + per_system - 1) // per_system):
+            systems.append(TestSystem(
+                it_service_ci=f"CI{s:08d}", name=f"bench-{s}", mon_system_ci=f"CI{90000000 + s:08d}",
+                is_active=True,
+            ))
+        db.add_all(systems)
+        db.flush()
+
+        for i in range(metrics):
+            m = TestMetric(
+                test_system_id=systems[i // per_system].id, metric_hash=f"bench-{i:08d}",
+                metric_name=f"m{i}", metric_description="bench", metric_type="Latency",
+                metric_group="App", metric_unit="ms", object_id="obj", object_name="obj",
+                mon_system_metric_id=f"bench-{i}", metric_period_sec=period, is_active=True,
+            )
+            m.values_config = TestMetricValuesConfig(
+                pattern=rnd.choice(["random", "sine", "spike", "constant"]), value_min=0, value_max=100,
+            )
+            m.baseline_config = TestMetricBaselineConfig(enabled=rnd.random() < 0.5, calc_method="offset",
+                                                         offset_value=5)
+            m.health_config = TestMetricHealthConfig(enabled=True, calc_method="auto")
+            if rnd.random() < 0.5:
+                m.thresholds_config = TestMetricThresholdsConfig(enabled=True, threshold_rows=[
+                    TestMetricThresholdRow(health_type=3, min_value=70, max_value=90),
+                    TestMetricThresholdRow(health_type=5, min_value=90, max_value=None),
+                ])
+            db.add(m)
+            if i % 1000 == 999:
+                db.flush()
+        db.commit()
+    finally:
+        db.close()
+
+
+# ── Прогон ────────────────────────────────────────────────────────────────────
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def _drive(period: float, duration: float) -> float:
+    """Запустить планировщик на duration секунд. Вернуть perf_counter() старта расписания."""
+    from agents.metrics_scheduler import MetricsScheduler
+    from agents.generation_log_writer import generation_log_writer
+
+    sched = MetricsScheduler()
+    ids = await asyncio.to_thread(MetricsScheduler._load_active_metrics)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    started = time.perf_counter()
+    # Сроки равномерно по периоду — как в установившемся режиме, а не залпом со старта
+    for k, (mid, _) in enumerate(ids):
+        sched._schedule(mid, period, due=start + period * k / max(1, len(ids)))
+    await generation_log_writer.start()
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        await sched.stop_all()
+        await generation_log_writer.stop()
+    return started
+
+
+def run_benchmark(
+    metrics: int = 1000,
+    period: float = 1.0,
+    duration: float = 10.0,
+    database_url: str = "",
+    ack_ms: float = 0.0,
+    warmup: float | None = None,
+) -> dict:
+    """Засеять БД, прогнать планировщик duration секунд, вернуть метрики прогона.
+    Частота и jitter считаются по отправкам после warmup секунд (по умолчанию — период)."""
+    import db.postgres as PG
+    from sqlalchemy.orm import sessionmaker
+    from db.metrics_models import Base
+    import agents.metrics_config_cache as MCC
+
+    tmpdir = None
+    if not database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="bench_metrics_")
+        database_url = f"sqlite:///{Path(tmpdir.name) / 'bench.sqlite3'}"
+
+    engine = _make_engine(database_url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    saved_session, saved_configs, saved_kafka = PG.SessionLocal, MCC.metric_configs, sys.modules.get("kafka")
+    PG.SessionLocal = Session
+    MCC.metric_configs = MCC.MetricConfigCache()
+    try:
+        seed(Session, metrics, max(1, int(round(period))))
+        sink = FakeKafkaSink(data_topic="sber911.data", ack_ms=ack_ms)
+        sink.install()
+        timer = _SqlTimer(engine)
+
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        started = asyncio.run(_drive(period, duration))
+        wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+    finally:
+        PG.SessionLocal, MCC.metric_configs = saved_session, saved_configs
+        if saved_kafka is not None:
+            sys.modules["kafka"] = saved_kafka
+        else:
+            sys.modules.pop("kafka", None)
+        import agents.kafka_client as KC
+        KC._producers.clear()
+        engine.dispose()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    warmup = min(period if warmup is None else warmup, duration / 2)
+    steady_from = started + warmup
+    steady_sec = max(1e-9, duration - warmup)
+    jitter_ms = [
+        abs((b - a) - period) * 1000
+        for stamps in sink.data_sends.values()
+        for a, b in zip(stamps, stamps[1:])
+        if a >= steady_from
+    ]
+    sends = sum(len(stamps) for stamps in sink.data_sends.values())
+    steady_sends = sum(1 for stamps in sink.data_sends.values() for t in stamps if t >= steady_from)
+    return {
+        "metrics":          metrics,
+        "period_sec":       period,
+        "duration_sec":     round(wall, 3),
+        "warmup_sec":       round(warmup, 3),
+        "sends":            sends,
+        "messages":         sink.messages,
+        "sends_per_sec":    round(steady_sends / steady_sec, 1),
+        "expected_per_sec": round(metrics / period, 1),
+        "jitter_ms_p50":    round(_percentile(jitter_ms, 50), 2),
+        "jitter_ms_p95":    round(_percentile(jitter_ms, 95), 2),
+        "jitter_ms_p99":    round(_percentile(jitter_ms, 99), 2),
+        "jitter_ms_max":    round(max(jitter_ms, default=0.0), 2),
+        "jitter_ms_mean":   round(statistics.fmean(jitter_ms), 2) if jitter_ms else 0.0,
+        "db_time_sec":      round(timer.total, 3),
+        "db_statements":    timer.statements,
+        "db_ms_per_send":   round(timer.total * 1000 / sends, 4) if sends else 0.0,
+        "cpu_sec":          round(cpu, 3),
+        "cpu_us_per_send":  round(cpu * 1e6 / sends, 1) if sends else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк отправки метрик (планировщик + фейковый Kafka)")
+    parser.add_argument("--metrics", type=int, default=1000, help="сколько метрик засеять")
+    parser.add_argument("--period", type=float, default=1.0, help="период отправки каждой метрики, с")
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность прогона, с")
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", ""),
+                        help="БД для прогона (по умолчанию временный SQLite-файл)")
+    parser.add_argument("--ack-ms", type=float, default=0.0, help="задержка подтверждения брокера, мс")
+    parser.add_argument("--warmup", type=float, default=None,
+                        help="сколько секунд от старта не учитывать в sends/sec и jitter (по умолчанию — период)")
+    parser.add_argument("--verbose", action="store_true", help="показывать предупреждения планировщика")
+    parser.add_argument("--json", action="store_true", help="вывести результат одной строкой JSON")
+    parser.add_argument("--min-sends-per-sec", type=float, default=0.0,
+                        help="код выхода 1, если sends/sec ниже порога")
+    args = parser.parse_args(argv)
+    if not args.verbose:
+        # «previous send still running» на каждый пропущенный тик — шум; он виден по sends/sec
+        logging.getLogger("agents").setLevel(logging.ERROR)
+
+    result = run_benchmark(args.metrics, args.period, args.duration, args.database_url, args.ack_ms, args.warmup)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        width = max(len(k) for k in result)
+        for key, value in result.items():
+            print(f"{key:<{width}}  {value}")
+    if args.min_sends_per_sec and result["sends_per_sec"] < args.min_sends_per_sec:
+        print(f"РЕГРЕССИЯ: {result['sends_per_sec']} sends/sec < {args.min_sends_per_sec}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
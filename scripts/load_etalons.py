@@ -7,24 +7,25 @@ from vector_store import VectorStore
 
 vs = VectorStore()
 vs.clear_all()
+requirements: list[dict] = []  # копим и загружаем пачками через *_bulk
 print("БД очищена. Загружаю эталоны...\n")
 
 # ============================================================
 # БЛОК 1: SCOPE
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-SCOPE-001",
     content="""На странице представлены требования для получения шаблонов по инциденту.""",
     platform="W",
     feature="INCIDENT_TEMPLATE",
     content_type="scope",
     tags=["scope", "incident", "template", "tks"]
-)
+))
 
 # ============================================================
 # БЛОК 2: BUSINESS_LOGIC — Основная логика
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-BL-001",
     content="""При открытии страницы вызывается метод getWorkGroupIncidents, 
 в ответе проверяется наличие объекта templates:
@@ -37,9 +38,9 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="business_logic",
     tags=["logic", "status", "template", "branching", "getWorkGroupIncidents"]
-)
+))
 
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-BL-002",
     content="""После нажатия кнопки "Получить шаблон по сбору ТКС" вызывается метод getTemplates:
 - в случае если шаблоны найдены — появляется уведомление о найденных шаблонах, 
@@ -50,12 +51,12 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="business_logic",
     tags=["logic", "getTemplates", "search_result", "branching"]
-)
+))
 
 # ============================================================
 # БЛОК 3: DATA_MODEL — Модель данных
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-DM-001",
     content="""Таблица incident_tks_template:
 - id int8 (обязательное) — ID записи в таблице
@@ -72,9 +73,9 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="data_model",
     tags=["data_model", "table", "incident_tks_template", "status_enum"]
-)
+))
 
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-DM-002",
     content="""Таблица incident_template_user_request:
 - req_uuid varchar(255) (обязательное) — Сгенерированный ID запроса для получения справки размерности 64 байта. Пример: 123e4567-e89b-12d3-a456-426655440000
@@ -83,12 +84,12 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="data_model",
     tags=["data_model", "table", "incident_template_user_request", "uuid"]
-)
+))
 
 # ============================================================
 # БЛОК 4: API_METHOD — getWorkGroupIncidents
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-API-001",
     content="""Метод getWorkGroupIncidents
 Путь: /sber911/ms/work-group/web/npi/
@@ -120,12 +121,12 @@ Response.result параметры:
     feature="INCIDENT_TEMPLATE",
     content_type="api_method",
     tags=["api", "getWorkGroupIncidents", "request", "response", "incidents", "template_status"]
-)
+))
 
 # ============================================================
 # БЛОК 5: API_METHOD — requestIncidentTemplates
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-API-002",
     content="""Метод requestIncidentTemplates
 Путь: /sber911/ms/work-group/web/npi/
@@ -154,12 +155,12 @@ Response.result:
     feature="INCIDENT_TEMPLATE",
     content_type="api_method",
     tags=["api", "requestIncidentTemplates", "request", "response", "status_logic"]
-)
+))
 
 # ============================================================
 # БЛОК 6: API_METHOD — getTemplates
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-API-003",
     content="""Метод getTemplates
 Описание: Метод вызывается для получения и обновления списка шаблонов.
@@ -185,12 +186,12 @@ Response:
     feature="INCIDENT_TEMPLATE",
     content_type="api_method",
     tags=["api", "getTemplates", "request", "response", "templates_list", "refresh"]
-)
+))
 
 # ============================================================
 # БЛОК 7: SEQUENCE — Диаграмма последовательности
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-SEQ-001",
     content="""Sequence-диаграмма получения шаблонов:
 Участники: Пользователь → Веб-интерфейс → API Gateway → Backend → RAG База → БД шаблонов
@@ -210,12 +211,12 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="sequence",
     tags=["sequence", "flow", "refresh", "rag", "integration"]
-)
+))
 
 # ============================================================
 # БЛОК 8: NOTIFICATION — Уведомления
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-NOTIF-001",
     content="""Формирование уведомлений о завершении обработки запросов:
 Тип: WORKGROUP_INCIDENT_TEMPLATE_READY
@@ -234,12 +235,12 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="notification",
     tags=["notification", "push", "userIds", "template_ready"]
-)
+))
 
 # ============================================================
 # БЛОК 9: UI_REQUIREMENT — Требования к фронту
 # ============================================================
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-UI-001",
     content="""Страница "Рабочее место дежурного по смене":
 1. У инцидента в блоке "Инциденты на услугах ДС", в выпадающем меню "AI-функции" появляется кнопка "Найти шаблон для сбора ТКС".
@@ -249,9 +250,9 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="ui_requirement",
     tags=["ui", "button", "getTemplates", "incident_block", "ai_functions"]
-)
+))
 
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-UI-002",
     content="""Шаблон НЕ найден:
 3. Появляется информационное окно о том что шаблон не найден и дополнительная информация у инцидента в блоке "Инциденты на услугах ДС" вместо кнопки "Найти шаблон для сбора ТКС".
@@ -261,9 +262,9 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="ui_requirement",
     tags=["ui", "error_state", "not_found", "modal", "refresh", "retry"]
-)
+))
 
-vs.add_requirement(
+requirements.append(dict(
     req_id="REQ-TMPL-UI-003",
     content="""Шаблон НАЙДЕН:
 4. Появляется информационное окно с кнопкой открытия модального окна для просмотра шаблона.
@@ -284,7 +285,9 @@ vs.add_requirement(
     feature="INCIDENT_TEMPLATE",
     content_type="ui_requirement",
     tags=["ui", "success_state", "modal", "invite", "sendInvite", "template_detail"]
-)
+))
+
+vs.add_requirements_bulk(requirements)
 
 # ============================================================
 # Статистика
@@ -5,6 +5,8 @@
 from vector_store import VectorStore
 
 vs = VectorStore()
+test_cases: list[dict] = []  # копим и загружаем пачками через *_bulk
+pairs: list[dict] = []
 
 print(f"До загрузки: {vs.get_stats()}")
 print("Загружаю тест-кейсы...\n")
@@ -14,7 +16,7 @@ print("Загружаю тест-кейсы...\n")
 # ============================================================
 
 # TC-4001: Кнопка при отсутствии template
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4001",
     content="""W [RAG ТКС] Отображение кнопки Найти шаблон для сбора ТКС при отсутствии объекта template.
 Цель: Проверить что для инцидента без ранее созданных запросов на поиск шаблонов в меню AI-функции отображается активная кнопка инициации RAG-поиска.
@@ -28,10 +30,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["ui", "initial_state", "no_template", "button"]
-)
+))
 
 # TC-4002: Индикатор загрузки при status sent
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4002",
     content="""W [RAG ТКС] Отображение индикатора загрузки при template.status sent.
 Цель: Проверить что если предыдущий запрос на RAG-поиск в статусе sent отображается индикатор загрузки и кнопки недоступны.
@@ -45,10 +47,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["ui", "initial_state", "status_sent", "spinner", "loading"]
-)
+))
 
 # TC-4003: Автовызов getTemplates при status success
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4003",
     content="""W [RAG ТКС] Автоматический вызов getTemplates и кнопка Получить шаблон при template.status success.
 Цель: Проверить что при загрузке РМДС если RAG-поиск завершился успехом автоматически вызывается getTemplates и отображается кнопка получения результатов.
@@ -62,10 +64,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["ui", "api", "initial_state", "status_success", "getTemplates", "auto_call"]
-)
+))
 
 # TC-4004: Лейбл ошибки при status error
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4004",
     content="""W [RAG ТКС] Лейбл Нет подходящих шаблонов и кнопка повтора при template.status error.
 Цель: Проверить что при загрузке РМДС если RAG-поиск завершился ошибкой отображается лейбл ошибки кнопка повтора и возможность просмотра уведомления.
@@ -78,10 +80,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["ui", "initial_state", "status_error", "error_label", "retry"]
-)
+))
 
 # TC-4005: MAX created_date при нескольких записях
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4005",
     content="""W [RAG ТКС] Возврат последней записи template MAX created_date при нескольких записях в БД.
 Цель: Проверить что при нескольких записях поиска шаблонов по инциденту getWorkGroupIncidents возвращает данные из записи с максимальной created_date.
@@ -95,10 +97,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["api", "db", "initial_state", "max_created_date", "multiple_records"]
-)
+))
 
 # TC-4006: Первый запрос requestIncidentTemplates
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4006",
     content="""W [RAG ТКС] Успешный первый запрос RAG-поиска через requestIncidentTemplates без предыдущего id.
 Цель: Проверить полный позитивный сценарий первого запроса на поиск шаблонов: нажатие кнопки, вызов API, создание записей в БД, переход UI в состояние ожидания.
@@ -113,10 +115,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["api", "db", "ui", "request_templates", "first_request", "e2e"]
-)
+))
 
 # TC-4007: Получение 3 шаблонов через getTemplates
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4007",
     content="""W [RAG ТКС] Успешное получение 3 шаблонов через getTemplates refresh false и отображение модального окна.
 Цель: Проверить полный сценарий получения найденных шаблонов: вызов getTemplates, информационное окно, модальное окно со списком.
@@ -131,10 +133,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["api", "ui", "getTemplates", "modal", "templates_found", "e2e"]
-)
+))
 
 # TC-4008: Шаблон не найден — пустой массив
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4008",
     content="""W [RAG ТКС] Отображение информационного окна Шаблон не найден при пустом массиве templates.
 Цель: Проверить что при пустом массиве шаблонов отображается информационное окно с сообщением и кнопкой повторного поиска.
@@ -149,10 +151,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["api", "ui", "getTemplates", "empty_result", "not_found", "retry"]
-)
+))
 
 # TC-4009: Максимум 5 шаблонов
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4009",
     content="""W [RAG ТКС] Получение максимального количества 5 шаблонов и проверка структуры каждого объекта.
 Цель: Проверить что при нахождении более 5 шаблонов возвращается максимум 5 и каждый содержит все обязательные поля.
@@ -167,10 +169,10 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["api", "ui", "getTemplates", "maxItems", "schema_validation", "boundary"]
-)
+))
 
 # TC-4010: Просмотр детальной информации по шаблону
-vs.add_test_case(
+test_cases.append(dict(
     tc_id="SBER911-T4010",
     content="""W [RAG ТКС] Просмотр детальной информации по шаблону — открытие в новой вкладке браузера.
 Цель: Проверить что при клике на шаблон в модальном окне открывается новая вкладка с детальной информацией через /template/data.
@@ -184,7 +186,9 @@ vs.add_test_case(
     priority="normal",
     element_type="test_case",
     tags=["ui", "api", "template_detail", "new_tab", "template_data"]
-)
+))
+
+vs.add_test_cases_bulk(test_cases)
 
 print(f"Тест-кейсы загружены: {vs.test_cases.count()}")
 
@@ -194,7 +198,7 @@ print(f"Тест-кейсы загружены: {vs.test_cases.count()}")
 print("\nЗагружаю пары требование-тест...")
 
 # Пара 1: Логика status → 4 теста начального состояния
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL001-T4001",
     requirement_text="""При открытии страницы вызывается метод getWorkGroupIncidents, если template не передан — отображается кнопка Найти шаблон для сбора ТКС и вызывается метод requestIncidentTemplates""",
     test_case_xml="""<testCase key="SBER911-T4001">
@@ -208,9 +212,9 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["no_template", "initial_state", "button"]
-)
+))
 
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL001-T4002",
     requirement_text="""При открытии страницы если template передан и status = sent то отображается загрузка""",
     test_case_xml="""<testCase key="SBER911-T4002">
@@ -224,9 +228,9 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["status_sent", "spinner", "loading"]
-)
+))
 
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL001-T4003",
     requirement_text="""При открытии страницы если template передан и status = success то отображается кнопка Получить шаблон по сбору ТКС и вызывается метод getTemplates""",
     test_case_xml="""<testCase key="SBER911-T4003">
@@ -240,9 +244,9 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["status_success", "getTemplates", "auto_call"]
-)
+))
 
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL001-T4004",
     requirement_text="""При открытии страницы если template передан и status = error то появляется лейбл нет подходящих шаблонов и возможность просмотреть уведомление и обновить список""",
     test_case_xml="""<testCase key="SBER911-T4004">
@@ -255,10 +259,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["status_error", "error_label", "retry", "notification"]
-)
+))
 
 # Пара 5: API requestIncidentTemplates → первый запрос
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-API002-T4006",
     requirement_text="""Метод requestIncidentTemplates: при отправке запроса id пользователя добавляется в таблицу, проверяется наличие записи в статусе sent. Формируется новый id при отсутствии ранее созданных запросов со статусом != error""",
     test_case_xml="""<testCase key="SBER911-T4006">
@@ -273,10 +277,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["requestIncidentTemplates", "first_request", "e2e"]
-)
+))
 
 # Пара 6: getTemplates найдены → модальное окно
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL002-T4007",
     requirement_text="""После нажатия кнопки вызывается getTemplates: если шаблоны найдены — появляется уведомление, при нажатии Перейти к шаблону открывается модальное окно со списком""",
     test_case_xml="""<testCase key="SBER911-T4007">
@@ -291,10 +295,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["getTemplates", "templates_found", "modal", "e2e"]
-)
+))
 
 # Пара 7: getTemplates не найдены → лейбл
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-BL002-T4008",
     requirement_text="""После нажатия кнопки вызывается getTemplates: если шаблоны не найдены — появляется лейбл нет подходящих шаблонов и возможность обновить список""",
     test_case_xml="""<testCase key="SBER911-T4008">
@@ -309,10 +313,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["getTemplates", "empty_result", "not_found", "retry"]
-)
+))
 
 # Пара 8: maxItems=5
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-API003-T4009",
     requirement_text="""Метод getTemplates: templates array[object] maxItems = 5. Каждый объект содержит id, name, description, conference с externalId и statusType""",
     test_case_xml="""<testCase key="SBER911-T4009">
@@ -327,10 +331,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["getTemplates", "maxItems", "boundary", "schema_validation"]
-)
+))
 
 # Пара 9: Детальный просмотр шаблона
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-UI003-T4010",
     requirement_text="""При нажатии на инцидент открывается новая вкладка в браузере с детальной информацией о шаблоне. Метод получения информации: /template/data""",
     test_case_xml="""<testCase key="SBER911-T4010">
@@ -344,10 +348,10 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["template_detail", "new_tab", "template_data"]
-)
+))
 
 # Пара 10: Выбор последней записи MAX(created_date)
-vs.add_pair(
+pairs.append(dict(
     pair_id="PAIR-DM001-T4005",
     requirement_text="""Выбирается запись из таблицы incident_tks_template по incidentId. Если записей несколько — возвращается последняя с max(created_date)""",
     test_case_xml="""<testCase key="SBER911-T4005">
@@ -362,7 +366,9 @@ vs.add_pair(
     platform="W",
     feature="INCIDENT_TEMPLATE",
     tags=["data_model", "max_created_date", "multiple_records"]
-)
+))
+
+vs.add_pairs_bulk(pairs)
 
 # ============================================================
 # Итоговая статистика
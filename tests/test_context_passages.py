@@ -0,0 +1,75 @@
+"""Контекстные документы по фрагментам.
+
+Раньше генерация брала документы целиком и резала каждый до text[:3000] —
+нужный кусок длинной спецификации после 3000-го символа в промпт не попадал,
+а один вектор на весь документ плохо находил его. Теперь документ режется на
+перекрывающиеся фрагменты, а find_context_passages склеивает лучшие из них
+по документам в пределах бюджета токенов.
+"""
+
+import pytest
+
+import db.vector_store as VS
+from db.vector_store import _split_passages
+
+
+def _fake_ef(texts):
+    # «Эмбеддинг» — есть ли в тексте маркер: запрос с маркером ближе к фрагментам с ним
+    return [[1.0 if "ИСКОМОЕ" in t else 0.0, 1.0 if "ДРУГОЕ" in t else 0.0, 0.1] for t in texts]
+
+
+@pytest.fixture
+def store(tmp_path):
+    vs = VS.VectorStore(persist_dir=tmp_path)
+    vs.ef = _fake_ef
+    return vs
+
+
+def test_фрагменты_перекрываются_и_покрывают_текст():
+    text = "".join(f"Абзац {i}. " + "x" * 90 + "\n\n" for i in range(40))
+    passages = _split_passages(text, size=500, overlap=100)
+    assert passages[0][0] == 0
+    for (off, part), (next_off, _) in zip(passages, passages[1:]):
+        assert text[off:off + len(part)] == part
+        assert next_off < off + len(part)        # перекрытие
+    last_off, last = passages[-1]
+    assert last_off + len(last) == len(text)
+
+
+def test_нужный_кусок_после_3000_символов_попадает_в_контекст(store):
+    content = "вступление " * 400 + "ИСКОМОЕ правило расчёта лимита"
+    store.add_context_doc("d1", content, name="Спека")
+    store.add_context_doc("d2", "ДРУГОЕ " * 50, name="Чужой")
+
+    found = store.find_context_passages("ИСКОМОЕ", n_results=1, token_budget=1000)
+    assert [d["doc_id"] for d in found] == ["d1"]
+    assert found[0]["name"] == "Спека"
+    assert "ИСКОМОЕ правило расчёта лимита" in found[0]["text"]
+    assert len(found[0]["text"]) < len(content)
+
+
+def test_соседние_фрагменты_склеиваются_без_повторов(store):
+    content = "".join(f"ИСКОМОЕ {i:03d} " + "y" * 80 + "\n" for i in range(40))
+    store.add_context_doc("d1", content)
+    found = store.find_context_passages("ИСКОМОЕ", n_results=50, token_budget=100_000)
+    assert len(found) == 1
+    assert found[0]["text"] == content
+
+
+def test_бюджет_ограничивает_объём(store):
+    store.add_context_doc("d1", "ИСКОМОЕ " + "z" * 5000)
+    found = store.find_context_passages("ИСКОМОЕ", n_results=10, token_budget=500)
+    assert sum(len(d["text"]) for d in found) <= 500 * VS._CHARS_PER_TOKEN
+
+
+def test_удаление_и_переиндексация_старых_документов(store):
+    store.add_context_doc("d1", "ИСКОМОЕ " * 10)
+    store.delete_context_doc("d1")
+    assert store.context_passages.count() == 0
+
+    # Документ, загруженный до появления фрагментов
+    store.context_docs.upsert(ids=["old"], documents=["ИСКОМОЕ старое"], embeddings=[[1.0, 0.0, 0.1]],
+                              metadatas=[{"name": "Старый"}])
+    assert store.reindex_context_docs() == 1
+    assert store.reindex_context_docs() == 0
+    assert store.find_context_passages("ИСКОМОЕ")[0]["doc_id"] == "old"
@@ -0,0 +1,80 @@
+"""Сессии генерации в SQLite (db/gen_sessions_store.py).
+
+Раньше каждый update_session переписывал целиком data/gen_sessions.json со
+всеми сессиями. Теперь сессия и каждый её кейс — отдельные строки: обновления
+точечные, список сессий не тянет qa_doc и кейсы, старый JSON переносится.
+"""
+
+import json
+
+import pytest
+
+import db.gen_sessions_store as GS
+from db.gen_sessions_store import GenSessionsStore as Store
+
+
+@pytest.fixture(autouse=True)
+def files(tmp_path, monkeypatch):
+    monkeypatch.setattr(GS, "_DB_FILE", tmp_path / "gen_sessions.sqlite3")
+    monkeypatch.setattr(GS, "_LEGACY_FILE", tmp_path / "gen_sessions.json")
+    return tmp_path
+
+
+def test_обновление_полей_и_сводка_без_тяжёлых_данных():
+    sid = Store.create_session({"requirement": "т" * 500, "feature": "F", "provider": "gigachat"})["id"]
+    assert Store.update_session(sid, qa_doc="документ", current_layer=2, error=None, elapsed=5)
+    assert not Store.update_session("нет-такой", status="done")
+
+    session = Store.get_session(sid)
+    assert session["qa_doc"] == "документ"
+    assert session["current_layer"] == 2 and session["elapsed"] == 5
+    assert session["feature"] == "F" and session["error"] is None
+
+    [summary] = Store.list_sessions()
+    assert "qa_doc" not in summary and "cases" not in summary and "case_list" not in summary
+    assert summary["has_qa_doc"] and len(summary["requirement"]) == 200
+    assert summary["current_layer"] == 2
+
+
+def test_кейсы_по_одному_делятся_на_готовый_префикс_и_pending():
+    sid = Store.create_session({})["id"]
+    Store.save_case(sid, 0, {"name": "a"})
+    Store.save_case(sid, 2, {"name": "c"})
+    session = Store.get_session(sid)
+    assert [c["name"] for c in session["cases"]] == ["a"]
+    assert session["cases_pending"] == {"2": {"name": "c"}}
+
+    Store.save_case(sid, 1, {"name": "b"})
+    session = Store.get_session(sid)
+    assert [c["name"] for c in session["cases"]] == ["a", "b", "c"]
+    assert session["cases_pending"] == {}
+    assert Store.list_sessions()[0]["case_count"] == 3
+
+
+def test_хранятся_последние_50_и_удаление_убирает_кейсы(monkeypatch):
+    monkeypatch.setattr(GS, "_MAX_SESSIONS", 3)
+    ids = [Store.create_session({"requirement": str(i)})["id"] for i in range(5)]
+    assert [s["id"] for s in Store.list_sessions()] == ids[:1:-1]
+    Store.save_case(ids[-1], 0, {"name": "x"})
+    assert Store.delete_session(ids[-1])
+    assert Store.get_session(ids[-1]) is None
+    assert not Store.delete_session(ids[-1])
+
+
+def test_старый_json_переносится(files):
+    legacy = [
+        {"id": "new", "status": "done", "created_at": "2026-02-01", "updated_at": "2026-02-01",
+         "requirement": "r2", "qa_doc": "d", "case_list": [{}, {}], "cases": [{"name": "x"}],
+         "cases_pending": {}, "feature": "F2", "export_result": {"md": "m"}},
+        {"id": "old", "status": "error", "created_at": "2026-01-01", "updated_at": "2026-01-01",
+         "requirement": "r1", "qa_doc": "", "case_list": [], "cases": [],
+         "cases_pending": {"1": {"name": "y"}}},
+    ]
+    (files / "gen_sessions.json").write_text(json.dumps(legacy), encoding="utf-8")
+
+    assert [s["id"] for s in Store.list_sessions()] == ["new", "old"]
+    new = Store.get_session("new")
+    assert new["cases"] == [{"name": "x"}] and new["export_result"] == {"md": "m"}
+    assert new["feature"] == "F2"
+    assert Store.get_session("old")["cases_pending"] == {"1": {"name": "y"}}
+    assert (files / "gen_sessions.json.migrated").exists()
@@ -0,0 +1,134 @@
+"""Слой 3 генерации: кейсы детализируются параллельно, но приходят по порядку.
+
+Раньше каждый кейс ждал предыдущего, и атомарная глубина (до сотни кейсов)
+означала сотню последовательных обращений к LLM. Теперь запросы идут
+параллельно с лимитом на провайдера; порядок кейсов, события case_start /
+case_done и возобновление после сбоя остаются прежними.
+"""
+
+import asyncio
+import random
+
+import pytest
+
+import agents.layered_generator as LG
+import agents.llm_client as LC
+import db.gen_sessions_store as GS
+from agents.layered_generator import TestCaseMarkdown as CaseMarkdown
+from backend.api import generation as G
+
+
+CASE_LIST = [{"name": f"[F] HappyPath. Кейс {i}", "priority": "Normal", "type": "positive"}
+             for i in range(12)]
+
+
+class FakeGenerator:
+    """Отвечает с разной задержкой, чтобы кейсы завершались не по порядку."""
+
+    in_flight = 0
+    peak = 0
+    fail_on: set = set()
+
+    def __init__(self, llm):
+        pass
+
+    async def agenerate_case_markdown(self, case_info, qa_doc):
+        cls = FakeGenerator
+        cls.in_flight += 1
+        cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            await asyncio.sleep(random.uniform(0.005, 0.03))
+            if case_info["name"] in cls.fail_on:
+                raise RuntimeError("502 Bad Gateway")
+            return CaseMarkdown(name=case_info["name"], steps=[{"action": "a"}])
+        finally:
+            cls.in_flight -= 1
+
+
+class FakeLLMClient(LC.AsyncLLMClient):
+    def __init__(self, provider):
+        self.provider = provider
+
+    async def aclose(self):
+        pass
+
+
+class FakeWS:
+    def __init__(self):
+        self.events = []
+
+    async def send_json(self, msg):
+        self.events.append(msg)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setattr(GS, "_DB_FILE", tmp_path / "gen_sessions.sqlite3")
+    monkeypatch.setattr(GS, "_LEGACY_FILE", tmp_path / "gen_sessions.json")
+    monkeypatch.setattr(LC, "AsyncLLMClient", FakeLLMClient)
+    monkeypatch.setattr(LG, "LayeredGenerator", FakeGenerator)
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "3")
+    FakeGenerator.peak = 0
+    FakeGenerator.fail_on = set()
+    G._provider_semaphores.clear()
+
+    import db.vector_store as VS
+
+    def _no_vector_store():
+        raise RuntimeError("vector store disabled in tests")
+    monkeypatch.setattr(VS, "get_vector_store", _no_vector_store)
+
+    session = GS.GenSessionsStore.create_session({"requirement": "r", "feature": "F", "provider": "gigachat"})
+    GS.GenSessionsStore.update_session(session["id"], qa_doc="doc", case_list=CASE_LIST)
+    return session["id"]
+
+
+def _run(sid):
+    ws = FakeWS()
+    G._active_ws[sid] = ws
+    G._provider_semaphores.clear()      # каждый asyncio.run — новый event loop
+    asyncio.run(G._run_generation(sid))
+    G._active_ws.pop(sid, None)
+    return ws.events
+
+
+def test_кейсы_сохраняются_в_порядке_списка(env):
+    events = _run(env)
+    session = GS.GenSessionsStore.get_session(env)
+    assert session["status"] == "done"
+    assert [c["name"] for c in session["cases"]] == [c["name"] for c in CASE_LIST]
+    done = [e["i"] for e in events if e["type"] == "case_done"]
+    assert done == list(range(1, len(CASE_LIST) + 1))
+    assert sum(e["type"] == "case_start" for e in events) == len(CASE_LIST)
+
+
+def test_параллельность_ограничена_лимитом_провайдера(env):
+    _run(env)
+    assert 1 < FakeGenerator.peak <= 3
+
+
+def test_лимит_из_настроек_провайдера_зажат_в_разумные_рамки(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "1000")
+    assert LC.provider_concurrency("gigachat") == LC._MAX_CONCURRENCY
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "abc")
+    assert LC.provider_concurrency("gigachat") == LC._DEFAULT_CONCURRENCY
+
+
+def test_сбой_теряет_только_кейсы_в_полёте_и_resume_их_добирает(env):
+    FakeGenerator.fail_on = {CASE_LIST[5]["name"]}
+    _run(env)
+    session = GS.GenSessionsStore.get_session(env)
+    assert session["status"] == "error"
+    # Готовые кейсы сохранены: по порядку — в cases, опередившие упавший — в
+    # cases_pending. Теряются только те, что были в полёте вместе с ним.
+    assert len(session["cases"]) <= 5
+    assert session["cases"] or session["cases_pending"]
+    assert "5" not in session["cases_pending"]
+
+    FakeGenerator.fail_on = set()
+    GS.GenSessionsStore.update_session(env, status="generating", error=None)
+    _run(env)
+    session = GS.GenSessionsStore.get_session(env)
+    assert session["status"] == "done"
+    assert [c["name"] for c in session["cases"]] == [c["name"] for c in CASE_LIST]
+    assert session["cases_pending"] == {}
@@ -0,0 +1,131 @@
+"""Отложенная запись GenerationLog и ротация.
+
+Раньше каждая пачка планировщика сама делала commit логов, а обещанной в
+модели ротации «старше 7 дней» не было. Теперь строки копятся в буфере и
+пишутся фоном одним INSERT по таймеру или по числу строк, а purge_old_logs()
+удаляет старые записи порциями.
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import agents.generation_log_writer as GW
+
+
+@pytest.fixture
+def logs_db(monkeypatch):
+    import db.postgres as PG
+    from db.metrics_models import Base, TestSystem, TestMetric
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(PG, "SessionLocal", Session)
+
+    db = Session()
+    system = TestSystem(it_service_ci="CI1", name="S", mon_system_ci="CI2")
+    db.add(system)
+    db.flush()
+    for i in (1, 2):
+        db.add(TestMetric(
+            test_system_id=system.id, metric_hash=f"h{i}", metric_name=f"m{i}", metric_description="d",
+            metric_type="Other", metric_group="App", metric_unit="ms", object_id="o", object_name="o",
+            mon_system_metric_id=f"mid{i}",
+        ))
+    db.commit()
+    db.close()
+    return Session, engine
+
+
+def _row(metric_id, value=1.0):
+    return {"test_metric_id": metric_id, "value_sent": value, "status": "success", "thresholds_sent": False}
+
+
+def _values(Session):
+    from db.metrics_models import GenerationLog
+    db = Session()
+    try:
+        return [float(l.value_sent) for l in db.query(GenerationLog).order_by(GenerationLog.id)]
+    finally:
+        db.close()
+
+
+def test_буфер_пишется_по_числу_строк_и_на_остановке(logs_db, monkeypatch):
+    Session, _ = logs_db
+    monkeypatch.setenv("METRICS_LOG_FLUSH_MS", "60000")
+    monkeypatch.setenv("METRICS_LOG_FLUSH_ROWS", "3")
+    writer = GW.GenerationLogWriter()
+
+    async def run():
+        await writer.start()
+        await asyncio.to_thread(writer.add, [_row(1, 1), _row(2, 2)])
+        await asyncio.sleep(0.1)
+        before_threshold = _values(Session)
+
+        # Третья строка из другого потока — порог достигнут, сброс без ожидания таймера
+        t = threading.Thread(target=writer.add, args=([_row(1, 3)],))
+        t.start()
+        t.join()
+        await asyncio.sleep(0.2)
+        after_threshold = _values(Session)
+
+        await asyncio.to_thread(writer.add, [_row(2, 4)])
+        await writer.stop()
+        return before_threshold, after_threshold
+
+    before, after = asyncio.run(run())
+    assert before == []
+    assert after == [1.0, 2.0, 3.0]
+    assert _values(Session) == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_отметки_метрик_и_удалённая_метрика(logs_db):
+    from db.metrics_models import TestMetric
+
+    Session, _ = logs_db
+    db = Session()
+    db.delete(db.get(TestMetric, 2))
+    db.commit()
+    db.close()
+
+    sent_at = datetime(2026, 1, 1, 12, 0)
+    writer = GW.GenerationLogWriter()
+    writer.add([_row(1, 1), _row(2, 2)], {1: {"last_sent_at": sent_at}, 2: {"last_sent_at": sent_at}})
+
+    assert _values(Session) == [1.0]
+    db = Session()
+    assert db.get(TestMetric, 1).last_sent_at == sent_at
+    db.close()
+
+
+def test_ротация_удаляет_старые_записи_порциями(logs_db):
+    from db.metrics_models import GenerationLog
+
+    Session, engine = logs_db
+    old = datetime.utcnow() - timedelta(days=10)
+    db = Session()
+    db.add_all([GenerationLog(test_metric_id=1, status="success", value_sent=i, sent_at=old) for i in range(5)])
+    db.add(GenerationLog(test_metric_id=1, status="success", value_sent=99, sent_at=datetime.utcnow()))
+    db.commit()
+    db.close()
+
+    deletes = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, stmt, *a: stmt.startswith("DELETE") and deletes.append(stmt))
+    assert GW.purge_old_logs(days=7, chunk=2) == 5
+    assert len(deletes) == 3
+    assert _values(Session) == [99.0]
+
+
+def test_индексы_generation_log(logs_db):
+    _, engine = logs_db
+    indexes = {ix["name"]: ix["column_names"] for ix in inspect(engine).get_indexes("generation_log")}
+    assert indexes["ix_generation_log_metric_sent"] == ["test_metric_id", "sent_at"]
+    assert indexes["ix_generation_log_sent_at"] == ["sent_at"]
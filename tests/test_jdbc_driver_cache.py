@@ -0,0 +1,98 @@
+"""Кэш загруженных JDBC-драйверов.
+
+Раньше load_jdbc_driver создавал свежий URLClassLoader на каждое
+подключение — загрузка классов на каждый запрос и растущий metaspace.
+Теперь драйвер кэшируется по (путь, класс, mtime/размер .jar): заменили
+файл — грузится новая версия, а старый загрузчик закрывается после
+закрытия последнего своего соединения.
+"""
+
+import os
+
+import pytest
+
+import backend.api.db_connector as DC
+
+
+class FakeLoader:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeJConn:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Список (loader, driver_class) на каждую настоящую загрузку."""
+    made = []
+
+    def new_driver(driver_class, jar):
+        made.append((FakeLoader(), driver_class))
+        return made[-1][0], object()
+
+    monkeypatch.setattr(DC, "_new_driver", new_driver)
+    monkeypatch.setattr(DC, "_drivers", {})
+    return made
+
+
+def _replace(jar, content: bytes):
+    jar.write_bytes(content)
+    st = jar.stat()
+    os.utime(jar, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_драйвер_грузится_один_раз(loads, tmp_path):
+    jar = tmp_path / "pg.jar"
+    jar.write_bytes(b"v1")
+
+    first = DC.load_jdbc_driver("org.postgresql.Driver", str(jar))
+    assert DC.load_jdbc_driver("org.postgresql.Driver", str(jar)) is first
+    assert len(loads) == 1
+
+    # Другой класс из того же .jar — свой загрузчик
+    DC.load_jdbc_driver("org.other.Driver", str(jar))
+    assert len(loads) == 2
+
+    with pytest.raises(FileNotFoundError):
+        DC.load_jdbc_driver("org.postgresql.Driver", str(tmp_path / "missing.jar"))
+
+
+def test_замена_jar_перезагружает_и_закрывает_старый_загрузчик(loads, tmp_path):
+    jar = tmp_path / "pg.jar"
+    jar.write_bytes(b"v1")
+
+    old = DC._checkout_driver("org.postgresql.Driver", str(jar), lease=True)
+    _replace(jar, b"v2-bigger")
+    new = DC._checkout_driver("org.postgresql.Driver", str(jar), lease=False)
+
+    assert new is not old and len(loads) == 2
+    # Соединение через старую версию ещё открыто — её загрузчик жив
+    assert not old.loader.closed
+    DC._release_driver(old)
+    assert old.loader.closed and not new.loader.closed
+
+    # Без открытых соединений старый загрузчик закрывается сразу при замене
+    _replace(jar, b"v3")
+    DC.load_jdbc_driver("org.postgresql.Driver", str(jar))
+    assert new.loader.closed and len(loads) == 3
+
+
+def test_закрытие_соединения_отпускает_драйвер(loads, tmp_path):
+    jar = tmp_path / "pg.jar"
+    jar.write_bytes(b"v1")
+    loaded = DC._checkout_driver("org.postgresql.Driver", str(jar), lease=True)
+
+    conn = DC._leased_connection_class()(FakeJConn(), {})
+    conn._driver_lease = loaded
+    _replace(jar, b"v2")
+    DC.load_jdbc_driver("org.postgresql.Driver", str(jar))
+    assert loaded.retired and not loaded.loader.closed
+
+    conn.close()
+    assert loaded.connections == 0 and loaded.loader.closed
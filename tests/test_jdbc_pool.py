@@ -0,0 +1,151 @@
+"""Пул JDBC-соединений к внешним БД.
+
+Раньше «Тестовые данные», джобы и генератор данных открывали новое
+JDBC-соединение на каждый запрос — логин через VPN стоит 0.5–2 с. Теперь
+соединения живут в пуле подключения: ограниченный размер, проверка перед
+выдачей, закрытие простаивающих и старых, сброс при правке подключения или
+драйвера.
+"""
+
+import threading
+import time
+
+import pytest
+
+import backend.api.db_connector as DC
+
+
+class FakeJConn:
+    def __init__(self):
+        self.valid = True
+        self.closed = False
+        self.autocommit = True
+
+    def isValid(self, timeout):
+        return self.valid and not self.closed
+
+    def isClosed(self):
+        return self.closed
+
+    def getAutoCommit(self):
+        return self.autocommit
+
+    def setAutoCommit(self, value):
+        self.autocommit = value
+
+
+class FakeConn:
+    def __init__(self):
+        self.jconn = FakeJConn()
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.jconn.closed = True
+
+
+DRIVER = {"id": "drv", "name": "PostgreSQL", "driver_class": "org.postgresql.Driver",
+          "url_template": "jdbc:postgresql://{host}:{port}/{db_name}", "sql_dialect": "postgresql"}
+CFG = {"id": "c1", "driver_id": "drv", "host": "db", "port": 5432, "db_name": "app",
+       "login": "u", "password": "p"}
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Список физически открытых соединений; реальный JDBC подменён."""
+    conns: list[FakeConn] = []
+
+    def connect(conn_config):
+        conns.append(FakeConn())
+        return conns[-1], DRIVER
+
+    monkeypatch.setattr(DC, "get_db_connection", connect)
+    monkeypatch.setattr(DC, "get_driver_for_connection", lambda cfg: DRIVER)
+    monkeypatch.setattr(DC, "_ensure_jaydebeapi_ready", lambda: None)
+    monkeypatch.setattr(DC, "_start_sweeper", lambda: None)
+    monkeypatch.setattr(DC, "_pools", {})
+    return conns
+
+
+def test_соединение_переиспользуется_и_проверяется(opened):
+    with DC.pooled_connection(CFG) as (first, driver):
+        assert driver["sql_dialect"] == "postgresql"
+    with DC.pooled_connection(CFG) as (second, _):
+        pass
+    assert first is second and len(opened) == 1
+
+    # Сервер разорвал соединение — при выдаче оно выбрасывается, открывается новое
+    first.jconn.valid = False
+    with DC.pooled_connection(CFG) as (third, _):
+        pass
+    assert third is not first and first.jconn.closed and len(opened) == 2
+
+
+def test_размер_пула_ограничен(opened, monkeypatch):
+    monkeypatch.setenv("TESTDATA_POOL_SIZE", "1")
+    monkeypatch.setenv("TESTDATA_POOL_WAIT_SEC", "0.1")
+
+    with DC.pooled_connection(CFG):
+        with pytest.raises(TimeoutError):
+            with DC.pooled_connection(CFG):
+                pass
+
+    # Освободившееся соединение достаётся ожидающему потоку
+    got = []
+    monkeypatch.setenv("TESTDATA_POOL_WAIT_SEC", "5")
+    DC._pools.clear()
+    with DC.pooled_connection(CFG) as (conn, _):
+        t = threading.Thread(target=lambda: got.append(DC.pooled_connection(CFG).__enter__()[0]))
+        t.start()
+        time.sleep(0.05)
+        assert got == []
+    t.join(2)
+    assert got == [conn]
+
+
+def test_простаивающие_и_старые_закрываются(opened, monkeypatch):
+    monkeypatch.setenv("TESTDATA_POOL_IDLE_SEC", "0.05")
+    with DC.pooled_connection(CFG) as (idle, _):
+        pass
+    time.sleep(0.1)
+    assert DC._pools["c1"].evict_idle() == 1
+    assert idle.jconn.closed
+
+    monkeypatch.setenv("TESTDATA_POOL_IDLE_SEC", "300")
+    monkeypatch.setenv("TESTDATA_POOL_MAX_LIFETIME_SEC", "0.05")
+    DC._pools.clear()
+    with DC.pooled_connection(CFG) as (old, _):
+        time.sleep(0.1)
+    assert old.jconn.closed and DC.pool_stats()["c1"]["idle"] == 0
+
+
+def test_транзакция_откатывается_при_возврате(opened):
+    with DC.pooled_connection(CFG) as (conn, _):
+        conn.jconn.setAutoCommit(False)
+    assert conn.rollbacks == 1 and conn.jconn.autocommit is True
+    with DC.pooled_connection(CFG) as (again, _):
+        pass
+    assert again is conn
+
+
+def test_правка_подключения_или_драйвера_сбрасывает_пул(opened):
+    with DC.pooled_connection(CFG) as (conn, _):
+        pass
+
+    # Новый пароль — другая сигнатура: старый пул закрыт, соединение новое
+    with DC.pooled_connection({**CFG, "password": "new"}) as (fresh, _):
+        pass
+    assert conn.jconn.closed and fresh is not conn
+
+    # Выданное соединение закрывается при возврате, если пул сбросили
+    with DC.pooled_connection({**CFG, "password": "new"}) as (busy, _):
+        DC.invalidate_driver("drv")
+        assert "c1" not in DC._pools
+    assert busy.jconn.closed
+
+    with DC.pooled_connection(CFG):
+        pass
+    DC.invalidate_connection("c1")
+    assert DC.pool_stats() == {} and opened[-1].jconn.closed
@@ -0,0 +1,119 @@
+"""Общий транзакционный слой JSON-хранилищ data/*.json.
+
+Раньше каждое хранилище читало файл целиком на каждый запрос и переписывало
+его без блокировок: параллельные запросы теряли изменения друг друга, а
+обрыв записи оставлял битый JSON. Теперь чтение идёт из кэша по mtime с
+индексом по id, а запись — в transaction() под блокировкой файла с атомарной
+заменой.
+"""
+
+import json
+import os
+import threading
+
+import pytest
+
+import db.json_store as JS
+from db.json_store import JsonDocument
+
+
+def test_повторное_чтение_из_кэша_без_разбора(tmp_path, monkeypatch):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([{"id": "a", "v": 1}]), encoding="utf-8")
+    doc = JsonDocument(path)
+    assert doc.get("a") == {"id": "a", "v": 1}
+
+    parsed = []
+    monkeypatch.setattr(doc, "_parse", lambda: parsed.append(1) or [])
+    assert doc.read() == [{"id": "a", "v": 1}]
+    assert doc.get("a")["v"] == 1
+    assert parsed == []
+
+
+def test_изменение_файла_другим_писателем_сбрасывает_кэш(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([{"id": "a", "v": 1}]), encoding="utf-8")
+    doc = JsonDocument(path)
+    assert doc.get("a")["v"] == 1
+
+    path.write_text(json.dumps([{"id": "a", "v": 2}, {"id": "b"}]), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert doc.get("a")["v"] == 2
+    assert doc.get("b") == {"id": "b"}
+
+
+def test_результат_чтения_не_портит_кэш(tmp_path):
+    doc = JsonDocument(tmp_path / "items.json")
+    doc.write([{"id": "a", "tags": ["x"]}])
+    doc.read()[0]["tags"].append("y")
+    doc.get("a")["tags"].append("z")
+    assert doc.get("a") == {"id": "a", "tags": ["x"]}
+
+
+def test_транзакция_пишет_атомарно_и_без_хвостов(tmp_path):
+    path = tmp_path / "items.json"
+    doc = JsonDocument(path)
+    with doc.transaction() as tx:
+        tx.data.append({"id": "a"})
+    with doc.transaction() as tx:
+        tx.save = False
+        tx.data.append({"id": "b"})
+
+    assert json.loads(path.read_text(encoding="utf-8")) == [{"id": "a"}]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["items.json", "items.json.lock"]
+
+
+def test_ошибка_в_транзакции_не_меняет_файл(tmp_path):
+    doc = JsonDocument(tmp_path / "items.json")
+    doc.write([{"id": "a"}])
+    with pytest.raises(RuntimeError):
+        with doc.transaction() as tx:
+            tx.data.clear()
+            raise RuntimeError("boom")
+    assert doc.read() == [{"id": "a"}]
+
+
+def test_битый_файл_откладывается(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text("[{\"id\": ", encoding="utf-8")
+    doc = JsonDocument(path)
+    assert doc.read() == []
+    assert [p.name.startswith("items.json.corrupted-") for p in tmp_path.iterdir()] == [True]
+
+    doc.write([{"id": "a"}])
+    assert doc.get("a") == {"id": "a"}
+
+
+def test_параллельные_транзакции_не_теряют_изменений(tmp_path):
+    path = tmp_path / "counter.json"
+    # Два документа на один файл — как два воркера: их разделяет только блокировка файла
+    docs = [JsonDocument(path, default=dict), JsonDocument(path, default=dict)]
+
+    def bump(doc):
+        for _ in range(25):
+            with doc.transaction() as tx:
+                tx.data["n"] = tx.data.get("n", 0) + 1
+
+    threads = [threading.Thread(target=bump, args=(docs[i % 2],)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"n": 100}
+
+
+def test_хранилище_алертов_поверх_документа(tmp_path, monkeypatch):
+    import db.alerts_store as AS
+
+    monkeypatch.setattr(AS, "_SCRIPTS_FILE", tmp_path / "alert_scripts.json")
+    monkeypatch.setattr(AS, "_FOLDERS_FILE", tmp_path / "alert_folders.json")
+    monkeypatch.setattr(JS, "_documents", {})
+
+    script = AS.AlertsStore.save_script({"name": "cpu", "folder_id": "f1"})
+    assert AS.AlertsStore.get_script(script["id"])["name"] == "cpu"
+
+    folder = AS.AlertsStore.save_folder({"id": "f1", "name": "infra"})
+    assert AS.AlertsStore.delete_folder(folder["id"]) is True
+    assert AS.AlertsStore.get_script(script["id"])["folder_id"] is None
+    assert AS.AlertsStore.delete_script("missing") is False
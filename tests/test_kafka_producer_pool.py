@@ -0,0 +1,89 @@
+"""Общий KafkaProducer для отправки сообщений.
+
+Раньше KafkaClient.send создавал KafkaProducer на каждое сообщение, делал
+flush и close — по handshake и загрузке metadata на каждую из трёх отправок
+метрики. Теперь producer один на набор настроек подключения, сообщения
+копятся linger_ms, а close_producers() дописывает хвост и закрывает пул.
+"""
+
+import sys
+import types
+
+import pytest
+
+import agents.kafka_client as KC
+from agents.kafka_client import KafkaClient
+
+
+class _Meta:
+    def __init__(self, offset):
+        self.offset, self.partition, self.timestamp = offset, 0, 1
+
+
+class _Future:
+    def __init__(self, offset):
+        self._offset = offset
+
+    def get(self, timeout=None):
+        return _Meta(self._offset)
+
+
+class FakeProducer:
+    instances: list = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.sent = []
+        self.flushed = self.closed = False
+        FakeProducer.instances.append(self)
+
+    def send(self, topic, **kwargs):
+        self.sent.append((topic, kwargs))
+        return _Future(len(self.sent) - 1)
+
+    def flush(self, timeout=None):
+        self.flushed = True
+
+    def close(self, timeout=None):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_kafka(monkeypatch):
+    FakeProducer.instances = []
+    monkeypatch.setitem(sys.modules, "kafka", types.SimpleNamespace(KafkaProducer=FakeProducer))
+    monkeypatch.setattr(KC, "_producers", {})
+    monkeypatch.setenv("KAFKA_LINGER_MS", "50")
+    yield
+
+
+CFG = {"kafka_bootstrap_servers": "b1:9092", "kafka_topic_data": "t.data"}
+
+
+def test_один_producer_на_настройки_подключения():
+    assert KafkaClient.send("t", "a", kafka_cfg=CFG)["offset"] == 0
+    assert KafkaClient.send("t", "b", kafka_cfg={**CFG, "kafka_topic_data": "other"})["offset"] == 1
+    assert len(FakeProducer.instances) == 1
+    assert FakeProducer.instances[0].kwargs["linger_ms"] == 50
+    assert not FakeProducer.instances[0].closed
+
+    KafkaClient.send("t", "c", kafka_cfg={**CFG, "kafka_bootstrap_servers": "b2:9092"})
+    assert len(FakeProducer.instances) == 2
+
+
+def test_close_producers_дописывает_и_пересобирает():
+    KafkaClient.send("t", "a", kafka_cfg=CFG)
+    first = FakeProducer.instances[0]
+    KC.close_producers()
+    assert first.flushed and first.closed
+
+    KafkaClient.send("t", "b", kafka_cfg=CFG)
+    assert len(FakeProducer.instances) == 2
+
+
+def test_send_async_не_ждёт_доставки():
+    futures = [KafkaClient.send_async("t", str(i), key="k", kafka_cfg=CFG) for i in range(3)]
+    producer = FakeProducer.instances[0]
+    assert [m[1]["value"] for m in producer.sent] == [b"0", b"1", b"2"]
+    assert not producer.flushed
+    assert [KafkaClient.result(f)["offset"] for f in futures] == [0, 1, 2]
@@ -0,0 +1,88 @@
+"""Кэш ответов LLM по содержимому запроса (db/llm_cache.py).
+
+Одинаковый запрос к той же модели с теми же параметрами отдаётся из SQLite
+под data/, а не генерируется заново. Вызов может отказаться от кэша
+(cache=False), старые записи вытесняются по LRU и TTL.
+"""
+
+import json
+
+import pytest
+
+import agents.llm_client as LC
+import db.llm_cache as CACHE
+from agents.llm_client import LLMResponse, Message
+
+
+class CountingClient(LC.LLMClient):
+    def __init__(self):
+        self.provider = "custom_c"
+        self.model = "m"
+        self.calls = 0
+
+    def _chat_custom(self, messages, temperature, max_tokens, model_override=""):
+        self.calls += 1
+        return LLMResponse(content=f"ответ {self.calls}", model="m", usage={"total_tokens": 3})
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(CACHE, "_CACHE_FILE", tmp_path / "llm_cache.sqlite3")
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "1")
+    monkeypatch.setattr(CACHE.LLMResponseCache, "_hits", 0)
+    monkeypatch.setattr(CACHE.LLMResponseCache, "_misses", 0)
+
+
+def _ask(llm, text="привет", **kw):
+    return llm.chat([Message(role="user", content=text)], temperature=0, max_tokens=100, **kw)
+
+
+def test_повторный_запрос_отдаётся_из_кэша():
+    llm = CountingClient()
+    first = _ask(llm)
+    second = _ask(llm)
+    assert llm.calls == 1
+    assert second == first
+    assert _ask(llm, "другой").content == "ответ 2"
+    stats = CACHE.LLMResponseCache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+
+def test_cache_false_и_выключенный_кэш_идут_к_модели(monkeypatch):
+    llm = CountingClient()
+    _ask(llm)
+    _ask(llm, cache=False)
+    assert llm.calls == 2
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "")
+    _ask(llm)
+    assert llm.calls == 3
+
+
+def test_lru_и_ttl(monkeypatch):
+    monkeypatch.setenv("LLM_CACHE_MAX_ENTRIES", "2")
+    llm = CountingClient()
+    _ask(llm, "a")
+    _ask(llm, "b")
+    _ask(llm, "a")          # a — свежее b
+    _ask(llm, "c")          # вытесняет b
+    calls = llm.calls
+    _ask(llm, "a")
+    _ask(llm, "c")
+    assert llm.calls == calls
+    _ask(llm, "b")
+    assert llm.calls == calls + 1
+
+    monkeypatch.setenv("LLM_CACHE_TTL_SEC", "0")
+    monkeypatch.setattr(CACHE.time, "time", lambda: 10 ** 10)
+    _ask(llm, "a")
+    assert llm.calls == calls + 2
+
+
+def test_ключ_зависит_от_параметров():
+    msgs = [Message(role="user", content="x")]
+    base = CACHE.cache_key("p", "m", msgs, 0.2, 100)
+    assert base == CACHE.cache_key("p", "m", [Message(role="user", content="x")], 0.2, 100)
+    assert base != CACHE.cache_key("p", "m", msgs, 0.3, 100)
+    assert base != CACHE.cache_key("p", "m2", msgs, 0.2, 100)
+    assert base != CACHE.cache_key("p", "m", msgs, 0.2, 200)
+    assert json.dumps(CACHE.LLMResponseCache.stats())
@@ -0,0 +1,91 @@
+"""Потоковые ответы LLM (SSE) для слоя 1 генерации.
+
+Раньше QA-документ (до 8000 токенов и до трёх продолжений) приходил в UI
+целиком, когда генерация уже закончилась. Теперь AsyncLLMClient.astream читает
+SSE chat/completions, а achat_continued(on_delta=...) отдаёт куски по мере
+прихода — и в продолжениях тоже.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import agents.llm_client as LC
+from agents.llm_client import Message
+
+
+def _sse(*chunks, finish="stop"):
+    lines = [
+        "data: " + json.dumps({"choices": [{"delta": {"content": c}, "finish_reason": None}]})
+        for c in chunks
+    ]
+    lines.append("data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": finish}]}))
+    lines.append("data: [DONE]")
+    return ("\n\n".join(lines) + "\n\n").encode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("CUSTOM_LLM_PROVIDERS", json.dumps([
+        {"id": "custom_s", "name": "S", "base_url": "http://s/v1", "api_key": "k", "model": "m"},
+    ]))
+    LC.reset_llm_transports()
+
+    def make(handler):
+        llm = LC.AsyncLLMClient("custom_s")
+        llm.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return llm
+    yield make
+    LC.reset_llm_transports()
+
+
+def test_astream_разбирает_sse_и_finish_reason(client):
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                              content=_sse("При", "вет", finish="length"))
+
+    async def run():
+        return [c async for c in client(handler).astream([Message(role="user", content="hi")])]
+
+    chunks = asyncio.run(run())
+    assert "".join(c.content for c in chunks) == "Привет"
+    assert chunks[-1].finish_reason == "length"
+    assert requests[0]["stream"] is True
+
+
+def test_on_delta_получает_куски_и_продолжения(client):
+    answers = iter([_sse("Нач", "ало", finish="length"), _sse(" и конец")])
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=next(answers))
+
+    seen = []
+
+    async def on_delta(text):
+        seen.append(text)
+
+    async def run():
+        return await client(handler).achat_continued(
+            [Message(role="user", content="hi")], max_tokens=10, on_delta=on_delta,
+        )
+
+    response = asyncio.run(run())
+    assert seen == ["Нач", "ало", " и конец"]
+    assert response.content == "Начало и конец"
+    assert response.finish_reason == "stop"
+
+
+def test_эндпоинт_без_стриминга_отдаёт_ответ_одним_чанком(client):
+    def handler(request):
+        return httpx.Response(200, json={"choices": [{"message": {"content": "целиком"}, "finish_reason": "stop"}]})
+
+    async def run():
+        return [c async for c in client(handler).astream([Message(role="user", content="hi")])]
+
+    chunks = asyncio.run(run())
+    assert [(c.content, c.finish_reason) for c in chunks] == [("целиком", "stop")]
@@ -0,0 +1,57 @@
+"""Пул HTTP-клиентов LLM.
+
+Раньше каждый LLMClient(...) создавал свой httpx.Client — новый TLS-handshake
+и загрузка сертификата на каждый запрос. Теперь клиенты общие на процесс по
+ключу (провайдер, base_url, cert, verify, timeout) и сбрасываются при
+сохранении настроек.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import agents.llm_client as LC
+
+
+@pytest.fixture(autouse=True)
+def custom_provider(monkeypatch):
+    monkeypatch.setenv("CUSTOM_LLM_PROVIDERS", json.dumps([
+        {"id": "custom_a", "name": "A", "base_url": "http://a/v1", "api_key": "k", "model": "m"},
+        {"id": "custom_b", "name": "B", "base_url": "http://b/v1", "api_key": "k", "model": "m"},
+    ]))
+    monkeypatch.setenv("SSL_NO_VERIFY", "1")
+    LC.reset_llm_transports()
+    yield
+    LC.reset_llm_transports()
+
+
+def test_клиенты_одного_провайдера_делят_транспорт():
+    first = LC.LLMClient("custom_a")
+    second = LC.LLMClient("custom_a")
+    assert first.client is second.client
+    assert LC.LLMClient("custom_b").client is not first.client
+    assert LC.LLMClient("custom_a", timeout=5).client is not first.client
+
+
+def test_смена_настроек_tls_и_сброс_дают_новый_клиент(monkeypatch):
+    before = LC.LLMClient("custom_a").client
+    monkeypatch.setenv("SSL_NO_VERIFY", "")
+    assert LC.LLMClient("custom_a").client is not before
+
+    again = LC.LLMClient("custom_a").client
+    LC.reset_llm_transports()
+    assert LC.LLMClient("custom_a").client is not again
+
+
+def test_асинхронный_пул_свой_у_каждого_loop_и_aclose_его_не_закрывает():
+    async def grab():
+        async with LC.AsyncLLMClient("custom_a") as one:
+            pass
+        two = LC.AsyncLLMClient("custom_a")
+        assert one.client is two.client
+        assert not two.client.is_closed
+        return two.client
+
+    first_loop = asyncio.run(grab())
+    assert asyncio.run(grab()) is not first_loop
@@ -0,0 +1,113 @@
+"""Постоянный кэш LLM-анализа ошибок логов по fingerprint.
+
+Раньше каждое открытие /api/logs/analyze отправляло в LLM все выбранные
+ошибки, даже если тот же стектрейс разбирали час назад. Теперь анализ
+fingerprint хранится в data/log_analysis_cache.sqlite3 (ключ — fingerprint,
+провайдер и модель, TTL и LRU-лимит): в LLM уходят только промахи, а
+записи из кэша помечаются cached: true.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+import pytest
+
+import agents.llm_client as LC
+import backend.api.logs as L
+import db.log_analysis_cache as CACHE
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    calls: list = []
+    model = "GigaChat"
+
+    def __init__(self, provider="gigachat"):
+        self.provider = provider
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def achat_continued(self, messages, **kwargs):
+        messages_in_prompt = re.findall(r"Сообщение: (.*)", messages[0].content)
+        FakeLLM.calls.append(messages_in_prompt)
+        if "broken" in messages_in_prompt:
+            return FakeResponse("не JSON")
+        return FakeResponse(json.dumps([{"error_index": i, "summary": f"about {msg}"}
+                                        for i, msg in enumerate(messages_in_prompt, 1)]))
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch, tmp_path):
+    FakeLLM.calls, FakeLLM.model = [], "GigaChat"
+    monkeypatch.setattr(LC, "AsyncLLMClient", FakeLLM)
+    monkeypatch.setattr(LC, "provider_concurrency", lambda provider: 2)
+    monkeypatch.setattr(CACHE, "_CACHE_FILE", tmp_path / "log_analysis_cache.sqlite3")
+    monkeypatch.setattr(CACHE.LogAnalysisCache, "_hits", 0)
+    monkeypatch.setattr(CACHE.LogAnalysisCache, "_misses", 0)
+    for name in ("LOG_ANALYSIS_CACHE_ENABLED", "LOG_ANALYSIS_CACHE_TTL_SEC", "LOG_ANALYSIS_CACHE_MAX_ENTRIES"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def _entry(i, fp, message=None):
+    return {"id": f"id{i}", "fingerprint": fp, "service": "billing", "level": "ERROR",
+            "message": message or f"msg-{fp}", "stacktrace": "at x.y"}
+
+
+def _analyze(entries, provider="gigachat"):
+    return asyncio.run(L._analyze_with_llm(entries, provider))
+
+
+def test_повторный_анализ_из_кэша():
+    first = _analyze([_entry(0, "a"), _entry(1, "b")])
+    assert len(FakeLLM.calls) == 1 and not any(a["cached"] for a in first)
+
+    out = _analyze([_entry(5, "b"), _entry(6, "c"), _entry(7, "b")])
+    assert FakeLLM.calls[1:] == [["msg-c"]]           # в LLM только промах
+    assert [a["cached"] for a in out] == [True, False, True]
+    assert out[0]["summary"] == "about msg-b"
+    assert (out[0]["log_id"], out[0]["error_index"], out[2]["group_size"]) == ("id5", 1, 2)
+    assert CACHE.LogAnalysisCache.stats()["hits"] == 1
+
+    # Другая модель — другой ключ
+    FakeLLM.model = "GigaChat-Max"
+    _analyze([_entry(8, "b")])
+    assert FakeLLM.calls[-1] == ["msg-b"]
+
+
+def test_заглушки_и_записи_без_fingerprint_не_кэшируются():
+    entries = [_entry(0, "bad", message="broken"), {"id": "x", "service": "s", "message": "no fp"}]
+    _analyze(entries)
+    out = _analyze(entries)
+
+    assert len(FakeLLM.calls) == 2
+    assert out[0]["fallback"] is True and out[0]["cached"] is False
+    assert out[1]["cached"] is False
+    assert CACHE.LogAnalysisCache.stats()["entries"] == 0
+
+
+def test_ttl_и_лимит_записей(monkeypatch):
+    cache = CACHE.LogAnalysisCache
+    monkeypatch.setenv("LOG_ANALYSIS_CACHE_MAX_ENTRIES", "2")
+    cache.put_many({"a": {"summary": "A"}, "b": {"summary": "B"}}, "gigachat", "m")
+    time.sleep(0.01)
+    cache.get_many(["a"], "gigachat", "m")             # a свежее по чтению
+    cache.put_many({"c": {"summary": "C"}}, "gigachat", "m")
+    assert set(cache.get_many(["a", "b", "c"], "gigachat", "m")) == {"a", "c"}
+
+    monkeypatch.setenv("LOG_ANALYSIS_CACHE_TTL_SEC", "0")
+    time.sleep(0.01)
+    assert cache.get_many(["a"], "gigachat", "m") == {}
+
+    monkeypatch.setenv("LOG_ANALYSIS_CACHE_ENABLED", "0")
+    cache.put_many({"d": {"summary": "D"}}, "gigachat", "m")
+    assert cache.clear() == 2
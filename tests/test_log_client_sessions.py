@@ -0,0 +1,112 @@
+"""Общие keep-alive сессии клиентов логов VPS.
+
+Раньше каждый search/get_services/test_connection шёл через голый
+requests.get/post — новое TCP+TLS-соединение на вызов, — а _build_client
+создавал клиента на каждый запрос. Теперь у клиента своя Session с пулом
+и повторами (backoff), клиенты кэшируются на подключение VPS, а сохранение
+LOGS_VPS_CONNECTIONS сбрасывает кэш.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import backend.api.log_clients as LC
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"            # keep-alive
+    failures_left = 0
+
+    def do_GET(self):
+        server = self.server
+        server.requests += 1
+        server.peers.add(self.client_address)
+        if _Handler.failures_left > 0:
+            _Handler.failures_left -= 1
+            status, body = 503, b"{}"
+        else:
+            status, body = 200, json.dumps([{"id": server.requests, "message": "boom"}]).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("LOGS_HTTP_BACKOFF_SEC", "0")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.requests, httpd.peers = 0, set()
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(LC, "_clients", {})
+    yield
+    LC.invalidate_clients()
+
+
+def _conn(url, **extra):
+    return {"id": "vps_main", "vps_type": "generic", "base_url": url, **extra}
+
+
+def test_одно_соединение_на_клиента_и_повтор_503(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    now = datetime(2024, 5, 1)
+    _Handler.failures_left = 1
+
+    for _ in range(3):
+        client = LC.client_for_connection(_conn(url))
+        result = client.search([], "ERROR", now - timedelta(hours=1), now, limit=10)
+        assert [e.message for e in result.entries] == ["boom"]
+
+    assert server.requests == 4                  # 503 повторён, дальше — без ошибок
+    assert len(server.peers) == 1                # все запросы — по одному keep-alive соединению
+
+
+def test_кэш_по_подключению_и_сброс(monkeypatch):
+    first = LC.client_for_connection(_conn("http://logs-a"))
+    assert LC.client_for_connection(_conn("http://logs-a")) is first
+
+    closed = []
+    monkeypatch.setattr(first, "close", lambda: closed.append("first"))
+    changed = LC.client_for_connection(_conn("http://logs-a", token="new"))
+    assert changed is not first and closed == ["first"]
+
+    other = LC.client_for_connection({**_conn("http://logs-b"), "id": "VPS_Other"})
+    LC.invalidate_clients("vps_other")
+    assert LC.client_for_connection(_conn("http://logs-a", token="new")) is changed
+    assert LC.client_for_connection({**_conn("http://logs-b"), "id": "vps_other"}) is not other
+
+
+def test_сохранение_подключений_сбрасывает_кэш(monkeypatch):
+    import backend.api.app_settings as AS
+    from db.metrics_models import Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setenv("LOGS_VPS_CONNECTIONS", "[]")
+
+    cached = LC.client_for_connection(_conn("http://logs-a"))
+    AS.upsert_logs_vps(AS.LogsVpsConfig(id="vps_main", name="Main", vps_type="generic",
+                                        base_url="http://logs-a"), db)
+    assert LC._clients == {}
+    assert LC.client_for_connection(_conn("http://logs-a")) is not cached
+    db.close()
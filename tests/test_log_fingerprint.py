@@ -0,0 +1,81 @@
+"""Нормализованный fingerprint ошибок логов.
+
+Раньше LogEntry.fingerprint хэшировал сырые первые строки стектрейса — UUID,
+id заказов, IP, таймстемпы, адреса объектов и дрейф номеров строк дробили
+одну ошибку на сотни групп (и пакетов в LLM). Теперь изменчивые токены
+маскируются заранее скомпилированным нормализатором, набор масок задаётся
+на подключение VPS, а scripts/bench_log_fingerprint.py меряет эффект.
+"""
+
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from backend.api.log_clients import get_client
+from backend.api.log_clients.base import LogEntry
+from backend.api.log_clients.fingerprint import FingerprintNormalizer, get_normalizer
+
+_BENCH = Path(__file__).resolve().parent.parent / "scripts" / "bench_log_fingerprint.py"
+
+
+def _entry(stacktrace, message="boom", **kwargs):
+    return LogEntry(id="1", timestamp=datetime(2024, 5, 1), service="billing", level="ERROR",
+                    message=message, stacktrace=stacktrace, **kwargs)
+
+
+def test_изменчивые_токены_маскируются():
+    n = get_normalizer()
+    assert n.normalize(
+        "IllegalStateException: Order 12345 not found for request 3f2b8c1e-1d2a-4b5c-9e8f-0a1b2c3d4e5f\n"
+        "  at com.acme.OrderService.load(OrderService.java:142)\n"
+        "Connection to 10.0.12.7:5432 refused at 2024-05-01T10:22:33.123Z\n"
+        "com.acme.Foo@1b6d3586 ptr 0x7ffd1234 can't parse 'abc-42' \"x y\" Http2Client"
+    ).splitlines() == [
+        "IllegalStateException: Order <NUM> not found for request <UUID>",
+        "at com.acme.OrderService.load(OrderService.java:<NUM>)",
+        "Connection to <IP> refused at <TS>",
+        "com.acme.Foo@<HEX> ptr <HEX> can't parse <STR> <STR> Http2Client",
+    ]
+
+
+def test_одна_ошибка_одна_группа():
+    a = _entry("NPE at Foo@1b6d3586 req 11111111-2222-3333-4444-555555555555\n\tat x.Y.z(Y.java:10)")
+    b = _entry("NPE at Foo@7a81197d req 99999999-8888-7777-6666-555555555555\n\tat x.Y.z(Y.java:12)")
+    other = _entry("IOException: closed\n\tat x.Y.z(Y.java:10)")
+    assert a.fingerprint == b.fingerprint != other.fingerprint
+    assert a.to_dict()["fingerprint"] == a.fingerprint and "normalizer" not in a.to_dict()
+
+    # Без стектрейса группа — по сообщению, а не одна на весь сервис
+    assert _entry("", message="timeout 30s").fingerprint == _entry("", message="timeout 45s").fingerprint
+    assert _entry("", message="timeout 30s").fingerprint != _entry("", message="auth failed").fingerprint
+
+
+def test_маски_настраиваются_на_источник():
+    client = get_client("generic", base_url="http://logs", fingerprint_masks=["uuid"],
+                        fingerprint_patterns=[r"tenant=\w+"])
+    assert client.normalizer is get_normalizer(["uuid"], [r"tenant=\w+"])
+
+    entries = client._attach([_entry("failed tenant=acme shard 1"), _entry("failed tenant=zeta shard 2")])
+    # Числа этот источник не маскирует (шарды различаются), tenant — своим шаблоном
+    assert client.normalizer.normalize("failed tenant=acme shard 1") == "failed <*> shard 1"
+    assert entries[0].fingerprint != entries[1].fingerprint
+
+    with pytest.raises(ValueError, match="Неизвестные маски"):
+        FingerprintNormalizer(masks=["phone"])
+    with pytest.raises(ValueError, match="Некорректный шаблон"):
+        FingerprintNormalizer(patterns=["(unclosed"])
+
+
+def test_бенчмарк_группировки():
+    spec = importlib.util.spec_from_file_location("bench_log_fingerprint", _BENCH)
+    bench = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bench)
+
+    result = bench.run_benchmark(entries=3000, templates=12)
+    assert result["groups_normalized"] == 12
+    assert result["groups_raw"] > 1000
+    assert result["llm_calls_normalized"] == 3
+    assert result["entries_per_sec_normalized"] > 0
+    assert bench.main(["--entries", "500", "--templates", "5", "--json", "--min-ratio", "1000000"]) == 1
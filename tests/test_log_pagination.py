@@ -0,0 +1,210 @@
+"""Постраничный поиск логов во всех LogSourceClient.
+
+Раньше Loki/Elastic/Graylog/Generic делали один запрос с min(limit, 500) —
+ночь ошибок молча обрезалась до 500 записей. Теперь iter_search отдаёт
+страницы (search_after у Elastic, сдвиг окна у Loki, offset у Graylog и
+Generic) до общего бюджета LOGS_MAX_ROWS, а search помечает обрезку
+truncated. Здесь фейковые платформы честно пагинируют свои данные.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import backend.api.log_clients.graylog as GL
+from backend.api.log_clients import get_client
+
+T0 = datetime(2024, 5, 1, tzinfo=timezone.utc)
+FROM, TO = T0, T0 + timedelta(hours=10)
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data, self.status_code = data, status_code
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def _client(kind):
+    return get_client(kind, base_url="http://logs")
+
+
+@pytest.fixture(autouse=True)
+def no_budget_env(monkeypatch):
+    monkeypatch.delenv("LOGS_MAX_ROWS", raising=False)
+
+
+def _elastic(monkeypatch, pit=True):
+    """Фейковый Elasticsearch: 1200 документов, по два на секунду — у пар одинаковый @timestamp."""
+    docs = [{"_id": f"d{i}", "ts": T0 + timedelta(seconds=i // 2), "shard_doc": 5000 - i} for i in range(1200)]
+    tiebreak = "shard_doc" if pit else "_id"
+    order = sorted(docs, key=lambda d: (-d["ts"].timestamp(), d[tiebreak]))
+    calls = {"search": [], "urls": [], "closed": []}
+
+    def post(url, json=None, params=None, **kwargs):
+        if url.endswith("/_pit"):
+            return FakeResponse({"id": "pit-1"} if pit else {}, 200 if pit else 404)
+        calls["urls"].append(url)
+        calls["search"].append(dict(json))
+        after = json.get("search_after")
+        start = 0 if after is None else next(i for i, d in enumerate(order)
+                                             if [d["ts"].timestamp(), d[tiebreak]] == after) + 1
+        page = order[start:start + json["size"]]
+        hits = {"hits": [{"_id": d["_id"], "sort": [d["ts"].timestamp(), d[tiebreak]],
+                          "_source": {"@timestamp": d["ts"].isoformat(), "message": "boom"}} for d in page]}
+        if json.get("track_total_hits"):
+            hits["total"] = {"value": len(order)}
+        return FakeResponse({"hits": hits, **({"pit_id": "pit-2"} if pit else {})})
+
+    client = _client("elastic")
+    monkeypatch.setattr(client.session, "post", post)
+    monkeypatch.setattr(client.session, "delete", lambda url, json=None, **kw: calls["closed"].append(json["id"]))
+    return client, order, calls
+
+
+def test_elastic_search_after_в_pit(monkeypatch):
+    client, order, calls = _elastic(monkeypatch)
+    bodies = calls["search"]
+    result = client.search([], "ERROR", FROM, TO, limit=1100)
+
+    assert [e.id for e in result.entries] == [d["_id"] for d in order[:1100]]
+    assert result.total == 1200 and result.truncated is True
+    assert [b["size"] for b in bodies] == [500, 500, 500]
+    # Внутри PIT: поиск без индекса в URL, уникальный тай-брейк _shard_doc, свежий id PIT
+    assert set(calls["urls"]) == {"http://logs/_search"}
+    assert bodies[0]["sort"][1] == {"_shard_doc": {"order": "asc"}}
+    assert bodies[0]["pit"]["id"] == "pit-1" and bodies[1]["pit"]["id"] == "pit-2"
+    assert "search_after" not in bodies[0] and bodies[1]["search_after"] == [order[499]["ts"].timestamp(),
+                                                                             order[499]["shard_doc"]]
+    assert bodies[0]["track_total_hits"] is True and bodies[1]["track_total_hits"] is False
+    # Бюджет кончился раньше выборки — PIT всё равно закрыт
+    assert calls["closed"] == ["pit-2"]
+
+    # Всё помещается в лимит — одна страница на limit+1, без обрезки
+    calls["closed"].clear()
+    small = client.search([], "ERROR", FROM, TO, limit=5000)
+    assert len(small.entries) == 1200 and small.truncated is False
+    assert calls["closed"] == ["pit-2"]
+
+
+def test_elastic_без_pit_тай_брейк_по_id(monkeypatch):
+    client, order, calls = _elastic(monkeypatch, pit=False)
+    result = client.search([], "ERROR", FROM, TO, limit=5000)
+
+    assert [e.id for e in result.entries] == [d["_id"] for d in order]
+    assert set(calls["urls"]) == {"http://logs/*/_search"}
+    assert calls["search"][0]["sort"][1] == {"_id": {"order": "asc"}} and "pit" not in calls["search"][0]
+    assert calls["closed"] == []
+
+
+def test_loki_окно_времени_без_потерь_на_границе(monkeypatch):
+    # Два потока; метки времени повторяются — граница страницы попадает внутрь группы
+    rows = [(int((T0 + timedelta(seconds=i // 3)).timestamp() * 1e9), f"app{i % 2}", f"ERROR line {i}")
+            for i in range(1100)]
+    calls = []
+
+    def get(url, params, **kwargs):
+        calls.append(dict(params))
+        start, end, limit = int(params["start"]), int(params["end"]), params["limit"]
+        window = sorted((r for r in rows if start <= r[0] < end), key=lambda r: -r[0])[:limit]
+        streams: dict[str, list] = {}
+        for ts, job, line in window:
+            streams.setdefault(job, []).append([str(ts), line])
+        return FakeResponse({"data": {"result": [{"stream": {"job": job}, "values": v}
+                                                 for job, v in streams.items()]}})
+
+    client = _client("loki")
+    monkeypatch.setattr(client.session, "get", get)
+    pages = list(client.iter_search([], "ERROR", FROM, TO, page_size=200))
+
+    lines = [e.message for page in pages for e in page.entries]
+    assert sorted(lines) == sorted(r[2] for r in rows) and len(lines) == len(set(lines))
+    assert len(calls) >= 6
+    assert all(int(b["end"]) <= int(a["end"]) for a, b in zip(calls, calls[1:]))
+
+
+def test_graylog_offset_и_сдвиг_у_края_окна(monkeypatch):
+    monkeypatch.setattr(GL, "_MAX_RESULT_WINDOW", 30)
+    msgs = [{"_id": f"m{i}", "timestamp": (T0 + timedelta(seconds=100 - i // 2)).isoformat(),
+             "source": "billing", "level": 3, "message": f"boom {i}"} for i in range(95)]
+    calls = []
+
+    def get(url, params, **kwargs):
+        calls.append(dict(params))
+        to = datetime.fromisoformat(params["to"].replace("Z", "+00:00"))
+        window = [m for m in msgs if datetime.fromisoformat(m["timestamp"]) <= to]
+        page = window[params["offset"]:params["offset"] + params["limit"]]
+        return FakeResponse({"messages": [{"message": m} for m in page], "total_results": len(window)})
+
+    client = _client("graylog")
+    monkeypatch.setattr(client.session, "get", get)
+    pages = list(client.iter_search([], "ERROR", FROM, TO, page_size=10))
+
+    assert [e.id for page in pages for e in page.entries] == [m["_id"] for m in msgs]
+    assert max(c["offset"] + c["limit"] for c in calls) <= 30      # не выходим за окно
+    assert len({c["to"] for c in calls}) > 1                        # верхняя граница сдвигалась
+    assert pages[0].total == 95
+
+
+def test_generic_offset_и_api_без_пагинации(monkeypatch):
+    items = [{"id": i, "message": f"err {i}", "timestamp": 1_714_500_000 + i} for i in range(25)]
+
+    def paging(url, params, **kwargs):
+        offset, limit = int(params["offset"]), int(params["limit"])
+        return FakeResponse({"items": items[offset:offset + limit], "total": len(items)})
+
+    client = _client("generic")
+    monkeypatch.setattr(client.session, "get", paging)
+    pages = list(client.iter_search([], "ERROR", FROM, TO, page_size=10))
+    assert [len(p.entries) for p in pages] == [10, 10, 5]
+
+    calls = []
+
+    def ignores_offset(url, params, **kwargs):
+        calls.append(params["offset"])
+        return FakeResponse(items[:10])
+
+    monkeypatch.setattr(client.session, "get", ignores_offset)
+    pages = list(client.iter_search([], "ERROR", FROM, TO, page_size=10))
+    assert [len(p.entries) for p in pages] == [10] and calls == ["0", "10"]
+
+
+def test_общий_бюджет_строк(monkeypatch):
+    monkeypatch.setenv("LOGS_MAX_ROWS", "12")
+    items = [{"id": i, "message": f"err {i}"} for i in range(40)]
+    client = _client("generic")
+    monkeypatch.setattr(client.session, "get", lambda url, params, **kw: FakeResponse(
+        items[int(params["offset"]):int(params["offset"]) + int(params["limit"])]))
+
+    result = client.search([], "ERROR", FROM, TO, limit=1000)
+    assert len(result.entries) == 12 and result.truncated is True
+    assert all(e.normalizer is client.normalizer for e in result.entries)
+
+    exact = client.search([], "ERROR", FROM, TO, limit=40)
+    assert len(exact.entries) == 12
+    monkeypatch.setenv("LOGS_MAX_ROWS", "100")
+    assert client.search([], "ERROR", FROM, TO, limit=40).truncated is False
+
+
+def test_ровно_бюджет_не_обрезано(monkeypatch):
+    items = [{"id": i, "message": f"err {i}"} for i in range(1000)]
+    offsets = []
+
+    def get(url, params, **kw):
+        offsets.append(int(params["offset"]))
+        return FakeResponse(items[int(params["offset"]):int(params["offset"]) + int(params["limit"])])
+
+    client = _client("generic")
+    monkeypatch.setattr(client.session, "get", get)
+
+    # Данные кончились ровно на limit — следующая страница пустая
+    result = client.search([], "ERROR", FROM, TO, limit=1000)
+    assert len(result.entries) == 1000 and result.truncated is False
+    assert offsets == [0, 500, 1000]
+
+    items.append({"id": 1000, "message": "err 1000"})
+    assert client.search([], "ERROR", FROM, TO, limit=1000).truncated is True
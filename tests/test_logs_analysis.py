@@ -0,0 +1,97 @@
+"""LLM-анализ ошибок логов: свёртка по fingerprint и параллельные пакеты.
+
+Раньше _analyze_with_llm отправлял записи пакетами по 5 строго по очереди и
+анализировал заново каждую запись с тем же fingerprint. Теперь в LLM уходит
+по представителю группы, пакеты идут параллельно в пределах
+provider_concurrency, а анализ копируется на все записи группы.
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+import agents.llm_client as LC
+import backend.api.logs as L
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    calls: list = []
+    in_flight = 0
+    max_in_flight = 0
+    model = "GigaChat"
+
+    def __init__(self, provider="gigachat"):
+        self.provider = provider
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def achat_continued(self, messages, **kwargs):
+        prompt = messages[0].content
+        FakeLLM.calls.append(prompt)
+        FakeLLM.in_flight += 1
+        FakeLLM.max_in_flight = max(FakeLLM.max_in_flight, FakeLLM.in_flight)
+        await asyncio.sleep(0.02)
+        FakeLLM.in_flight -= 1
+        messages_in_prompt = re.findall(r"Сообщение: (.*)", prompt)
+        if "broken" in messages_in_prompt:
+            return FakeResponse("не JSON")
+        # Ответ нарочно в обратном порядке — привязка по error_index
+        answer = [{"error_index": i, "summary": f"about {msg}", "category": "db"}
+                  for i, msg in enumerate(messages_in_prompt, 1)]
+        return FakeResponse(json.dumps(answer[::-1]))
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(monkeypatch):
+    FakeLLM.calls, FakeLLM.in_flight, FakeLLM.max_in_flight = [], 0, 0
+    monkeypatch.setattr(LC, "AsyncLLMClient", FakeLLM)
+    monkeypatch.setattr(LC, "provider_concurrency", lambda provider: 2)
+    # Кэш анализов проверяется в test_log_analysis_cache.py
+    monkeypatch.setenv("LOG_ANALYSIS_CACHE_ENABLED", "0")
+
+
+def _entry(i, fp, message=None):
+    return {"id": f"id{i}", "fingerprint": fp, "service": "billing", "level": "ERROR",
+            "message": message or f"msg-{fp}", "stacktrace": "at x.y"}
+
+
+def test_всплеск_одинаковых_ошибок_один_вызов():
+    entries = [_entry(i, "same") for i in range(100)]
+    out = asyncio.run(L._analyze_with_llm(entries, "gigachat"))
+
+    assert len(FakeLLM.calls) == 1
+    assert "повторяется ×100" in FakeLLM.calls[0]
+    assert [a["log_id"] for a in out] == [f"id{i}" for i in range(100)]
+    assert {a["summary"] for a in out} == {"about msg-same"}
+    assert out[41]["error_index"] == 42 and out[41]["group_size"] == 100
+
+
+def test_пакеты_параллельно_в_пределах_лимита_и_по_порядку():
+    fps = [f"fp{k}" for k in range(12)]
+    entries = [_entry(i, fps[i % 12]) for i in range(36)]
+    out = asyncio.run(L._analyze_with_llm(entries, "gigachat"))
+
+    assert len(FakeLLM.calls) == 3                  # 12 групп / 5 на пакет
+    assert FakeLLM.max_in_flight == 2
+    assert [a["error_index"] for a in out] == list(range(1, 37))
+    assert all(a["summary"] == f"about {e['message']}" for a, e in zip(out, entries))
+    assert all(a["fingerprint"] == e["fingerprint"] for a, e in zip(out, entries))
+
+
+def test_сбой_разбора_ответа_только_для_своего_пакета():
+    entries = [_entry(i, f"fp{i}") for i in range(5)] + [_entry(5, "bad", message="broken")]
+    out = asyncio.run(L._analyze_with_llm(entries, "gigachat"))
+
+    assert [a["summary"] for a in out[:5]] == [f"about msg-fp{i}" for i in range(5)]
+    assert out[5]["log_id"] == "id5" and "парсинга" in out[5]["root_cause"]
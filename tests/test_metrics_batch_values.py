@@ -0,0 +1,107 @@
+"""Пакетный (NumPy) расчёт значений, базалайна и здоровья метрик.
+
+Раньше планировщик считал каждую метрику тика отдельно через random/math.
+Теперь *_batch считают весь тик массивами; для детерминированных паттернов
+результат обязан побитно совпадать со скалярными generate_value /
+calculate_baseline / calculate_health.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import agents.metrics_message_builder as B
+
+NOW = datetime(2026, 10, 18, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def rnd():
+    return random.Random(20261018)
+
+
+def test_детерминированные_паттерны_совпадают_со_скалярными(rnd):
+    n = 5000
+    patterns = [rnd.choice(["constant", "sine", "spike"]) for _ in range(n)]
+    vmin = [round(rnd.uniform(-1000, 1000), 3) for _ in range(n)]
+    vmax = [v + rnd.choice([0, 0.12345, 10, 1e6]) for v in vmin]
+    sine = [rnd.choice([None, 0, 1, 7, 60]) for _ in range(n)]
+    spike = [rnd.choice([None, 1, 3, 15]) for _ in range(n)]
+
+    for t in (NOW.timestamp(), 1700000000.0, 1700000855.5):
+        got = B.generate_values_batch(B.encode(patterns, B.PATTERN_CODES), vmin, vmax, sine, spike, now=t)
+        expected = [B.generate_value(*args, now=t) for args in zip(patterns, vmin, vmax, sine, spike)]
+        assert got.tolist() == expected
+
+
+def test_random_в_границах_и_неизвестный_паттерн_как_random():
+    codes = B.encode(["random", "bogus", None], B.PATTERN_CODES)
+    values = B.generate_values_batch(codes, [1, 5, -2], [2, 5, -1], rng=np.random.default_rng(1))
+    assert 1 <= values[0] <= 2 and values[1] == 5 and -2 <= values[2] <= -1
+    assert all(v == round(v, 4) for v in values.tolist())
+
+
+def test_округление_как_у_python(rnd):
+    xs = np.array([2.67495, 1.00005, 0.00005, -2.5e-5, 1.23455, 1e12 + 0.5]
+                  + [rnd.uniform(-1e7, 1e7) for _ in range(20000)])
+    assert B._round4(xs).tolist() == [round(x, 4) for x in xs.tolist()]
+
+
+def test_базалайн_совпадает_со_скалярным(rnd):
+    n = 2000
+    enabled = [rnd.random() < 0.8 for _ in range(n)]
+    methods = [rnd.choice(["fixed", "offset", "other"]) for _ in range(n)]
+    values = [round(rnd.uniform(-100, 100), 4) for _ in range(n)]
+    fixed = [rnd.choice([None, 0, 3.5]) for _ in range(n)]
+    offset = [rnd.choice([None, 0, -1.25, 0.33333]) for _ in range(n)]
+
+    got = B.calculate_baselines_batch(enabled, B.encode(methods, B.BASELINE_METHOD_CODES), values, fixed, offset)
+    expected = [B.calculate_baseline(*args) for args in zip(enabled, methods, values, fixed, offset)]
+    assert [None if np.isnan(g) else g for g in got.tolist()] == expected
+
+
+def test_здоровье_совпадает_со_скалярным(rnd, monkeypatch):
+    n = 3000
+    rows_pool = [
+        [],
+        [{"health_type": 3, "min_value": 50, "max_value": None, "is_percent": False}],
+        [{"health_type": 2, "min_value": 20, "max_value": 80, "is_percent": False},
+         {"health_type": 4, "min_value": 60, "max_value": None, "is_percent": False},
+         {"health_type": 5, "min_value": None, "max_value": 5, "is_percent": False}],
+    ]
+    params = [dict(
+        metric_id=i,
+        enabled=rnd.random() < 0.9,
+        calc_method=rnd.choice(["auto", "fixed", "pattern", "other"]),
+        value=round(rnd.uniform(0, 100), 4),
+        fixed_status=rnd.choice([None, 0, 1, 4]),
+        health_pattern=rnd.choice([None, "stable_ok", "degrading", "flapping", "bogus"]),
+        flap_interval_min=rnd.choice([None, 1, 5]),
+        degrade_hours=rnd.choice([None, 1, 4, 24]),
+        metric_created_at=rnd.choice([None, NOW - timedelta(minutes=rnd.randint(0, 3000)),
+                                      (NOW - timedelta(hours=2)).replace(tzinfo=None)]),
+        thresholds_enabled=rnd.random() < 0.7,
+        combination_selector=rnd.choice(["best", "worst"]),
+        threshold_rows=rnd.choice(rows_pool),
+    ) for i in range(n)]
+
+    # Оба пути ведут один счётчик flapping — сравниваем на одинаковом старте
+    monkeypatch.setattr(B, "_flap_counter", {})
+    expected = [B.calculate_health(**p, now=NOW) for p in params]
+    monkeypatch.setattr(B, "_flap_counter", {})
+    col = lambda key: [p[key] for p in params]
+    got = B.calculate_health_batch(
+        col("metric_id"), col("enabled"), B.encode(col("calc_method"), B.HEALTH_METHOD_CODES), col("value"),
+        fixed_status=col("fixed_status"),
+        health_patterns=B.encode(col("health_pattern"), B.HEALTH_PATTERN_CODES),
+        flap_interval_min=col("flap_interval_min"),
+        degrade_hours=col("degrade_hours"),
+        metric_created_at=col("metric_created_at"),
+        thresholds_enabled=col("thresholds_enabled"),
+        best=[s == "best" for s in col("combination_selector")],
+        thresholds=B.threshold_table(col("threshold_rows")),
+        now=NOW,
+    )
+    assert [h or None for h in got.tolist()] == expected
@@ -0,0 +1,49 @@
+"""Бенчмарк пути отправки метрик (scripts/bench_metrics.py).
+
+Раньше производительность планировщика нечем было измерить без живого
+Kafka. Теперь бенчмарк засевает метрики во временную БД, подменяет
+producer фейковым и отдаёт sends/sec, jitter, время БД и CPU на отправку.
+Здесь — короткий прогон: отчёт полный, SQL на отправку не растёт.
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+_PATH = Path(__file__).resolve().parent.parent / "scripts" / "bench_metrics.py"
+
+
+@pytest.fixture
+def bench():
+    spec = importlib.util.spec_from_file_location("bench_metrics", _PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_короткий_прогон_даёт_полный_отчёт(bench):
+    import db.postgres as PG
+    import agents.metrics_config_cache as MCC
+
+    session, configs, kafka = PG.SessionLocal, MCC.metric_configs, sys.modules.get("kafka")
+    result = bench.run_benchmark(metrics=60, period=1.0, duration=2.5)
+
+    # Окружение процесса восстановлено
+    assert (PG.SessionLocal, MCC.metric_configs, sys.modules.get("kafka")) == (session, configs, kafka)
+
+    for key in ("sends_per_sec", "jitter_ms_p50", "jitter_ms_p95", "jitter_ms_p99",
+                "db_time_sec", "db_ms_per_send", "cpu_us_per_send"):
+        assert key in result
+    assert result["sends"] >= 60
+    assert result["messages"] > result["sends"]      # первые METADATA/THRESHOLDS
+    # Пачки, а не запросы на каждую метрику: даже с холодной загрузкой
+    # конфигов statements меньше отправок (раньше — несколько на отправку)
+    assert result["db_statements"] < result["sends"]
+
+
+def test_порог_регрессии_даёт_код_выхода(bench, capsys):
+    assert bench.main(["--metrics", "10", "--duration", "1.5", "--json", "--verbose",
+                       "--min-sends-per-sec", "1000000"]) == 1
+    assert '"sends_per_sec"' in capsys.readouterr().out
@@ -0,0 +1,254 @@
+"""Планировщик метрик: один цикл с кучей сроков вместо задачи на метрику.
+
+Раньше на каждую метрику была своя asyncio-задача, которая каждый период
+перечитывала metric_period_sec из БД и отправляла через свой to_thread.
+Теперь метрики с одним сроком уходят пачкой (один запрос конфигов, одна пачка
+producer'а, один commit логов), а период меняется событием update_period().
+Конфиги метрик компилируются в неизменяемые снимки один раз и сбрасываются
+PUT-ами конструктора — повторные отправки БД не читают.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import agents.kafka_client as KC
+import agents.metrics_config_cache as MCC
+import agents.metrics_scheduler as MS
+
+
+def _recording_scheduler(gone=()):
+    sched = MS.MetricsScheduler()
+    batches = []
+
+    def fake_send_batch(ids):
+        batches.append(sorted(ids))
+        return [mid for mid in ids if mid in gone]
+
+    sched._do_send_batch = fake_send_batch
+    return sched, batches
+
+
+def test_метрики_с_одним_сроком_уходят_одной_пачкой():
+    async def run():
+        sched, batches = _recording_scheduler()
+        await sched.start_metric(1, period_sec=0.1)
+        await sched.start_metric(2, period_sec=0.1)
+        await sched.start_metric(3, period_sec=10)
+        await asyncio.sleep(0.35)
+        await sched.stop_all()
+        return batches
+
+    batches = asyncio.run(run())
+    assert len(batches) >= 2
+    assert all(b == [1, 2] for b in batches)
+
+
+def test_остановка_и_смена_периода_без_опроса_бд(monkeypatch):
+    monkeypatch.setattr(MS.MetricsScheduler, "_get_period",
+                        staticmethod(lambda mid: pytest.fail("период не должен читаться из БД")))
+
+    async def run():
+        sched, batches = _recording_scheduler()
+        await sched.start_metric(1, period_sec=10)
+        await sched.start_metric(2, period_sec=0.1)
+        await sched.update_period(1, 0.1)
+        await asyncio.sleep(0.15)
+        await sched.stop_metric(2)
+        seen = len(batches)
+        await asyncio.sleep(0.25)
+        tail = batches[seen:]
+        await sched.stop_all()
+        return batches, tail, sched
+
+    batches, tail, sched = asyncio.run(run())
+    assert batches[0] == [1, 2]
+    assert tail and all(b == [1] for b in tail)
+    assert sched.running_ids() == []
+
+
+def test_выключенная_метрика_снимается_с_расписания():
+    async def run():
+        sched, batches = _recording_scheduler(gone={2})
+        await sched.start_metric(1, period_sec=0.1)
+        await sched.start_metric(2, period_sec=0.1)
+        await asyncio.sleep(0.15)
+        ids = sched.running_ids()
+        await sched.stop_all()
+        return ids
+
+    assert asyncio.run(run()) == [1]
+
+
+# ── Отправка пачки: один запрос, одна пачка producer'а, один commit ──────────
+
+class _Meta:
+    offset, partition, timestamp = 7, 0, 1
+
+
+class _Future:
+    def get(self, timeout=None):
+        return _Meta()
+
+
+@pytest.fixture
+def metrics_db(monkeypatch):
+    import db.postgres as PG
+    from db.metrics_models import Base, TestSystem, TestMetric, TestMetricValuesConfig
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(PG, "SessionLocal", Session)
+    monkeypatch.setattr(MCC, "metric_configs", MCC.MetricConfigCache())
+
+    sent = []
+    monkeypatch.setattr(KC.KafkaClient, "send_async",
+                        classmethod(lambda cls, topic, payload, **kw: sent.append(topic) or _Future()))
+
+    db = Session()
+    on = TestSystem(it_service_ci="CI1", name="S", mon_system_ci="CI2", is_active=True)
+    db.add(on)
+    db.flush()
+    for i, active in enumerate([True, True, False], start=1):
+        m = TestMetric(
+            test_system_id=on.id, metric_hash=f"h{i}", metric_name=f"m{i}", metric_description="d",
+            metric_type="Other", metric_group="App", metric_unit="ms", object_id="o", object_name="o",
+            mon_system_metric_id=f"mid{i}", is_active=active,
+        )
+        db.add(m)
+        db.flush()
+        db.add(TestMetricValuesConfig(test_metric_id=m.id, pattern="constant", value_min=5, value_max=5))
+    db.commit()
+    db.close()
+    return Session, sent, engine
+
+
+def test_пачка_шлёт_и_логирует_активные_метрики(metrics_db):
+    from db.metrics_models import GenerationLog, TestMetric
+
+    Session, sent, _ = metrics_db
+    gone = MS.MetricsScheduler._do_send_batch([1, 2, 3, 404])
+
+    assert sorted(gone) == [3, 404]
+    # DATA + METADATA (первый запуск) для двух активных метрик
+    assert sorted(sent) == ["sber911.data"] * 2 + ["sber911.metadata"] * 2
+
+    db = Session()
+    logs = db.query(GenerationLog).order_by(GenerationLog.test_metric_id).all()
+    assert [(l.test_metric_id, l.status, l.kafka_offset) for l in logs] == [(1, "success", 7), (2, "success", 7)]
+    assert db.get(TestMetric, 1).last_metadata_sent_at is not None
+    db.close()
+
+    # Через период METADATA уже не повторяется
+    sent.clear()
+    MS.MetricsScheduler._do_send_batch([1])
+    assert sent == ["sber911.data"]
+
+
+# ── Кэш скомпилированных конфигов ────────────────────────────────────────────
+
+def _selects(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, stmt, *a: statements.append(stmt))
+    return lambda: [st for st in statements if st.lstrip().upper().startswith("SELECT")]
+
+
+def test_повторная_пачка_не_читает_конфиги_из_бд(metrics_db):
+    Session, sent, engine = metrics_db
+    MS.MetricsScheduler._do_send_batch([1, 2])
+
+    selects = _selects(engine)
+    MS.MetricsScheduler._do_send_batch([1, 2])
+    assert selects() == []
+    assert sent[-2:] == ["sber911.data", "sber911.data"]
+
+
+def test_put_конструктора_сбрасывает_снимок(metrics_db):
+    from backend.api.metrics_builder import ValuesConfigUpdate, update_values
+    from db.metrics_models import GenerationLog
+
+    Session, _, _ = metrics_db
+    MS.MetricsScheduler._do_send_batch([1])
+
+    db = Session()
+    update_values(1, ValuesConfigUpdate(pattern="constant", value_min=9, value_max=9), db)
+    db.close()
+    MS.MetricsScheduler._do_send_batch([1])
+
+    db = Session()
+    values = [float(l.value_sent) for l in db.query(GenerationLog).order_by(GenerationLog.id)]
+    db.close()
+    assert values == [5.0, 9.0]
+
+
+def test_удалённая_метрика_после_сброса_снимается(metrics_db):
+    from db.metrics_models import TestMetric
+
+    Session, _, _ = metrics_db
+    MS.MetricsScheduler._do_send_batch([2])
+    db = Session()
+    db.delete(db.get(TestMetric, 2))
+    db.commit()
+    db.close()
+
+    MCC.metric_configs.invalidate(2)
+    assert MS.MetricsScheduler._do_send_batch([2]) == [2]
+
+
+def test_снимок_неизменяем(metrics_db):
+    from dataclasses import FrozenInstanceError
+
+    compiled = MCC.metric_configs.load([1])[1]
+    assert compiled.value_min == 5.0 and isinstance(compiled.value_min, float)
+    assert compiled.topic_data == "sber911.data"
+    with pytest.raises(FrozenInstanceError):
+        compiled.value_min = 1.0
+    with pytest.raises(TypeError):
+        compiled.kafka_cfg["kafka_topic_data"] = "x"
+
+
+def test_put_общих_настроек_сбрасывает_топики(metrics_db, monkeypatch):
+    import os
+    from backend.api.app_settings import SettingsUpdate, save_settings
+
+    Session, sent, _ = metrics_db
+    monkeypatch.setattr(os, "environ", os.environ.copy())
+    MS.MetricsScheduler._do_send_batch([1])
+    assert "sber911.data" in sent
+
+    db = Session()
+    save_settings(SettingsUpdate(settings={"kafka_topic_data": "stand.data"}), db)
+    db.close()
+    sent.clear()
+    MS.MetricsScheduler._do_send_batch([1])
+    assert sent == ["stand.data"]
+    assert MCC.metric_configs.get_many([1])[0][1].topic_data == "stand.data"
+
+
+def test_сбой_пакетного_расчёта_валит_только_битую_метрику(metrics_db, monkeypatch):
+    from db.metrics_models import GenerationLog
+
+    Session, sent, _ = metrics_db
+    scalar = MS.MetricsScheduler._evaluate_one
+
+    def evaluate_one(c, now):
+        if c.id == 2:
+            raise ValueError("битый конфиг")
+        return scalar(c, now)
+
+    monkeypatch.setattr(MS.MetricsScheduler, "_evaluate",
+                        staticmethod(lambda configs, now: (_ for _ in ()).throw(ValueError("битый конфиг"))))
+    monkeypatch.setattr(MS.MetricsScheduler, "_evaluate_one", staticmethod(evaluate_one))
+    MS.MetricsScheduler._do_send_batch([1, 2])
+
+    assert sorted(sent) == ["sber911.data", "sber911.metadata"]
+    db = Session()
+    logs = db.query(GenerationLog).order_by(GenerationLog.test_metric_id).all()
+    assert [(l.test_metric_id, l.status, float(l.value_sent or 0)) for l in logs] == [(1, "success", 5.0), (2, "error", 0.0)]
+    assert "битый конфиг" in logs[1].error_message
+    db.close()
@@ -0,0 +1,113 @@
+"""Параллельный опрос нескольких БД: /api/testdata/query и пачка джобов.
+
+Раньше execute_query и execute_batch ждали подключения по очереди — пять
+стендов отвечали за сумму своих задержек, а зависшая БД держала весь
+запрос. Теперь запросы идут параллельно с общим сроком: успевшие отдают
+данные, не успевшие — ошибку timed_out.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+
+import pytest
+
+import backend.api.jobs as J
+import backend.api.testdata as T
+
+DELAYS = {"fast": 0.05, "mid": 0.2, "slow": 0.2, "hung": 1.0}
+
+
+class FakeCursor:
+    def __init__(self, conn_id):
+        self.conn_id = conn_id
+        self.description = [("db",)]
+        self.rowcount = 1
+
+    def execute(self, sql):
+        if self.conn_id == "broken":
+            raise RuntimeError("ORA-12541: no listener")
+        time.sleep(DELAYS[self.conn_id])
+
+    def fetchmany(self, size):
+        rows, self.rows = getattr(self, "rows", [(self.conn_id,)]), []
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, conn_id):
+        self.conn_id = conn_id
+
+    def cursor(self):
+        return FakeCursor(self.conn_id)
+
+    def commit(self):
+        pass
+
+
+@pytest.fixture
+def fake_dbs(monkeypatch):
+    @contextmanager
+    def pooled(cfg):
+        if cfg["id"] == "busy":
+            raise TimeoutError("Все 4 соединений с базой заняты дольше 30 с")
+        yield FakeConn(cfg["id"]), {"sql_dialect": "postgresql"}
+
+    monkeypatch.setattr(T, "pooled_connection", pooled)
+    monkeypatch.setattr(J, "pooled_connection", pooled)
+    monkeypatch.setattr(T.TestDataConnectionsStore, "get_connection",
+                        lambda cid: None if cid == "gone" else {"id": cid, "display_name": cid.upper()})
+    monkeypatch.setattr(J.TestDataConnectionsStore, "get_connection", T.TestDataConnectionsStore.get_connection)
+    monkeypatch.setattr(T.JdbcDriversStore, "get_driver", lambda driver_id: {"sql_dialect": "postgresql"})
+
+
+def test_запрос_ко_всем_бд_параллельно_с_частичным_ответом(fake_dbs):
+    req = T.QueryRequest(connection_ids=["slow", "fast", "hung", "broken", "gone", "mid", "busy"],
+                         sql="SELECT 1", timeout_sec=0.5)
+
+    async def run():
+        started = time.perf_counter()
+        out = await T.execute_query(req)
+        return out["results"], time.perf_counter() - started
+
+    out, elapsed = asyncio.run(run())
+    assert list(out) == ["slow", "fast", "hung", "broken", "gone", "mid", "busy"]
+    assert elapsed < 0.7                       # не сумма задержек и не ожидание зависшей БД
+    assert out["fast"]["rows"] == [["fast"]] and out["fast"]["db_name"] == "FAST"
+    assert out["slow"]["rows"] == [["slow"]] and out["mid"]["rows"] == [["mid"]]
+    assert out["hung"]["timed_out"] is True and out["hung"]["db_name"] == "HUNG"
+    assert "no listener" in out["broken"]["error"]
+    assert out["gone"]["error"] == "Подключение не найдено"
+    # Пул исчерпан — это не «база не ответила»
+    assert "timed_out" not in out["busy"] and "заняты" in out["busy"]["error"]
+
+
+def test_пачка_джобов_параллельно_не_успевшие_дописывают_историю(fake_dbs, monkeypatch):
+    jobs = {jid: {"id": jid, "name": jid, "connection_id": jid, "update_sql": "UPDATE t SET x = {nextfiretime}"}
+            for jid in ("fast", "mid", "slow", "hung")}
+    history = []
+    monkeypatch.setattr(J.JobsStore, "get_job", lambda jid: jobs.get(jid))
+    monkeypatch.setattr(J.JobsStore, "add_history", history.append)
+    monkeypatch.setitem(DELAYS, "hung", 0.6)
+
+    async def run():
+        started = time.perf_counter()
+        out = await J.execute_batch(J.BatchExecuteRequest(job_ids=["fast", "mid", "slow", "hung", "nope"],
+                                                          timeout_sec=0.4))
+        elapsed = time.perf_counter() - started
+        before = [h["job_id"] for h in history]
+        await asyncio.sleep(0.5)
+        return out, elapsed, before
+
+    out, elapsed, before = asyncio.run(run())
+
+    assert elapsed < 0.55
+    assert (out["total"], out["ok"], out["failed"]) == (5, 3, 2)
+    by_id = {r["job_id"]: r for r in out["results"]}
+    assert by_id["hung"]["timed_out"] is True and by_id["nope"]["error"] == "Джоб не найден"
+    assert sorted(before) == ["fast", "mid", "slow"]
+    # Не дождались, но джоб не прерван — его история записана по завершении
+    assert sorted(h["job_id"] for h in history) == ["fast", "hung", "mid", "slow"]
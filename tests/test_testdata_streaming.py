@@ -0,0 +1,161 @@
+"""Порционное чтение результата SELECT и поток NDJSON.
+
+Раньше _execute_query читал результат fetchall() целиком и прогонял каждую
+ячейку через цепочку isinstance. Теперь Statement выполняется с fetchSize и
+maxRows, строки читаются порциями fetchmany до потолка, конвертер выбирается
+на колонку один раз, а /api/testdata/query/stream отдаёт порции NDJSON.
+"""
+
+import json
+import re
+from contextlib import contextmanager
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import backend.api.testdata as T
+
+
+class FakeResultSet:
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def getMetaData(self):
+        return None
+
+
+class FakeStatement:
+    def __init__(self, calls, rows):
+        self.calls, self.rows = calls, rows
+
+    def setFetchSize(self, n):
+        self.calls.append(("fetchSize", n))
+
+    def setMaxRows(self, n):
+        self.calls.append(("maxRows", n))
+        self.rows = self.rows[:n]
+
+    def execute(self):
+        self.calls.append(("execute",))
+        return True
+
+    def getResultSet(self):
+        return FakeResultSet(self.rows)
+
+
+class FakeJConn:
+    def __init__(self, rows):
+        self.rows, self.calls, self.autocommit = rows, [], True
+
+    def setAutoCommit(self, value):
+        self.autocommit = value
+
+    def prepareStatement(self, sql):
+        self.calls.append(("prepare", sql))
+        # Как настоящая БД: приписанный LIMIT/FETCH FIRST ограничивает результат
+        limit = re.search(r"(?:LIMIT|FETCH FIRST) (\d+)", sql)
+        return FakeStatement(self.calls, self.rows[:int(limit.group(1))] if limit else self.rows)
+
+
+class FakeCursor:
+    """Как jaydebeapi.Cursor: fetchmany читает из _rs, выставленного _open_cursor."""
+
+    def __init__(self, pages):
+        self._rs, self.pages, self.closed = None, pages, False
+        self.description = [("id",), ("name",), ("blob",), ("amount",)]
+
+    def _close_last(self):
+        pass
+
+    def fetchmany(self, size):
+        self.pages.append(size)
+        batch, self._rs.rows = self._rs.rows[:size], self._rs.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConn:
+    def __init__(self, rows):
+        self.jconn = FakeJConn(rows)
+        self.pages = []
+        self.cursors = []
+
+    def cursor(self):
+        self.cursors.append(FakeCursor(self.pages))
+        return self.cursors[-1]
+
+
+def _rows(n):
+    return [(i, f"n{i}", b"\x01\xff", Decimal("1.50")) for i in range(n)]
+
+
+@pytest.fixture(autouse=True)
+def small_pages(monkeypatch):
+    monkeypatch.setattr(T, "_FETCH_SIZE", 4)
+
+
+def test_порции_потолок_и_конвертеры(monkeypatch):
+    conn = FakeConn(_rows(10))
+    out = T._execute_query(conn, "SELECT * FROM t", max_rows=7)
+
+    # fetchSize/maxRows — до выполнения, в транзакции (порции у PostgreSQL)
+    assert conn.jconn.calls == [("prepare", "SELECT * FROM t"), ("fetchSize", 4), ("maxRows", 8), ("execute",)]
+    assert conn.jconn.autocommit is False
+    assert conn.pages == [4, 3, 1]            # две порции до потолка + проверка «есть ещё»
+    assert out["row_count"] == 7 and out["truncated"] is True
+    assert out["columns"] == ["id", "name", "blob", "amount"]
+    assert out["rows"][0] == [0, "n0", "01ff", "1.50"]
+    assert conn.cursors[0].closed
+
+    full = T._execute_query(FakeConn(_rows(3)), "SELECT 1", max_rows=7)
+    assert full["row_count"] == 3 and full["truncated"] is False
+
+
+def test_конвертер_колонки_и_разнотипные_значения():
+    rows = [(None, 1), (2, "x"), (b"\x00", None), (Decimal("3"), 4.5)]
+    convs = T._column_converters(rows, 2)
+    got = [[None if v is None else c(v) for c, v in zip(convs, row)] for row in rows]
+    assert got == [[None, 1], [2, "x"], ["00", None], ["3", 4.5]]
+    assert got == [[T._to_json_value(v) for v in row] for row in rows]
+
+
+def test_поток_ndjson(monkeypatch):
+    conns = []
+
+    @contextmanager
+    def pooled(cfg):
+        conns.append(FakeConn(_rows(cfg["rows"])))
+        yield conns[-1], {"sql_dialect": "postgresql"}
+
+    monkeypatch.setattr(T, "pooled_connection", pooled)
+    monkeypatch.setattr(T, "attach_jvm_thread", lambda: None)
+    sizes = {"c1": 9, "exact": 6}
+    monkeypatch.setattr(T.TestDataConnectionsStore, "get_connection",
+                        lambda cid: {"id": cid, "rows": sizes[cid]} if cid in sizes else None)
+    monkeypatch.setattr(T.JdbcDriversStore, "get_driver", lambda driver_id: {"sql_dialect": "postgresql"})
+    monkeypatch.setenv("TESTDATA_MAX_ROWS", "6")
+
+    app = FastAPI()
+    app.include_router(T.router)
+    client = TestClient(app)
+
+    resp = client.post("/api/testdata/query/stream", json={"connection_id": "c1", "sql": "SELECT * FROM t"})
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in resp.text.splitlines()]
+    assert [e["type"] for e in events] == ["columns", "rows", "rows", "end"]
+    assert [len(e["rows"]) for e in events if e["type"] == "rows"] == [4, 2]
+    assert events[-1] == {"type": "end", "row_count": 6, "truncated": True}
+    # LIMIT на строку больше потолка — иначе обрезку «SELECT * FROM big» не заметить
+    assert conns[0].jconn.calls[0] == ("prepare", "SELECT * FROM t LIMIT 7")
+
+    # Ровно потолок строк — не обрезано
+    resp = client.post("/api/testdata/query/stream", json={"connection_id": "exact", "sql": "SELECT * FROM t"})
+    assert [json.loads(line) for line in resp.text.splitlines()][-1] == {"type": "end", "row_count": 6, "truncated": False}
+
+    assert client.post("/api/testdata/query/stream", json={"connection_id": "nope", "sql": "SELECT 1"}).status_code == 404
+    assert client.post("/api/testdata/query/stream", json={"connection_id": "c1", "sql": "DELETE FROM t"}).status_code == 400
+    assert T._validate_sql("SELECT * FROM t", "oracle", 6).endswith("FETCH FIRST 7 ROWS ONLY")
@@ -0,0 +1,69 @@
+"""Массовая загрузка эталонов и контекстных документов.
+
+Раньше scripts/load_*.py и UI добавляли документы по одному: на каждый —
+отдельный проход эмбеддинга и отдельная запись в Chroma. Теперь add_*_bulk
+считают эмбеддинги пачками и пишут теми же пачками, а /api/etalons/bulk
+принимает JSONL.
+"""
+
+import json
+
+import pytest
+
+import db.vector_store as VS
+from backend.api.etalons import _parse_etalons_jsonl
+
+
+@pytest.fixture
+def store(tmp_path):
+    calls = []
+
+    def fake_ef(texts):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    vs = VS.VectorStore(persist_dir=tmp_path)
+    vs.ef = fake_ef
+    vs._warm = True        # модель «уже загружена» — считаются только пачки
+    vs.ef_calls = calls
+    return vs
+
+
+def test_пары_эмбеддятся_и_пишутся_пачками(store):
+    items = [
+        {"pair_id": f"p{i}", "requirement_text": f"требование {i}", "test_case_xml": f"<tc>{i}</tc>",
+         "feature": "F", "tags": ["a"]}
+        for i in range(5)
+    ]
+    assert store.add_pairs_bulk(items, batch_size=2) == 5
+    assert [len(c) for c in store.ef_calls] == [2, 2, 1]
+
+    got = store.pairs.get(ids=["p3"])
+    assert got["documents"] == ["требование 3"]
+    assert got["metadatas"][0]["test_case_xml"] == "<tc>3</tc>"
+    assert got["metadatas"][0]["tags"] == '["a"]'
+
+
+def test_повтор_id_в_пачке_не_ломает_upsert(store):
+    items = [
+        {"doc_id": "d1", "content": "старый", "name": "Док"},
+        {"doc_id": "d1", "content": "новый", "name": "Док"},
+        {"doc_id": "d2", "content": "другой"},
+    ]
+    assert store.add_context_docs_bulk(items) == 2
+    assert store.context_docs.get(ids=["d1"])["documents"] == ["новый"]
+    assert store.context_docs.count() == 2
+
+
+def test_jsonl_пропускает_битые_строки_с_номерами():
+    text = "\n".join([
+        json.dumps({"req_text": "r1", "tc_text": "t1", "feature": "F", "id": "e1"}),
+        "",
+        "{не json",
+        json.dumps({"req_text": "r2"}),
+        json.dumps({"req_text": "r3", "tc_text": "t3"}),
+    ])
+    items, errors = _parse_etalons_jsonl(text)
+    assert [i["requirement_text"] for i in items] == ["r1", "r3"]
+    assert items[0]["pair_id"] == "e1" and items[0]["feature"] == "F"
+    assert [e["line"] for e in errors] == [3, 4]
@@ -0,0 +1,91 @@
+"""Общий VectorStore на процесс.
+
+Раньше каждый запрос эталонов и генерации создавал VectorStore() — заново
+открывал PersistentClient и модель эмбеддингов, а первый поиск ждал загрузку
+ONNX. Теперь get_vector_store() отдаёт один экземпляр, а warm_up() грузит
+модель один раз даже при параллельных первых запросах.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import db.vector_store as VS
+
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(VS, "_store", None)
+
+
+def test_один_экземпляр_на_все_потоки(fresh, monkeypatch):
+    created = []
+
+    class FakeStore:
+        def __init__(self):
+            time.sleep(0.05)
+            created.append(self)
+
+    monkeypatch.setattr(VS, "VectorStore", FakeStore)
+    with ThreadPoolExecutor(8) as pool:
+        stores = list(pool.map(lambda _: VS.get_vector_store(), range(8)))
+    assert len(created) == 1
+    assert all(s is created[0] for s in stores)
+
+
+def test_прогрев_грузит_модель_один_раз(fresh, tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ef(texts):
+        time.sleep(0.05)
+        calls.append(texts)
+        return [[0.0] for _ in texts]
+
+    store = VS.VectorStore(persist_dir=tmp_path)
+    store.ef = fake_ef
+    threads = [threading.Thread(target=store.warm_up) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+
+def test_поиск_во_время_прогрева_ждёт_его(fresh, tmp_path):
+    calls = []
+
+    def fake_ef(texts):
+        time.sleep(0.05)
+        calls.append(list(texts))
+        return [[0.0, 1.0] for _ in texts]
+
+    store = VS.VectorStore(persist_dir=tmp_path)
+    store.ef = fake_ef
+    threads = [threading.Thread(target=store.warm_up)] + [
+        threading.Thread(target=store.find_context_passages, args=(f"запрос {i}",)) for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Модель грузится один раз — прогревом; поиски эмбеддят только свой запрос
+    assert calls.count(["прогрев"]) == 1
+    assert calls[0] == ["прогрев"] and len(calls) == 5
+
+
+def test_init_без_прогрева_не_трогает_модель_но_нарезает_документы(fresh, monkeypatch):
+    reindexed = []
+
+    class FakeStore:
+        def warm_up(self):
+            raise AssertionError("prewarm disabled")
+
+        def reindex_context_docs(self):
+            reindexed.append(self)
+            return 0
+
+    monkeypatch.setattr(VS, "VectorStore", FakeStore)
+    assert VS.init_vector_store(prewarm=False) is VS.get_vector_store()
+    assert reindexed == [VS.get_vector_store()]